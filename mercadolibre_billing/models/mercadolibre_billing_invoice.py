@@ -532,14 +532,15 @@ class MercadoliBillingInvoice(models.Model):
 
         _logger.info(f'Descargando PDF desde: {url}')
 
-        import requests
         import base64
 
         headers = {
             'Authorization': f'Bearer {token}',
         }
 
-        response = requests.get(url, headers=headers, timeout=30)
+        response = self.env['mercadolibre.http']._send(
+            self.account_id.id, 'GET', url, headers=headers, timeout=30
+        )
 
         if response.status_code != 200:
             _logger.error(f'Error descargando PDF: Status {response.status_code}, Response: {response.text[:500]}')
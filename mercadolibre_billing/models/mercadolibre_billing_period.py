@@ -206,7 +206,6 @@ class MercadoliBillingPeriod(models.Model):
         batch_number = 0
         consecutive_errors = 0
         max_consecutive_errors = 5
-        base_delay = 1.0
         total_synced = 0
 
         doc_type_name = 'Facturas' if document_type == 'BILL' else 'Notas de Crédito'
@@ -216,9 +215,6 @@ class MercadoliBillingPeriod(models.Model):
             try:
                 batch_number += 1
 
-                if batch_number > 1:
-                    time.sleep(base_delay)
-
                 results, display, total = self._sync_billing_details_batch(
                     token, offset, limit, document_type=document_type
                 )
@@ -329,21 +325,13 @@ class MercadoliBillingPeriod(models.Model):
 
             # Sincronizar cada tipo de documento
             for doc_type in doc_types_to_sync:
+                # El rate limit lo gestiona mercadolibre.http._send
                 synced = self._sync_document_type(token, doc_type, log_lines)
                 total_synced += synced
 
-                # Pausa entre tipos de documento para evitar rate limit
-                if len(doc_types_to_sync) > 1 and doc_type != doc_types_to_sync[-1]:
-                    log_lines.append('[INFO] Pausa de 5s antes de siguiente tipo...')
-                    time.sleep(5)
-
             log_lines.append(f'[SUCCESS] Sincronización de detalles completada: {total_synced} detalles')
 
             # Sincronizar file_ids de documentos PDF
-            # Esperar antes de llamar para evitar rate limit
-            log_lines.append(f'[INFO] Esperando 10s antes de sincronizar PDFs...')
-            time.sleep(10)
-
             try:
                 log_lines.append(f'[INFO] Sincronizando file_ids de PDFs...')
                 pdf_count = self._sync_document_files(token)
@@ -440,7 +428,9 @@ class MercadoliBillingPeriod(models.Model):
         start_time = datetime.now()
 
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=60)
+            response = self.env['mercadolibre.http']._send(
+                self.account_id.id, 'GET', url, headers=headers, params=params, timeout=60
+            )
             duration = (datetime.now() - start_time).total_seconds()
 
             # Log de la llamada
@@ -527,26 +517,19 @@ class MercadoliBillingPeriod(models.Model):
         group_name = 'MercadoLibre' if self.billing_group == 'ML' else 'MercadoPago'
         _logger.info(f'Sincronizando documentos PDF de {group_name} desde: {url}?group={self.billing_group}')
 
-        # Retry con backoff para manejar rate limiting
-        max_retries = 3
-        for attempt in range(max_retries):
-            response = requests.get(url, headers=headers, params=params, timeout=60)
-
-            if response.status_code == 200:
-                break
-            elif response.status_code == 429:
-                wait_time = 2 ** (attempt + 1)  # 2, 4, 8 segundos
-                _logger.warning(f'Rate limit 429 en documents, esperando {wait_time}s (intento {attempt + 1}/{max_retries})')
-                time.sleep(wait_time)
-            else:
-                _logger.error(f'Error obteniendo documentos: {response.status_code} - {response.text[:500]}')
-                raise UserError(_(
-                    'Error al obtener documentos de MercadoLibre.\n'
-                    'Status: %s'
-                ) % response.status_code)
-        else:
-            # Si agotamos los reintentos
+        # Rate limit y reintentos ante 429 los gestiona mercadolibre.http._send
+        response = self.env['mercadolibre.http']._send(
+            self.account_id.id, 'GET', url, headers=headers, params=params, timeout=60
+        )
+
+        if response.status_code == 429:
             raise UserError(_('Error al obtener documentos: Rate limit persistente (429)'))
+        if response.status_code != 200:
+            _logger.error(f'Error obteniendo documentos: {response.status_code} - {response.text[:500]}')
+            raise UserError(_(
+                'Error al obtener documentos de MercadoLibre.\n'
+                'Status: %s'
+            ) % response.status_code)
 
         data = response.json()
         results = data.get('results', [])
@@ -631,8 +614,6 @@ class MercadoliBillingPeriod(models.Model):
                 continue  # Ya tiene el PDF
 
             try:
-                # Esperar para evitar rate limit
-                time.sleep(0.5)
                 inv._download_and_attach_pdf(inv.vendor_bill_id)
                 downloaded += 1
                 _logger.info(f'PDF descargado para {inv.legal_document_number}')
@@ -492,7 +492,7 @@ class MercadolibreClaim(models.Model):
                 'Content-Type': 'application/json',
             }
 
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self.env['mercadolibre.http']._get_session(account).get(url, headers=headers, timeout=10)
 
             if response.status_code == 200:
                 user_data = response.json()
@@ -744,7 +744,7 @@ class MercadolibreClaim(models.Model):
         start_time = time.time()
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, headers=headers, timeout=30)
             duration = time.time() - start_time
 
             headers_log = {k: v if k != 'Authorization' else 'Bearer ***' for k, v in headers.items()}
@@ -793,7 +793,7 @@ class MercadolibreClaim(models.Model):
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, headers=headers, timeout=30)
 
             if response.status_code != 200:
                 _logger.error('Error obteniendo mensajes: %s', response.text)
@@ -897,7 +897,7 @@ class MercadolibreClaim(models.Model):
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, headers=headers, timeout=30)
 
             if response.status_code == 200:
                 data = response.json()
@@ -935,7 +935,7 @@ class MercadolibreClaim(models.Model):
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, headers=headers, timeout=30)
 
             if response.status_code != 200:
                 _logger.error('Error obteniendo orden %s: %s', self.ml_order_id, response.text)
@@ -1003,7 +1003,7 @@ class MercadolibreClaim(models.Model):
         try:
             url = f'https://api.mercadolibre.com/items/{ml_item_id}'
             headers = {'Authorization': f'Bearer {access_token}'}
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, headers=headers, timeout=10)
 
             if response.status_code == 200:
                 item_data = response.json()
@@ -1109,7 +1109,7 @@ class MercadolibreClaim(models.Model):
         }
 
         try:
-            response = requests.post(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).post(url, headers=headers, timeout=30)
 
             if response.status_code not in (200, 201):
                 raise UserError(_('Error al abrir disputa: %s') % response.text)
@@ -1151,7 +1151,7 @@ class MercadolibreClaim(models.Model):
         }
 
         try:
-            response = requests.post(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).post(url, headers=headers, timeout=30)
 
             if response.status_code not in (200, 201):
                 raise UserError(_('Error al procesar reembolso: %s') % response.text)
@@ -1193,7 +1193,7 @@ class MercadolibreClaim(models.Model):
         }
 
         try:
-            response = requests.post(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).post(url, headers=headers, timeout=30)
 
             if response.status_code not in (200, 201):
                 raise UserError(_('Error al permitir devolucion: %s') % response.text)
@@ -279,6 +279,12 @@ class MercadolibreClaimConfig(models.Model):
         string='Log Ultima Sincronizacion',
         readonly=True
     )
+    last_sync_run_id = fields.Many2one(
+        'mercadolibre.sync.run',
+        string='Ultima Ejecucion',
+        readonly=True,
+        ondelete='set null'
+    )
     total_syncs = fields.Integer(
         string='Total Sincronizaciones',
         readonly=True,
@@ -327,6 +333,11 @@ class MercadolibreClaimConfig(models.Model):
 
             record.state = 'active'
 
+    def action_view_sync_runs(self):
+        """Ver el historial de ejecuciones de esta configuracion"""
+        self.ensure_one()
+        return self.env['mercadolibre.sync.run']._action_view_runs(self)
+
     def action_run_now(self):
         """Ejecuta la sincronizacion manualmente ahora"""
         self.ensure_one()
@@ -379,6 +390,7 @@ class MercadolibreClaimConfig(models.Model):
             })
             return False
 
+        run = self.env['mercadolibre.sync.run']._start(self, 'claims', self.account_id)
         log_lines = []
         log_lines.append('=' * 50)
         log_lines.append(f'  SYNC CLAIMS: {self.name}')
@@ -392,9 +404,11 @@ class MercadolibreClaimConfig(models.Model):
         access_token = self.account_id.get_valid_token_with_retry(max_retries=2)
         if not access_token:
             log_lines.append('ERROR: No se pudo obtener token valido')
+            run.close('\n'.join(log_lines), state='error')
             self.write({
                 'last_sync': fields.Datetime.now(),
                 'last_sync_log': '\n'.join(log_lines),
+                'last_sync_run_id': run.run.id,
             })
             return False
 
@@ -419,7 +433,7 @@ class MercadolibreClaimConfig(models.Model):
         start_time = time.time()
 
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=60)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, params=params, headers=headers, timeout=60)
             duration = time.time() - start_time
 
             headers_log = {k: v if k != 'Authorization' else 'Bearer ***' for k, v in headers.items()}
@@ -440,9 +454,11 @@ class MercadolibreClaimConfig(models.Model):
             if response.status_code != 200:
                 log_lines.append(f'ERROR API: {response.status_code}')
                 log_lines.append(response.text[:500])
+                run.close('\n'.join(log_lines), state='error')
                 self.write({
                     'last_sync': fields.Datetime.now(),
                     'last_sync_log': '\n'.join(log_lines),
+                    'last_sync_run_id': run.run.id,
                 })
                 return False
 
@@ -451,9 +467,11 @@ class MercadolibreClaimConfig(models.Model):
         except requests.exceptions.RequestException as e:
             _logger.error('Error de conexion: %s', str(e))
             log_lines.append(f'ERROR: {str(e)}')
+            run.close('\n'.join(log_lines), state='error')
             self.write({
                 'last_sync': fields.Datetime.now(),
                 'last_sync_log': '\n'.join(log_lines),
+                'last_sync_run_id': run.run.id,
             })
             return False
 
@@ -478,17 +496,20 @@ class MercadolibreClaimConfig(models.Model):
 
                 if is_new:
                     created_count += 1
+                    run.add('created', claim.display_name, claim_data.get('id'))
                     # Notificar nuevo claim
                     if self.notify_new_claim:
                         self._notify_new_claim(claim)
                 else:
                     updated_count += 1
+                    run.count('updated')
                     # Verificar cambios de estado
                     self._check_claim_changes(claim, claim_data)
 
             except Exception as e:
                 error_count += 1
                 _logger.error('Error procesando claim %s: %s', claim_data.get('id'), str(e))
+                run.add('error', str(e), claim_data.get('id'))
 
         log_lines.append('-' * 50)
         log_lines.append('  RESUMEN')
@@ -506,10 +527,14 @@ class MercadolibreClaimConfig(models.Model):
         elif self.sync_interval_type == 'days':
             next_sync += timedelta(days=self.sync_interval_number)
 
+        summary = '\n'.join(log_lines)
+        run.close(summary)
+
         self.write({
             'last_sync': fields.Datetime.now(),
             'last_sync_count': sync_count,
-            'last_sync_log': '\n'.join(log_lines),
+            'last_sync_log': summary,
+            'last_sync_run_id': run.run.id,
             'next_sync': next_sync,
             'total_syncs': self.total_syncs + 1,
             'total_claims_synced': self.total_claims_synced + sync_count,
@@ -229,7 +229,7 @@ class MercadolibreClaimEvidenceAttachment(models.Model):
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=60)
+            response = self.env['mercadolibre.http']._get_session(account).get(url, headers=headers, timeout=60)
 
             if response.status_code != 200:
                 raise UserError(_('Error descargando archivo: %s') % response.text)
@@ -316,7 +316,7 @@ class MercadolibreClaimMessageAttachment(models.Model):
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=60)
+            response = self.env['mercadolibre.http']._get_session(account).get(url, headers=headers, timeout=60)
 
             if response.status_code != 200:
                 _logger.error('Error descargando archivo %s: %s', self.filename, response.text)
@@ -59,38 +59,32 @@ class MercadolibrePayment(models.Model):
             record.claim_count = len(record.claim_ids)
             record.has_active_claim = any(c.status == 'opened' for c in record.claim_ids)
 
-    @api.model
-    def create_from_mp_data(self, data, account):
-        """Sobrescribe para detectar mediaciones"""
-        payment, is_new = super().create_from_mp_data(data, account)
-
-        if not payment:
-            return payment, is_new
+    def _on_mp_data_synced(self, data, is_new):
+        """Detecta mediaciones al sincronizar el pago"""
+        super()._on_mp_data_synced(data, is_new)
 
         # Detectar si entro en mediacion
         current_status = data.get('status', '')
 
         if current_status == 'in_mediation':
-            if payment.mediation_status == 'none':
+            if self.mediation_status == 'none':
                 # Primera vez que entra en mediacion
-                payment._process_mediation_entry()
-            elif payment.mediation_status != 'in_mediation':
+                self._process_mediation_entry()
+            elif self.mediation_status != 'in_mediation':
                 # Re-entro en mediacion
-                payment._process_mediation_entry()
+                self._process_mediation_entry()
 
-        elif current_status == 'approved' and payment.mediation_status == 'in_mediation':
+        elif current_status == 'approved' and self.mediation_status == 'in_mediation':
             # Salio de mediacion con aprobacion (a favor vendedor)
-            payment._process_mediation_resolution('seller')
+            self._process_mediation_resolution('seller')
 
-        elif current_status in ('refunded', 'charged_back') and payment.mediation_status == 'in_mediation':
+        elif current_status in ('refunded', 'charged_back') and self.mediation_status == 'in_mediation':
             # Salio de mediacion con reembolso (a favor comprador)
-            payment._process_mediation_resolution('buyer')
+            self._process_mediation_resolution('buyer')
 
-        elif current_status == 'cancelled' and payment.mediation_status == 'in_mediation':
+        elif current_status == 'cancelled' and self.mediation_status == 'in_mediation':
             # Cancelado durante mediacion
-            payment._process_mediation_resolution('other')
-
-        return payment, is_new
+            self._process_mediation_resolution('other')
 
     def _process_mediation_entry(self):
         """Procesa la entrada de un pago a mediacion"""
@@ -146,7 +146,7 @@ class MercadolibrePaymentSyncConfigClaims(models.Model):
         }
 
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=60)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, params=params, headers=headers, timeout=60)
 
             if response.status_code != 200:
                 _logger.error('Error API claims: %s', response.text)
@@ -160,6 +160,7 @@ class MercadolibrePaymentSyncConfigClaims(models.Model):
 
         results = data.get('data', [])
         ClaimModel = self.env['mercadolibre.claim']
+        run = self.env['mercadolibre.sync.run']._start(self, 'claims', self.account_id)
 
         synced_count = 0
         created_count = 0
@@ -173,11 +174,13 @@ class MercadolibrePaymentSyncConfigClaims(models.Model):
 
                 if is_new:
                     created_count += 1
+                    run.add('created', claim.display_name, claim_data.get('id'))
                     # Crear actividad si está configurado
                     if self.create_mediation_activity and self.mediation_activity_user_id:
                         self._create_claim_activity(claim)
                 else:
                     updated_count += 1
+                    run.count('updated')
 
                 # Sincronizar mensajes si está habilitado
                 if self.sync_claim_messages and claim:
@@ -186,6 +189,7 @@ class MercadolibrePaymentSyncConfigClaims(models.Model):
             except Exception as e:
                 error_count += 1
                 _logger.error('Error procesando claim %s: %s', claim_data.get('id'), str(e))
+                run.add('error', str(e), claim_data.get('id'))
 
         # Actualizar estadísticas
         self.write({
@@ -195,10 +199,11 @@ class MercadolibrePaymentSyncConfigClaims(models.Model):
             'total_claims_synced': self.total_claims_synced + synced_count,
         })
 
-        # Actualizar log
-        claims_log = f'\n\n  CLAIMS SYNC:\n  Sincronizados: {synced_count} (Nuevos: {created_count}, Actualizados: {updated_count}, Errores: {error_count})'
+        # El detalle queda en la ejecución; el log de pagos solo recibe la línea de resumen
+        claims_log = f'  CLAIMS SYNC:\n  Sincronizados: {synced_count} (Nuevos: {created_count}, Actualizados: {updated_count}, Errores: {error_count})'
+        run.close(claims_log)
         if self.last_sync_log:
-            self.last_sync_log = self.last_sync_log + claims_log
+            self.last_sync_log = self.last_sync_log + '\n\n' + claims_log
 
         _logger.info('SYNC CLAIMS completada: %d sincronizados', synced_count)
 
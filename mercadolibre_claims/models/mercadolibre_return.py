@@ -636,7 +636,7 @@ class MercadolibreReturn(models.Model):
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, headers=headers, timeout=30)
 
             if response.status_code != 200:
                 _logger.error('Error obteniendo returns: %s', response.text)
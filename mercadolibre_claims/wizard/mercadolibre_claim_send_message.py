@@ -162,7 +162,7 @@ class MercadolibreClaimSendMessageWizard(models.TransientModel):
             body['attachments'] = uploaded_filenames
 
         try:
-            response = requests.post(url, headers=headers, json=body, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(account).post(url, headers=headers, json=body, timeout=30)
 
             if response.status_code not in (200, 201):
                 error_data = response.json() if response.text else {}
@@ -220,7 +220,7 @@ class MercadolibreClaimSendMessageWizard(models.TransientModel):
         }
 
         try:
-            response = requests.post(url, headers=headers, files=files, timeout=60)
+            response = self.env['mercadolibre.http']._get_session(claim.account_id).post(url, headers=headers, files=files, timeout=60)
 
             if response.status_code == 200:
                 data = response.json()
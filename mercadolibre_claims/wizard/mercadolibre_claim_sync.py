@@ -90,7 +90,7 @@ class MercadolibreClaimSyncWizard(models.TransientModel):
         }
 
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=60)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, params=params, headers=headers, timeout=60)
 
             if response.status_code != 200:
                 raise UserError(_('Error API: %s') % response.text)
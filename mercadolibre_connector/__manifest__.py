@@ -36,6 +36,9 @@
         'views/mercadolibre_account_views.xml',
         'views/mercadolibre_invitation_views.xml',
         'views/mercadolibre_log_views.xml',
+        'views/mercadolibre_notification_views.xml',
+        'views/mercadolibre_sync_run_views.xml',
+        'views/mercadolibre_job_views.xml',
         'views/mercadolibre_playground_views.xml',
         'views/mercadolibre_menus.xml',
         'views/templates.xml',
@@ -38,51 +38,6 @@ class MercadolibreController(http.Controller):
     - questions: Notificaciones de preguntas
     """
 
-
-    def _delegate_notification(self, account, data):
-        """
-        Delega la notificación al módulo correspondiente según el topic.
-
-        Los módulos pueden registrar handlers implementando:
-        mercadolibre.notification.handler con método process_notification(account, data)
-        """
-        topic = data.get('topic')
-        resource = data.get('resource', '')
-
-        # Mapeo de topics a modelos que pueden manejarlos
-        topic_handlers = {
-            'messages': 'mercadolibre.conversation',
-            'orders_v2': 'mercadolibre.order',
-            'shipments': 'mercadolibre.shipment',
-            'questions': 'mercadolibre.question',
-            'payments': 'mercadolibre.payment',  # Agregado desde mercadolibre_payments
-        }
-
-        handler_model = topic_handlers.get(topic)
-
-        _logger.info(f"[WEBHOOK] Topic: {topic} -> Handler: {handler_model or 'NO DEFINIDO'}")
-
-        if handler_model and handler_model in request.env:
-            model = request.env[handler_model].sudo()
-            if hasattr(model, 'process_notification'):
-                try:
-                    _logger.info(f"[WEBHOOK] Ejecutando {handler_model}.process_notification()")
-                    result = model.process_notification(account, data)
-                    _logger.info(f"[WEBHOOK] Handler {handler_model} completado: {result}")
-                    return result
-                except Exception as e:
-                    _logger.error(f"[WEBHOOK] Error en handler {handler_model}: {str(e)}", exc_info=True)
-                    return {'status': 'error', 'handler': handler_model, 'message': str(e)}
-            else:
-                _logger.warning(f"[WEBHOOK] Modelo {handler_model} no tiene método process_notification")
-        else:
-            if handler_model:
-                _logger.warning(f"[WEBHOOK] Modelo {handler_model} no está instalado")
-
-        _logger.debug(f"[WEBHOOK] Topic '{topic}' sin handler registrado")
-        return {'status': 'ignored', 'reason': f'no_handler_for_{topic}'}
-
-
     @http.route('/mercadolibre/notifications/status', type='json', auth='user',
                 methods=['POST'], csrf=False)
     def webhook_status(self, **kwargs):
@@ -117,9 +72,18 @@ class MercadolibreController(http.Controller):
                     except:
                         pass
 
+            # Estado de la bandeja de notificaciones
+            queue_counts = {
+                group['state']: group['state_count']
+                for group in request.env['mercadolibre.notification'].sudo().read_group(
+                    [], ['state'], ['state']
+                )
+            }
+
             return {
                 'status': 'ok',
                 'webhook_url': '/mercadolibre/callback',
+                'queue': queue_counts,
                 'last_24h': {
                     'total': len(notifications),
                     'by_status': status_counts,
@@ -146,7 +110,7 @@ class MercadolibreController(http.Controller):
 
     def _handle_webhook_notification(self):
         """
-        Procesa notificaciones webhook de MercadoLibre.
+        Recibe notificaciones webhook de MercadoLibre.
 
         MercadoLibre envía POST con estructura:
         {
@@ -158,8 +122,11 @@ class MercadolibreController(http.Controller):
             "sent": "2024-01-15T10:30:00.000Z",
             "received": "2024-01-15T10:30:01.000Z"
         }
+
+        Solo se guarda la notificación en mercadolibre.notification y se
+        responde 200 de inmediato; el procesamiento lo hace el cron
+        ir_cron_process_notifications para no exceder el timeout de ML.
         """
-        start_time = datetime.now()
         data = {}
 
         try:
@@ -174,17 +141,9 @@ class MercadolibreController(http.Controller):
             topic = data.get('topic', 'unknown')
             user_id = str(data.get('user_id', ''))
             resource = data.get('resource', '')
-            attempts = data.get('attempts', 1)
-            notification_id = data.get('_id', '')
-
-            _logger.info("=" * 60)
-            _logger.info(f"[WEBHOOK /callback] Notificación recibida")
-            _logger.info(f"[WEBHOOK] Topic: {topic}")
-            _logger.info(f"[WEBHOOK] User ID: {user_id}")
-            _logger.info(f"[WEBHOOK] Resource: {resource}")
-            _logger.info(f"[WEBHOOK] Attempts: {attempts}")
-            _logger.info(f"[WEBHOOK] Notification ID: {notification_id}")
-            _logger.info(f"[WEBHOOK] Payload: {json.dumps(data, indent=2)}")
+
+            _logger.info(f"[WEBHOOK /callback] Topic: {topic} | Resource: {resource} | "
+                         f"User ID: {user_id} | Attempts: {data.get('attempts', 1)}")
 
             # Buscar cuenta ML
             account = request.env['mercadolibre.account'].sudo().search([
@@ -196,7 +155,7 @@ class MercadolibreController(http.Controller):
                 _logger.warning(f"[WEBHOOK] Cuenta ML no encontrada para user_id: {user_id}")
 
                 # Log a BD
-                request.env['mercadolibre.log'].sudo().create({
+                request.env['mercadolibre.log'].sudo()._write_log({
                     'log_type': 'notification',
                     'level': 'warning',
                     'message': f'[WEBHOOK] Cuenta no encontrada - Topic: {topic}, Resource: {resource}',
@@ -206,51 +165,22 @@ class MercadolibreController(http.Controller):
 
                 return json_response({'status': 'ignored', 'reason': 'account_not_found'})
 
-            # Log de la notificación
-            log_record = request.env['mercadolibre.log'].sudo().create({
-                'log_type': 'notification',
-                'level': 'info',
-                'account_id': account.id,
-                'message': f'[WEBHOOK] Topic: {topic} | Resource: {resource} | Intento: {attempts}',
-                'request_url': resource,
-                'request_method': 'POST',
-                'request_body': json.dumps(data, indent=2),
-            })
-
-            _logger.info(f"[WEBHOOK] Cuenta: {account.name} (ID: {account.id})")
-            _logger.info(f"[WEBHOOK] Log ID: {log_record.id}")
-
-            # Delegar al handler correspondiente
-            result = self._delegate_notification(account, data)
-
-            # Actualizar log con resultado
-            duration = (datetime.now() - start_time).total_seconds()
-            log_record.sudo().write({
-                'response_body': json.dumps(result, indent=2),
-                'duration': duration,
-                'level': 'success' if result.get('status') == 'ok' else 'warning',
-            })
-
-            _logger.info(f"[WEBHOOK] Resultado: {result}")
-            _logger.info(f"[WEBHOOK] Duración: {duration:.3f}s")
-            _logger.info("=" * 60)
+            notification = request.env['mercadolibre.notification'].sudo()._enqueue(data, account)
 
-            return json_response(result)
+            return json_response({'status': 'queued', 'id': notification.id})
 
         except Exception as e:
-            duration = (datetime.now() - start_time).total_seconds()
             error_msg = str(e)
 
             _logger.error(f"[WEBHOOK] Error: {error_msg}", exc_info=True)
 
             try:
-                request.env['mercadolibre.log'].sudo().create({
+                request.env['mercadolibre.log'].sudo()._write_log({
                     'log_type': 'notification',
                     'level': 'error',
                     'message': f'[WEBHOOK ERROR] {error_msg}',
                     'request_body': json.dumps(data, indent=2) if data else '',
                     'error_details': error_msg,
-                    'duration': duration,
                 })
             except:
                 pass
@@ -7,3 +7,7 @@ from . import mercadolibre_invitation
 from . import mercadolibre_log
 from . import mercadolibre_api_playground
 from . import mercadolibre_http
+from . import mercadolibre_rate_limit
+from . import mercadolibre_notification
+from . import mercadolibre_sync_run
+from . import mercadolibre_job
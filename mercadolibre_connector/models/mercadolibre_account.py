@@ -113,12 +113,18 @@ class MercadolibreAccount(models.Model):
                 record.current_token_id = False
                 record.has_valid_token = False
 
-    def get_valid_token(self, force_refresh=False):
+    def get_valid_token(self, force_refresh=False, stale_token=None):
         """
         Obtiene un token válido, refrescándolo si es necesario.
 
+        El token se sirve desde un cache en memoria del worker mientras no
+        esté próximo a expirar, sin leer la base de datos. Los refrescos se
+        hacen con mercadolibre.token._refresh_single_flight, de modo que un
+        solo proceso refresca cada cuenta y el resto reutiliza su token.
+
         Args:
             force_refresh: Forzar refresh aunque el token sea válido
+            stale_token: access token rechazado por la API (401), si se conoce
 
         Returns:
             access_token string
@@ -127,6 +133,15 @@ class MercadolibreAccount(models.Model):
             ValidationError si no hay token o no se puede refrescar
         """
         self.ensure_one()
+        TokenModel = self.env['mercadolibre.token']
+        margin = TokenModel._get_refresh_margin()
+
+        if not force_refresh:
+            cached = TokenModel._get_cached_token(self.id, margin_minutes=margin)
+            if cached:
+                return cached
+        elif not stale_token:
+            stale_token = TokenModel._get_cached_token(self.id)
 
         # Buscar token activo (incluso si expiró, para intentar refresh)
         token = self.token_ids.filtered(lambda t: t.active).sorted(
@@ -140,12 +155,19 @@ class MercadolibreAccount(models.Model):
                 'Por favor reconecte la cuenta.'
             ) % self.name)
 
-        # Si el token expiró o está próximo a expirar, intentar refrescar
-        if force_refresh or not token.is_valid or token.is_expiring_soon():
+        # Si el token expiró o está próximo a expirar, intentar refrescar.
+        # Si aún es válido no se espera al lock: se usa el actual y lo
+        # refresca el proceso que ya tiene el lock.
+        if force_refresh or not token.is_valid or token.is_expiring_soon(minutes=margin):
+            must_wait = force_refresh or not token.is_valid
             try:
-                new_token = token._refresh_token()
-                if new_token:
-                    token = new_token
+                refreshed = TokenModel._refresh_single_flight(
+                    self.id,
+                    stale_token=(stale_token or token.access_token) if force_refresh else None,
+                    wait=must_wait,
+                )
+                if refreshed:
+                    return refreshed[0]
             except Exception as e:
                 # Si falla el refresh, verificar si el token aún es válido
                 if not token.is_valid:
@@ -163,6 +185,7 @@ class MercadolibreAccount(models.Model):
                 'Por favor reconecte la cuenta.'
             ) % self.name)
 
+        TokenModel._set_cached_token(self.id, token.access_token, token.expires_at)
         return token.access_token
 
     def get_valid_token_with_retry(self, max_retries=2):
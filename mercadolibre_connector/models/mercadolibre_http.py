@@ -1,17 +1,489 @@
 # -*- coding: utf-8 -*-
 
+import os
+import time
+import random
+import threading
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from odoo import models, api, _
 from odoo.exceptions import UserError
 
 _logger = logging.getLogger(__name__)
 
+ML_API_BASE_URL = 'https://api.mercadolibre.com'
+
+# Sesiones HTTP reutilizables por proceso (worker), base de datos y cuenta.
+# La llave incluye el PID para no compartir sockets entre workers tras un fork.
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+# Códigos HTTP que se reintentan con backoff exponencial
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Recursos con multiget (/recurso?ids=A,B,C) y máximo de IDs por llamada
+MULTIGET_LIMITS = {
+    'items': 20,
+    'users': 20,
+}
+
 
 class MercadolibreHttp(models.AbstractModel):
     _name = 'mercadolibre.http'
     _description = 'HTTP Wrapper para MercadoLibre API'
 
+    @api.model
+    def _get_session(self, account_id=None):
+        """
+        Obtiene la sesión HTTP con pool de conexiones keep-alive para una cuenta.
+
+        La sesión se crea una sola vez por worker y cuenta, de modo que los
+        requests consecutivos reutilizan la conexión TLS abierta con
+        api.mercadolibre.com en lugar de negociar un handshake nuevo.
+
+        Parámetros de sistema:
+            mercadolibre_connector.http_pool_connections: hosts en el pool (default 4)
+            mercadolibre_connector.http_pool_maxsize: conexiones por host (default 10)
+
+        Args:
+            account_id: ID o registro de mercadolibre.account (opcional)
+
+        Returns:
+            requests.Session
+        """
+        if isinstance(account_id, models.BaseModel):
+            account_id = account_id.id
+        key = (os.getpid(), self.env.cr.dbname, account_id or 0)
+
+        session = _SESSIONS.get(key)
+        if session is not None:
+            return session
+
+        with _SESSIONS_LOCK:
+            session = _SESSIONS.get(key)
+            if session is None:
+                ICP = self.env['ir.config_parameter'].sudo()
+                pool_connections = int(ICP.get_param(
+                    'mercadolibre_connector.http_pool_connections', default=4))
+                pool_maxsize = int(ICP.get_param(
+                    'mercadolibre_connector.http_pool_maxsize', default=10))
+
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=pool_connections,
+                    pool_maxsize=pool_maxsize,
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({
+                    'Connection': 'keep-alive',
+                    'Accept-Encoding': 'gzip, deflate',
+                })
+                _SESSIONS[key] = session
+                _logger.debug('Sesión HTTP ML creada (pid=%s, cuenta=%s, pool=%s)',
+                              key[0], account_id, pool_maxsize)
+        return session
+
+    @api.model
+    def _clear_sessions(self):
+        """Cierra y descarta las sesiones HTTP del worker actual."""
+        pid = os.getpid()
+        with _SESSIONS_LOCK:
+            for key in [k for k in _SESSIONS if k[0] == pid]:
+                _SESSIONS.pop(key).close()
+
+    @api.model
+    def _get_retry_delay(self, response, attempt):
+        """
+        Calcula la espera antes de reintentar: respeta Retry-After si viene,
+        si no aplica backoff exponencial con jitter (1, 2, 4... máx. 60s).
+        """
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), 300.0)
+            except (TypeError, ValueError):
+                pass
+        return min(2 ** attempt, 60) + random.uniform(0, 0.5)
+
+    @api.model
+    def _get_max_retries(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'mercadolibre_connector.http_max_retries', default=3))
+
+    @api.model
+    def _send(self, account_id, method, url, **kwargs):
+        """
+        Envía un request HTTP respetando el rate limit de la cuenta y
+        reintentando automáticamente ante 429 y errores 5xx.
+
+        Los POST sólo se reintentan ante 429 (el request no fue procesado).
+
+        Parámetros de sistema:
+            mercadolibre_connector.http_max_retries: reintentos máximos (default 3)
+
+        Args:
+            account_id: ID de la cuenta MercadoLibre
+            method: Método HTTP
+            url: URL completa
+            **kwargs: Argumentos para requests.Session.request
+
+        Returns:
+            requests.Response (último intento)
+        """
+        endpoint = url[len(ML_API_BASE_URL):] if url.startswith(ML_API_BASE_URL) else url
+        return self._send_with_retry(
+            self._get_session(account_id),
+            account_id,
+            self.env['mercadolibre.rate.limit']._get_limits(endpoint),
+            self._get_max_retries(),
+            method,
+            url,
+            **kwargs
+        )
+
+    def _send_with_retry(self, session, account_id, limits, max_retries, method, url, **kwargs):
+        """
+        Núcleo de _send. No usa el cursor del env, por lo que puede
+        ejecutarse desde hilos (ver _request_batch).
+        """
+        RateLimit = self.env['mercadolibre.rate.limit']
+        endpoint = url[len(ML_API_BASE_URL):] if url.startswith(ML_API_BASE_URL) else url
+
+        attempt = 0
+        while True:
+            RateLimit._consume(account_id, limits)
+            response = session.request(method=method, url=url, **kwargs)
+
+            status = response.status_code
+            retryable = status == 429 or (status in RETRY_STATUS_CODES and method != 'POST')
+            if not retryable or attempt >= max_retries:
+                return response
+
+            wait = self._get_retry_delay(response, attempt)
+            if status == 429:
+                RateLimit._register_throttle(account_id, endpoint, wait)
+            _logger.warning('ML API %s %s -> %s, reintento %s/%s en %.1fs',
+                            method, endpoint, status, attempt + 1, max_retries, wait)
+            time.sleep(wait)
+            attempt += 1
+
+    @api.model
+    def _request_batch(self, account_id, calls, max_workers=None, log_request=True, raw=False):
+        """
+        Ejecuta varios requests a la API de MercadoLibre en paralelo.
+
+        Los requests HTTP se reparten en un pool de hilos acotado; los hilos
+        no tocan el ORM, por lo que todas las escrituras quedan en el cursor
+        principal a cargo del llamador.
+
+        Parámetros de sistema:
+            mercadolibre_connector.http_batch_workers: hilos concurrentes (default 8)
+
+        Args:
+            account_id: ID de la cuenta MercadoLibre
+            calls: lista de endpoints (str) o dicts con keys
+                   endpoint, method (default GET), params, body
+            max_workers: hilos concurrentes (opcional)
+            log_request: Si True, registra un log resumen del lote
+            raw: Si True, data contiene los bytes de la respuesta en lugar
+                 del JSON (ej: etiquetas PDF/ZPL)
+
+        Returns:
+            list de dicts en el mismo orden que calls, con keys:
+            endpoint, data, status_code, headers, error (None si fue exitoso)
+        """
+        if not calls:
+            return []
+
+        account = self.env['mercadolibre.account'].browse(account_id)
+        if not account.exists():
+            raise UserError(_('Cuenta no encontrada.'))
+
+        try:
+            access_token = account.get_valid_token()
+        except Exception as e:
+            raise UserError(_(f'Error al obtener token: {str(e)}'))
+
+        if max_workers is None:
+            max_workers = int(self.env['ir.config_parameter'].sudo().get_param(
+                'mercadolibre_connector.http_batch_workers', default=8))
+
+        RateLimit = self.env['mercadolibre.rate.limit']
+        session = self._get_session(account_id)
+        max_retries = self._get_max_retries()
+
+        # Normaliza las llamadas y resuelve la configuración en el hilo principal
+        jobs = []
+        limits_cache = {}
+        for call in calls:
+            if isinstance(call, str):
+                call = {'endpoint': call}
+            endpoint = call['endpoint']
+            if not endpoint.startswith('/'):
+                endpoint = f'/{endpoint}'
+            bucket = RateLimit._get_bucket(endpoint)
+            if bucket not in limits_cache:
+                limits_cache[bucket] = RateLimit._get_limits(endpoint)
+            jobs.append({
+                'endpoint': endpoint,
+                'method': call.get('method', 'GET'),
+                'params': call.get('params'),
+                'body': call.get('body'),
+                'limits': limits_cache[bucket],
+            })
+
+        def run(job, token):
+            method = job['method']
+            try:
+                response = self._send_with_retry(
+                    session, account_id, job['limits'], max_retries,
+                    method, f"{ML_API_BASE_URL}{job['endpoint']}",
+                    json=job['body'] if method in ['POST', 'PUT'] else None,
+                    params=job['params'],
+                    headers={
+                        'Authorization': f'Bearer {token}',
+                        'Content-Type': 'application/json',
+                        'Accept': '*/*' if raw else 'application/json',
+                    },
+                    timeout=60 if raw else 30,
+                )
+            except requests.exceptions.RequestException as e:
+                return {'endpoint': job['endpoint'], 'data': None, 'status_code': 0,
+                        'headers': {}, 'error': f'Error de conexión: {str(e)}'}
+
+            result = {
+                'endpoint': job['endpoint'],
+                'data': None,
+                'status_code': response.status_code,
+                'headers': dict(response.headers),
+                'error': None,
+            }
+            if 200 <= response.status_code < 300 and raw:
+                result['data'] = response.content
+            elif 200 <= response.status_code < 300:
+                try:
+                    result['data'] = response.json() if response.text else {}
+                except ValueError:
+                    result['error'] = 'Respuesta no es JSON válido'
+            else:
+                result['error'] = f'HTTP Error {response.status_code}: {response.text[:500]}'
+            return result
+
+        def run_all(indexes, token):
+            workers = max(1, min(max_workers, len(indexes)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(lambda i: run(jobs[i], token), indexes))
+
+        start_time = time.time()
+        results = run_all(list(range(len(jobs))), access_token)
+
+        # Reintenta una vez los 401 con un token refrescado
+        unauthorized = [i for i, r in enumerate(results) if r['status_code'] == 401]
+        if unauthorized:
+            _logger.warning(f'Recibidos {len(unauthorized)} 401 en lote, refrescando token para cuenta {account.name}')
+            access_token = account.get_valid_token(force_refresh=True, stale_token=access_token)
+            for i, result in zip(unauthorized, run_all(unauthorized, access_token)):
+                results[i] = result
+
+        duration = time.time() - start_time
+        errors = [r for r in results if r['error']]
+
+        if log_request:
+            Log = self.env['mercadolibre.log']
+            methods = sorted({job['method'] for job in jobs})
+            # Un solo INSERT para el resumen y los errores del lote
+            with Log._buffered():
+                Log._write_log({
+                    'log_type': 'api_request',
+                    'level': 'error' if errors else 'success',
+                    'account_id': account_id,
+                    'message': f'{"/".join(methods)} lote: {len(jobs)} requests, {len(errors)} errores',
+                    'request_url': f"{ML_API_BASE_URL}{jobs[0]['endpoint']}",
+                    'request_method': '/'.join(methods),
+                    'error_details': '\n'.join(f"{r['endpoint']}: {r['error']}" for r in errors[:50]),
+                    'duration': duration,
+                })
+                for job, result in zip(jobs, results):
+                    if result['error']:
+                        Log._write_log({
+                            'log_type': 'api_response',
+                            'level': 'error',
+                            'account_id': account_id,
+                            'message': f"{job['method']} {ML_API_BASE_URL}{job['endpoint']}: {result['error']}",
+                            'request_url': f"{ML_API_BASE_URL}{job['endpoint']}",
+                            'request_method': job['method'],
+                            'response_code': result['status_code'],
+                            'error_details': result['error'],
+                        })
+
+        return results
+
+    @api.model
+    def _multiget(self, account_id, resource, ids, attributes=None, log_request=True):
+        """
+        Obtiene varios recursos por ID con el menor número de requests.
+
+        Para recursos con multiget (ver MULTIGET_LIMITS) agrupa los IDs en
+        llamadas /recurso?ids=A,B,C; para el resto (ej. orders) hace un GET
+        /recurso/{id} por ID. En ambos casos las llamadas se ejecutan en
+        paralelo con _request_batch.
+
+        Args:
+            account_id: ID de la cuenta MercadoLibre
+            resource: Nombre del recurso ('items', 'orders', 'shipments'...)
+            ids: Lista de IDs de MercadoLibre
+            attributes: Lista de atributos a devolver (solo multiget)
+            log_request: Si True, registra un log resumen del lote
+
+        Returns:
+            tuple (dict {id: data}, dict {id: mensaje de error})
+        """
+        ids = list(dict.fromkeys(str(i) for i in ids if i))
+        found = {}
+        errors = {}
+        if not ids:
+            return found, errors
+
+        chunk_size = MULTIGET_LIMITS.get(resource)
+        if not chunk_size:
+            results = self._request_batch(
+                account_id, [f'/{resource}/{ml_id}' for ml_id in ids], log_request=log_request
+            )
+            for ml_id, result in zip(ids, results):
+                if result['error']:
+                    errors[ml_id] = result['error']
+                else:
+                    found[ml_id] = result['data']
+            return found, errors
+
+        chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        calls = []
+        for chunk in chunks:
+            params = {'ids': ','.join(chunk)}
+            if attributes:
+                params['attributes'] = ','.join(attributes)
+            calls.append({'endpoint': f'/{resource}', 'params': params})
+
+        results = self._request_batch(account_id, calls, log_request=log_request)
+        for chunk, result in zip(chunks, results):
+            if result['error']:
+                for ml_id in chunk:
+                    errors[ml_id] = result['error']
+                continue
+            # Multiget responde [{code, body}, ...] en el mismo orden que ids
+            for ml_id, entry in zip(chunk, result['data'] or []):
+                body = entry.get('body') or {}
+                if entry.get('code') == 200:
+                    found[ml_id] = body
+                else:
+                    errors[ml_id] = f"HTTP Error {entry.get('code')}: {body.get('message', body)}"
+            for ml_id in chunk:
+                if ml_id not in found and ml_id not in errors:
+                    errors[ml_id] = 'Sin respuesta en multiget'
+        return found, errors
+
+    @api.model
+    def _iter_pages(self, account_id, endpoint, params=None, page_size=50,
+                    max_results=None, max_offset=None, scan=False, start_offset=0):
+        """
+        Recorre un endpoint de búsqueda paginado entregando páginas de forma
+        perezosa, para que el llamador procese cada página antes de pedir
+        la siguiente.
+
+        Pagina con offset/limit hasta agotar paging.total o llegar a
+        max_offset (tope de la API). Si scan=True y quedan resultados más
+        allá del tope, continúa con search_type=scan / scroll_id omitiendo
+        los resultados ya entregados.
+
+        Args:
+            account_id: ID de la cuenta MercadoLibre
+            endpoint: Endpoint de búsqueda (ej: '/orders/search')
+            params: Parámetros de query (sin limit/offset)
+            page_size: Resultados por página
+            max_results: Máximo total de resultados (None o 0 = todos)
+            max_offset: Offset máximo permitido por la API (None = sin tope)
+            scan: Si True, usa scroll al superar max_offset
+            start_offset: Offset inicial, para reanudar un recorrido (max_results
+                          cuenta desde aquí)
+
+        Yields:
+            dict: Respuesta de cada página (results, paging, ...)
+        """
+        params = dict(params or {})
+        yielded = 0
+        offset = start_offset or 0
+        seen = set()
+
+        def result_key(result):
+            return str(result.get('id')) if isinstance(result, dict) else str(result)
+
+        while True:
+            limit = page_size
+            if max_results:
+                limit = min(limit, max_results - yielded)
+                if limit <= 0:
+                    return
+            if max_offset is not None and offset >= max_offset:
+                break
+
+            data = self._request(
+                account_id=account_id,
+                endpoint=endpoint,
+                method='GET',
+                params=dict(params, limit=limit, offset=offset),
+            ).get('data', {})
+            results = data.get('results') or []
+            if not results:
+                return
+
+            if scan:
+                seen.update(result_key(r) for r in results)
+            yielded += len(results)
+            yield data
+
+            offset += len(results)
+            total = (data.get('paging') or {}).get('total', 0)
+            if offset >= total or len(results) < limit:
+                return
+
+        if not scan:
+            _logger.warning('Paginación de %s detenida en el tope de offset %s', endpoint, max_offset)
+            return
+
+        # Scroll para catálogos que superan el tope de offset
+        _logger.info('Paginación de %s supera offset %s, continuando con search_type=scan',
+                     endpoint, max_offset)
+        scan_params = dict(params, search_type='scan', limit=100)
+        while True:
+            if max_results and yielded >= max_results:
+                return
+
+            data = self._request(
+                account_id=account_id,
+                endpoint=endpoint,
+                method='GET',
+                params=scan_params,
+            ).get('data', {})
+            results = data.get('results') or []
+            if not results:
+                return
+
+            new_results = [r for r in results if result_key(r) not in seen]
+            seen.update(result_key(r) for r in new_results)
+            if max_results:
+                new_results = new_results[:max_results - yielded]
+            if new_results:
+                yielded += len(new_results)
+                yield dict(data, results=new_results)
+
+            scroll_id = data.get('scroll_id')
+            if not scroll_id:
+                return
+            scan_params = dict(params, search_type='scan', scroll_id=scroll_id, limit=100)
+
     @api.model
     def _request(self, account_id, endpoint, method='GET', body=None,
                  headers=None, params=None, retry_on_401=True, log_request=True):
@@ -43,7 +515,7 @@ class MercadolibreHttp(models.AbstractModel):
             raise UserError(_(f'Error al obtener token: {str(e)}'))
 
         # Prepara la URL
-        base_url = 'https://api.mercadolibre.com'
+        base_url = ML_API_BASE_URL
         if not endpoint.startswith('/'):
             endpoint = f'/{endpoint}'
         url = f'{base_url}{endpoint}'
@@ -57,26 +529,14 @@ class MercadolibreHttp(models.AbstractModel):
         if headers:
             request_headers.update(headers)
 
-        # Log del request
-        log_id = None
-        if log_request:
-            log = self.env['mercadolibre.log'].log_api_request(
-                account_id=account_id,
-                method=method,
-                url=url,
-                headers=request_headers,
-                body=body
-            )
-            log_id = log.id
-
         try:
-            import time
             start_time = time.time()
 
-            # Realiza el request
-            response = requests.request(
-                method=method,
-                url=url,
+            # Realiza el request (con rate limit y backoff en 429/5xx)
+            response = self._send(
+                account_id,
+                method,
+                url,
                 json=body if method in ['POST', 'PUT'] else None,
                 params=params,
                 headers=request_headers,
@@ -89,10 +549,9 @@ class MercadolibreHttp(models.AbstractModel):
             if response.status_code == 401 and retry_on_401:
                 _logger.warning(f'Recibido 401, intentando refrescar token para cuenta {account.name}')
 
-                # Refresca el token
-                token = account.current_token_id
-                if token:
-                    token._refresh_token()
+                # Refresca el token (un solo proceso refresca, el resto lo reutiliza)
+                if account.current_token_id:
+                    account.get_valid_token(force_refresh=True, stale_token=access_token)
 
                     # Reintenta el request (sin permitir más retries)
                     return self._request(
@@ -103,16 +562,20 @@ class MercadolibreHttp(models.AbstractModel):
                         headers=headers,
                         params=params,
                         retry_on_401=False,  # No reintentar más
-                        log_request=False    # Ya se registró el primer intento
+                        log_request=log_request
                     )
 
-            # Log de la respuesta
-            if log_request and log_id:
-                self.env['mercadolibre.log'].log_api_response(
-                    log_id=log_id,
+            # Log del request y la respuesta (un solo registro, con muestreo)
+            if log_request and response.ok:
+                self.env['mercadolibre.log'].log_api_call(
+                    account_id=account_id,
+                    method=method,
+                    url=url,
+                    headers=request_headers,
+                    body=body,
                     response_code=response.status_code,
-                    headers=dict(response.headers),
-                    body=response.text,
+                    response_headers=dict(response.headers),
+                    response_body=response.text,
                     duration=duration
                 )
 
@@ -132,14 +595,18 @@ class MercadolibreHttp(models.AbstractModel):
 
             # Log del error
             if log_request:
-                self.env['mercadolibre.log'].create({
+                self.env['mercadolibre.log']._write_log({
                     'log_type': 'api_response',
                     'level': 'error',
                     'account_id': account_id,
                     'message': error_msg,
                     'request_url': url,
                     'request_method': method,
+                    'request_headers': str(request_headers),
+                    'request_body': str(body) if body else '',
                     'response_code': response.status_code,
+                    'response_headers': str(dict(response.headers)),
+                    'response_body': response.text,
                     'error_details': str(e),
                 })
 
@@ -151,7 +618,7 @@ class MercadolibreHttp(models.AbstractModel):
 
             # Log del error
             if log_request:
-                self.env['mercadolibre.log'].create({
+                self.env['mercadolibre.log']._write_log({
                     'log_type': 'error',
                     'level': 'error',
                     'account_id': account_id,
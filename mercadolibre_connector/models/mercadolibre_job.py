@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import logging
+import time
+
+from odoo import models, fields, api, tools
+
+_logger = logging.getLogger(__name__)
+
+
+class MercadolibreJob(models.Model):
+    """
+    Cursor persistente de un trabajo por lotes reanudable.
+
+    _run_chunked procesa el trabajo en lotes de tamaño fijo, hace commit
+    por lote guardando el cursor, y al agotar el presupuesto de tiempo
+    vuelve a disparar su cron para continuar donde quedó. Así una
+    ejecución que choca con el límite de tiempo del cron no pierde lo
+    avanzado ni empieza desde cero.
+    """
+    _name = 'mercadolibre.job'
+    _description = 'Trabajo por Lotes MercadoLibre'
+    _order = 'key'
+    _rec_name = 'key'
+
+    key = fields.Char(
+        string='Trabajo',
+        required=True,
+        index=True,
+        readonly=True
+    )
+    cursor = fields.Char(
+        string='Cursor',
+        readonly=True,
+        help='Posición desde la que se reanuda el trabajo (vacío = desde el inicio)'
+    )
+    state = fields.Selection([
+        ('idle', 'Terminado'),
+        ('running', 'En Curso'),
+        ('paused', 'Pausado'),
+    ], string='Estado', default='idle', readonly=True)
+    started_at = fields.Datetime(
+        string='Inicio Pasada',
+        readonly=True,
+        help='Inicio de la primera ejecución de la pasada actual; se conserva al reanudar'
+    )
+    finished_at = fields.Datetime(
+        string='Fin Última Pasada',
+        readonly=True
+    )
+    chunks_done = fields.Integer(
+        string='Lotes (pasada actual)',
+        readonly=True
+    )
+    items_done = fields.Integer(
+        string='Registros (pasada actual)',
+        readonly=True
+    )
+    error_count = fields.Integer(
+        string='Errores (pasada actual)',
+        readonly=True
+    )
+    last_error = fields.Text(
+        string='Último Error',
+        readonly=True
+    )
+
+    _sql_constraints = [
+        ('key_uniq', 'unique(key)', 'Ya existe un trabajo con esta clave.')
+    ]
+
+    # =========================================================================
+    # CONFIGURACIÓN
+    # =========================================================================
+
+    @api.model
+    def _get_chunk_size(self, default=50):
+        """
+        Parámetro de sistema:
+            mercadolibre_connector.job_chunk_size: registros por lote (default 50)
+        """
+        return max(int(self.env['ir.config_parameter'].sudo().get_param(
+            'mercadolibre_connector.job_chunk_size', default=default
+        )), 1)
+
+    @api.model
+    def _get_deadline(self):
+        """
+        Instante (time.monotonic) en que el trabajo debe pausarse.
+
+        Parámetro de sistema:
+            mercadolibre_connector.job_time_budget: segundos por ejecución.
+                0 (default) = 60% del límite de tiempo real de los crons.
+        """
+        budget = float(self.env['ir.config_parameter'].sudo().get_param(
+            'mercadolibre_connector.job_time_budget', default=0
+        ))
+        if budget <= 0:
+            limit = tools.config.get('limit_time_real_cron')
+            if not limit or limit <= 0:
+                limit = tools.config.get('limit_time_real') or 120
+            budget = limit * 0.6
+        return time.monotonic() + budget
+
+    # =========================================================================
+    # PRIMITIVAS
+    # =========================================================================
+
+    @api.model
+    def _get_job(self, key):
+        """Obtiene (o crea) el registro del trabajo."""
+        job = self.sudo().search([('key', '=', key)], limit=1)
+        if not job:
+            self.env.cr.execute("""
+                INSERT INTO mercadolibre_job (key, state, chunks_done, items_done, error_count)
+                VALUES (%s, 'idle', 0, 0, 0)
+                ON CONFLICT (key) DO NOTHING
+            """, (key,))
+            job = self.sudo().search([('key', '=', key)], limit=1)
+        return job
+
+    @api.model
+    def _lock_key(self, key):
+        """Clave numérica para pg_advisory_lock derivada de la clave del trabajo."""
+        return int(hashlib.sha1(key.encode()).hexdigest()[:15], 16)
+
+    @api.model
+    def _try_lock(self, key):
+        """
+        Lock de sesión para que dos workers no procesen el mismo trabajo.
+        Sobrevive a los commits por lote; se libera con _unlock.
+        """
+        self.env.cr.execute('SELECT pg_try_advisory_lock(%s)', (self._lock_key(key),))
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _unlock(self, key):
+        self.env.cr.execute('SELECT pg_advisory_unlock(%s)', (self._lock_key(key),))
+
+    def _begin_pass(self):
+        """
+        Marca el inicio de una pasada. Si el trabajo quedó pausado (o
+        interrumpido en 'running' por caída del worker) conserva el cursor.
+        """
+        self.ensure_one()
+        if self.state == 'idle' or not self.cursor:
+            self.write({
+                'cursor': False,
+                'started_at': fields.Datetime.now(),
+                'chunks_done': 0,
+                'items_done': 0,
+                'error_count': 0,
+            })
+        self.write({'state': 'running'})
+
+    def _save_cursor(self, cursor, items=0):
+        """Guarda el avance de un lote y hace commit."""
+        self.ensure_one()
+        self.write({
+            'cursor': cursor if cursor not in (None, False) else False,
+            'chunks_done': self.chunks_done + 1,
+            'items_done': self.items_done + items,
+        })
+        self.env.cr.commit()
+
+    def _add_errors(self, count):
+        """Acumula errores de la pasada actual (persisten entre reanudaciones)."""
+        self.ensure_one()
+        if count:
+            self.write({'error_count': self.error_count + count})
+
+    def _finish(self):
+        """Pasada completa: limpia el cursor para empezar desde el inicio la próxima vez."""
+        self.ensure_one()
+        self.write({
+            'cursor': False,
+            'state': 'idle',
+            'finished_at': fields.Datetime.now(),
+        })
+        self.env.cr.commit()
+
+    def _pause(self, cron=None):
+        """Pausa por presupuesto de tiempo y vuelve a disparar el cron."""
+        self.ensure_one()
+        self.write({'state': 'paused'})
+        self.env.cr.commit()
+        if cron:
+            cron.sudo()._trigger()
+
+    # =========================================================================
+    # RUNNER
+    # =========================================================================
+
+    @api.model
+    def _run_chunked(self, key, fetch, process, cron=None, chunk_size=None, deadline=None):
+        """
+        Procesa un trabajo en lotes con commit y cursor persistente por lote.
+
+        Args:
+            key: Clave única del trabajo (ej: 'mercadolibre.order.create_sale_orders')
+            fetch: callable(cursor, limit) -> (items, next_cursor). Lista
+                   vacía = trabajo drenado. cursor es str o False.
+            process: callable(items). Si lanza, se hace rollback del lote y
+                     se reintenta registro por registro (items[i:i + 1]);
+                     solo los registros que vuelven a fallar se saltan.
+            cron: ir.cron a disparar de nuevo si se agota el tiempo (opcional)
+            chunk_size: Registros por lote (default job_chunk_size)
+            deadline: time.monotonic() límite (default _get_deadline())
+
+        Returns:
+            dict: {'drained': bool, 'chunks': int, 'items': int, 'locked': bool}
+        """
+        chunk_size = chunk_size or self._get_chunk_size()
+        deadline = deadline or self._get_deadline()
+        stats = {'drained': False, 'chunks': 0, 'items': 0, 'locked': False}
+
+        if not self._try_lock(key):
+            _logger.info('[JOB] %s ya está en ejecución en otro worker', key)
+            stats['locked'] = True
+            return stats
+
+        try:
+            job = self._get_job(key)
+            job._begin_pass()
+            self.env.cr.commit()
+
+            while True:
+                items, next_cursor = fetch(job.cursor, chunk_size)
+                if not items:
+                    job._finish()
+                    stats['drained'] = True
+                    break
+
+                try:
+                    with self.env.cr.savepoint():
+                        process(items)
+                except Exception as e:
+                    _logger.warning('[JOB] %s: error en lote desde cursor %s, reintentando uno por uno: %s',
+                                    key, job.cursor, e)
+                    self._process_one_by_one(job, items, process)
+
+                job._save_cursor(next_cursor, len(items))
+                stats['chunks'] += 1
+                stats['items'] += len(items)
+
+                if time.monotonic() >= deadline:
+                    _logger.info('[JOB] %s: presupuesto de tiempo agotado tras %d lotes, '
+                                 'se reanuda desde cursor %s', key, stats['chunks'], next_cursor)
+                    job._pause(cron)
+                    break
+        finally:
+            try:
+                self._unlock(key)
+            except Exception:
+                # Transacción abortada: el lock es de sesión, hay que liberarlo igual
+                self.env.cr.rollback()
+                self._unlock(key)
+
+        return stats
+
+    @api.model
+    def _process_one_by_one(self, job, items, process):
+        """
+        Reintenta registro por registro un lote que falló, para que un
+        registro con error no haga saltar al resto del lote al avanzar el
+        cursor. Los que vuelven a fallar quedan en error_count y last_error.
+        """
+        failed = []
+        for index in range(len(items)):
+            item = items[index:index + 1]
+            try:
+                with self.env.cr.savepoint():
+                    process(item)
+            except Exception as e:
+                _logger.error('[JOB] %s: error en registro %s: %s',
+                              job.key, getattr(item, 'ids', item), e, exc_info=True)
+                failed.append((getattr(item, 'ids', item), e))
+        if failed:
+            job.write({'last_error': '\n'.join(
+                f'Cursor {job.cursor}, registro {ref}: {e}' for ref, e in failed[:20]
+            )})
+            job._add_errors(len(failed))
@@ -1,6 +1,22 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api
+import base64
+import json
+import random
+import logging
+import threading
+import zlib
+from contextlib import contextmanager
+
+from odoo import models, fields, api, tools
+
+_logger = logging.getLogger(__name__)
+
+# Buffers de logs activos por hilo (ver MercadolibreLog._buffered)
+_BUFFERS = threading.local()
+
+# Campos de texto grandes que se pueden comprimir o descartar
+LOG_BODY_FIELDS = ('request_headers', 'request_body', 'response_headers', 'response_body')
 
 
 class MercadolibreLog(models.Model):
@@ -73,6 +89,166 @@ class MercadolibreLog(models.Model):
         string='Duración (s)',
         help='Duración de la operación en segundos'
     )
+    is_compressed = fields.Boolean(
+        string='Comprimido',
+        readonly=True,
+        help='Headers y bodies guardados comprimidos en Detalle Comprimido'
+    )
+    compressed_details = fields.Binary(
+        string='Detalle Comprimido',
+        attachment=False,
+        readonly=True
+    )
+    details_text = fields.Text(
+        string='Detalle',
+        compute='_compute_details_text'
+    )
+
+    def init(self):
+        # La retención borra por rangos de fecha
+        tools.create_index(self._cr, 'mercadolibre_log_create_date_index',
+                           self._table, ['create_date'])
+
+    @api.depends('is_compressed', 'compressed_details')
+    def _compute_details_text(self):
+        for record in self:
+            if record.is_compressed and record.compressed_details:
+                try:
+                    raw = zlib.decompress(base64.b64decode(record.compressed_details))
+                    details = json.loads(raw.decode('utf-8'))
+                    record.details_text = '\n\n'.join(
+                        f'--- {key} ---\n{details[key]}' for key in LOG_BODY_FIELDS if details.get(key)
+                    )
+                except Exception as e:
+                    record.details_text = f'No se pudo descomprimir: {e}'
+            else:
+                record.details_text = False
+
+    # =========================================================================
+    # ESCRITURA CON MUESTREO
+    # =========================================================================
+
+    @api.model
+    def _get_log_config(self):
+        """
+        Configuración del backend de logs.
+
+        Parámetros de sistema:
+            mercadolibre_connector.log_mode: 'full' (todo), 'sampled' (errores
+                siempre, éxitos muestreados) o 'errors' (solo errores). Default 'full'
+            mercadolibre_connector.log_success_sample_rate: % de éxitos a guardar
+                en modo 'sampled' (default 10)
+            mercadolibre_connector.log_body_min_duration: en éxitos solo se guardan
+                headers/bodies si la operación tardó al menos estos segundos (default 0)
+            mercadolibre_connector.log_max_body_size: caracteres máximos por body (default 10000)
+            mercadolibre_connector.log_compress_bodies: 'True' para guardar headers y
+                bodies comprimidos con zlib (default False)
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        return {
+            'mode': ICP.get_param('mercadolibre_connector.log_mode', 'full'),
+            'sample_rate': float(ICP.get_param('mercadolibre_connector.log_success_sample_rate', default=10)),
+            'body_min_duration': float(ICP.get_param('mercadolibre_connector.log_body_min_duration', default=0)),
+            'max_body_size': int(ICP.get_param('mercadolibre_connector.log_max_body_size', default=10000)),
+            'compress': ICP.get_param('mercadolibre_connector.log_compress_bodies', 'False')
+                        in ('True', 'true', '1'),
+        }
+
+    @api.model
+    def _prepare_log_vals(self, vals, config):
+        """
+        Aplica la política de logs a unos valores de create.
+
+        Returns:
+            dict de valores a guardar o None si el log se descarta por muestreo
+        """
+        is_error = vals.get('level') == 'error' or vals.get('log_type') == 'error'
+        if not is_error:
+            if config['mode'] == 'errors':
+                return None
+            if config['mode'] == 'sampled' and random.random() * 100 >= config['sample_rate']:
+                return None
+
+        vals = dict(vals)
+        keep_bodies = is_error or (vals.get('duration') or 0.0) >= config['body_min_duration']
+        details = {}
+        for key in LOG_BODY_FIELDS:
+            value = vals.pop(key, None)
+            if keep_bodies and value:
+                details[key] = str(value)[:config['max_body_size']]
+
+        if details and config['compress']:
+            raw = json.dumps(details, ensure_ascii=False).encode('utf-8')
+            vals['compressed_details'] = base64.b64encode(zlib.compress(raw))
+            vals['is_compressed'] = True
+        else:
+            vals.update(details)
+        return vals
+
+    @api.model
+    def _write_log(self, vals):
+        """
+        Registra un log aplicando muestreo, límite y compresión de bodies.
+
+        Si hay un buffer activo (ver _buffered) el log se acumula y se
+        inserta junto con el resto al cerrar el buffer.
+
+        Returns:
+            mercadolibre.log record creado (vacío si se descartó o quedó en buffer)
+        """
+        buffer = getattr(_BUFFERS, 'stack', None)
+        config = buffer[-1]['config'] if buffer else self._get_log_config()
+        vals = self._prepare_log_vals(vals, config)
+        if vals is None:
+            return self.browse()
+        if buffer:
+            buffer[-1]['vals'].append(vals)
+            return self.browse()
+        return self.sudo().create(vals)
+
+    @api.model
+    @contextmanager
+    def _buffered(self):
+        """
+        Acumula los logs escritos con _write_log en este hilo y los inserta
+        con un solo create() al salir del bloque.
+
+            with self.env['mercadolibre.log']._buffered():
+                ...
+        """
+        stack = getattr(_BUFFERS, 'stack', None)
+        if stack is None:
+            stack = _BUFFERS.stack = []
+        stack.append({'config': self._get_log_config(), 'vals': []})
+        try:
+            yield
+        finally:
+            entry = stack.pop()
+            if entry['vals']:
+                try:
+                    self.sudo().create(entry['vals'])
+                except Exception as e:
+                    _logger.error('Error guardando %d logs en lote: %s', len(entry['vals']), e)
+
+    @api.model
+    def log_api_call(self, account_id, method, url, headers=None, body=None,
+                     response_code=None, response_headers=None, response_body=None,
+                     duration=None):
+        """Registra un request API y su respuesta en un solo log"""
+        return self._write_log({
+            'log_type': 'api_request',
+            'level': 'success' if response_code and 200 <= response_code < 300 else 'error',
+            'account_id': account_id,
+            'message': f'{method} {url}',
+            'request_url': url,
+            'request_method': method,
+            'request_headers': str(headers) if headers else '',
+            'request_body': str(body) if body else '',
+            'response_code': response_code,
+            'response_headers': str(response_headers) if response_headers else '',
+            'response_body': str(response_body) if response_body else '',
+            'duration': duration,
+        })
 
     @api.model
     def log_api_request(self, account_id, method, url, headers=None, body=None):
@@ -103,19 +279,56 @@ class MercadolibreLog(models.Model):
 
     @api.model
     def cron_cleanup_old_logs(self):
-        """Cron: Limpia logs antiguos (más de 90 días)"""
-        days_to_keep = int(self.env['ir.config_parameter'].sudo().get_param(
-            'mercadolibre_connector.log_retention_days', default=90
-        ))
+        """
+        Cron: Limpia logs antiguos.
 
-        cutoff_date = fields.Datetime.subtract(fields.Datetime.now(), days=days_to_keep)
+        Borra por rangos de create_date en bloques con SQL directo y commit
+        por bloque, para no cargar registros en memoria ni mantener una
+        transacción larga sobre la tabla.
 
-        old_logs = self.search([('create_date', '<', cutoff_date)])
+        Parámetros de sistema:
+            mercadolibre_connector.log_retention_days: días a conservar (default 90)
+            mercadolibre_connector.log_retention_days_success: días a conservar
+                logs que no son error (default igual a log_retention_days)
+            mercadolibre_connector.log_cleanup_chunk: filas por bloque (default 10000)
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        days_to_keep = int(ICP.get_param('mercadolibre_connector.log_retention_days', default=90))
+        success_days = int(ICP.get_param('mercadolibre_connector.log_retention_days_success',
+                                         default=days_to_keep))
+        chunk = int(ICP.get_param('mercadolibre_connector.log_cleanup_chunk', default=10000))
 
-        if old_logs:
-            count = len(old_logs)
-            old_logs.unlink()
+        now = fields.Datetime.now()
+        count = self._delete_logs_before(fields.Datetime.subtract(now, days=days_to_keep), chunk)
+        if success_days < days_to_keep:
+            count += self._delete_logs_before(fields.Datetime.subtract(now, days=success_days), chunk,
+                                              exclude_errors=True)
 
-            import logging
-            _logger = logging.getLogger(__name__)
-            _logger.info(f'Eliminados {count} logs antiguos')
+        if count:
+            _logger.info('Eliminados %d logs antiguos', count)
+        return count
+
+    @api.model
+    def _delete_logs_before(self, cutoff_date, chunk, exclude_errors=False):
+        """Borra en bloques los logs creados antes de cutoff_date."""
+        where = 'create_date < %s'
+        if exclude_errors:
+            where += " AND level != 'error' AND log_type != 'error'"
+        total = 0
+        while True:
+            self.env.cr.execute(f"""
+                DELETE FROM mercadolibre_log
+                 WHERE id IN (
+                        SELECT id FROM mercadolibre_log
+                         WHERE {where}
+                         ORDER BY create_date
+                         LIMIT %s
+                 )
+            """, (cutoff_date, chunk))
+            deleted = self.env.cr.rowcount
+            total += deleted
+            if deleted < chunk:
+                break
+            self.env.cr.commit()
+        self.invalidate_model()
+        return total
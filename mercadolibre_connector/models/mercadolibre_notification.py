@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Mapeo de topics a modelos que pueden manejarlos
+NOTIFICATION_TOPIC_HANDLERS = {
+    'messages': 'mercadolibre.conversation',
+    'orders_v2': 'mercadolibre.order',
+    'shipments': 'mercadolibre.shipment',
+    'questions': 'mercadolibre.question',
+    'payments': 'mercadolibre.payment',  # Agregado desde mercadolibre_payments
+}
+
+
+class MercadolibreNotification(models.Model):
+    """
+    Bandeja de entrada de notificaciones webhook de MercadoLibre.
+
+    El controller solo guarda el payload crudo y responde 200 de inmediato;
+    el cron drena la bandeja en lotes, procesando cada notificación con el
+    handler de su topic en hilos con cursor propio y reintentos con backoff.
+    """
+    _name = 'mercadolibre.notification'
+    _description = 'Notificación Webhook MercadoLibre'
+    _order = 'id desc'
+    _rec_name = 'resource'
+
+    account_id = fields.Many2one(
+        'mercadolibre.account',
+        string='Cuenta ML',
+        ondelete='cascade',
+        index=True
+    )
+    topic = fields.Char(
+        string='Topic',
+        index=True
+    )
+    resource = fields.Char(
+        string='Resource'
+    )
+    ml_user_id = fields.Char(
+        string='User ID ML'
+    )
+    ml_notification_id = fields.Char(
+        string='ID Notificación ML'
+    )
+    attempts = fields.Integer(
+        string='Intentos ML',
+        help='Número de intento reportado por MercadoLibre'
+    )
+    payload = fields.Text(
+        string='Payload'
+    )
+    state = fields.Selection([
+        ('pending', 'Pendiente'),
+        ('processing', 'Procesando'),
+        ('done', 'Procesada'),
+        ('ignored', 'Ignorada'),
+        ('error', 'Error'),
+    ], string='Estado', default='pending', required=True, index=True)
+    coalesced_count = fields.Integer(
+        string='Fusionadas',
+        default=0,
+        help='Notificaciones del mismo recurso absorbidas por esta'
+    )
+    retry_count = fields.Integer(
+        string='Reintentos',
+        default=0
+    )
+    next_attempt = fields.Datetime(
+        string='Próximo Intento',
+        index=True
+    )
+    processing_started = fields.Datetime(
+        string='Inicio Procesamiento'
+    )
+    processed_date = fields.Datetime(
+        string='Fecha Procesamiento'
+    )
+    duration = fields.Float(
+        string='Duración (s)'
+    )
+    result = fields.Text(
+        string='Resultado'
+    )
+    last_error = fields.Text(
+        string='Último Error'
+    )
+
+    # =========================================================================
+    # ENCOLADO
+    # =========================================================================
+
+    @api.model
+    def _enqueue(self, data, account=None):
+        """
+        Guarda una notificación en la bandeja y despierta al cron.
+
+        Las notificaciones del mismo recurso que lleguen mientras otra sigue
+        pendiente se fusionan con ella: solo se actualiza el payload y el
+        contador de coalescencia. Las nuevas se programan tras la ventana de
+        coalescencia para absorber las ráfagas de ML (reintentos y varios
+        orders_v2 por cambio de estado).
+
+        Args:
+            data: dict con el payload del webhook
+            account: mercadolibre.account record (opcional)
+
+        Returns:
+            mercadolibre.notification record
+        """
+        topic = data.get('topic', 'unknown')
+        resource = data.get('resource', '')
+        window = self._get_coalesce_window()
+
+        if resource:
+            pending = self.search([
+                ('account_id', '=', account.id if account else False),
+                ('topic', '=', topic),
+                ('resource', '=', resource),
+                ('state', '=', 'pending'),
+            ], limit=1, order='id desc')
+            if pending:
+                pending.write({
+                    'payload': json.dumps(data),
+                    'attempts': max(pending.attempts, data.get('attempts', 1) or 1),
+                    'coalesced_count': pending.coalesced_count + 1,
+                })
+                _logger.info('[WEBHOOK QUEUE] %s %s fusionada con notificación pendiente %s',
+                             topic, resource, pending.id)
+                return pending
+
+        next_attempt = fields.Datetime.now() + timedelta(seconds=window)
+        notification = self.create({
+            'account_id': account.id if account else False,
+            'topic': topic,
+            'resource': resource,
+            'ml_user_id': str(data.get('user_id', '')),
+            'ml_notification_id': data.get('_id', ''),
+            'attempts': data.get('attempts', 1) or 1,
+            'payload': json.dumps(data),
+            'next_attempt': next_attempt,
+        })
+
+        self._trigger_processing(next_attempt if window else None)
+
+        return notification
+
+    @api.model
+    def _get_coalesce_window(self):
+        """
+        Segundos que espera una notificación nueva antes de procesarse.
+
+        Parámetro de sistema:
+            mercadolibre_connector.notification_coalesce_seconds (default 10, 0 desactiva)
+        """
+        return max(int(self.env['ir.config_parameter'].sudo().get_param(
+            'mercadolibre_connector.notification_coalesce_seconds', default=10
+        )), 0)
+
+    @api.model
+    def _trigger_processing(self, at=None):
+        """Programa una ejecución del cron de procesamiento."""
+        cron = self.env.ref('mercadolibre_connector.ir_cron_process_notifications',
+                            raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger(at=at)
+
+    # =========================================================================
+    # PROCESAMIENTO
+    # =========================================================================
+
+    @api.model
+    def _get_queue_config(self):
+        """
+        Parámetros de sistema:
+            mercadolibre_connector.notification_batch_size: notificaciones por ejecución (default 100)
+            mercadolibre_connector.notification_workers: hilos concurrentes (default 4)
+            mercadolibre_connector.notification_max_retries: reintentos antes de error (default 5)
+            mercadolibre_connector.notification_stale_minutes: minutos para liberar
+                notificaciones bloqueadas en 'processing' (default 30)
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        return {
+            'batch_size': int(ICP.get_param('mercadolibre_connector.notification_batch_size', default=100)),
+            'workers': max(int(ICP.get_param('mercadolibre_connector.notification_workers', default=4)), 1),
+            'max_retries': int(ICP.get_param('mercadolibre_connector.notification_max_retries', default=5)),
+            'stale_minutes': int(ICP.get_param('mercadolibre_connector.notification_stale_minutes', default=30)),
+        }
+
+    @api.model
+    def _claim_batch(self, batch_size):
+        """
+        Toma un lote de notificaciones pendientes y las marca como 'processing'.
+
+        Usa FOR UPDATE SKIP LOCKED para que varios workers puedan drenar la
+        bandeja a la vez sin procesar dos veces la misma notificación.
+
+        Returns:
+            list de ids reclamados
+        """
+        self.env.cr.execute("""
+            UPDATE mercadolibre_notification
+               SET state = 'processing',
+                   processing_started = (now() at time zone 'UTC')
+             WHERE id IN (
+                    SELECT id
+                      FROM mercadolibre_notification
+                     WHERE state = 'pending'
+                       AND (next_attempt IS NULL OR next_attempt <= (now() at time zone 'UTC'))
+                     ORDER BY id
+                     LIMIT %s
+                       FOR UPDATE SKIP LOCKED
+             )
+         RETURNING id
+        """, (batch_size,))
+        ids = sorted(row[0] for row in self.env.cr.fetchall())
+        self.invalidate_model(['state', 'processing_started'])
+        return ids
+
+    @api.model
+    def _release_stale(self, stale_minutes):
+        """Devuelve a 'pending' notificaciones que quedaron en 'processing' (worker caído)."""
+        limit_date = fields.Datetime.now() - timedelta(minutes=stale_minutes)
+        stale = self.search([
+            ('state', '=', 'processing'),
+            ('processing_started', '<', limit_date),
+        ])
+        if stale:
+            _logger.warning('[WEBHOOK QUEUE] Liberando %d notificaciones bloqueadas', len(stale))
+            stale.write({'state': 'pending', 'next_attempt': fields.Datetime.now()})
+
+    @api.model
+    def cron_process_notifications(self):
+        """Cron: drena la bandeja de notificaciones webhook."""
+        config = self._get_queue_config()
+        self._release_stale(config['stale_minutes'])
+
+        ids = self._claim_batch(config['batch_size'])
+        if not ids:
+            return True
+        # Liberar los locks antes de procesar en otros cursores
+        self.env.cr.commit()
+
+        ids = self._coalesce_claimed(ids)
+
+        _logger.info('[WEBHOOK QUEUE] Procesando %d notificaciones con %d hilos',
+                     len(ids), config['workers'])
+
+        # Repartir por recurso para que las notificaciones de un mismo
+        # recurso se procesen en orden dentro del mismo hilo
+        chunks = [[] for _ in range(min(config['workers'], len(ids)))]
+        for notification in self.browse(ids):
+            key = (notification.account_id.id, notification.resource or '')
+            chunks[hash(key) % len(chunks)].append(notification.id)
+        chunks = [chunk for chunk in chunks if chunk]
+
+        if len(chunks) == 1:
+            self._process_ids(chunks[0], config['max_retries'])
+        else:
+            uid = self.env.uid
+            context = dict(self.env.context)
+            with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+                futures = [
+                    executor.submit(self._process_ids_in_thread, uid, context,
+                                    chunk, config['max_retries'])
+                    for chunk in chunks
+                ]
+                for future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        _logger.error('[WEBHOOK QUEUE] Error en hilo de procesamiento: %s', e,
+                                      exc_info=True)
+
+        # Si el lote vino lleno probablemente quedan pendientes: reprogramar
+        if len(ids) >= config['batch_size']:
+            self._trigger_processing()
+        return True
+
+    @api.model
+    def _coalesce_claimed(self, ids):
+        """
+        Fusiona notificaciones reclamadas del mismo recurso.
+
+        Se procesa solo la más reciente de cada recurso; el resto se cierra
+        como 'ignored' indicando con cuál se fusionó.
+
+        Returns:
+            list de ids a procesar
+        """
+        latest = {}
+        for notification in self.browse(ids):
+            key = (notification.account_id.id, notification.topic, notification.resource or str(notification.id))
+            latest[key] = notification
+        keep_ids = sorted(notification.id for notification in latest.values())
+
+        duplicates = self.browse(sorted(set(ids) - set(keep_ids)))
+        if duplicates:
+            for notification in duplicates:
+                key = (notification.account_id.id, notification.topic, notification.resource or str(notification.id))
+                notification.write({
+                    'state': 'ignored',
+                    'processed_date': fields.Datetime.now(),
+                    'result': json.dumps({'status': 'coalesced', 'into': latest[key].id}),
+                })
+            self.env.cr.commit()
+            _logger.info('[WEBHOOK QUEUE] %d notificaciones fusionadas por recurso', len(duplicates))
+        return keep_ids
+
+    def _process_ids_in_thread(self, uid, context, ids, max_retries):
+        """Procesa notificaciones en un hilo con su propio cursor y environment."""
+        with self.env.registry.cursor() as cr:
+            env = api.Environment(cr, uid, context)
+            env[self._name]._process_ids(ids, max_retries)
+
+    @api.model
+    def _process_ids(self, ids, max_retries):
+        """Procesa notificaciones una a una haciendo commit tras cada una."""
+        for notification in self.browse(ids):
+            notification._process_one(max_retries)
+            self.env.cr.commit()
+
+    def _process_one(self, max_retries):
+        """Procesa una notificación reclamada y actualiza su contabilidad de reintentos."""
+        self.ensure_one()
+        start_time = datetime.now()
+        try:
+            data = json.loads(self.payload or '{}')
+        except ValueError:
+            data = {}
+
+        try:
+            with self.env.cr.savepoint():
+                result = self._delegate(data)
+        except Exception as e:
+            result = {'status': 'error', 'message': str(e)}
+            _logger.error('[WEBHOOK QUEUE] Error procesando %s %s: %s',
+                          self.topic, self.resource, e, exc_info=True)
+
+        duration = (datetime.now() - start_time).total_seconds()
+        status = (result or {}).get('status')
+        vals = {
+            'duration': duration,
+            'result': json.dumps(result, indent=2, default=str),
+            'processed_date': fields.Datetime.now(),
+        }
+
+        if status == 'error':
+            retry_count = self.retry_count + 1
+            vals.update({
+                'retry_count': retry_count,
+                'last_error': (result or {}).get('message', ''),
+            })
+            if retry_count >= max_retries:
+                vals['state'] = 'error'
+            else:
+                vals.update({
+                    'state': 'pending',
+                    'next_attempt': fields.Datetime.now() + timedelta(minutes=min(2 ** retry_count, 60)),
+                })
+        else:
+            vals['state'] = 'ignored' if status in ('ignored', 'skipped') else 'done'
+
+        self.write(vals)
+
+        self.env['mercadolibre.log']._write_log({
+            'log_type': 'notification',
+            'level': 'success' if status in ('ok', 'success') else ('error' if status == 'error' else 'warning'),
+            'account_id': self.account_id.id,
+            'message': f'[WEBHOOK] Topic: {self.topic} | Resource: {self.resource} | Intento: {self.attempts}',
+            'request_url': self.resource,
+            'request_method': 'POST',
+            'request_body': json.dumps(data, indent=2),
+            'response_body': vals['result'],
+            'duration': duration,
+        })
+
+    def _delegate(self, data):
+        """
+        Delega la notificación al módulo correspondiente según el topic.
+
+        Los módulos pueden registrar handlers implementando
+        process_notification(account, data) en el modelo de su topic.
+        """
+        self.ensure_one()
+        topic = self.topic
+
+        if not self.account_id:
+            return {'status': 'ignored', 'reason': 'account_not_found'}
+
+        handler_model = NOTIFICATION_TOPIC_HANDLERS.get(topic)
+        _logger.info('[WEBHOOK QUEUE] Topic: %s -> Handler: %s', topic, handler_model or 'NO DEFINIDO')
+
+        if handler_model and handler_model in self.env:
+            model = self.env[handler_model].sudo()
+            if hasattr(model, 'process_notification'):
+                return model.process_notification(self.account_id.sudo(), data) or {'status': 'ok'}
+            _logger.warning('[WEBHOOK QUEUE] Modelo %s no tiene método process_notification', handler_model)
+        elif handler_model:
+            _logger.warning('[WEBHOOK QUEUE] Modelo %s no está instalado', handler_model)
+
+        return {'status': 'ignored', 'reason': f'no_handler_for_{topic}'}
+
+    # =========================================================================
+    # ACCIONES
+    # =========================================================================
+
+    def action_retry(self):
+        """Reencola las notificaciones seleccionadas."""
+        self.write({
+            'state': 'pending',
+            'retry_count': 0,
+            'next_attempt': fields.Datetime.now(),
+        })
+        self._trigger_processing()
+        return True
+
+    @api.model
+    def cron_cleanup_notifications(self):
+        """Cron: elimina notificaciones procesadas antiguas."""
+        days_to_keep = int(self.env['ir.config_parameter'].sudo().get_param(
+            'mercadolibre_connector.notification_retention_days', default=7
+        ))
+        cutoff_date = fields.Datetime.subtract(fields.Datetime.now(), days=days_to_keep)
+        old = self.search([
+            ('state', 'in', ('done', 'ignored')),
+            ('create_date', '<', cutoff_date),
+        ])
+        if old:
+            count = len(old)
+            old.unlink()
+            _logger.info('Eliminadas %d notificaciones webhook antiguas', count)
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+
+import math
+import threading
+import time
+import logging
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Tokens tomados del bucket compartido y aún no usados en este worker:
+# {(dbname, account_id, bucket): (tokens, lease_expires_at)}
+_LEASES = {}
+_LEASES_LOCK = threading.Lock()
+# Segundos de vigencia de un lote de tokens tomado de la base de datos
+LEASE_SECONDS = 1.0
+
+
+class MercadolibreRateLimit(models.Model):
+    """
+    Token bucket compartido entre workers para limitar la tasa de requests
+    a la API de MercadoLibre.
+
+    Cada fila representa un bucket por cuenta y familia de endpoint
+    (orders, items, shipments...). El estado vive en la base de datos y se
+    actualiza con SELECT ... FOR UPDATE en un cursor propio, de modo que
+    todos los procesos de Odoo consumen del mismo bucket sin bloquear la
+    transacción principal.
+
+    Para no sumar un round trip y un commit a cada request, cada worker
+    toma los tokens de a lotes (hasta un segundo de tasa) y los consume en
+    memoria; los tokens de un lote que no se usan en LEASE_SECONDS se
+    descartan, así ningún worker acapara capacidad.
+    """
+    _name = 'mercadolibre.rate.limit'
+    _description = 'Rate Limit MercadoLibre'
+    _order = 'account_id, bucket'
+    _rec_name = 'bucket'
+
+    account_id = fields.Many2one(
+        'mercadolibre.account',
+        string='Cuenta ML',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    bucket = fields.Char(
+        string='Familia Endpoint',
+        required=True,
+        help='Primer segmento del endpoint (orders, items, shipments...)'
+    )
+    tokens = fields.Float(
+        string='Tokens Disponibles',
+        readonly=True
+    )
+    updated_at = fields.Float(
+        string='Último Relleno (epoch)',
+        readonly=True
+    )
+    throttled_until = fields.Float(
+        string='Bloqueado Hasta (epoch)',
+        readonly=True,
+        help='Instante hasta el cual no se envían requests tras recibir un 429'
+    )
+
+    _sql_constraints = [
+        ('account_bucket_uniq', 'unique(account_id, bucket)',
+         'Ya existe un bucket para esta cuenta y familia de endpoint.')
+    ]
+
+    @api.model
+    def _get_bucket(self, endpoint):
+        """Obtiene la familia de un endpoint: '/orders/123' -> 'orders'"""
+        path = (endpoint or '').split('?', 1)[0].strip('/')
+        return path.split('/', 1)[0] or 'root'
+
+    @api.model
+    def _get_bucket_config(self, bucket):
+        """
+        Retorna (rate, burst) para un bucket.
+
+        Parámetros de sistema:
+            mercadolibre_connector.rate_limit_rate: requests por segundo (default 10)
+            mercadolibre_connector.rate_limit_burst: tamaño del bucket (default 20)
+            mercadolibre_connector.rate_limit_rate.<bucket>: override por familia
+            mercadolibre_connector.rate_limit_burst.<bucket>: override por familia
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        rate = float(ICP.get_param(
+            f'mercadolibre_connector.rate_limit_rate.{bucket}',
+            default=ICP.get_param('mercadolibre_connector.rate_limit_rate', default=10)
+        ))
+        burst = float(ICP.get_param(
+            f'mercadolibre_connector.rate_limit_burst.{bucket}',
+            default=ICP.get_param('mercadolibre_connector.rate_limit_burst', default=20)
+        ))
+        return max(rate, 0.1), max(burst, 1.0)
+
+    @api.model
+    def _try_consume(self, account_id, bucket, rate, burst):
+        """
+        Intenta consumir un token del bucket, primero del lote ya tomado
+        por este worker y, si se agotó o venció, tomando otro lote de la
+        base de datos.
+
+        Returns:
+            float: 0 si se consumió el token, o segundos a esperar
+        """
+        key = (self.env.cr.dbname, account_id, bucket)
+        with _LEASES_LOCK:
+            tokens, expires_at = _LEASES.get(key, (0, 0.0))
+            if tokens >= 1 and expires_at > time.monotonic():
+                _LEASES[key] = (tokens - 1, expires_at)
+                return 0.0
+
+        lease_size = max(1, min(int(rate * LEASE_SECONDS), int(burst)))
+        leased, wait = self._lease_tokens(account_id, bucket, rate, burst, lease_size)
+        if leased:
+            with _LEASES_LOCK:
+                # Uno de los tokens del lote es para este request
+                _LEASES[key] = (leased - 1, time.monotonic() + LEASE_SECONDS)
+        return wait
+
+    @api.model
+    def _lease_tokens(self, account_id, bucket, rate, burst, lease_size):
+        """
+        Toma hasta lease_size tokens del bucket compartido.
+
+        Returns:
+            tuple (tokens tomados, segundos a esperar si no se tomó ninguno)
+        """
+        with self.env.registry.cursor() as cr:
+            cr.execute("""
+                INSERT INTO mercadolibre_rate_limit
+                    (account_id, bucket, tokens, updated_at, throttled_until)
+                VALUES (%s, %s, %s, extract(epoch from clock_timestamp()), 0)
+                ON CONFLICT (account_id, bucket) DO NOTHING
+            """, (account_id, bucket, burst))
+            cr.execute("""
+                SELECT id, tokens, updated_at, throttled_until,
+                       extract(epoch from clock_timestamp())
+                  FROM mercadolibre_rate_limit
+                 WHERE account_id = %s AND bucket = %s
+                   FOR UPDATE
+            """, (account_id, bucket))
+            row_id, tokens, updated_at, throttled_until, now = cr.fetchone()
+            now = float(now)
+            tokens = float(tokens or 0.0)
+            updated_at = float(updated_at or now)
+            throttled_until = float(throttled_until or 0.0)
+
+            if throttled_until > now:
+                return 0, throttled_until - now
+
+            tokens = min(burst, tokens + max(now - updated_at, 0.0) * rate)
+            leased = min(lease_size, int(math.floor(tokens)))
+            if leased:
+                tokens -= leased
+                wait = 0.0
+            else:
+                wait = (1.0 - tokens) / rate
+
+            cr.execute("""
+                UPDATE mercadolibre_rate_limit
+                   SET tokens = %s, updated_at = %s
+                 WHERE id = %s
+            """, (tokens, now, row_id))
+        return leased, wait
+
+    @api.model
+    def _get_limits(self, endpoint):
+        """
+        Resuelve la configuración de rate limit para un endpoint.
+
+        Se separa de _consume para poder leer los parámetros en el hilo
+        principal y consumir tokens desde hilos sin tocar el cursor del env.
+
+        Parámetros de sistema:
+            mercadolibre_connector.rate_limit_enabled: 'False' para desactivar
+            mercadolibre_connector.rate_limit_max_wait: espera máxima en segundos (default 120)
+
+        Returns:
+            dict con keys: enabled, bucket, rate, burst, max_wait
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        bucket = self._get_bucket(endpoint)
+        rate, burst = self._get_bucket_config(bucket)
+        return {
+            'enabled': ICP.get_param('mercadolibre_connector.rate_limit_enabled', 'True')
+                       not in ('False', 'false', '0'),
+            'bucket': bucket,
+            'rate': rate,
+            'burst': burst,
+            'max_wait': float(ICP.get_param('mercadolibre_connector.rate_limit_max_wait', default=120)),
+        }
+
+    @api.model
+    def _consume(self, account_id, limits):
+        """
+        Bloquea hasta obtener un token del bucket. Seguro para usar desde hilos.
+
+        Returns:
+            float: segundos esperados
+        """
+        if not account_id or not limits['enabled']:
+            return 0.0
+
+        bucket = limits['bucket']
+        waited = 0.0
+        while True:
+            wait = self._try_consume(account_id, bucket, limits['rate'], limits['burst'])
+            if wait <= 0:
+                return waited
+            if waited + wait > limits['max_wait']:
+                _logger.warning('Rate limit ML: espera máxima alcanzada para cuenta %s bucket %s (%.1fs)',
+                                account_id, bucket, waited)
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    @api.model
+    def _acquire(self, account_id, endpoint):
+        """
+        Bloquea hasta que haya capacidad para enviar un request al endpoint.
+
+        Returns:
+            float: segundos esperados
+        """
+        if not account_id:
+            return 0.0
+        return self._consume(account_id, self._get_limits(endpoint))
+
+    @api.model
+    def _register_throttle(self, account_id, endpoint, seconds):
+        """Bloquea el bucket para todos los workers tras recibir un 429."""
+        if not account_id:
+            return
+        bucket = self._get_bucket(endpoint)
+        with _LEASES_LOCK:
+            _LEASES.pop((self.env.cr.dbname, account_id, bucket), None)
+        with self.env.registry.cursor() as cr:
+            cr.execute("""
+                INSERT INTO mercadolibre_rate_limit
+                    (account_id, bucket, tokens, updated_at, throttled_until)
+                VALUES (%s, %s, 0, extract(epoch from clock_timestamp()),
+                        extract(epoch from clock_timestamp()) + %s)
+                ON CONFLICT (account_id, bucket) DO UPDATE
+                   SET tokens = 0,
+                       updated_at = EXCLUDED.updated_at,
+                       throttled_until = GREATEST(mercadolibre_rate_limit.throttled_until,
+                                                  EXCLUDED.throttled_until)
+            """, (account_id, bucket, seconds))
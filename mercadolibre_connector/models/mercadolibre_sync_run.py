@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Nivel de línea -> contador de la ejecución que incrementa
+SYNC_RUN_COUNTERS = {
+    'created': 'created_count',
+    'updated': 'updated_count',
+    'skipped': 'skipped_count',
+    'error': 'error_count',
+}
+
+
+class SyncRunWriter:
+    """
+    Escritor de una ejecución de sincronización.
+
+    Acumula las líneas por ítem en memoria y las inserta en lotes de
+    flush_size, actualizando los contadores de la ejecución en cada flush.
+    Así una ejecución larga no reescribe un campo Text gigante ni mantiene
+    todo el detalle en memoria.
+    """
+
+    def __init__(self, run, flush_size):
+        self.run = run
+        self.flush_size = max(flush_size, 1)
+        self.counters = dict.fromkeys(SYNC_RUN_COUNTERS.values(), 0)
+        self._lines = []
+        self._started = time.monotonic()
+
+    def add(self, level, message, reference=None):
+        """
+        Agrega una línea por ítem.
+
+        Args:
+            level: ok, created, updated, skipped, error o info
+            message: texto corto (se trunca a 500 caracteres)
+            reference: ID ML u Odoo del ítem (opcional)
+        """
+        counter = SYNC_RUN_COUNTERS.get(level)
+        if counter:
+            self.counters[counter] += 1
+        self._lines.append({
+            'run_id': self.run.id,
+            'level': level,
+            'reference': str(reference) if reference else False,
+            'message': (message or '')[:500],
+        })
+        if len(self._lines) >= self.flush_size:
+            self.flush()
+
+    def count(self, level, amount=1):
+        """Incrementa un contador sin registrar línea."""
+        self.counters[SYNC_RUN_COUNTERS[level]] += amount
+
+    def flush(self):
+        """Inserta las líneas pendientes y actualiza los contadores."""
+        if self._lines:
+            self.run.env['mercadolibre.sync.run.line'].sudo().create(self._lines)
+            self._lines = []
+        self.run.sudo().write(dict(self.counters))
+
+    def close(self, summary=None, state='done'):
+        """Cierra la ejecución: último flush, duración, estado y resumen."""
+        self.flush()
+        vals = {
+            'state': state,
+            'end_date': fields.Datetime.now(),
+            'duration': time.monotonic() - self._started,
+        }
+        if summary is not None:
+            vals['summary'] = summary
+        self.run.sudo().write(vals)
+        return self.run
+
+
+class MercadolibreSyncRun(models.Model):
+    """
+    Registro estructurado de una ejecución de sincronización.
+
+    Una fila por ejecución con contadores y un resumen corto, y filas
+    compactas por ítem (mercadolibre.sync.run.line) insertadas en lotes.
+    """
+    _name = 'mercadolibre.sync.run'
+    _description = 'Ejecución de Sincronización MercadoLibre'
+    _order = 'start_date desc, id desc'
+
+    name = fields.Char(
+        string='Configuración',
+        required=True
+    )
+    sync_type = fields.Selection([
+        ('orders', 'Órdenes'),
+        ('payments', 'Pagos'),
+        ('claims', 'Reclamos'),
+        ('products', 'Productos'),
+        ('other', 'Otro'),
+    ], string='Tipo', required=True, default='other', index=True)
+    account_id = fields.Many2one(
+        'mercadolibre.account',
+        string='Cuenta ML',
+        ondelete='cascade',
+        index=True
+    )
+    res_model = fields.Char(
+        string='Modelo Config',
+        index=True
+    )
+    res_id = fields.Many2oneReference(
+        string='ID Config',
+        model_field='res_model',
+        index=True
+    )
+    state = fields.Selection([
+        ('running', 'En Ejecución'),
+        ('done', 'Completada'),
+        ('error', 'Error'),
+    ], string='Estado', default='running', required=True)
+    start_date = fields.Datetime(
+        string='Inicio',
+        default=fields.Datetime.now,
+        required=True
+    )
+    end_date = fields.Datetime(
+        string='Fin'
+    )
+    duration = fields.Float(
+        string='Duración (s)',
+        digits=(10, 2)
+    )
+    created_count = fields.Integer(string='Nuevos')
+    updated_count = fields.Integer(string='Actualizados')
+    skipped_count = fields.Integer(string='Omitidos')
+    error_count = fields.Integer(string='Errores')
+    summary = fields.Text(
+        string='Resumen'
+    )
+    line_ids = fields.One2many(
+        'mercadolibre.sync.run.line',
+        'run_id',
+        string='Detalle'
+    )
+
+    @api.model
+    def _start(self, config, sync_type, account=None):
+        """
+        Abre una ejecución para una configuración de sincronización.
+
+        Parámetros de sistema:
+            mercadolibre_connector.sync_run_flush_size: líneas por lote (default 200)
+
+        Returns:
+            SyncRunWriter
+        """
+        flush_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            'mercadolibre_connector.sync_run_flush_size', default=200
+        ))
+        run = self.sudo().create({
+            'name': config.display_name,
+            'sync_type': sync_type,
+            'account_id': account.id if account else False,
+            'res_model': config._name,
+            'res_id': config.id,
+        })
+        return SyncRunWriter(run, flush_size)
+
+    @api.model
+    def _action_view_runs(self, config):
+        """Acción con las ejecuciones de una configuración."""
+        return {
+            'type': 'ir.actions.act_window',
+            'name': f'Ejecuciones - {config.display_name}',
+            'res_model': 'mercadolibre.sync.run',
+            'view_mode': 'tree,form',
+            'domain': [('res_model', '=', config._name), ('res_id', '=', config.id)],
+        }
+
+    @api.model
+    def cron_cleanup_sync_runs(self):
+        """
+        Cron: elimina ejecuciones antiguas (las líneas se borran en cascada).
+
+        Parámetros de sistema:
+            mercadolibre_connector.sync_run_retention_days: días a conservar (default 30)
+        """
+        days_to_keep = int(self.env['ir.config_parameter'].sudo().get_param(
+            'mercadolibre_connector.sync_run_retention_days', default=30
+        ))
+        cutoff_date = fields.Datetime.subtract(fields.Datetime.now(), days=days_to_keep)
+        self.env.cr.execute(
+            "DELETE FROM mercadolibre_sync_run WHERE start_date < %s AND state != 'running'",
+            (cutoff_date,)
+        )
+        if self.env.cr.rowcount:
+            _logger.info('Eliminadas %d ejecuciones de sincronización antiguas', self.env.cr.rowcount)
+
+
+class MercadolibreSyncRunLine(models.Model):
+    """Línea compacta por ítem de una ejecución de sincronización."""
+    _name = 'mercadolibre.sync.run.line'
+    _description = 'Detalle de Ejecución de Sincronización MercadoLibre'
+    _order = 'id'
+    _log_access = False
+
+    run_id = fields.Many2one(
+        'mercadolibre.sync.run',
+        string='Ejecución',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    level = fields.Selection([
+        ('ok', 'OK'),
+        ('created', 'Nuevo'),
+        ('updated', 'Actualizado'),
+        ('skipped', 'Omitido'),
+        ('error', 'Error'),
+        ('info', 'Info'),
+    ], string='Nivel', required=True, default='info')
+    reference = fields.Char(
+        string='Referencia',
+        index=True
+    )
+    message = fields.Char(
+        string='Mensaje'
+    )
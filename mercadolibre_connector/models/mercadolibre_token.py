@@ -2,12 +2,20 @@
 
 import requests
 import logging
+import threading
 from datetime import datetime, timedelta
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
 
 _logger = logging.getLogger(__name__)
 
+# Cache de access tokens por worker: {(dbname, account_id): (access_token, expires_at)}
+_TOKEN_CACHE = {}
+_TOKEN_CACHE_LOCK = threading.Lock()
+
+# Clave (classid) del advisory lock de refresco; el objid es el account_id
+TOKEN_REFRESH_LOCK = 7461
+
 
 class MercadolibreToken(models.Model):
     _name = 'mercadolibre.token'
@@ -106,11 +114,156 @@ class MercadolibreToken(models.Model):
                 ('account_id', 'in', account_ids),
                 ('active', '=', True)
             ]).write({'active': False})
+            self._clear_cached_token(account_ids)
         return super().create(vals_list)
 
+    def write(self, vals):
+        if 'active' in vals or 'access_token' in vals:
+            self._clear_cached_token(self.mapped('account_id').ids)
+        return super().write(vals)
+
+    # =========================================================================
+    # CACHE EN MEMORIA Y REFRESCO SINGLE-FLIGHT
+    # =========================================================================
+
+    @api.model
+    def _get_refresh_margin(self):
+        """
+        Minutos antes de la expiración en que se refresca el token.
+
+        Parámetro de sistema:
+            mercadolibre_connector.token_refresh_margin_minutes (default 60)
+        """
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'mercadolibre_connector.token_refresh_margin_minutes', default=60
+        ))
+
+    @api.model
+    def _get_cached_token(self, account_id, margin_minutes=0):
+        """
+        Retorna el access token cacheado en este worker si sigue vigente
+        durante al menos margin_minutes, o None.
+        """
+        key = (self.env.cr.dbname, account_id)
+        with _TOKEN_CACHE_LOCK:
+            cached = _TOKEN_CACHE.get(key)
+        if not cached:
+            return None
+        access_token, expires_at = cached
+        if expires_at <= fields.Datetime.now() + timedelta(minutes=margin_minutes):
+            return None
+        return access_token
+
+    @api.model
+    def _set_cached_token(self, account_id, access_token, expires_at):
+        with _TOKEN_CACHE_LOCK:
+            _TOKEN_CACHE[(self.env.cr.dbname, account_id)] = (access_token, expires_at)
+
+    @api.model
+    def _clear_cached_token(self, account_ids=None):
+        """Elimina del cache los tokens de las cuentas indicadas (o todos)."""
+        dbname = self.env.cr.dbname
+        with _TOKEN_CACHE_LOCK:
+            for key in list(_TOKEN_CACHE):
+                if key[0] == dbname and (account_ids is None or key[1] in account_ids):
+                    del _TOKEN_CACHE[key]
+
+    @api.model
+    def _refresh_single_flight(self, account_id, stale_token=None, wait=True):
+        """
+        Refresca el token de una cuenta garantizando un solo refresco a la vez.
+
+        El token se pide y se guarda en un cursor propio protegido por un
+        advisory lock por cuenta: el proceso que obtiene el lock refresca y
+        hace commit; los demás esperan y, al entrar, encuentran el token
+        nuevo y lo reutilizan en lugar de refrescar otra vez (lo que
+        invalidaría el anterior). En ese cursor solo se escriben filas de
+        token; el estado de la cuenta y los logs van al cursor del llamador.
+
+        Args:
+            account_id: id de mercadolibre.account
+            stale_token: access token que se sabe inválido (p. ej. tras un 401);
+                se refresca aunque el token activo no esté por expirar si coincide
+            wait: si es False y otro proceso tiene el lock, retorna None sin esperar
+
+        Returns:
+            (access_token, expires_at) o None si no hay token activo o no se obtuvo el lock
+        """
+        margin = self._get_refresh_margin()
+        refreshed = error = None
+        with self.env.registry.cursor() as cr:
+            if wait:
+                cr.execute('SELECT pg_advisory_xact_lock(%s, %s)', (TOKEN_REFRESH_LOCK, account_id))
+            else:
+                cr.execute('SELECT pg_try_advisory_xact_lock(%s, %s)', (TOKEN_REFRESH_LOCK, account_id))
+                if not cr.fetchone()[0]:
+                    return None
+
+            env = api.Environment(cr, self.env.uid, self.env.context)
+            token = env['mercadolibre.token'].sudo().search([
+                ('account_id', '=', account_id),
+                ('active', '=', True),
+            ], order='expires_at desc', limit=1)
+            if not token:
+                return None
+
+            needs_refresh = (
+                not token.is_valid
+                or token.is_expiring_soon(minutes=margin)
+                or (stale_token and token.access_token == stale_token)
+            )
+            if needs_refresh:
+                try:
+                    token = token._request_new_token()
+                    refreshed = token.refresh_count
+                except requests.exceptions.RequestException as e:
+                    error = e
+            else:
+                _logger.info('Token de cuenta %s ya refrescado por otro proceso, reutilizando', account_id)
+
+            result = (token.access_token, token.expires_at)
+            cr.commit()
+
+        # Estado de la cuenta y logs en el cursor del llamador: puede tener
+        # ya bloqueada la fila de la cuenta, y un error no debe perderse con
+        # el rollback del cursor propio
+        account = self.env['mercadolibre.account'].sudo().browse(account_id)
+        if error is not None:
+            self._log_refresh_error(account, error)
+            raise UserError(_(f'Error al refrescar token: {str(error)}'))
+        if refreshed is not None:
+            self._log_refresh_start(account)
+            self._log_refresh_success(account, refreshed)
+
+        self._set_cached_token(account_id, *result)
+        return result
+
     def _refresh_token(self):
         """Refresca el token usando el refresh_token"""
         self.ensure_one()
+        account = self.account_id
+        self._log_refresh_start(account)
+        try:
+            new_token = self._request_new_token()
+        except requests.exceptions.RequestException as e:
+            self._log_refresh_error(account, e)
+            raise UserError(_(f'Error al refrescar token: {str(e)}'))
+        self._log_refresh_success(account, new_token.refresh_count)
+        return new_token
+
+    def _request_new_token(self):
+        """
+        Pide un token nuevo a MercadoLibre con el refresh_token y lo guarda.
+
+        Solo escribe filas de mercadolibre.token (el token nuevo y la
+        desactivación del anterior): _refresh_single_flight lo ejecuta en un
+        cursor propio, y tocar ahí la cuenta o los logs podría bloquearse
+        contra la transacción del llamador.
+
+        Raises:
+            requests.exceptions.RequestException
+        """
+        self.ensure_one()
 
         config = self.account_id.config_id
         url = 'https://api.mercadolibre.com/oauth/token'
@@ -122,85 +275,88 @@ class MercadolibreToken(models.Model):
             'refresh_token': self.refresh_token,
         }
 
-        try:
-            # Log del intento
-            self.env['mercadolibre.log'].create({
-                'log_type': 'token_refresh',
-                'level': 'info',
-                'account_id': self.account_id.id,
-                'message': f'Refrescando token para cuenta {self.account_id.name}',
-            })
-
-            response = requests.post(url, data=payload, timeout=30)
-            response.raise_for_status()
-
-            data = response.json()
-
-            # Calcula la fecha de expiración
-            expires_at = datetime.now() + timedelta(seconds=data['expires_in'])
-
-            # Crea un nuevo token
-            new_token = self.create({
-                'account_id': self.account_id.id,
-                'access_token': data['access_token'],
-                'refresh_token': data['refresh_token'],
-                'token_type': data.get('token_type', 'Bearer'),
-                'expires_in': data['expires_in'],
-                'expires_at': expires_at,
-                'scope': data.get('scope', ''),
-                'ml_user_id': data.get('user_id', self.ml_user_id),
-                'refresh_count': self.refresh_count + 1,
-                'last_refresh_date': fields.Datetime.now(),
-            })
-
-            # Actualiza el estado de la cuenta
-            self.account_id.write({'state': 'connected'})
-
-            # Log exitoso
-            self.env['mercadolibre.log'].create({
-                'log_type': 'token_refresh',
-                'level': 'success',
-                'account_id': self.account_id.id,
-                'message': f'Token refrescado exitosamente (#{new_token.refresh_count})',
-            })
-
-            _logger.info(f'Token refrescado para cuenta {self.account_id.name}')
-
-            return new_token
+        session = self.env['mercadolibre.http']._get_session(self.account_id.id)
+        response = session.post(url, data=payload, timeout=30)
+        response.raise_for_status()
 
-        except requests.exceptions.RequestException as e:
-            error_msg = str(e)
-            _logger.error(f'Error al refrescar token: {error_msg}')
+        data = response.json()
+
+        # Calcula la fecha de expiración
+        expires_at = datetime.now() + timedelta(seconds=data['expires_in'])
+
+        # Crea un nuevo token
+        return self.create({
+            'account_id': self.account_id.id,
+            'access_token': data['access_token'],
+            'refresh_token': data['refresh_token'],
+            'token_type': data.get('token_type', 'Bearer'),
+            'expires_in': data['expires_in'],
+            'expires_at': expires_at,
+            'scope': data.get('scope', ''),
+            'ml_user_id': data.get('user_id', self.ml_user_id),
+            'refresh_count': self.refresh_count + 1,
+            'last_refresh_date': fields.Datetime.now(),
+        })
+
+    @api.model
+    def _log_refresh_start(self, account):
+        # Log del intento
+        self.env['mercadolibre.log'].create({
+            'log_type': 'token_refresh',
+            'level': 'info',
+            'account_id': account.id,
+            'message': f'Refrescando token para cuenta {account.name}',
+        })
 
-            # Log del error
-            self.env['mercadolibre.log'].create({
-                'log_type': 'token_refresh',
-                'level': 'error',
-                'account_id': self.account_id.id,
-                'message': f'Error al refrescar token: {error_msg}',
-                'error_details': str(e),
-            })
+    @api.model
+    def _log_refresh_success(self, account, refresh_count):
+        # Actualiza el estado de la cuenta
+        account.write({'state': 'connected'})
+
+        # Log exitoso
+        self.env['mercadolibre.log'].create({
+            'log_type': 'token_refresh',
+            'level': 'success',
+            'account_id': account.id,
+            'message': f'Token refrescado exitosamente (#{refresh_count})',
+        })
+
+        _logger.info(f'Token refrescado para cuenta {account.name}')
+
+    @api.model
+    def _log_refresh_error(self, account, error):
+        error_msg = str(error)
+        _logger.error(f'Error al refrescar token: {error_msg}')
 
-            # Actualiza el estado de la cuenta
-            self.account_id.write({'state': 'error'})
+        # Log del error
+        self.env['mercadolibre.log'].create({
+            'log_type': 'token_refresh',
+            'level': 'error',
+            'account_id': account.id,
+            'message': f'Error al refrescar token: {error_msg}',
+            'error_details': error_msg,
+        })
 
-            raise UserError(_(f'Error al refrescar token: {error_msg}'))
+        # Actualiza el estado de la cuenta
+        account.write({'state': 'error'})
 
     @api.model
     def cron_refresh_tokens(self):
         """Cron: Refresca todos los tokens que estén próximos a expirar"""
         _logger.info('Ejecutando cron de refresco de tokens')
 
+        margin = self._get_refresh_margin()
         tokens = self.search([
             ('active', '=', True),
-            ('expires_at', '<=', fields.Datetime.now() + timedelta(minutes=30))
+            ('expires_at', '<=', fields.Datetime.now() + timedelta(minutes=max(margin, 30)))
         ])
 
         _logger.info(f'Encontrados {len(tokens)} tokens para refrescar')
 
         for token in tokens:
             try:
-                token._refresh_token()
+                # Sin esperar: si otro proceso está refrescando esta cuenta, se omite
+                self._refresh_single_flight(token.account_id.id, wait=False)
             except Exception as e:
                 _logger.error(f'Error al refrescar token {token.id}: {str(e)}')
                 continue
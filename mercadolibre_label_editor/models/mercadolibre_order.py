@@ -2,6 +2,7 @@
 
 import base64
 import logging
+from collections import defaultdict
 from odoo import models, fields, api
 
 _logger = logging.getLogger(__name__)
@@ -580,8 +581,6 @@ class MercadolibreOrder(models.Model):
         """
         Envía la etiqueta a la impresora HTTP con logs detallados para debugging.
         """
-        import requests
-
         _logger.info('─── INICIO _send_label_to_printer_with_logs ───')
 
         # Validaciones
@@ -597,17 +596,38 @@ class MercadolibreOrder(models.Model):
             _logger.error('Attachment vacío o sin datos')
             return {'success': False, 'error': 'No hay etiqueta para imprimir'}
 
-        try:
-            # Decodificar el archivo
-            file_content = base64.b64decode(attachment.datas)
-            _logger.info(f'Archivo decodificado: {len(file_content)} bytes')
-            _logger.info(f'Nombre archivo: {attachment.name}')
-            _logger.info(f'Mimetype: {attachment.mimetype}')
+        # Decodificar el archivo
+        file_content = base64.b64decode(attachment.datas)
+        _logger.info(f'Archivo decodificado: {len(file_content)} bytes')
+        _logger.info(f'Nombre archivo: {attachment.name}')
+        _logger.info(f'Mimetype: {attachment.mimetype}')
+
+        result = self._post_label_to_printer(
+            logistic_config, attachment.name, file_content, attachment.mimetype
+        )
+
+        # Registrar en el chatter
+        if result.get('success') and self.sale_order_id:
+            self.sale_order_id.message_post(
+                body=f'🖨️ Etiqueta enviada a impresora: {logistic_config.printer_name} '
+                     f'({logistic_config.printer_copies} copia(s))'
+            )
+        return result
 
+    def _post_label_to_printer(self, logistic_config, filename, file_content, mimetype=None):
+        """
+        Envía un archivo de etiqueta(s) a la impresora HTTP del tipo logístico.
+
+        Returns:
+            dict con 'success' y 'response' o 'error'
+        """
+        import requests
+
+        try:
             # Preparar el request
             url = logistic_config.printer_url
             files = {
-                'file': (attachment.name, file_content, attachment.mimetype or 'application/pdf')
+                'file': (filename, file_content, mimetype or 'application/pdf')
             }
             data = {
                 'printer': logistic_config.printer_name,
@@ -632,14 +652,6 @@ class MercadolibreOrder(models.Model):
 
             if response.status_code in (200, 201, 202):
                 _logger.info('✓ Impresión exitosa')
-
-                # Registrar en el chatter
-                if self.sale_order_id:
-                    self.sale_order_id.message_post(
-                        body=f'🖨️ Etiqueta enviada a impresora: {logistic_config.printer_name} '
-                             f'({logistic_config.printer_copies} copia(s))'
-                    )
-
                 return {'success': True, 'response': response.text}
             else:
                 error_msg = f'Error HTTP {response.status_code}: {response.text[:200]}'
@@ -751,80 +763,70 @@ class MercadolibreOrder(models.Model):
             'skipped': [],
         }
 
+        # 1. Validar órdenes
+        to_print = self.browse()
         for order in self:
-            try:
-                _logger.info(f'─── Procesando orden {order.ml_order_id} ───')
-
-                # Validar que tiene shipment_id
-                if not order.ml_shipment_id:
-                    results['skipped'].append({
-                        'order': order.ml_order_id,
-                        'reason': 'Sin shipment_id'
-                    })
-                    _logger.warning(f'Orden {order.ml_order_id} sin shipment_id, saltando')
-                    continue
-
-                # Obtener configuración del tipo logístico
-                logistic_config = order.logistic_type_id
-                if not logistic_config:
-                    results['skipped'].append({
-                        'order': order.ml_order_id,
-                        'reason': 'Sin configuración de tipo logístico'
-                    })
-                    _logger.warning(f'Orden {order.ml_order_id} sin tipo logístico, saltando')
-                    continue
-
-                # Verificar URL de impresora
-                if not logistic_config.printer_url:
-                    results['skipped'].append({
-                        'order': order.ml_order_id,
-                        'reason': 'Sin URL de impresora configurada'
-                    })
-                    _logger.warning(f'Orden {order.ml_order_id} sin printer_url, saltando')
-                    continue
-
-                # Descargar etiqueta (esto también aplica plantilla si está configurada)
-                download_result = order._download_and_save_shipping_label(logistic_config)
-
-                if not download_result.get('success'):
-                    results['errors'].append({
-                        'order': order.ml_order_id,
-                        'error': download_result.get('error', 'Error desconocido en descarga')
-                    })
-                    _logger.error(f'Error descargando etiqueta {order.ml_order_id}: {download_result.get("error")}')
-                    continue
+            logistic_config = order.logistic_type_id
+            if not order.ml_shipment_id:
+                reason = 'Sin shipment_id'
+            elif not logistic_config:
+                reason = 'Sin configuración de tipo logístico'
+            elif not logistic_config.printer_url:
+                reason = 'Sin URL de impresora configurada'
+            else:
+                reason = None
 
-                attachment = download_result.get('attachment')
-                if not attachment:
-                    results['errors'].append({
-                        'order': order.ml_order_id,
-                        'error': 'No se obtuvo attachment'
-                    })
-                    continue
+            if reason:
+                results['skipped'].append({'order': order.ml_order_id, 'reason': reason})
+                _logger.warning(f'Orden {order.ml_order_id}: {reason}, saltando')
+            elif not order.sale_order_id:
+                results['errors'].append({'order': order.ml_order_id, 'error': 'Sin orden de venta asociada'})
+            else:
+                to_print |= order
 
-                # Enviar a impresora
-                print_result = order._send_label_to_printer_with_logs(attachment, logistic_config)
+        # 2. Obtener etiquetas: existentes + descarga en lote + plantillas
+        try:
+            labels = to_print._prepare_labels_batch()
+        except Exception as e:
+            _logger.error(f'✗ Error preparando etiquetas: {e}', exc_info=True)
+            labels = {order.id: {'error': str(e)} for order in to_print}
+
+        # 3. Un trabajo de impresión por impresora y formato
+        printer_groups = defaultdict(list)
+        for order in to_print:
+            label = labels.get(order.id) or {'error': 'No se obtuvo etiqueta'}
+            if label.get('error'):
+                results['errors'].append({'order': order.ml_order_id, 'error': label['error']})
+                _logger.error(f'Error descargando etiqueta {order.ml_order_id}: {label["error"]}')
+                continue
+            config = order.logistic_type_id
+            key = (config.printer_url, config.printer_name, config.printer_copies, label['extension'])
+            printer_groups[key].append((order, label))
+
+        for items in printer_groups.values():
+            logistic_config = items[0][0].logistic_type_id
+            try:
+                print_result = self._send_merged_labels_to_printer(logistic_config, items)
+            except Exception as e:
+                _logger.error(f'✗ Excepción imprimiendo lote: {e}', exc_info=True)
+                print_result = {'success': False, 'error': str(e)}
 
+            for order, label in items:
                 if print_result.get('success'):
                     results['success'].append({
                         'order': order.ml_order_id,
                         'printer': logistic_config.printer_name,
-                        'template_applied': download_result.get('template_applied', False)
+                        'template_applied': label.get('template_applied', False)
                     })
-                    _logger.info(f'✓ Orden {order.ml_order_id} enviada a impresora')
+                    order.sale_order_id.message_post(
+                        body=f'🖨️ Etiqueta enviada a impresora: {logistic_config.printer_name} '
+                             f'({logistic_config.printer_copies} copia(s))'
+                    )
                 else:
                     results['errors'].append({
                         'order': order.ml_order_id,
                         'error': print_result.get('error', 'Error desconocido en impresión')
                     })
-                    _logger.error(f'✗ Error imprimiendo {order.ml_order_id}: {print_result.get("error")}')
-
-            except Exception as e:
-                _logger.error(f'✗ Excepción procesando orden {order.ml_order_id}: {e}', exc_info=True)
-                results['errors'].append({
-                    'order': order.ml_order_id,
-                    'error': str(e)
-                })
 
         # Generar mensaje de resumen
         _logger.info('═══ FIN IMPRESIÓN MÚLTIPLE ═══')
@@ -867,6 +869,270 @@ class MercadolibreOrder(models.Model):
             }
         }
 
+    def _get_labels_batch_size(self):
+        """
+        Parámetro de sistema:
+            mercadolibre_label_editor.labels_batch_size: envíos por llamada a
+                /shipment_labels (default 50)
+        """
+        return max(int(self.env['ir.config_parameter'].sudo().get_param(
+            'mercadolibre_label_editor.labels_batch_size', default=50
+        )), 1)
+
+    def _prepare_labels_batch(self):
+        """
+        Obtiene las etiquetas de varias órdenes: reutiliza los adjuntos ya
+        descargados, descarga el resto en lote, aplica las plantillas en un
+        pool de procesos y crea los adjuntos en un solo create.
+
+        Returns:
+            dict {order.id: {'content', 'extension', 'mimetype',
+                             'template_applied', 'attachment'} o {'error'}}
+        """
+        Attachment = self.env['ir.attachment']
+        processor = self.env['ml.label.processor']
+        labels = {}
+
+        # Etiquetas ya descargadas (una sola búsqueda)
+        existing_by_sale = defaultdict(list)
+        for attachment in Attachment.search([
+            ('res_model', '=', 'sale.order'),
+            ('res_id', 'in', self.sale_order_id.ids),
+            ('name', '=like', 'etiqueta_ml_%'),
+        ]):
+            existing_by_sale[attachment.res_id].append(attachment)
+
+        missing = self.browse()
+        for order in self:
+            prefix = f'etiqueta_ml_{order.ml_shipment_id}'
+            attachment = next((a for a in existing_by_sale[order.sale_order_id.id]
+                               if a.name.startswith(prefix)), None)
+            if attachment:
+                labels[order.id] = {
+                    'attachment': attachment,
+                    'content': base64.b64decode(attachment.datas),
+                    'extension': 'zpl' if attachment.name.endswith('.zpl') else 'pdf',
+                    'mimetype': attachment.mimetype,
+                    'template_applied': '_personalizada' in attachment.name,
+                }
+            else:
+                missing |= order
+
+        if not missing:
+            return labels
+
+        downloaded = missing._download_labels_batch()
+
+        # Plantillas: valores resueltos aquí, render en paralelo
+        template_jobs = []
+        template_orders = []
+        for order in missing:
+            label = downloaded[order.id]
+            template = order.logistic_type_id.label_template_id
+            if label.get('content') and label['extension'] == 'pdf' and template:
+                template_jobs.append((label['content'], template, order.sale_order_id))
+                template_orders.append(order)
+
+        for order, (pdf, error) in zip(template_orders, processor.apply_template_batch(template_jobs)):
+            if pdf:
+                downloaded[order.id].update(content=pdf, template_applied=True)
+            else:
+                # Se conserva el PDF original
+                downloaded[order.id]['template_error'] = error
+
+        # Adjuntos en un solo create
+        vals_list = []
+        created_orders = []
+        for order in missing:
+            label = downloaded[order.id]
+            if label.get('error'):
+                labels[order.id] = label
+                continue
+            suffix = '_personalizada' if label.get('template_applied') else ''
+            label['filename'] = f'etiqueta_ml_{order.ml_shipment_id}{suffix}.{label["extension"]}'
+            vals_list.append({
+                'name': label['filename'],
+                'type': 'binary',
+                'datas': base64.b64encode(label['content']),
+                'res_model': 'sale.order',
+                'res_id': order.sale_order_id.id,
+                'mimetype': label['mimetype'],
+            })
+            created_orders.append(order)
+
+        for order, attachment in zip(created_orders, Attachment.create(vals_list)):
+            label = downloaded[order.id]
+            label['attachment'] = attachment
+            labels[order.id] = label
+
+            body = f'Etiqueta de envio MercadoLibre descargada: {label["filename"]}'
+            if label.get('template_error'):
+                body += (f'<br/>⚠️ Error aplicando plantilla personalizada: {label["template_error"]}<br/>'
+                         f'Se guardó la etiqueta original sin modificaciones.')
+            order.sale_order_id.message_post(body=body, attachment_ids=[attachment.id])
+
+            try:
+                order._attach_label_to_picking(attachment)
+            except Exception as e:
+                _logger.error(f'Error vinculando etiqueta a pickings: {e}', exc_info=True)
+
+        return labels
+
+    def _download_labels_batch(self):
+        """
+        Descarga en paralelo las etiquetas de varias órdenes.
+
+        Las etiquetas PDF se piden de a labels_batch_size envíos por llamada
+        (/shipment_labels?shipment_ids=A,B,C) y el PDF resultante se separa
+        por página, asociando cada página al envío cuyo ID aparece en su
+        texto. Si el lote falla o alguna página no se puede asociar a un
+        único envío, esos envíos se piden de a uno. Las ZPL2 se piden de a
+        un envío (el zip de ML no permite asociar cada etiqueta a su envío).
+
+        Returns:
+            dict {order.id: {'content', 'extension', 'mimetype'} o {'error'}}
+        """
+        Http = self.env['mercadolibre.http']
+        batch_size = self._get_labels_batch_size()
+        results = {}
+
+        groups = defaultdict(list)
+        for order in self:
+            groups[(order.account_id, order.logistic_type_id.label_format or 'pdf')].append(order)
+
+        for (account, label_format), orders in groups.items():
+            if label_format == 'pdf':
+                chunks = [orders[i:i + batch_size] for i in range(0, len(orders), batch_size)]
+            else:
+                chunks = [[order] for order in orders]
+
+            try:
+                responses = Http._request_batch(
+                    account.id,
+                    [self._label_call(chunk, label_format) for chunk in chunks],
+                    raw=True,
+                )
+            except Exception as e:
+                for order in orders:
+                    results[order.id] = {'error': f'Error de autenticacion: {str(e)}'}
+                continue
+
+            pending = list(zip(chunks, responses))
+            while pending:
+                retry = []
+                for chunk, response in pending:
+                    contents = None
+                    if not response['error']:
+                        contents = self._split_label_response(chunk, response['data'], label_format)
+                    if contents is not None:
+                        for order, content in zip(chunk, contents):
+                            results[order.id] = self._label_vals(content)
+                    elif len(chunk) > 1:
+                        # Lote fallido o no separable: de a un envío
+                        retry.extend(([order], self._label_call([order], label_format)) for order in chunk)
+                    elif response['status_code'] == 404 and response['endpoint'] == '/shipment_labels':
+                        # Endpoint alternativo, igual que la descarga individual
+                        retry.append((chunk, {
+                            'endpoint': f'/shipments/{chunk[0].ml_shipment_id}/label',
+                            'params': {'response_type': label_format},
+                        }))
+                    else:
+                        results[chunk[0].id] = {'error': f'Error API ML: {response["error"]}'}
+
+                if retry:
+                    _logger.info(f'Reintentando {len(retry)} etiqueta(s) de a un envío')
+                    responses = Http._request_batch(account.id, [call for _chunk, call in retry], raw=True)
+                    pending = [(chunk, response) for (chunk, _call), response in zip(retry, responses)]
+                else:
+                    pending = []
+
+        return results
+
+    @api.model
+    def _label_call(self, orders, label_format):
+        """Llamada a /shipment_labels para uno o varios envíos."""
+        return {
+            'endpoint': '/shipment_labels',
+            'params': {
+                'shipment_ids': ','.join(order.ml_shipment_id for order in orders),
+                'response_type': label_format,
+            },
+        }
+
+    @api.model
+    def _split_label_response(self, orders, content, label_format):
+        """
+        Asocia el contenido descargado a cada envío del lote.
+
+        Cada página se asocia por el ID de envío impreso en su texto, no por
+        su posición: ML puede devolver las páginas en otro orden o más de
+        una página por envío, y una etiqueta asociada por posición se
+        adjuntaría (o imprimiría) en la orden equivocada.
+
+        Returns:
+            list de bytes (uno por orden) o None si no se puede separar
+        """
+        if len(orders) == 1:
+            return [content]
+        if label_format != 'pdf' or not content.startswith(b'%PDF'):
+            return None
+        pages = self.env['ml.label.processor']._split_pdf_pages_with_text(content)
+        if len(pages) != len(orders):
+            _logger.warning(
+                f'Lote de etiquetas con {len(pages)} página(s) para {len(orders)} envío(s), '
+                f'se descargan de a uno'
+            )
+            return None
+
+        shipment_ids = [str(order.ml_shipment_id) for order in orders]
+        by_shipment = {}
+        for page, text in pages:
+            found = [shipment_id for shipment_id in shipment_ids if shipment_id in text]
+            if len(found) != 1 or found[0] in by_shipment:
+                _logger.warning(
+                    f'Página del lote de etiquetas sin un envío identificable '
+                    f'(encontrados: {found}), se descargan de a uno'
+                )
+                return None
+            by_shipment[found[0]] = page
+        return [by_shipment[shipment_id] for shipment_id in shipment_ids]
+
+    @api.model
+    def _label_vals(self, content):
+        if content.startswith(b'%PDF'):
+            return {'content': content, 'extension': 'pdf', 'mimetype': 'application/pdf'}
+        return {
+            'content': self.env['ml.label.processor']._extract_zpl(content),
+            'extension': 'zpl',
+            'mimetype': 'text/plain',
+        }
+
+    def _send_merged_labels_to_printer(self, logistic_config, items):
+        """
+        Une las etiquetas de un grupo en un solo archivo (PDF o ZPL) y lo
+        envía como un único trabajo de impresión.
+
+        Args:
+            logistic_config: Tipo logístico con la impresora del grupo
+            items: lista de tuplas (mercadolibre.order, label dict)
+        """
+        processor = self.env['ml.label.processor']
+        extension = items[0][1]['extension']
+        if extension == 'pdf':
+            content = processor._merge_pdfs([label['content'] for _order, label in items])
+            mimetype = 'application/pdf'
+        else:
+            content = b'\n'.join(processor._extract_zpl(label['content']) for _order, label in items)
+            mimetype = 'text/plain'
+
+        _logger.info(
+            f'Enviando {len(items)} etiqueta(s) a {logistic_config.printer_name} '
+            f'en un solo trabajo ({len(content)} bytes)'
+        )
+        return self._post_label_to_printer(
+            logistic_config, f'etiquetas_ml_{len(items)}.{extension}', content, mimetype
+        )
+
     def action_test_printer_connection(self):
         """
         Test completo: Descarga etiqueta → Aplica plantilla → Envía a imprimir.
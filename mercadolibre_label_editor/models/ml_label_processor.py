@@ -1,20 +1,407 @@
 # -*- coding: utf-8 -*-
 
 import base64
+import hashlib
 import io
 import re
 import logging
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from odoo import models, api, _
+from odoo import models, api, tools, _
 from odoo.exceptions import UserError
 
 _logger = logging.getLogger(__name__)
 
+# Mínimo de etiquetas para usar el pool de procesos en apply_template_batch;
+# por debajo el costo de arrancar procesos supera al de renderizar
+RENDER_POOL_MIN_LABELS = 8
+
+# Overlays de campos estáticos por (versión de plantilla, tamaño de página).
+# Cache por proceso; cada worker (o proceso del pool) lo llena una vez.
+_STATIC_LAYERS = OrderedDict()
+_STATIC_LAYERS_LOCK = threading.Lock()
+STATIC_LAYER_CACHE_SIZE = 32
+
+
+def _text_offset(canvas_obj, text, align, font_name, font_size):
+    """Offset X según la alineación del texto (ver _calculate_text_offset)."""
+    if align == 'left':
+        return 0
+
+    text_width = canvas_obj.stringWidth(str(text), font_name, font_size)
+
+    if align == 'center':
+        return -text_width / 2
+    elif align == 'right':
+        return -text_width
+
+    return 0
+
+
+def _draw_fields(can, fields_spec, scale_x, scale_y, errors):
+    """
+    Dibuja campos de texto en un canvas de reportlab.
+
+    Returns:
+        int: campos renderizados (los errores se agregan a errors)
+    """
+    from reportlab.lib.colors import HexColor
+
+    rendered_count = 0
+    for field in fields_spec:
+        try:
+            text = field['text']
+
+            # Las coordenadas en BD están en puntos nativos (72 DPI) y la
+            # posición Y ya está en formato PyPDF2 (desde abajo): solo se
+            # escalan si el PDF real tiene diferente tamaño
+            x_pts = field['position_x'] * scale_x
+            y_pts = field['position_y'] * scale_y
+
+            # Configurar estilo de fuente
+            can.setFont(field['font_family'], field['font_size'])
+
+            # Configurar color
+            try:
+                can.setFillColor(HexColor(field['color']))
+            except Exception:
+                errors.append(f"Color inválido {field['color']} en {field['name']}, usando negro")
+                can.setFillColor(HexColor('#000000'))
+
+            x_offset = _text_offset(can, text, field['align'], field['font_family'], field['font_size'])
+
+            # Aplicar rotación y dibujar texto
+            if field['rotation']:
+                can.saveState()
+                can.translate(x_pts, y_pts)
+                can.rotate(field['rotation'])
+                can.drawString(x_offset, 0, text)
+                can.restoreState()
+            else:
+                can.drawString(x_pts + x_offset, y_pts, text)
+
+            rendered_count += 1
+
+        except Exception as e:
+            # Continuar con el siguiente campo
+            errors.append(f"Error renderizando campo {field['name']}: {e}")
+    return rendered_count
+
+
+def _build_layer(fields_spec, page_width, page_height, scale_x, scale_y, errors):
+    """
+    Renderiza un overlay con los campos dados.
+
+    Returns:
+        tuple (bytes del PDF overlay, campos renderizados)
+    """
+    from reportlab.pdfgen import canvas
+
+    packet = io.BytesIO()
+    can = canvas.Canvas(packet, pagesize=(page_width, page_height))
+    rendered_count = _draw_fields(can, fields_spec, scale_x, scale_y, errors)
+    can.save()
+    return packet.getvalue(), rendered_count
+
+
+def _layer_page(layer_bytes):
+    from PyPDF2 import PdfReader
+    return PdfReader(io.BytesIO(layer_bytes)).pages[0]
+
+
+def _stamp_layers(writer, page, layers):
+    """
+    Superpone overlays a una página ya agregada al writer como Form
+    XObjects, sin parsear el content stream original.
+
+    page.merge_page parsea y reescribe el contenido de ambas páginas en
+    cada etiqueta, y es lo que domina el tiempo de render. Aquí el
+    contenido original solo se envuelve entre q/Q (mismo aislamiento de
+    estado gráfico que merge_page) y cada capa se dibuja con "Do".
+    """
+    from PyPDF2 import PdfReader
+    from PyPDF2.generic import (
+        ArrayObject, DecodedStreamObject, DictionaryObject, FloatObject, NameObject,
+    )
+
+    def add_stream(data):
+        stream = DecodedStreamObject()
+        stream.set_data(data)
+        return writer._add_object(stream)
+
+    xobjects = DictionaryObject()
+    for index, layer_bytes in enumerate(layers):
+        layer = PdfReader(io.BytesIO(layer_bytes)).pages[0]
+        form = DecodedStreamObject()
+        form.set_data(layer.get_contents().get_data())
+        form.update({
+            NameObject('/Type'): NameObject('/XObject'),
+            NameObject('/Subtype'): NameObject('/Form'),
+            NameObject('/BBox'): ArrayObject([FloatObject(v) for v in layer.mediabox]),
+            NameObject('/Resources'): layer['/Resources'].get_object().clone(writer),
+        })
+        xobjects[NameObject(f'/MLLayer{index}')] = writer._add_object(form)
+
+    resources = page['/Resources'].get_object()
+    if '/XObject' in resources:
+        resources['/XObject'].get_object().update(xobjects)
+    else:
+        resources[NameObject('/XObject')] = xobjects
+
+    contents = page['/Contents']
+    original = contents.get_object()
+    streams = list(original) if isinstance(original, ArrayObject) else [contents]
+    draw = b'Q\n' + b''.join(b'q ' + name.encode() + b' Do Q\n' for name in xobjects)
+    page[NameObject('/Contents')] = ArrayObject(
+        [add_stream(b'q\n')] + streams + [add_stream(draw)]
+    )
+
+
+def _get_static_layer(spec, page_width, page_height, scale_x, scale_y):
+    """
+    Overlay con los campos estáticos de la plantilla, renderizado una vez
+    por versión de plantilla (layout_key) y tamaño de página.
+
+    Se cachean los bytes (no el PageObject) para que cada etiqueta lea su
+    propia copia y el cache pueda compartirse entre hilos.
+
+    Returns:
+        tuple (bytes del overlay, campos renderizados, errores)
+    """
+    key = (spec['layout_key'], page_width, page_height)
+    with _STATIC_LAYERS_LOCK:
+        cached = _STATIC_LAYERS.get(key)
+        if cached:
+            _STATIC_LAYERS.move_to_end(key)
+            return cached
+
+    errors = []
+    layer, rendered_count = _build_layer(
+        spec['static_fields'], page_width, page_height, scale_x, scale_y, errors
+    )
+    cached = (layer, rendered_count, tuple(errors))
+    with _STATIC_LAYERS_LOCK:
+        _STATIC_LAYERS[key] = cached
+        while len(_STATIC_LAYERS) > STATIC_LAYER_CACHE_SIZE:
+            _STATIC_LAYERS.popitem(last=False)
+    return cached
+
+
+def _render_label(pdf_bytes, spec, use_cache=True):
+    """
+    Dibuja los campos de una plantilla sobre la primera página de un PDF.
+
+    Los campos estáticos se toman de un overlay cacheado por versión de
+    plantilla; por etiqueta solo se renderiza la capa de campos variables.
+
+    Función pura (sin ORM ni logging) para poder ejecutarse en un pool de
+    procesos: todos los valores ya vienen resueltos en spec
+    (ver MlLabelProcessor._prepare_overlay_spec).
+
+    Args:
+        pdf_bytes: bytes del PDF original
+        spec: dict de _prepare_overlay_spec
+        use_cache: False renderiza todos los campos por etiqueta (benchmark)
+
+    Returns:
+        tuple (bytes del PDF modificado, campos renderizados, errores por campo)
+    """
+    from PyPDF2 import PdfReader, PdfWriter
+
+    # 1. Leer PDF original
+    original_pdf = PdfReader(io.BytesIO(pdf_bytes))
+    if len(original_pdf.pages) == 0:
+        raise ValueError('El PDF original no contiene páginas')
+
+    page = original_pdf.pages[0]
+
+    # Obtener dimensiones de la página
+    page_width = float(page.mediabox.width)
+    page_height = float(page.mediabox.height)
+
+    # Calcular dimensiones del template en puntos nativos (72 DPI)
+    # El template guarda pdf_width/height en escala 150 DPI
+    template_width_pts = spec['pdf_width'] * (72 / 150) if spec['pdf_width'] else page_width
+    template_height_pts = spec['pdf_height'] * (72 / 150) if spec['pdf_height'] else page_height
+
+    # Factor de escala si el PDF real tiene dimensiones diferentes al template
+    scale_x = page_width / template_width_pts if template_width_pts else 1.0
+    scale_y = page_height / template_height_pts if template_height_pts else 1.0
+
+    # 2. Capas: estática (cacheada) y variable (por etiqueta)
+    rendered_count = 0
+    errors = []
+    layers = []
+    static_fields = spec.get('static_fields') or ()
+    dynamic_fields = list(spec['fields'])
+    if static_fields and use_cache and spec.get('layout_key'):
+        static_layer, static_count, static_errors = _get_static_layer(
+            spec, page_width, page_height, scale_x, scale_y
+        )
+        layers.append(static_layer)
+        rendered_count += static_count
+        errors.extend(static_errors)
+    else:
+        dynamic_fields = list(static_fields) + dynamic_fields
+
+    if dynamic_fields:
+        layer, dynamic_count = _build_layer(
+            dynamic_fields, page_width, page_height, scale_x, scale_y, errors
+        )
+        layers.append(layer)
+        rendered_count += dynamic_count
+
+    # 3. Combinar capas sobre el original y escribir resultado final
+    output = None
+    if use_cache and '/Resources' in page:
+        try:
+            output = PdfWriter()
+            output.add_page(page)
+            _stamp_layers(output, output.pages[0], layers)
+        except Exception as e:
+            errors.append(f'Estampado rápido no disponible ({e}), usando merge_page')
+            output = None
+
+    if output is None:
+        for layer in layers:
+            page.merge_page(_layer_page(layer))
+        output = PdfWriter()
+        output.add_page(page)
+
+    result_stream = io.BytesIO()
+    output.write(result_stream)
+    return result_stream.getvalue(), rendered_count, errors
+
+
+def _render_label_job(args):
+    """Adaptador para ProcessPoolExecutor.map: captura el error por etiqueta."""
+    pdf_bytes, spec = args
+    try:
+        return _render_label(pdf_bytes, spec) + (None,)
+    except Exception as e:
+        return None, 0, [], str(e)
+
 
 class MlLabelProcessor(models.AbstractModel):
     _name = 'ml.label.processor'
     _description = 'Procesador de Etiquetas MercadoLibre'
 
+    @api.model
+    def _build_template_layout(self, template):
+        """
+        Parsea los campos activos de una plantilla separando los estáticos
+        (texto fijo, iguales en todas las etiquetas) de los variables.
+
+        Returns:
+            dict con keys: template_name, pdf_width, pdf_height, layout_key,
+            static_fields, dynamic_fields
+        """
+        static_fields = []
+        dynamic_fields = []
+        for field in template.field_ids.filtered(lambda f: f.active):
+            vals = {
+                'name': field.name,
+                'field_type': field.field_type,
+                'value': field.value,
+                'position_x': field.position_x,
+                'position_y': field.position_y,
+                'font_family': field.font_family,
+                'font_size': field.font_size,
+                'color': field.color,
+                'rotation': field.rotation or 0,
+                'align': field.align,
+            }
+            # Un campo dinámico sin variables también es texto fijo
+            if field.field_type == 'static' or '${' not in (field.value or ''):
+                if not field.value:
+                    _logger.warning(f'Campo {field.name} resultó en texto vacío')
+                    continue
+                vals['text'] = str(field.value)
+                static_fields.append(vals)
+            else:
+                dynamic_fields.append(vals)
+
+        layout = {
+            'template_name': template.name,
+            'pdf_width': template.pdf_width,
+            'pdf_height': template.pdf_height,
+            'static_fields': tuple(static_fields),
+            'dynamic_fields': tuple(dynamic_fields),
+        }
+        # Versión de la plantilla: cambia con cualquier dato que afecte el render
+        layout['layout_key'] = hashlib.sha1(repr((
+            template.pdf_width, template.pdf_height,
+            [sorted(f.items()) for f in static_fields],
+        )).encode()).hexdigest()
+        return layout
+
+    @api.model
+    @tools.ormcache('template_id')
+    def _get_template_layout(self, template_id):
+        """
+        Layout parseado de una plantilla guardada. Se invalida al modificar
+        la plantilla o sus campos (ver _clear_layout_cache).
+        """
+        return self._build_template_layout(self.env['ml.label.template'].browse(template_id))
+
+    @api.model
+    def _clear_layout_cache(self):
+        self.clear_caches()
+
+    @api.model
+    def _prepare_overlay_spec(self, template, context_record):
+        """
+        Resuelve en el proceso principal todo lo que requiere ORM: layout de
+        la plantilla (cacheado) y los valores variables para el registro.
+
+        Returns:
+            dict serializable con keys: template_name, pdf_width, pdf_height,
+            layout_key, static_fields y fields (campos variables con su
+            texto resuelto)
+        """
+        if isinstance(template.id, int):
+            layout = self._get_template_layout(template.id)
+        else:
+            layout = self._build_template_layout(template)
+
+        fields_spec = []
+        for field in layout['dynamic_fields']:
+            try:
+                text = self._resolve_value(field['value'], context_record)
+            except Exception as e:
+                _logger.error(f'Error resolviendo campo {field["name"]}: {e}')
+                continue
+
+            if not text:
+                _logger.warning(f'Campo {field["name"]} resultó en texto vacío')
+                continue
+
+            fields_spec.append(dict(field, text=str(text)))
+
+        return {
+            'template_name': layout['template_name'],
+            'pdf_width': layout['pdf_width'],
+            'pdf_height': layout['pdf_height'],
+            'layout_key': layout['layout_key'],
+            'static_fields': layout['static_fields'],
+            'fields': fields_spec,
+        }
+
+    @api.model
+    def _check_dependencies(self):
+        try:
+            import PyPDF2  # noqa: F401
+            import reportlab  # noqa: F401
+        except ImportError:
+            raise UserError(_(
+                'Falta instalar dependencias: PyPDF2 y reportlab.\n'
+                'Ejecutar: pip3 install PyPDF2 reportlab'
+            ))
+
     @api.model
     def apply_template(self, pdf_bytes, template, context_record):
         """
@@ -38,140 +425,162 @@ class MlLabelProcessor(models.AbstractModel):
             _logger.info('No hay plantilla o campos configurados, retornando PDF original')
             return pdf_bytes
 
+        self._check_dependencies()
+
         try:
-            from PyPDF2 import PdfReader, PdfWriter
-            from reportlab.pdfgen import canvas
-            from reportlab.lib.colors import HexColor
-        except ImportError as e:
+            spec = self._prepare_overlay_spec(template, context_record)
+            result_bytes, rendered_count, errors = _render_label(pdf_bytes, spec)
+        except Exception as e:
+            _logger.error(f'Error procesando PDF con plantilla: {e}', exc_info=True)
             raise UserError(_(
-                'Falta instalar dependencias: PyPDF2 y reportlab.\n'
-                'Ejecutar: pip3 install PyPDF2 reportlab'
-            ))
+                'Error al procesar la etiqueta con la plantilla:\n%s'
+            ) % str(e))
 
-        try:
-            # 1. Leer PDF original
-            original_pdf = PdfReader(io.BytesIO(pdf_bytes))
-            if len(original_pdf.pages) == 0:
-                raise UserError(_('El PDF original no contiene páginas'))
+        for error in errors:
+            _logger.error(error)
+        _logger.info(
+            f'PDF procesado con plantilla {template.name}: '
+            f'{rendered_count}/{len(spec["static_fields"]) + len(spec["fields"])} campos, '
+            f'{len(pdf_bytes)} bytes -> {len(result_bytes)} bytes'
+        )
+        return result_bytes
 
-            page = original_pdf.pages[0]
+    @api.model
+    def _get_render_processes(self):
+        """
+        Parámetro de sistema:
+            mercadolibre_label_editor.render_processes: procesos para renderizar
+                etiquetas en lote (default 1 = sin pool). El pool es opcional:
+                sus procesos deben poder importar este módulo por su cuenta
+                (addons instalados como paquete bajo odoo/addons); si no
+                pueden, se renderiza en serie.
+        """
+        return max(int(self.env['ir.config_parameter'].sudo().get_param(
+            'mercadolibre_label_editor.render_processes', default=1
+        )), 1)
 
-            # Obtener dimensiones de la página
-            page_width = float(page.mediabox.width)
-            page_height = float(page.mediabox.height)
+    @api.model
+    def apply_template_batch(self, jobs):
+        """
+        Aplica plantillas a varias etiquetas, renderizando en un pool de
+        procesos cuando el lote es grande.
 
-            _logger.info(
-                f'Procesando PDF: {page_width}x{page_height} pts, '
-                f'plantilla: {template.name}, campos: {len(template.field_ids)}'
-            )
+        Los valores de los campos se resuelven antes en el proceso principal
+        (ORM); los procesos solo dibujan y combinan PDFs.
 
-            # 2. Crear overlay con los campos de texto
-            packet = io.BytesIO()
-            can = canvas.Canvas(packet, pagesize=(page_width, page_height))
+        Args:
+            jobs: lista de tuplas (pdf_bytes, template, context_record)
 
-            # 3. Renderizar cada campo activo
-            active_fields = template.field_ids.filtered(lambda f: f.active)
-            rendered_count = 0
+        Returns:
+            list de tuplas (bytes del PDF o None, error o None) en el mismo orden
+        """
+        if not jobs:
+            return []
 
-            # Calcular dimensiones del template en puntos nativos (72 DPI)
-            # El template guarda pdf_width/height en escala 150 DPI
-            template_width_pts = template.pdf_width * (72 / 150) if template.pdf_width else page_width
-            template_height_pts = template.pdf_height * (72 / 150) if template.pdf_height else page_height
+        self._check_dependencies()
 
-            # Factor de escala si el PDF real tiene dimensiones diferentes al template
-            scale_x = page_width / template_width_pts if template_width_pts else 1.0
-            scale_y = page_height / template_height_pts if template_height_pts else 1.0
+        payloads = []
+        for pdf_bytes, template, context_record in jobs:
+            if not template or not template.field_ids:
+                payloads.append((pdf_bytes, None))
+            else:
+                payloads.append((pdf_bytes, self._prepare_overlay_spec(template, context_record)))
+
+        to_render = [i for i, (_pdf, spec) in enumerate(payloads) if spec]
+        args = [payloads[i] for i in to_render]
+
+        processes = min(self._get_render_processes(), len(args))
+        rendered = None
+        if processes > 1 and len(args) >= RENDER_POOL_MIN_LABELS:
+            try:
+                # No fork: el worker de Odoo tiene hilos, locks y el socket de la BD
+                # abiertos que el hijo heredaría. forkserver arranca los procesos
+                # desde un servidor limpio de un solo hilo.
+                methods = multiprocessing.get_all_start_methods()
+                ctx = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                with ProcessPoolExecutor(max_workers=processes, mp_context=ctx) as executor:
+                    rendered = list(executor.map(_render_label_job, args, chunksize=4))
+            except Exception as e:
+                _logger.warning(f'Pool de procesos no disponible ({e}), renderizando en serie')
+        if rendered is None:
+            rendered = [_render_label_job(a) for a in args]
+
+        results = [(pdf_bytes, None) for pdf_bytes, _spec in payloads]
+        for i, (pdf, _count, errors, error) in zip(to_render, rendered):
+            for field_error in errors:
+                _logger.error(field_error)
+            if error:
+                _logger.error(f'Error procesando PDF con plantilla: {error}')
+                results[i] = (None, error)
+            else:
+                results[i] = (pdf, None)
 
-            _logger.debug(
-                f'Dimensiones template: {template_width_pts:.1f}x{template_height_pts:.1f} pts, '
-                f'PDF real: {page_width:.1f}x{page_height:.1f} pts, '
-                f'escala: ({scale_x:.3f}, {scale_y:.3f})'
-            )
+        _logger.info(f'Plantillas aplicadas en lote: {len(args)} etiquetas, {processes} proceso(s)')
+        return results
 
-            for field in active_fields:
-                try:
-                    text = self._resolve_field_value(field, context_record)
-
-                    if not text:
-                        _logger.warning(f'Campo {field.name} resultó en texto vacío')
-                        continue
-
-                    # Las coordenadas en BD están en puntos nativos (72 DPI)
-                    # position_y está invertida (Y=0 abajo en formato PyPDF2)
-                    # Solo necesitamos escalar si el PDF real tiene diferente tamaño
-                    x_pts = field.position_x * scale_x
-
-                    # La posición Y en BD ya está en formato PyPDF2 (desde abajo)
-                    # Solo escalar proporcionalmente
-                    y_pts = field.position_y * scale_y
-
-                    # Configurar estilo de fuente
-                    can.setFont(field.font_family, field.font_size)
-
-                    # Configurar color
-                    try:
-                        can.setFillColor(HexColor(field.color))
-                    except:
-                        _logger.warning(f'Color inválido {field.color}, usando negro')
-                        can.setFillColor(HexColor('#000000'))
-
-                    # Aplicar rotación y dibujar texto
-                    if field.rotation and field.rotation != 0:
-                        can.saveState()
-                        can.translate(x_pts, y_pts)
-                        can.rotate(field.rotation)
-
-                        # Alineación con rotación
-                        x_offset = self._calculate_text_offset(
-                            can, text, field.align, field.font_family, field.font_size
-                        )
-                        can.drawString(x_offset, 0, str(text))
-                        can.restoreState()
-                    else:
-                        # Sin rotación
-                        x_offset = self._calculate_text_offset(
-                            can, text, field.align, field.font_family, field.font_size
-                        )
-                        can.drawString(x_pts + x_offset, y_pts, str(text))
-
-                    rendered_count += 1
-                    _logger.debug(
-                        f'Campo renderizado: {field.name} = "{text}" '
-                        f'en ({x_pts:.1f}, {y_pts:.1f})'
-                    )
-
-                except Exception as e:
-                    _logger.error(f'Error renderizando campo {field.name}: {e}')
-                    # Continuar con el siguiente campo
-
-            can.save()
-            _logger.info(f'Renderizados {rendered_count}/{len(active_fields)} campos')
-
-            # 4. Combinar PDFs (overlay sobre original)
-            packet.seek(0)
-            overlay_pdf = PdfReader(packet)
-            page.merge_page(overlay_pdf.pages[0])
-
-            # 5. Escribir resultado final
-            output = PdfWriter()
-            output.add_page(page)
+    @api.model
+    def _split_pdf_pages(self, pdf_bytes):
+        """Separa un PDF en una lista de PDFs de una página."""
+        from PyPDF2 import PdfReader, PdfWriter
+
+        pages = []
+        for page in PdfReader(io.BytesIO(pdf_bytes)).pages:
+            writer = PdfWriter()
+            writer.add_page(page)
+            stream = io.BytesIO()
+            writer.write(stream)
+            pages.append(stream.getvalue())
+        return pages
 
-            result_stream = io.BytesIO()
-            output.write(result_stream)
-            result_bytes = result_stream.getvalue()
+    @api.model
+    def _split_pdf_pages_with_text(self, pdf_bytes):
+        """
+        Como _split_pdf_pages, pero con el texto extraído de cada página.
 
-            _logger.info(
-                f'PDF procesado exitosamente: '
-                f'{len(pdf_bytes)} bytes -> {len(result_bytes)} bytes'
-            )
+        Returns:
+            list de tuplas (bytes del PDF de una página, texto de la página)
+        """
+        from PyPDF2 import PdfReader, PdfWriter
+
+        pages = []
+        for page in PdfReader(io.BytesIO(pdf_bytes)).pages:
+            try:
+                text = page.extract_text() or ''
+            except Exception as e:
+                _logger.warning(f'No se pudo extraer el texto de la página: {e}')
+                text = ''
+            writer = PdfWriter()
+            writer.add_page(page)
+            stream = io.BytesIO()
+            writer.write(stream)
+            pages.append((stream.getvalue(), text))
+        return pages
 
-            return result_bytes
+    @api.model
+    def _merge_pdfs(self, pdfs):
+        """Une varios PDFs en un solo documento (un trabajo de impresión)."""
+        from PyPDF2 import PdfReader, PdfWriter
+
+        writer = PdfWriter()
+        for pdf_bytes in pdfs:
+            for page in PdfReader(io.BytesIO(pdf_bytes)).pages:
+                writer.add_page(page)
+        stream = io.BytesIO()
+        writer.write(stream)
+        return stream.getvalue()
 
-        except Exception as e:
-            _logger.error(f'Error procesando PDF con plantilla: {e}', exc_info=True)
-            raise UserError(_(
-                'Error al procesar la etiqueta con la plantilla:\n%s'
-            ) % str(e))
+    @api.model
+    def _extract_zpl(self, content):
+        """
+        ML entrega las etiquetas ZPL2 comprimidas en un zip; retorna el texto
+        ZPL (o el contenido tal cual si no es un zip).
+        """
+        if not content or not content.startswith(b'PK'):
+            return content
+        import zipfile
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            return b''.join(archive.read(name) for name in archive.namelist()
+                            if not name.endswith('/'))
 
     def _calculate_text_offset(self, canvas_obj, text, align, font_name, font_size):
         """
@@ -187,17 +596,7 @@ class MlLabelProcessor(models.AbstractModel):
         Returns:
             offset en puntos
         """
-        if align == 'left':
-            return 0
-
-        text_width = canvas_obj.stringWidth(str(text), font_name, font_size)
-
-        if align == 'center':
-            return -text_width / 2
-        elif align == 'right':
-            return -text_width
-
-        return 0
+        return _text_offset(canvas_obj, text, align, font_name, font_size)
 
     def _resolve_field_value(self, field, record):
         """
@@ -212,9 +611,10 @@ class MlLabelProcessor(models.AbstractModel):
         """
         if field.field_type == 'static':
             return field.value
+        return self._resolve_value(field.value, record)
 
-        # Procesar variables dinámicas ${...}
-        value = field.value
+    def _resolve_value(self, value, record):
+        """Procesa las variables dinámicas ${...} de un valor."""
         pattern = r'\$\{([^}]+)\}'
 
         def replace_var(match):
@@ -337,7 +737,14 @@ class MlLabelProcessor(models.AbstractModel):
         if not template.sample_pdf:
             raise UserError(_('La plantilla no tiene un PDF de ejemplo'))
 
-        # Crear objeto mock con datos de muestra
+        mock_record = self._get_sample_record(sample_data)
+        pdf_bytes = base64.b64decode(template.sample_pdf)
+
+        return self.apply_template(pdf_bytes, template, mock_record)
+
+    @api.model
+    def _get_sample_record(self, sample_data=None):
+        """Objeto mock con datos de muestra para resolver variables."""
         class MockRecord:
             def __init__(self, data):
                 self._name = 'mock.record'
@@ -352,7 +759,54 @@ class MlLabelProcessor(models.AbstractModel):
             'ml_pack_id': 'PACK-001',
         }
 
-        mock_record = MockRecord(sample_data or default_sample)
+        return MockRecord(sample_data or default_sample)
+
+    @api.model
+    def benchmark_template(self, template, count=100):
+        """
+        Micro-benchmark de render sobre el PDF de ejemplo de la plantilla.
+
+        Compara el render anterior (parsear los campos y dibujar todas las
+        capas por etiqueta) con el actual (layout cacheado + capa estática
+        pre-renderizada + capa variable por etiqueta).
+
+        Returns:
+            dict con keys: count, before, after (etiquetas/segundo), speedup
+        """
+        if not template.sample_pdf:
+            raise UserError(_('La plantilla no tiene un PDF de ejemplo'))
+
+        self._check_dependencies()
         pdf_bytes = base64.b64decode(template.sample_pdf)
+        mock_record = self._get_sample_record()
+
+        def run(prepare, use_cache):
+            # Una pasada de calentamiento para no medir imports ni cache frío
+            _render_label(pdf_bytes, prepare(), use_cache=use_cache)
+            start = time.perf_counter()
+            for _i in range(count):
+                _render_label(pdf_bytes, prepare(), use_cache=use_cache)
+            return count / max(time.perf_counter() - start, 1e-9)
+
+        def prepare_uncached():
+            layout = self._build_template_layout(template)
+            return dict(
+                layout,
+                fields=[dict(f, text=str(self._resolve_value(f['value'], mock_record)))
+                        for f in layout['dynamic_fields']],
+            )
 
-        return self.apply_template(pdf_bytes, template, mock_record)
+        before = run(prepare_uncached, use_cache=False)
+        after = run(lambda: self._prepare_overlay_spec(template, mock_record), use_cache=True)
+
+        result = {
+            'count': count,
+            'before': before,
+            'after': after,
+            'speedup': after / before if before else 0.0,
+        }
+        _logger.info(
+            f'Benchmark plantilla {template.name}: {count} etiquetas, '
+            f'antes {before:.1f} etiq/s, ahora {after:.1f} etiq/s (x{result["speedup"]:.2f})'
+        )
+        return result
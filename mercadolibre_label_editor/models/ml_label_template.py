@@ -244,6 +244,40 @@ class MlLabelTemplate(models.Model):
                         'El archivo no es un PDF válido o está corrupto: %s'
                     ) % str(e))
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['ml.label.processor']._clear_layout_cache()
+        return records
+
+    def write(self, vals):
+        result = super().write(vals)
+        self.env['ml.label.processor']._clear_layout_cache()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self.env['ml.label.processor']._clear_layout_cache()
+        return result
+
+    def action_benchmark_render(self):
+        """Mide etiquetas/segundo del render con y sin cache de capa estática"""
+        self.ensure_one()
+        result = self.env['ml.label.processor'].benchmark_template(self)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Benchmark de Render',
+                'message': (
+                    f'{result["count"]} etiquetas: antes {result["before"]:.1f} etiq/s, '
+                    f'ahora {result["after"]:.1f} etiq/s (x{result["speedup"]:.2f})'
+                ),
+                'type': 'info',
+                'sticky': True,
+            }
+        }
+
     def action_open_editor(self):
         """Abre el editor visual"""
         self.ensure_one()
@@ -112,6 +112,22 @@ class MlLabelTemplateField(models.Model):
         readonly=True
     )
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['ml.label.processor']._clear_layout_cache()
+        return records
+
+    def write(self, vals):
+        result = super().write(vals)
+        self.env['ml.label.processor']._clear_layout_cache()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self.env['ml.label.processor']._clear_layout_cache()
+        return result
+
     @api.constrains('position_x', 'position_y')
     def _check_position(self):
         """Validar que las posiciones sean positivas"""
@@ -240,6 +240,24 @@ class AccountPayment(models.Model):
         Returns:
             account.payment record
         """
+        payment = self.create(self._prepare_ml_payment_vals(ml_payment, payment_vals))
+
+        _logger.info('Pago Odoo creado desde ML: %s (ref: %s)', payment.name, payment.ref)
+
+        return payment
+
+    @api.model
+    def _prepare_ml_payment_vals(self, ml_payment, payment_vals):
+        """
+        Completa los valores base del pago con los campos de ML y el ref.
+
+        Args:
+            ml_payment: mercadolibre.payment record
+            payment_vals: dict con valores base del pago
+
+        Returns:
+            dict payment_vals actualizado
+        """
         # Buscar orden de venta
         sale_order, pack_id, order_id = self._find_sale_order_by_ml_ref(ml_payment)
         sale_order_name = sale_order.name if sale_order else ''
@@ -262,11 +280,7 @@ class AccountPayment(models.Model):
             'ml_sale_order_name': sale_order_name,
         })
 
-        payment = self.create(payment_vals)
-
-        _logger.info('Pago Odoo creado desde ML: %s (ref: %s)', payment.name, ref)
-
-        return payment
+        return payment_vals
 
     def action_view_ml_payment(self):
         """Abre el pago de MercadoPago relacionado"""
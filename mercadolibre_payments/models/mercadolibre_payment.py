@@ -408,23 +408,25 @@ class MercadolibrePayment(models.Model):
             _logger.error('No se encontro ID de pago en los datos')
             return False
 
-        # Buscar pago existente
-        existing = self.search([
-            ('mp_payment_id', '=', mp_payment_id),
-            ('account_id', '=', account.id)
-        ], limit=1)
+        return self.create_from_mp_data_batch([data], account)[0]
+
+    @api.model
+    def _prepare_vals_from_mp_data(self, data, account, currency=None):
+        """
+        Valores del pago a partir de los datos de MercadoPago.
+
+        Args:
+            currency: res.currency ya resuelta (opcional, evita la busqueda)
+        """
+        mp_payment_id = str(data.get('id', ''))
 
-        # Preparar valores
-        currency = self._get_currency(data.get('currency_id', 'MXN'))
+        if currency is None:
+            currency = self._get_currency(data.get('currency_id', 'MXN'))
 
         # Parse payer info (can be in 'payer' object or at root level)
         payer = data.get('payer', {}) or {}
         payer_identification = payer.get('identification', {}) or {}
 
-        # Parse fee details for charges (can be in fee_details or charges_details)
-        fee_details = data.get('fee_details', []) or []
-        charges_details = data.get('charges_details', []) or []
-
         # Extract payer_id (can be in payer.id or root payer_id)
         payer_id = str(payer.get('id', '')) if payer.get('id') else str(data.get('payer_id', ''))
 
@@ -480,37 +482,168 @@ class MercadolibrePayment(models.Model):
             'last_sync_date': fields.Datetime.now(),
         }
 
-        if existing:
-            _logger.info('Actualizando pago existente: %s', mp_payment_id)
-            existing.write(vals)
-            payment = existing
-            is_new = False
-        else:
-            _logger.info('Creando nuevo pago: %s', mp_payment_id)
-            payment = self.create(vals)
-            is_new = True
+        return vals
+
+    @api.model
+    def create_from_mp_data_batch(self, payloads, account):
+        """
+        Crea o actualiza un lote de pagos desde los datos de MercadoPago.
+
+        Equivalente a llamar create_from_mp_data por cada payload, pero con
+        los pagos existentes precargados en una consulta, los nuevos creados
+        en un solo create(), los cargos reemplazados en bloque y las ordenes
+        de venta buscadas de una vez. Los pagos existentes cuyo
+        date_last_updated y estados no cambiaron solo actualizan
+        last_sync_date (una escritura para todos).
+
+        Args:
+            payloads: lista de dicts con los datos de los pagos desde la API
+            account: mercadolibre.account record
+
+        Returns:
+            lista de (mercadolibre.payment record, bool is_new) en el orden de entrada
+        """
+        # Deduplicar por ID conservando la ultima version recibida
+        payload_by_id = {}
+        for data in payloads:
+            mp_payment_id = str(data.get('id', '') or '')
+            if not mp_payment_id:
+                _logger.error('No se encontro ID de pago en los datos')
+                continue
+            payload_by_id[mp_payment_id] = data
+
+        if not payload_by_id:
+            return []
+
+        # Precarga de pagos existentes
+        existing_by_id = {
+            payment.mp_payment_id: payment
+            for payment in self.search([
+                ('mp_payment_id', 'in', list(payload_by_id)),
+                ('account_id', '=', account.id),
+            ])
+        }
+
+        # Monedas por codigo: una busqueda por codigo distinto
+        currencies = {}
+        now = fields.Datetime.now()
+        unchanged = self.browse()
+        changed = []
+        create_vals = []
+        create_data = []
+        for mp_payment_id, data in payload_by_id.items():
+            currency_code = data.get('currency_id', 'MXN')
+            if currency_code not in currencies:
+                currencies[currency_code] = self._get_currency(currency_code)
+            vals = self._prepare_vals_from_mp_data(data, account, currencies[currency_code])
+            vals['last_sync_date'] = now
+
+            existing = existing_by_id.get(mp_payment_id)
+            if existing and self._is_unchanged(existing, vals):
+                unchanged |= existing
+            elif existing:
+                _logger.info('Actualizando pago existente: %s', mp_payment_id)
+                existing.write(vals)
+                changed.append((existing, data, False))
+            else:
+                create_vals.append(vals)
+                create_data.append(data)
+
+        if unchanged:
+            unchanged.write({'last_sync_date': now})
+            # Un pago sin cambios no se reescribe, pero la venta pudo crearse
+            # despues de su primera sincronizacion y aun no tener su estado
+            unchanged._update_related_sale_orders(only_stale=True)
+
+        if create_vals:
+            _logger.info('Creando %d pagos nuevos', len(create_vals))
+            for payment, data in zip(self.create(create_vals), create_data):
+                changed.append((payment, data, True))
+
+        if changed:
+            # Cargos de todos los pagos modificados en un solo reemplazo
+            self._sync_charges_batch([
+                (payment, data.get('fee_details', []) or [], data.get('charges_details', []) or [])
+                for payment, data, _is_new in changed
+            ])
+
+            # Actualizar sale.order relacionado con estado de pago y liberación
+            self.browse([payment.id for payment, _data, _is_new in changed])._update_related_sale_orders()
+
+            for payment, data, is_new in changed:
+                payment._on_mp_data_synced(data, is_new)
+
+        is_new_by_id = {payment.mp_payment_id: is_new for payment, _data, is_new in changed}
+        payment_by_id = dict(existing_by_id)
+        payment_by_id.update({payment.mp_payment_id: payment for payment, _data, _is_new in changed})
+        return [
+            (payment_by_id[mp_payment_id], is_new_by_id.get(mp_payment_id, False))
+            for mp_payment_id in (str(data.get('id', '') or '') for data in payloads)
+            if mp_payment_id in payment_by_id
+        ]
 
-        # Crear/actualizar cargos
-        self._sync_charges(payment, fee_details, charges_details)
+    @api.model
+    def _create_from_mp_data_isolated(self, payloads, account):
+        """
+        create_from_mp_data_batch con aislamiento de errores: si el lote
+        falla se revierte y se reintenta pago por pago.
 
-        # Actualizar sale.order relacionado con estado de pago y liberación
-        payment._update_related_sale_order()
+        Returns:
+            tuple (lista de (payment, is_new), lista de (mp_payment_id, error))
+        """
+        try:
+            with self.env.cr.savepoint():
+                return self.create_from_mp_data_batch(payloads, account), []
+        except Exception as e:
+            _logger.warning('Error sincronizando lote de %d pagos, se reintenta uno por uno: %s',
+                            len(payloads), str(e))
 
-        return payment, is_new
+        synced = []
+        errors = []
+        for data in payloads:
+            try:
+                with self.env.cr.savepoint():
+                    synced.extend(self.create_from_mp_data_batch([data], account))
+            except Exception as e:
+                _logger.error('Error procesando pago %s: %s', data.get('id'), str(e))
+                errors.append((data.get('id'), str(e)))
+        return synced, errors
+
+    @api.model
+    def _is_unchanged(self, payment, vals):
+        """
+        True si MercadoPago no modifico el pago desde la ultima sincronizacion
+        (misma fecha de actualizacion y mismos estados).
+        """
+        return bool(
+            vals.get('date_last_updated')
+            and payment.date_last_updated == vals['date_last_updated']
+            and payment.status == vals['status']
+            and (payment.money_release_status or '') == (vals['money_release_status'] or '')
+        )
+
+    def _on_mp_data_synced(self, data, is_new):
+        """
+        Punto de extension por pago nuevo o modificado tras sincronizar
+        desde MercadoPago (ej: deteccion de mediaciones).
+        """
+        self.ensure_one()
 
     def _sync_charges(self, payment, fee_details, charges_details=None):
+        """Sincroniza los cargos/comisiones del pago."""
+        self._sync_charges_batch([(payment, fee_details, charges_details)])
+
+    @api.model
+    def _prepare_charge_vals(self, payment, fee_details, charges_details=None):
         """
-        Sincroniza los cargos/comisiones del pago.
+        Valores de los cargos/comisiones del pago.
 
         IMPORTANTE: La API de MercadoPago puede devolver la misma comision en
         fee_details Y charges_details. Para evitar duplicados, usamos SOLO UNA fuente:
         - Si charges_details tiene datos, usamos eso (mas detallado)
         - Si no, usamos fee_details
         """
-        ChargeModel = self.env['mercadolibre.payment.charge']
-
-        # Eliminar cargos existentes
-        payment.charge_ids.unlink()
+        vals_list = []
 
         # Usar charges_details si tiene datos (mas detallado), sino fee_details
         # NO procesar ambos para evitar duplicados
@@ -521,7 +654,7 @@ class MercadolibrePayment(models.Model):
                 accounts = charge.get('accounts', {}) or {}
                 amount = amounts.get('original', 0.0)
                 if amount > 0:  # Solo crear si hay monto
-                    ChargeModel.create({
+                    vals_list.append({
                         'payment_id': payment.id,
                         'charge_type': charge.get('name', '') or charge.get('type', ''),
                         'fee_payer': accounts.get('from', ''),
@@ -532,12 +665,31 @@ class MercadolibrePayment(models.Model):
             for fee in fee_details:
                 amount = fee.get('amount', 0.0)
                 if amount > 0:  # Solo crear si hay monto
-                    ChargeModel.create({
+                    vals_list.append({
                         'payment_id': payment.id,
                         'charge_type': fee.get('type', ''),
                         'fee_payer': fee.get('fee_payer', ''),
                         'amount': amount,
                     })
+        return vals_list
+
+    @api.model
+    def _sync_charges_batch(self, entries):
+        """
+        Reemplaza los cargos de varios pagos: un unlink y un create para todos.
+
+        Args:
+            entries: lista de (payment, fee_details, charges_details)
+        """
+        payments = self.browse([payment.id for payment, _fees, _charges in entries])
+        # Eliminar cargos existentes
+        payments.charge_ids.unlink()
+
+        vals_list = []
+        for payment, fee_details, charges_details in entries:
+            vals_list.extend(self._prepare_charge_vals(payment, fee_details, charges_details))
+        if vals_list:
+            self.env['mercadolibre.payment.charge'].create(vals_list)
 
     def _update_related_sale_order(self):
         """
@@ -545,33 +697,60 @@ class MercadolibrePayment(models.Model):
         Busca el sale.order por el ml_order_id y actualiza los campos de pago.
         """
         self.ensure_one()
+        self._update_related_sale_orders()
 
-        if not self.mp_order_id and not self.mp_external_reference:
-            _logger.debug('Pago %s sin order_id, no se puede vincular a sale.order', self.mp_payment_id)
-            return
-
-        # Buscar sale.order relacionado
-        order_ref = self.mp_order_id or self.mp_external_reference
-        sale_order = self.env['sale.order'].search([
-            ('ml_order_id', '=', order_ref)
-        ], limit=1)
+    def _update_related_sale_orders(self, only_stale=False):
+        """
+        Actualiza los sale.order relacionados con los datos de estos pagos,
+        buscando todas las ordenes en una sola consulta.
 
-        if not sale_order:
-            _logger.debug('No se encontró sale.order para order_id %s', order_ref)
+        Args:
+            only_stale: Si True, solo actualiza las ordenes cuyos campos de
+                        pago no coinciden con el pago (ej: creadas despues)
+        """
+        refs = {}
+        for payment in self:
+            order_ref = payment.mp_order_id or payment.mp_external_reference
+            if not order_ref:
+                _logger.debug('Pago %s sin order_id, no se puede vincular a sale.order', payment.mp_payment_id)
+                continue
+            refs[payment] = order_ref
+
+        if not refs:
             return
 
-        # Actualizar campos de pago en sale.order
-        try:
-            sale_order._update_from_ml_payment(self)
-            _logger.info(
-                'Sale.order %s actualizado desde pago %s (status=%s, release=%s)',
-                sale_order.name, self.mp_payment_id, self.status, self.money_release_status
-            )
-        except Exception as e:
-            _logger.error(
-                'Error actualizando sale.order %s desde pago %s: %s',
-                sale_order.name, self.mp_payment_id, str(e)
-            )
+        # Buscar sale.order relacionados
+        sale_orders = {}
+        for sale_order in self.env['sale.order'].search([
+            ('ml_order_id', 'in', list(set(refs.values())))
+        ]):
+            sale_orders.setdefault(sale_order.ml_order_id, sale_order)
+
+        for payment, order_ref in refs.items():
+            sale_order = sale_orders.get(order_ref)
+            if not sale_order:
+                _logger.debug('No se encontró sale.order para order_id %s', order_ref)
+                continue
+            if only_stale and (
+                    sale_order.ml_payment_status == (payment.status or sale_order.ml_payment_status)
+                    and sale_order.ml_money_release_status == (
+                        payment.money_release_status or sale_order.ml_money_release_status)
+                    and sale_order.ml_money_release_date == (
+                        payment.money_release_date or sale_order.ml_money_release_date)):
+                continue
+
+            # Actualizar campos de pago en sale.order
+            try:
+                sale_order._update_from_ml_payment(payment)
+                _logger.info(
+                    'Sale.order %s actualizado desde pago %s (status=%s, release=%s)',
+                    sale_order.name, payment.mp_payment_id, payment.status, payment.money_release_status
+                )
+            except Exception as e:
+                _logger.error(
+                    'Error actualizando sale.order %s desde pago %s: %s',
+                    sale_order.name, payment.mp_payment_id, str(e)
+                )
 
     def _get_currency(self, currency_code):
         """Obtiene la moneda de Odoo por codigo"""
@@ -736,7 +915,7 @@ class MercadolibrePayment(models.Model):
         start_time = time.time()
 
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(account).get(url, params=params, headers=headers, timeout=30)
             duration = time.time() - start_time
 
             # Guardar log en mercadolibre.log
@@ -780,25 +959,14 @@ class MercadolibrePayment(models.Model):
         results = data.get('results', [])
         _logger.info('Encontrados %d pagos', len(results))
 
-        synced_count = 0
-        created_count = 0
-        updated_count = 0
-        for payment_data in results:
-            # Filtrar por dinero liberado si es requerido
-            if only_released:
-                if payment_data.get('money_release_status') != 'released':
-                    continue
+        # Filtrar por dinero liberado si es requerido
+        if only_released:
+            results = [p for p in results if p.get('money_release_status') == 'released']
 
-            try:
-                payment, is_new = self.create_from_mp_data(payment_data, account)
-                synced_count += 1
-                if is_new:
-                    created_count += 1
-                else:
-                    updated_count += 1
-            except Exception as e:
-                _logger.error('Error procesando pago %s: %s',
-                             payment_data.get('id'), str(e))
+        synced, _errors = self._create_from_mp_data_isolated(results, account)
+        synced_count = len(synced)
+        created_count = sum(1 for _payment, is_new in synced if is_new)
+        updated_count = synced_count - created_count
 
         _logger.info('Sincronizados %d pagos para cuenta %s (Nuevos: %d, Actualizados: %d)',
                     synced_count, account.name, created_count, updated_count)
@@ -921,17 +1089,27 @@ class MercadolibrePayment(models.Model):
             dict con resultados: {'payment': account.payment, 'commission_payment': account.payment or False}
         """
         self.ensure_one()
+        return self._create_odoo_payments_batch(config)[self.id]
 
-        result = {
-            'payment': False,
-            'commission_payment': False,
-            'error': False,
-        }
+    def _prepare_odoo_payment(self, config):
+        """
+        Valida el pago ML y arma los valores del account.payment principal.
+
+        Los pagos que no corresponden (ya creado, no aprobado, direccion
+        desconocida) se marcan como omitidos y retornan None.
+
+        Args:
+            config: mercadolibre.payment.sync.config con la configuracion
+
+        Returns:
+            dict {'payment_vals', 'partner', 'payment_date', 'payment_user'} o None
+        """
+        self.ensure_one()
 
         # Validar que no tenga ya un pago creado
         if self.odoo_payment_id:
             _logger.info('Pago %s ya tiene pago Odoo: %s', self.mp_payment_id, self.odoo_payment_id.name)
-            return result
+            return None
 
         # Validar estado del pago ML
         # Para ingresos: siempre requerir approved
@@ -941,141 +1119,250 @@ class MercadolibrePayment(models.Model):
                 'odoo_payment_state': 'skipped',
                 'odoo_payment_error': f'Pago no aprobado (estado: {self.status})',
             })
-            return result
+            return None
 
-        try:
-            # Obtener el usuario para crear el pago segun la configuracion
-            payment_user = self._get_payment_user(config)
-            if payment_user:
-                _logger.info('Creando pago con usuario responsable: %s', payment_user.name)
-
-            # Detectar proveedor para egresos
-            if self.payment_direction == 'outgoing' and not self.matched_vendor_id:
-                self._detect_vendor()
-
-            # Determinar tipo de pago y journal
-            if self.payment_direction == 'incoming':
-                payment_type = 'inbound'
-                partner_type = 'customer'
-                journal = config.incoming_journal_id
-                partner = self.partner_id or config.default_customer_id
-
-                if not journal:
-                    raise ValidationError(_('No hay diario de ingresos configurado'))
-                if not partner:
-                    raise ValidationError(_('No hay cliente configurado para pagos entrantes'))
-
-            elif self.payment_direction == 'outgoing':
-                payment_type = 'outbound'
-                partner_type = 'supplier'
-                journal = config.outgoing_journal_id
-
-                # Usar el partner del proveedor detectado o el default
-                if self.matched_vendor_id:
-                    partner = self.matched_vendor_id.partner_id
-                else:
-                    partner = self.partner_id or config.default_vendor_id
-
-                if not journal:
-                    raise ValidationError(_('No hay diario de egresos configurado'))
-                if not partner:
-                    raise ValidationError(_('No hay proveedor configurado para pagos salientes'))
+        # Obtener el usuario para crear el pago segun la configuracion
+        payment_user = self._get_payment_user(config)
+        if payment_user:
+            _logger.info('Creando pago con usuario responsable: %s', payment_user.name)
+
+        # Detectar proveedor para egresos
+        if self.payment_direction == 'outgoing' and not self.matched_vendor_id:
+            self._detect_vendor()
+
+        # Determinar tipo de pago y journal
+        if self.payment_direction == 'incoming':
+            payment_type = 'inbound'
+            partner_type = 'customer'
+            journal = config.incoming_journal_id
+            partner = self.partner_id or config.default_customer_id
+
+            if not journal:
+                raise ValidationError(_('No hay diario de ingresos configurado'))
+            if not partner:
+                raise ValidationError(_('No hay cliente configurado para pagos entrantes'))
+
+        elif self.payment_direction == 'outgoing':
+            payment_type = 'outbound'
+            partner_type = 'supplier'
+            journal = config.outgoing_journal_id
+
+            # Usar el partner del proveedor detectado o el default
+            if self.matched_vendor_id:
+                partner = self.matched_vendor_id.partner_id
             else:
-                self.write({
-                    'odoo_payment_state': 'skipped',
-                    'odoo_payment_error': 'Direccion de pago desconocida',
-                })
-                return result
-
-            # Determinar fecha del pago segun configuracion
-            payment_date = self._get_payment_date(config)
-            if isinstance(payment_date, datetime):
-                payment_date = payment_date.date()
-
-            # Crear el pago principal usando el metodo extendido
-            payment_vals = {
-                'payment_type': payment_type,
-                'partner_type': partner_type,
-                'partner_id': partner.id,
-                'amount': abs(self.transaction_amount),
-                'currency_id': self.currency_id.id or config.company_id.currency_id.id,
-                'journal_id': journal.id,
-                'date': payment_date,
-            }
+                partner = self.partner_id or config.default_vendor_id
 
-            # Agregar usuario responsable si esta configurado
-            if payment_user:
-                payment_vals['ml_responsible_user_id'] = payment_user.id
+            if not journal:
+                raise ValidationError(_('No hay diario de egresos configurado'))
+            if not partner:
+                raise ValidationError(_('No hay proveedor configurado para pagos salientes'))
+        else:
+            self.write({
+                'odoo_payment_state': 'skipped',
+                'odoo_payment_error': 'Direccion de pago desconocida',
+            })
+            return None
+
+        # Determinar fecha del pago segun configuracion
+        payment_date = self._get_payment_date(config)
+        if isinstance(payment_date, datetime):
+            payment_date = payment_date.date()
+
+        payment_vals = {
+            'payment_type': payment_type,
+            'partner_type': partner_type,
+            'partner_id': partner.id,
+            'amount': abs(self.transaction_amount),
+            'currency_id': self.currency_id.id or config.company_id.currency_id.id,
+            'journal_id': journal.id,
+            'date': payment_date,
+        }
 
-            # Usar metodo extendido que construye el ref con formato correcto
-            # [Orden Venta] - [pack_id o order_id] - [payment_id]
-            payment = self.env['account.payment'].create_from_ml_payment(self, payment_vals)
-            result['payment'] = payment
+        # Agregar usuario responsable si esta configurado
+        if payment_user:
+            payment_vals['ml_responsible_user_id'] = payment_user.id
 
-            _logger.info('Pago Odoo creado: %s (ref: %s) para ML pago %s',
-                        payment.name, payment.ref, self.mp_payment_id)
+        # Campos ML y ref con formato:
+        # [Orden Venta] - [pack_id o order_id] - [payment_id]
+        payment_vals = self.env['account.payment']._prepare_ml_payment_vals(self, payment_vals)
 
-            # Confirmar pago automaticamente si esta configurado
-            if config.auto_confirm_payment:
-                try:
-                    payment.action_post()
-                    _logger.info('Pago %s confirmado automaticamente', payment.name)
-                except Exception as e:
-                    _logger.warning('Error al confirmar pago %s: %s', payment.name, str(e))
-                    # No lanzar excepcion, el pago ya fue creado
+        return {
+            'payment_vals': payment_vals,
+            'partner': partner,
+            'payment_date': payment_date,
+            'payment_user': payment_user,
+        }
 
-            # Crear pago de comision si corresponde (EGRESO)
-            commission_payment = False
-            if config.create_commission_payments and self.total_charges > 0:
-                commission_payment = self._create_commission_payment(config, payment_date, payment_user)
-                result['commission_payment'] = commission_payment
+    def _create_odoo_payments_batch(self, config):
+        """
+        Crea los pagos en Odoo de varios pagos ML.
 
-                # Confirmar comision automaticamente si esta configurado
-                if commission_payment and config.auto_confirm_payment:
-                    try:
-                        commission_payment.action_post()
-                        _logger.info('Comision %s confirmada automaticamente', commission_payment.name)
-                    except Exception as e:
-                        _logger.warning('Error al confirmar comision %s: %s', commission_payment.name, str(e))
-
-            # Crear pago de bonificacion si corresponde (INGRESO)
-            bonification_payment = False
-            if config.create_commission_payments and self.total_bonifications > 0:
-                bonification_payment = self._create_bonification_payment(config, payment_date, payment_user)
-                result['bonification_payment'] = bonification_payment
+        Los account.payment principales se crean con un create() por diario
+        y se confirman con un action_post() por diario; las comisiones y
+        bonificaciones igual. Si un bloque falla se reintenta registro por
+        registro para aislar el error.
+
+        Args:
+            config: mercadolibre.payment.sync.config con la configuracion
 
-                # Confirmar bonificacion automaticamente si esta configurado
-                if bonification_payment and config.auto_confirm_payment:
-                    try:
-                        bonification_payment.action_post()
-                        _logger.info('Bonificacion %s confirmada automaticamente', bonification_payment.name)
-                    except Exception as e:
-                        _logger.warning('Error al confirmar bonificacion %s: %s', bonification_payment.name, str(e))
+        Returns:
+            dict {id pago ML: {'payment', 'commission_payment', 'error'}}
+        """
+        results = {
+            payment.id: {'payment': False, 'commission_payment': False, 'error': False}
+            for payment in self
+        }
+
+        def set_error(payment, error_msg):
+            _logger.error('Error creando pago Odoo para %s: %s', payment.mp_payment_id, error_msg)
+            payment.write({
+                'odoo_payment_state': 'error',
+                'odoo_payment_error': error_msg,
+            })
+            results[payment.id]['error'] = error_msg
+
+        prepared = []
+        for payment in self:
+            try:
+                prep = payment._prepare_odoo_payment(config)
+            except Exception as e:
+                set_error(payment, str(e))
+                continue
+            if prep:
+                prepared.append((payment, prep))
+
+        if not prepared:
+            return results
+
+        # Pagos principales
+        created = self._create_account_payments([prep['payment_vals'] for _payment, prep in prepared])
+        done = []
+        for (payment, prep), (odoo_payment, error_msg) in zip(prepared, created):
+            if error_msg:
+                set_error(payment, error_msg)
+                continue
+            results[payment.id]['payment'] = odoo_payment
+            _logger.info('Pago Odoo creado: %s (ref: %s) para ML pago %s',
+                         odoo_payment.name, odoo_payment.ref, payment.mp_payment_id)
+            done.append((payment, prep))
+
+        # Confirmar pagos automaticamente si esta configurado
+        if config.auto_confirm_payment:
+            self._post_account_payments(self.env['account.payment'].union(
+                *[results[payment.id]['payment'] for payment, _prep in done]
+            ))
+
+        # Comisiones (EGRESO) y bonificaciones (INGRESO)
+        extra = []
+        if config.create_commission_payments:
+            for payment, prep in done:
+                if payment.total_charges > 0:
+                    vals = payment._prepare_commission_payment_vals(
+                        config, prep['payment_date'], prep['payment_user'])
+                    if vals:
+                        extra.append((payment, 'commission', vals))
+                if payment.total_bonifications > 0:
+                    vals = payment._prepare_bonification_payment_vals(
+                        config, prep['payment_date'], prep['payment_user'])
+                    if vals:
+                        extra.append((payment, 'bonification', vals))
+
+        extra_payments = {}
+        if extra:
+            created = self._create_account_payments([vals for _payment, _kind, vals in extra])
+            for (payment, kind, _vals), (odoo_payment, error_msg) in zip(extra, created):
+                if error_msg:
+                    _logger.error('Error creando %s para pago %s: %s', kind, payment.mp_payment_id, error_msg)
+                    continue
+                _logger.info('Pago %s creado: %s para ML pago %s', kind, odoo_payment.name, payment.mp_payment_id)
+                extra_payments[(payment.id, kind)] = odoo_payment
+            if config.auto_confirm_payment:
+                self._post_account_payments(self.env['account.payment'].union(*extra_payments.values()))
 
-            # Actualizar el registro ML payment
+        # Actualizar los registros ML payment
+        for payment, prep in done:
+            commission_payment = payment.commission_payment_id or extra_payments.get((payment.id, 'commission'))
+            bonification_payment = payment.bonification_payment_id or extra_payments.get((payment.id, 'bonification'))
+            result = results[payment.id]
             update_vals = {
-                'odoo_payment_id': payment.id,
+                'odoo_payment_id': result['payment'].id,
                 'odoo_payment_state': 'created',
                 'odoo_payment_error': False,
-                'partner_id': partner.id,
+                'partner_id': prep['partner'].id,
             }
             if commission_payment:
                 update_vals['commission_payment_id'] = commission_payment.id
+                result['commission_payment'] = commission_payment
             if bonification_payment:
                 update_vals['bonification_payment_id'] = bonification_payment.id
+                result['bonification_payment'] = bonification_payment
+            payment.write(update_vals)
 
-            self.write(update_vals)
+        return results
 
-        except Exception as e:
-            error_msg = str(e)
-            _logger.error('Error creando pago Odoo para %s: %s', self.mp_payment_id, error_msg)
-            self.write({
-                'odoo_payment_state': 'error',
-                'odoo_payment_error': error_msg,
-            })
-            result['error'] = error_msg
+    @api.model
+    def _create_account_payments(self, vals_list):
+        """
+        Crea account.payment con un create() por diario. Si el bloque de un
+        diario falla, se crean uno por uno para aislar el error.
+
+        Returns:
+            lista alineada con vals_list de (account.payment o False, error o False)
+        """
+        AccountPayment = self.env['account.payment']
+        created = [(False, False)] * len(vals_list)
 
-        return result
+        indexes_by_journal = {}
+        for index, vals in enumerate(vals_list):
+            indexes_by_journal.setdefault(vals.get('journal_id'), []).append(index)
+
+        for journal_id, indexes in indexes_by_journal.items():
+            try:
+                with self.env.cr.savepoint():
+                    payments = AccountPayment.create([vals_list[index] for index in indexes])
+                for index, payment in zip(indexes, payments):
+                    created[index] = (payment, False)
+                continue
+            except Exception as e:
+                _logger.warning('Error creando %d pagos del diario %s en bloque, se reintenta uno por uno: %s',
+                                len(indexes), journal_id, str(e))
+
+            for index in indexes:
+                try:
+                    with self.env.cr.savepoint():
+                        created[index] = (AccountPayment.create(vals_list[index]), False)
+                except Exception as e:
+                    created[index] = (False, str(e))
+
+        return created
+
+    @api.model
+    def _post_account_payments(self, payments):
+        """
+        Confirma los pagos con un action_post() por diario. Si el bloque de
+        un diario falla, se confirman uno por uno; los errores no se
+        propagan (el pago ya fue creado).
+        """
+        for journal in payments.journal_id:
+            journal_payments = payments.filtered(lambda p: p.journal_id == journal)
+            try:
+                with self.env.cr.savepoint():
+                    journal_payments.action_post()
+                _logger.info('%d pagos confirmados automaticamente (diario %s)',
+                             len(journal_payments), journal.name)
+                continue
+            except Exception as e:
+                _logger.warning('Error al confirmar %d pagos del diario %s en bloque, '
+                                'se reintenta uno por uno: %s', len(journal_payments), journal.name, str(e))
+
+            for payment in journal_payments:
+                try:
+                    with self.env.cr.savepoint():
+                        payment.action_post()
+                    _logger.info('Pago %s confirmado automaticamente', payment.name)
+                except Exception as e:
+                    _logger.warning('Error al confirmar pago %s: %s', payment.name, str(e))
 
     def _create_commission_payment(self, config, payment_date, payment_user=None):
         """
@@ -1097,13 +1384,31 @@ class MercadolibrePayment(models.Model):
                         self.mp_payment_id, self.commission_payment_id.name)
             return self.commission_payment_id
 
+        commission_vals = self._prepare_commission_payment_vals(config, payment_date, payment_user)
+        if not commission_vals:
+            return False
+
+        commission_payment = self.env['account.payment'].create(commission_vals)
+        _logger.info('Pago comision creado: %s para ML pago %s', commission_payment.name, self.mp_payment_id)
+
+        return commission_payment
+
+    def _prepare_commission_payment_vals(self, config, payment_date, payment_user=None):
+        """
+        Valores del pago de comision, o None si ya existe o falta configuracion.
+        """
+        self.ensure_one()
+
+        if self.commission_payment_id:
+            return None
+
         if not config.commission_journal_id:
             _logger.warning('No hay diario de comisiones configurado')
-            return False
+            return None
 
         if not config.commission_partner_id:
             _logger.warning('No hay partner de comisiones configurado')
-            return False
+            return None
 
         commission_vals = {
             'payment_type': 'outbound',  # Siempre es egreso (pagamos comision)
@@ -1121,10 +1426,7 @@ class MercadolibrePayment(models.Model):
         if payment_user:
             commission_vals['ml_responsible_user_id'] = payment_user.id
 
-        commission_payment = self.env['account.payment'].create(commission_vals)
-        _logger.info('Pago comision creado: %s para ML pago %s', commission_payment.name, self.mp_payment_id)
-
-        return commission_payment
+        return commission_vals
 
     def _create_bonification_payment(self, config, payment_date, payment_user=None):
         """
@@ -1147,13 +1449,31 @@ class MercadolibrePayment(models.Model):
                         self.mp_payment_id, self.bonification_payment_id.name)
             return self.bonification_payment_id
 
+        bonification_vals = self._prepare_bonification_payment_vals(config, payment_date, payment_user)
+        if not bonification_vals:
+            return False
+
+        bonification_payment = self.env['account.payment'].create(bonification_vals)
+        _logger.info('Pago bonificacion creado: %s para ML pago %s', bonification_payment.name, self.mp_payment_id)
+
+        return bonification_payment
+
+    def _prepare_bonification_payment_vals(self, config, payment_date, payment_user=None):
+        """
+        Valores del pago de bonificacion, o None si ya existe o falta configuracion.
+        """
+        self.ensure_one()
+
+        if self.bonification_payment_id:
+            return None
+
         if not config.commission_journal_id:
             _logger.warning('No hay diario de comisiones configurado para bonificaciones')
-            return False
+            return None
 
         if not config.commission_partner_id:
             _logger.warning('No hay partner de comisiones configurado para bonificaciones')
-            return False
+            return None
 
         bonification_vals = {
             'payment_type': 'inbound',  # INGRESO (nos dan dinero/descuento)
@@ -1171,10 +1491,7 @@ class MercadolibrePayment(models.Model):
         if payment_user:
             bonification_vals['ml_responsible_user_id'] = payment_user.id
 
-        bonification_payment = self.env['account.payment'].create(bonification_vals)
-        _logger.info('Pago bonificacion creado: %s para ML pago %s', bonification_payment.name, self.mp_payment_id)
-
-        return bonification_payment
+        return bonification_vals
 
     def action_view_odoo_payment(self):
         """Abre el pago de Odoo asociado"""
@@ -1268,7 +1585,7 @@ class MercadolibrePayment(models.Model):
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(account).get(url, headers=headers, timeout=30)
 
             if response.status_code != 200:
                 _logger.error('[WEBHOOK PAYMENTS] Error API: %s - %s', response.status_code, response.text[:500])
@@ -12,6 +12,8 @@ _logger = logging.getLogger(__name__)
 
 MEXICO_TZ = pytz.timezone('America/Mexico_City')
 
+PAYMENTS_SEARCH_PAGE_SIZE = 100
+
 
 class MercadolibrePaymentSyncConfig(models.Model):
     _name = 'mercadolibre.payment.sync.config'
@@ -95,7 +97,30 @@ class MercadolibrePaymentSyncConfig(models.Model):
     limit = fields.Integer(
         string='Limite',
         default=100,
-        help='Numero maximo de pagos a sincronizar por ejecucion'
+        help='Numero maximo de pagos a sincronizar por ejecucion (0 = todos). '
+             'Los pagos se consultan pagina por pagina hasta agotar el resultado.'
+    )
+
+    # Sincronizacion incremental (marca de agua por date_last_updated)
+    use_incremental_sync = fields.Boolean(
+        string='Sincronizacion Incremental',
+        default=False,
+        help='Consulta solo los pagos modificados desde la ultima ejecucion exitosa '
+             '(range=date_last_updated) en lugar de todo el periodo. '
+             'La primera ejecucion usa el periodo configurado.'
+    )
+    last_updated_watermark = fields.Datetime(
+        string='Sincronizado Hasta',
+        readonly=True,
+        copy=False,
+        help='Inicio de la ultima ejecucion exitosa. La siguiente ejecucion '
+             'consulta pagos modificados desde este momento (menos el solape).'
+    )
+    watermark_overlap_minutes = fields.Integer(
+        string='Solape (minutos)',
+        default=10,
+        help='Minutos que se restan a la marca de agua para cubrir desfases de reloj '
+             'y pagos actualizados durante la ejecucion anterior'
     )
 
     # =========================================================================
@@ -146,6 +171,12 @@ class MercadolibrePaymentSyncConfig(models.Model):
         string='Ultimos Errores',
         readonly=True
     )
+    last_sync_run_id = fields.Many2one(
+        'mercadolibre.sync.run',
+        string='Ultima Ejecucion',
+        readonly=True,
+        ondelete='set null'
+    )
     last_sync_log = fields.Text(
         string='Log Ultima Ejecucion',
         readonly=True
@@ -320,6 +351,15 @@ class MercadolibrePaymentSyncConfig(models.Model):
 
             record.state = 'active'
 
+    def action_view_sync_runs(self):
+        """Ver el historial de ejecuciones de esta configuracion"""
+        self.ensure_one()
+        return self.env['mercadolibre.sync.run']._action_view_runs(self)
+
+    def action_reset_watermark(self):
+        """Reinicia la marca de agua: la proxima ejecucion usa el periodo completo"""
+        self.write({'last_updated_watermark': False})
+
     def action_run_now(self):
         """Ejecuta la sincronizacion manualmente ahora"""
         self.ensure_one()
@@ -352,6 +392,33 @@ class MercadolibrePaymentSyncConfig(models.Model):
             cron = self.env['ir.cron'].sudo().create(cron_vals)
             self.cron_id = cron
 
+    @api.model
+    def _parse_watermark(self, date_last_updated):
+        """
+        Convierte un date_last_updated de MercadoPago (ISO 8601 con zona
+        horaria) a datetime UTC sin zona, como se guardan en Odoo.
+        """
+        if not date_last_updated:
+            return False
+        try:
+            value = datetime.fromisoformat(date_last_updated.replace('Z', '+00:00'))
+        except ValueError:
+            _logger.warning('date_last_updated invalido para la marca de agua: %s', date_last_updated)
+            return False
+        if value.tzinfo:
+            value = value.astimezone(pytz.utc).replace(tzinfo=None)
+        return value.replace(microsecond=0)
+
+    def _get_watermark_from(self):
+        """
+        Retorna el datetime (UTC) desde el cual consultar pagos modificados,
+        o None si se debe usar el rango de fechas del periodo.
+        """
+        self.ensure_one()
+        if not self.use_incremental_sync or not self.last_updated_watermark:
+            return None
+        return self.last_updated_watermark - timedelta(minutes=max(self.watermark_overlap_minutes, 0))
+
     def _get_date_range(self):
         """Calcula el rango de fechas segun el periodo configurado (en zona horaria Mexico)"""
         # Obtener la fecha actual en Mexico (no UTC)
@@ -406,6 +473,9 @@ class MercadolibrePaymentSyncConfig(models.Model):
             })
             return False
 
+        # Encabezado y resumen van a last_sync_log; el detalle por pago
+        # se escribe en lotes en mercadolibre.sync.run.line
+        run = self.env['mercadolibre.sync.run']._start(self, 'payments', self.account_id)
         log_lines = []
         log_lines.append('=' * 50)
         log_lines.append(f'  SYNC AUTO: {self.name}')
@@ -416,6 +486,9 @@ class MercadolibrePaymentSyncConfig(models.Model):
         log_lines.append(f'  Fecha (Mexico): {now_mexico.strftime("%d/%m/%Y %H:%M:%S")}')
         log_lines.append('')
 
+        run_started_at = fields.Datetime.now()
+        watermark_from = self._get_watermark_from()
+
         # Obtener rango de fechas
         date_from, date_to = self._get_date_range()
 
@@ -452,8 +525,14 @@ class MercadolibrePaymentSyncConfig(models.Model):
         log_lines.append(f'  Cuenta:    {self.account_id.name}')
         log_lines.append(f'  Direccion: {direction_labels.get(self.payment_direction_filter)}')
         log_lines.append(f'  Estado:    {status_labels.get(self.status_filter)}')
-        log_lines.append(f'  Periodo:   {period_labels.get(self.period)}')
-        log_lines.append(f'  Fechas:    {date_from_str} a {date_to_str}')
+        if watermark_from:
+            watermark_mx = pytz.utc.localize(watermark_from).astimezone(MEXICO_TZ)
+            log_lines.append('  Modo:      Incremental')
+            log_lines.append(f'  Desde:     {watermark_mx.strftime("%d/%m/%Y %H:%M:%S")} (date_last_updated)')
+            date_from = date_to = None
+        else:
+            log_lines.append(f'  Periodo:   {period_labels.get(self.period)}')
+            log_lines.append(f'  Fechas:    {date_from_str} a {date_to_str}')
         log_lines.append('')
 
         # Obtener token con reintentos automáticos
@@ -462,20 +541,21 @@ class MercadolibrePaymentSyncConfig(models.Model):
             _logger.error('No se pudo obtener token válido')
             log_lines.append('ERROR: No se pudo obtener token válido.')
             log_lines.append('Por favor reconecte la cuenta desde MercadoLibre > Cuentas')
+            run.close('\n'.join(log_lines), state='error')
             self.write({
                 'last_run': fields.Datetime.now(),
                 'last_sync_log': '\n'.join(log_lines),
                 'last_sync_errors': 1,
+                'last_sync_run_id': run.run.id,
             })
             return False
 
         import requests
 
-        # Construir parametros
+        # Construir parametros (limit/offset van por pagina)
         params = {
             'sort': self.date_field,
             'criteria': 'desc',
-            'limit': self.limit,
             'range': self.date_field,
         }
 
@@ -492,6 +572,21 @@ class MercadolibrePaymentSyncConfig(models.Model):
             params['end_date'] = dt_to_mx.strftime('%Y-%m-%dT%H:%M:%S.999%z')
             params['end_date'] = params['end_date'][:-2] + ':' + params['end_date'][-2:]
 
+        # Filtro incremental por fecha de ultima modificacion, en orden
+        # ascendente y paginado por clave (ver mas abajo)
+        if watermark_from:
+            dt_wm_mx = pytz.utc.localize(watermark_from).astimezone(MEXICO_TZ)
+            dt_now_mx = pytz.utc.localize(run_started_at).astimezone(MEXICO_TZ)
+            params.update({
+                'sort': 'date_last_updated',
+                'criteria': 'asc',
+                'range': 'date_last_updated',
+                'begin_date': dt_wm_mx.strftime('%Y-%m-%dT%H:%M:%S.000%z'),
+                'end_date': dt_now_mx.strftime('%Y-%m-%dT%H:%M:%S.999%z'),
+            })
+            params['begin_date'] = params['begin_date'][:-2] + ':' + params['begin_date'][-2:]
+            params['end_date'] = params['end_date'][:-2] + ':' + params['end_date'][-2:]
+
         # Filtro de estado
         if self.status_filter and self.status_filter != 'all':
             params['status'] = self.status_filter
@@ -506,16 +601,17 @@ class MercadolibrePaymentSyncConfig(models.Model):
         LogModel = self.env['mercadolibre.log'].sudo()
 
         # Función para hacer la llamada con retry en caso de 401
-        def make_api_call(token, retry_count=0):
+        def make_api_call(page_params, retry_count=0):
+            nonlocal access_token
             headers = {
-                'Authorization': f'Bearer {token}',
+                'Authorization': f'Bearer {access_token}',
                 'Content-Type': 'application/json',
             }
             headers_log = {k: v if k != 'Authorization' else 'Bearer ***' for k, v in headers.items()}
             start_time = time.time()
 
             try:
-                response = requests.get(url, params=params, headers=headers, timeout=60)
+                response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, params=page_params, headers=headers, timeout=60)
                 duration = time.time() - start_time
 
                 response_body_log = response.text[:10000] if response.text else ''
@@ -527,7 +623,7 @@ class MercadolibrePaymentSyncConfig(models.Model):
                     'request_url': response.url,
                     'request_method': 'GET',
                     'request_headers': json.dumps(headers_log, indent=2),
-                    'request_body': json.dumps(params, indent=2),
+                    'request_body': json.dumps(page_params, indent=2),
                     'response_code': response.status_code,
                     'response_headers': json.dumps(dict(response.headers), indent=2),
                     'response_body': response_body_log,
@@ -541,7 +637,8 @@ class MercadolibrePaymentSyncConfig(models.Model):
 
                     new_token = self.account_id.get_valid_token_with_retry(max_retries=1)
                     if new_token:
-                        return make_api_call(new_token, retry_count + 1)
+                        access_token = new_token
+                        return make_api_call(page_params, retry_count + 1)
                     else:
                         return None, 'No se pudo refrescar el token'
 
@@ -554,43 +651,26 @@ class MercadolibrePaymentSyncConfig(models.Model):
                 _logger.error('Error de conexion: %s', str(e))
                 return None, str(e)
 
-        # Ejecutar llamada con retry automático
-        data, error = make_api_call(access_token)
-
-        if error:
-            log_lines.append(f'ERROR: {error}')
-            self.write({
-                'last_run': fields.Datetime.now(),
-                'last_sync_log': '\n'.join(log_lines),
-                'last_sync_errors': 1,
-            })
-            return False
-
-        results = data.get('results', [])
-        total = data.get('paging', {}).get('total', len(results))
-
-        # Filtrar por direccion
-        if filter_direction_locally and account_user_id:
-            filtered_results = []
-            for payment_data in results:
-                payer = payment_data.get('payer', {}) or {}
-                payer_id = str(payer.get('id', '')) if payer.get('id') else str(payment_data.get('payer_id', ''))
-                collector = payment_data.get('collector', {}) or {}
-                collector_id = str(payment_data.get('collector_id', '')) if payment_data.get('collector_id') else str(collector.get('id', ''))
-
-                if self.payment_direction_filter == 'outgoing' and payer_id == account_user_id:
-                    filtered_results.append(payment_data)
-                elif self.payment_direction_filter == 'incoming' and collector_id == account_user_id:
-                    filtered_results.append(payment_data)
-            results = filtered_results
-
-        # Filtrar por estado
-        if filter_status_locally:
-            results = [p for p in results if p.get('status') == self.status_filter]
-
-        log_lines.append(f'  Total en MP:  {total}')
-        log_lines.append(f'  A procesar:   {len(results)}')
-        log_lines.append('')
+        def filter_results(results):
+            # Filtrar por direccion
+            if filter_direction_locally and account_user_id:
+                filtered_results = []
+                for payment_data in results:
+                    payer = payment_data.get('payer', {}) or {}
+                    payer_id = str(payer.get('id', '')) if payer.get('id') else str(payment_data.get('payer_id', ''))
+                    collector = payment_data.get('collector', {}) or {}
+                    collector_id = str(payment_data.get('collector_id', '')) if payment_data.get('collector_id') else str(collector.get('id', ''))
+
+                    if self.payment_direction_filter == 'outgoing' and payer_id == account_user_id:
+                        filtered_results.append(payment_data)
+                    elif self.payment_direction_filter == 'incoming' and collector_id == account_user_id:
+                        filtered_results.append(payment_data)
+                results = filtered_results
+
+            # Filtrar por estado
+            if filter_status_locally:
+                results = [p for p in results if p.get('status') == self.status_filter]
+            return results
 
         PaymentModel = self.env['mercadolibre.payment']
         sync_count = 0
@@ -598,89 +678,169 @@ class MercadolibrePaymentSyncConfig(models.Model):
         updated_count = 0
         error_count = 0
         skipped_count = 0
+        to_process_count = 0
 
         # Contadores para pagos Odoo
         odoo_payments_created = 0
         odoo_payments_errors = 0
         odoo_commissions_created = 0
 
-        # Lista de pagos sincronizados para crear pagos Odoo despues
-        synced_payments = []
-
-        for payment_data in results:
-            mp_id = payment_data.get('id')
-            release_status = payment_data.get('money_release_status')
-
-            if self.only_released and release_status != 'released':
-                skipped_count += 1
-                continue
+        # Pagos sincronizados para crear pagos Odoo despues
+        synced_payments = PaymentModel
+
+        # Paginacion: cada pagina se sincroniza en bloque antes de pedir la siguiente.
+        # En modo incremental se pagina por clave: cada pagina pide desde el
+        # date_last_updated del ultimo pago recibido (offset solo para saltar
+        # empates), asi un pago modificado durante la ejecucion no desplaza
+        # los que faltan. Los repetidos se descartan por (id, date_last_updated).
+        total = None
+        offset = 0
+        fetched = 0
+        truncated = False
+        # date_last_updated del ultimo pago procesado (modo incremental)
+        last_processed_updated = None
+        page_errors = []
+        seen = set()
+        while True:
+            page_limit = PAYMENTS_SEARCH_PAGE_SIZE
+            if self.limit:
+                page_limit = min(page_limit, self.limit - fetched)
+                if page_limit <= 0:
+                    truncated = True
+                    break
+
+            data, error = make_api_call(dict(params, limit=page_limit, offset=offset))
+
+            if error and total is None:
+                log_lines.append(f'ERROR: {error}')
+                run.close('\n'.join(log_lines), state='error')
+                self.write({
+                    'last_run': fields.Datetime.now(),
+                    'last_sync_log': '\n'.join(log_lines),
+                    'last_sync_errors': 1,
+                    'last_sync_run_id': run.run.id,
+                })
+                return False
+            if error:
+                _logger.error('Error obteniendo pagina de pagos (offset %d): %s', offset, error)
+                log_lines.append(f'  ERROR en pagina (offset {offset}): {error}')
+                page_errors.append(error)
+                break
+
+            results = data.get('results', [])
+            if total is None:
+                total = data.get('paging', {}).get('total', len(results))
+                log_lines.append(f'  Total en MP:  {total}')
+            if not results:
+                break
+
+            new_results = []
+            for payment_data in results:
+                key = (payment_data.get('id'), payment_data.get('date_last_updated'))
+                if key not in seen:
+                    seen.add(key)
+                    new_results.append(payment_data)
+            fetched += len(new_results)
+
+            payloads = []
+            for payment_data in filter_results(new_results):
+                if self.only_released and payment_data.get('money_release_status') != 'released':
+                    skipped_count += 1
+                    run.count('skipped')
+                    continue
+                payloads.append(payment_data)
+            to_process_count += len(payloads)
 
-            try:
-                payment, is_new = PaymentModel.create_from_mp_data(payment_data, self.account_id)
+            # Existentes precargados en una consulta y nuevos creados en bloque
+            synced, errors = PaymentModel._create_from_mp_data_isolated(payloads, self.account_id)
+            for payment, is_new in synced:
                 sync_count += 1
                 if is_new:
                     created_count += 1
+                    run.count('created')
                 else:
                     updated_count += 1
-
-                # Agregar a la lista para crear pagos Odoo
-                if payment:
-                    synced_payments.append(payment)
-
-            except Exception as e:
+                    run.count('updated')
+                synced_payments |= payment
+            for mp_id, error_msg in errors:
                 error_count += 1
-                _logger.error('Error procesando pago %s: %s', mp_id, str(e))
+                run.add('error', error_msg, mp_id)
+            if results[-1].get('date_last_updated'):
+                last_processed_updated = results[-1]['date_last_updated']
+
+            if len(results) < page_limit:
+                break
+            if watermark_from:
+                last_updated = results[-1].get('date_last_updated')
+                if not last_updated:
+                    offset += len(results)
+                elif last_updated == params['begin_date']:
+                    # Pagina completa con la misma fecha: avanzar dentro del empate
+                    offset += len(results)
+                else:
+                    params['begin_date'] = last_updated
+                    offset = 0
+            else:
+                offset += len(results)
+                if offset >= total:
+                    break
+
+        log_lines.append(f'  A procesar:   {to_process_count}')
+        log_lines.append('')
 
         # =====================================================
         # CREAR PAGOS EN ODOO SI ESTA CONFIGURADO
         # =====================================================
-        if self.create_odoo_payments and synced_payments:
+        # Se reintentan tambien los pagos de ejecuciones anteriores cuya
+        # creacion en Odoo fallo: en modo incremental no vuelven a llegar
+        retry_payments = PaymentModel
+        if self.create_odoo_payments:
+            retry_payments = PaymentModel.search([
+                ('account_id', '=', self.account_id.id),
+                ('odoo_payment_state', '=', 'error'),
+                ('odoo_payment_id', '=', False),
+            ])
+
+        if self.create_odoo_payments and (synced_payments or retry_payments):
             log_lines.append('')
             log_lines.append('-' * 50)
             log_lines.append('  CREACION DE PAGOS ODOO')
             log_lines.append('-' * 50)
 
-            for payment in synced_payments:
-                # Saltar si ya tiene pago Odoo
-                if payment.odoo_payment_id:
-                    continue
-
-                # Validar direccion del pago vs configuracion
-                if self.payment_direction_filter == 'incoming' and payment.payment_direction != 'incoming':
-                    continue
-                if self.payment_direction_filter == 'outgoing' and payment.payment_direction != 'outgoing':
-                    continue
-
-                # Validar estado del pago:
-                # - Para ingresos (incoming): siempre requerir 'approved'
-                # - Para egresos (outgoing): respetar la configuracion only_approved
-                # - Para todos: respetar only_approved o aceptar approved
-                if payment.payment_direction == 'incoming':
-                    # Ingresos siempre requieren approved para crear pago
-                    if payment.status != 'approved':
-                        continue
-                elif payment.payment_direction == 'outgoing':
-                    # Egresos: solo filtrar si only_approved esta activo
-                    if self.only_approved and payment.status != 'approved':
-                        continue
-                else:
-                    # Direccion desconocida: saltar
-                    continue
-
-                try:
-                    result = payment._create_odoo_payment(self)
-                    if result.get('payment'):
-                        odoo_payments_created += 1
-                        log_lines.append(f'    [OK] Pago {payment.mp_payment_id}: {result["payment"].name}')
-                    if result.get('commission_payment'):
-                        odoo_commissions_created += 1
-                    if result.get('error'):
-                        odoo_payments_errors += 1
-                        log_lines.append(f'    [ERROR] Pago {payment.mp_payment_id}: {result["error"]}')
-                except Exception as e:
+            # Validar direccion y estado del pago vs configuracion:
+            # - Para ingresos (incoming): siempre requerir 'approved'
+            # - Para egresos (outgoing): solo filtrar si only_approved esta activo
+            # - Direccion desconocida: saltar
+            # Los que ya tienen pago Odoo se saltan
+            if retry_payments - synced_payments:
+                log_lines.append(f'  Reintentos de errores previos: {len(retry_payments - synced_payments)}')
+            candidates = (synced_payments | retry_payments).filtered(
+                lambda payment: not payment.odoo_payment_id
+                and self.payment_direction_filter in ('all', payment.payment_direction)
+                and (
+                    (payment.payment_direction == 'incoming' and payment.status == 'approved')
+                    or (payment.payment_direction == 'outgoing'
+                        and (not self.only_approved or payment.status == 'approved'))
+                )
+            )
+
+            # Un create() y un action_post() por diario
+            try:
+                results = candidates._create_odoo_payments_batch(self)
+            except Exception as e:
+                _logger.error('Error creando pagos Odoo: %s', str(e))
+                results = {payment.id: {'error': str(e)} for payment in candidates}
+
+            for payment in candidates:
+                result = results[payment.id]
+                if result.get('payment'):
+                    odoo_payments_created += 1
+                    run.add('ok', result['payment'].name, payment.mp_payment_id)
+                if result.get('commission_payment'):
+                    odoo_commissions_created += 1
+                if result.get('error'):
                     odoo_payments_errors += 1
-                    _logger.error('Error creando pago Odoo para %s: %s', payment.mp_payment_id, str(e))
-                    log_lines.append(f'    [ERROR] Pago {payment.mp_payment_id}: {str(e)}')
+                    run.add('error', result['error'], payment.mp_payment_id)
 
             log_lines.append(f'  Pagos Odoo creados:     {odoo_payments_created}')
             log_lines.append(f'  Comisiones creadas:     {odoo_commissions_created}')
@@ -708,17 +868,36 @@ class MercadolibrePaymentSyncConfig(models.Model):
         elif self.interval_type == 'days':
             next_run += timedelta(days=self.interval_number)
 
-        update_vals = {
+        update_vals = {}
+        if self.use_incremental_sync:
+            # Solo avanzar la marca de agua si no hubo errores. Si el limite
+            # corto la ejecucion se avanza hasta el ultimo pago procesado
+            # (los resultados vienen en orden ascendente por date_last_updated);
+            # si no, la siguiente ejecucion releeria siempre los mismos pagos
+            truncated_watermark = truncated and self._parse_watermark(last_processed_updated)
+            if page_errors or error_count or (truncated and not truncated_watermark):
+                log_lines.append('  Marca de agua NO actualizada (ejecucion incompleta)')
+            elif truncated:
+                update_vals['last_updated_watermark'] = truncated_watermark
+                log_lines.append(f'  Limite alcanzado: marca de agua hasta {last_processed_updated}')
+            else:
+                update_vals['last_updated_watermark'] = run_started_at
+
+        summary = '\n'.join(log_lines)
+        run.close(summary)
+
+        update_vals.update({
             'last_run': fields.Datetime.now(),
             'last_sync_count': sync_count,
             'last_sync_created': created_count,
             'last_sync_updated': updated_count,
             'last_sync_errors': error_count,
-            'last_sync_log': '\n'.join(log_lines),
+            'last_sync_log': summary,
+            'last_sync_run_id': run.run.id,
             'next_run': next_run,
             'total_syncs': self.total_syncs + 1,
             'total_payments_synced': self.total_payments_synced + sync_count,
-        }
+        })
 
         # Agregar estadisticas de pagos Odoo si aplica
         if self.create_odoo_payments:
@@ -322,7 +322,7 @@ class MercadolibrePaymentSync(models.TransientModel):
         start_time = time.time()
 
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=60)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, params=params, headers=headers, timeout=60)
             duration = time.time() - start_time
             _logger.info('Response Code: %d', response.status_code)
 
@@ -572,7 +572,7 @@ class MercadolibrePaymentSync(models.TransientModel):
         start_time = time.time()
 
         try:
-            response = requests.get(url, headers=headers, timeout=60)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, headers=headers, timeout=60)
             duration = time.time() - start_time
 
             # Guardar log
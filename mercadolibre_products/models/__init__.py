@@ -2,11 +2,15 @@
 
 from . import mercadolibre_category
 from . import mercadolibre_category_attribute
+from . import mercadolibre_category_prediction
 from . import mercadolibre_item
 from . import mercadolibre_item_variation
+from . import mercadolibre_sku_index
 from . import mercadolibre_product_sync_config
+from . import mercadolibre_product_change
 from . import mercadolibre_stock_reconcile
 from . import mercadolibre_account
 from . import mercadolibre_image
 from . import product_template
 from . import product_product
+from . import stock_move
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import re
+import unicodedata
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+ML_DOMAIN_DISCOVERY_URL = 'https://api.mercadolibre.com/sites/{site_id}/domain_discovery/search?q={query}'
+
+
+def _normalize_title(title):
+    """
+    Clave de cache de un titulo: minusculas, sin acentos ni signos y con
+    espacios colapsados, recortada a 60 caracteres como la consulta a ML.
+    """
+    if not title:
+        return ''
+    title = unicodedata.normalize('NFKD', title)
+    title = ''.join(c for c in title if not unicodedata.combining(c))
+    title = re.sub(r'[^a-z0-9]+', ' ', title.lower()).strip()
+    return title[:60].strip()
+
+
+def _fetch_prediction(send, site_id, query):
+    """
+    Consulta el predictor de categorias de ML (endpoint publico).
+    Corre en hilos: no toca el ORM. send es mercadolibre.http._send_with_retry
+    con la sesion y los limites ya resueltos en el hilo principal.
+
+    Returns:
+        dict con la prediccion ({} si ML no sugiere nada) o None si fallo
+    """
+    url = ML_DOMAIN_DISCOVERY_URL.format(site_id=site_id, query=urllib.parse.quote(query))
+    try:
+        response = send('GET', url, timeout=10)
+        if response.status_code != 200:
+            _logger.warning('Predictor de categoria respondio %s para "%s"', response.status_code, query[:30])
+            return None
+        data = response.json()
+    except Exception as e:
+        _logger.warning('Error prediciendo categoria para %s: %s', query[:30], str(e))
+        return None
+
+    if not data:
+        return {}
+    first_result = data[0]
+    return {
+        'category_id': first_result.get('category_id'),
+        'category_name': first_result.get('category_name'),
+        'domain_id': first_result.get('domain_id'),
+        'domain_name': first_result.get('domain_name'),
+    }
+
+
+class MercadolibreCategoryPrediction(models.Model):
+    """
+    Cache persistente del predictor de categorias de ML por titulo
+    normalizado. Titulos iguales (o que solo difieren en mayusculas,
+    acentos o signos) se predicen una sola vez.
+    """
+    _name = 'mercadolibre.category.prediction'
+    _description = 'Prediccion de Categoria MercadoLibre'
+    _order = 'date desc'
+    _rec_name = 'title_key'
+    _log_access = False
+
+    site_id = fields.Char(
+        string='Sitio',
+        required=True
+    )
+    title_key = fields.Char(
+        string='Titulo Normalizado',
+        required=True
+    )
+    category_id = fields.Char(
+        string='ID Categoria'
+    )
+    category_name = fields.Char(
+        string='Categoria'
+    )
+    domain_id = fields.Char(
+        string='ID Dominio'
+    )
+    domain_name = fields.Char(
+        string='Dominio'
+    )
+    date = fields.Datetime(
+        string='Fecha',
+        default=fields.Datetime.now
+    )
+
+    _sql_constraints = [
+        ('site_title_uniq', 'unique(site_id, title_key)',
+         'Ya existe una prediccion para este titulo.')
+    ]
+
+    @api.model
+    def _predict_batch(self, titles, site_id='MLM', max_workers=None, account_id=None):
+        """
+        Predice la categoria de varios titulos.
+
+        Los titulos se buscan en la cache con una sola consulta; solo los
+        que faltan (o vencieron) se consultan a ML, en paralelo, y se
+        guardan con un solo INSERT. Las consultas usan la sesion con pool
+        de mercadolibre.http y, si se indica account_id, el rate limit de
+        la cuenta.
+
+        Parametros de sistema:
+            mercadolibre_products.category_prediction_days: vigencia de la cache (default 30)
+            mercadolibre_products.category_prediction_workers: hilos concurrentes (default 8)
+
+        Returns:
+            dict: {titulo: {'category_id', 'category_name', 'domain_id', 'domain_name'} o None}
+        """
+        keys_by_title = {title: _normalize_title(title) for title in titles if title}
+        keys = {key for key in keys_by_title.values() if key}
+        if not keys:
+            return {}
+
+        ICP = self.env['ir.config_parameter'].sudo()
+        days = int(ICP.get_param('mercadolibre_products.category_prediction_days', default=30))
+        if max_workers is None:
+            max_workers = int(ICP.get_param('mercadolibre_products.category_prediction_workers', default=8))
+
+        self.env.cr.execute("""
+            SELECT title_key, category_id, category_name, domain_id, domain_name
+              FROM mercadolibre_category_prediction
+             WHERE site_id = %s AND title_key = ANY(%s)
+               AND date >= (now() at time zone 'UTC') - %s * interval '1 day'
+        """, (site_id, list(keys), days))
+        predictions = {
+            key: {'category_id': cat_id, 'category_name': cat_name,
+                  'domain_id': dom_id, 'domain_name': dom_name} if cat_id else {}
+            for key, cat_id, cat_name, dom_id, dom_name in self.env.cr.fetchall()
+        }
+
+        missing = sorted(keys - set(predictions))
+        if missing:
+            _logger.info('Prediccion de categoria: %d en cache, %d a consultar en ML',
+                         len(predictions), len(missing))
+            Http = self.env['mercadolibre.http']
+            send = partial(
+                Http._send_with_retry,
+                Http._get_session(account_id),
+                account_id,
+                self.env['mercadolibre.rate.limit']._get_limits(f'/sites/{site_id}/domain_discovery/search'),
+                Http._get_max_retries(),
+            )
+            workers = max(1, min(max_workers, len(missing)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                fetched = list(executor.map(lambda key: _fetch_prediction(send, site_id, key), missing))
+
+            rows = []
+            for key, prediction in zip(missing, fetched):
+                if prediction is None:
+                    continue  # Error de red/API: no se guarda, se reintenta la proxima vez
+                predictions[key] = prediction
+                rows.append((
+                    site_id, key, prediction.get('category_id'), prediction.get('category_name'),
+                    prediction.get('domain_id'), prediction.get('domain_name'),
+                ))
+            if rows:
+                values = ', '.join(['(%s, %s, %s, %s, %s, %s, now() at time zone \'UTC\')'] * len(rows))
+                self.env.cr.execute(f"""
+                    INSERT INTO mercadolibre_category_prediction
+                        (site_id, title_key, category_id, category_name, domain_id, domain_name, date)
+                    VALUES {values}
+                    ON CONFLICT (site_id, title_key) DO UPDATE SET
+                        category_id = EXCLUDED.category_id,
+                        category_name = EXCLUDED.category_name,
+                        domain_id = EXCLUDED.domain_id,
+                        domain_name = EXCLUDED.domain_name,
+                        date = EXCLUDED.date
+                """, [value for row in rows for value in row])
+
+        return {
+            title: predictions.get(key) or None
+            for title, key in keys_by_title.items()
+        }
@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
 
 import base64
+import hashlib
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from io import BytesIO
 from odoo import models, api, fields, _
 from odoo.exceptions import UserError
@@ -18,6 +21,88 @@ _logger = logging.getLogger(__name__)
 ML_IMAGE_MIN_SIZE = 500  # Mínimo requerido por ML
 ML_IMAGE_RECOMMENDED_SIZE = 1200  # Recomendado para zoom
 ML_IMAGE_MAX_SIZE = 2048  # Máximo permitido
+ML_PICTURE_UPLOAD_URL = 'https://api.mercadolibre.com/pictures/items/upload'
+
+
+def _content_type(filename):
+    """Tipo de contenido según la extensión del archivo."""
+    filename = filename.lower()
+    if filename.endswith('.png'):
+        return 'image/png'
+    if filename.endswith('.gif'):
+        return 'image/gif'
+    if filename.endswith('.webp'):
+        return 'image/webp'
+    return 'image/jpeg'
+
+
+def _post_picture(send, access_token, filename, image_data):
+    """
+    Sube los bytes de una imagen a MercadoLibre.
+    No toca el ORM, por lo que puede correr en hilos. send es
+    mercadolibre.http._send_with_retry con la sesion y los limites de la
+    cuenta ya resueltos (ver _get_picture_sender).
+
+    Returns:
+        dict: {'success': True, 'id', 'url', 'secure_url', ...} o
+              {'success': False, 'error': str}
+    """
+    try:
+        # Bytes y no un stream: un reintento por 429 vuelve a enviar el archivo completo
+        files = {
+            'file': (filename, image_data, _content_type(filename))
+        }
+
+        _logger.info('Subiendo imagen a MercadoLibre: %s', filename)
+        response = send(
+            'POST',
+            ML_PICTURE_UPLOAD_URL,
+            headers={'Authorization': f'Bearer {access_token}'},
+            files=files,
+            timeout=60
+        )
+
+        if response.status_code in [200, 201]:
+            data = response.json()
+            _logger.info('Imagen subida exitosamente. Respuesta API: %s', data)
+
+            # Obtener ID de la imagen
+            picture_id = data.get('id', '')
+
+            # Obtener URLs - la API puede devolverlas de diferentes formas
+            url = data.get('url')
+            secure_url = data.get('secure_url')
+
+            # Si no hay URLs, construirlas desde el ID
+            # Formato estándar ML: https://http2.mlstatic.com/D_{ID}-F.jpg
+            if not secure_url and picture_id:
+                secure_url = f'https://http2.mlstatic.com/D_{picture_id}-F.jpg'
+            if not url and picture_id:
+                url = f'http://http2.mlstatic.com/D_{picture_id}-F.jpg'
+
+            return {
+                'success': True,
+                'id': picture_id,
+                'url': url,
+                'secure_url': secure_url,
+                'size': data.get('size'),
+                'max_size': data.get('max_size'),
+                'variations': data.get('variations', []),
+            }
+        else:
+            error_msg = response.text
+            _logger.error('Error subiendo imagen: %s - %s', response.status_code, error_msg)
+            return {
+                'success': False,
+                'error': f'HTTP {response.status_code}: {error_msg}'
+            }
+
+    except requests.exceptions.RequestException as e:
+        _logger.error('Error de conexión subiendo imagen: %s', str(e))
+        return {
+            'success': False,
+            'error': f'Error de conexión: {str(e)}'
+        }
 
 
 class MercadolibreImage(models.Model):
@@ -70,6 +155,13 @@ class MercadolibreImage(models.Model):
     error_message = fields.Text(
         string='Mensaje de Error'
     )
+    checksum = fields.Char(
+        string='Checksum',
+        readonly=True,
+        index=True,
+        help='SHA1 de la imagen de origen (el checksum de su adjunto). '
+             'Permite reutilizar la imagen ya subida en lugar de volver a subirla.'
+    )
 
     @api.depends('ml_picture_id', 'product_tmpl_id')
     def _compute_name(self):
@@ -301,70 +393,192 @@ class MercadolibreImageService(models.AbstractModel):
         except Exception as e:
             raise UserError(_('Error decodificando imagen base64: %s') % str(e))
 
-        # Determinar tipo de contenido
-        content_type = 'image/jpeg'
-        if filename.lower().endswith('.png'):
-            content_type = 'image/png'
-        elif filename.lower().endswith('.gif'):
-            content_type = 'image/gif'
-        elif filename.lower().endswith('.webp'):
-            content_type = 'image/webp'
-
-        # Subir a MercadoLibre
-        url = 'https://api.mercadolibre.com/pictures/items/upload'
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-        }
+        return _post_picture(self._get_picture_sender(account_id), access_token, filename, image_data)
 
-        try:
-            files = {
-                'file': (filename, BytesIO(image_data), content_type)
-            }
+    @api.model
+    def _get_picture_sender(self, account_id):
+        """
+        Envío de subidas de imágenes por la sesión con pool y el rate limit
+        de la cuenta, resuelto en el hilo principal para poder usarlo en hilos.
+        """
+        Http = self.env['mercadolibre.http']
+        return partial(
+            Http._send_with_retry,
+            Http._get_session(account_id),
+            account_id,
+            self.env['mercadolibre.rate.limit']._get_limits('/pictures/items/upload'),
+            Http._get_max_retries(),
+        )
+
+    @api.model
+    def _get_image_checksums(self, records, field='image_1920'):
+        """
+        Checksum del adjunto de un campo imagen, para varios registros en
+        una consulta y sin leer el binario.
+
+        Returns:
+            dict: {res_id: checksum}
+        """
+        if not records:
+            return {}
+        attachments = self.env['ir.attachment'].sudo().search_read([
+            ('res_model', '=', records._name),
+            ('res_field', '=', field),
+            ('res_id', 'in', records.ids),
+        ], ['res_id', 'checksum'])
+        return {att['res_id']: att['checksum'] for att in attachments if att['checksum']}
 
-            _logger.info('Subiendo imagen a MercadoLibre: %s', filename)
-            response = requests.post(url, headers=headers, files=files, timeout=60)
-
-            if response.status_code in [200, 201]:
-                data = response.json()
-                _logger.info('Imagen subida exitosamente. Respuesta API: %s', data)
-
-                # Obtener ID de la imagen
-                picture_id = data.get('id', '')
-
-                # Obtener URLs - la API puede devolverlas de diferentes formas
-                url = data.get('url')
-                secure_url = data.get('secure_url')
-
-                # Si no hay URLs, construirlas desde el ID
-                # Formato estándar ML: https://http2.mlstatic.com/D_{ID}-F.jpg
-                if not secure_url and picture_id:
-                    secure_url = f'https://http2.mlstatic.com/D_{picture_id}-F.jpg'
-                if not url and picture_id:
-                    url = f'http://http2.mlstatic.com/D_{picture_id}-F.jpg'
-
-                return {
-                    'success': True,
-                    'id': picture_id,
-                    'url': url,
-                    'secure_url': secure_url,
-                    'size': data.get('size'),
-                    'max_size': data.get('max_size'),
-                    'variations': data.get('variations', []),
+    @api.model
+    def upload_images_cached(self, account_id, images, max_workers=None):
+        """
+        Sube varias imágenes a MercadoLibre reutilizando las ya subidas.
+
+        Cada imagen se identifica por el checksum de su adjunto: si la
+        cuenta ya tiene una imagen subida con ese checksum se reutiliza su
+        ID de ML sin leer ni subir el binario. Las demás se validan y
+        redimensionan en el hilo principal y se suben en paralelo, una sola
+        vez por checksum aunque la compartan varios productos.
+
+        Parámetros de sistema:
+            mercadolibre_products.image_upload_workers: hilos concurrentes (default 4)
+
+        Args:
+            account_id: ID de la cuenta MercadoLibre
+            images: lista de dicts con keys record (registro con la imagen),
+                    field (default image_1920), filename y product_tmpl_id
+            max_workers: hilos concurrentes (opcional)
+
+        Returns:
+            list: en el mismo orden que images, dicts {'id', 'secure_url'}
+                  o None si la imagen no se pudo subir
+        """
+        if not images:
+            return []
+
+        ImageModel = self.env['mercadolibre.image']
+        if max_workers is None:
+            max_workers = int(self.env['ir.config_parameter'].sudo().get_param(
+                'mercadolibre_products.image_upload_workers', default=4
+            ))
+
+        # Checksums de los adjuntos, una consulta por modelo/campo
+        checksums = [False] * len(images)
+        groups = {}
+        for index, image in enumerate(images):
+            record = image['record']
+            groups.setdefault((record._name, image.get('field', 'image_1920')), []).append(index)
+        for (model_name, field), indexes in groups.items():
+            records = self.env[model_name].browse([images[i]['record'].id for i in indexes])
+            by_id = self._get_image_checksums(records, field)
+            for i in indexes:
+                checksums[i] = by_id.get(images[i]['record'].id, False)
+
+        # Imágenes sin adjunto: checksum de los bytes (el mismo SHA1 que usa ir.attachment)
+        payloads = {}
+        for index, image in enumerate(images):
+            if checksums[index]:
+                continue
+            img_b64 = image['record'].with_context(bin_size=False)[image.get('field', 'image_1920')]
+            if not img_b64:
+                continue
+            if isinstance(img_b64, bytes):
+                img_b64 = img_b64.decode('utf-8')
+            checksum = hashlib.sha1(base64.b64decode(img_b64)).hexdigest()
+            checksums[index] = checksum
+            payloads[checksum] = img_b64
+
+        cached = {}
+        for img in ImageModel.search([
+            ('account_id', '=', account_id),
+            ('checksum', 'in', [c for c in checksums if c]),
+            ('state', '=', 'uploaded'),
+            ('ml_picture_id', '!=', False),
+        ]):
+            cached.setdefault(img.checksum, img)
+
+        # Subir una vez cada checksum que falta
+        to_upload = []
+        queued = set()
+        for index, image in enumerate(images):
+            checksum = checksums[index]
+            if not checksum or checksum in cached or checksum in queued:
+                continue
+            queued.add(checksum)
+            img_b64 = payloads.get(checksum)
+            if img_b64 is None:
+                img_b64 = image['record'].with_context(bin_size=False)[image.get('field', 'image_1920')]
+                if isinstance(img_b64, bytes):
+                    img_b64 = img_b64.decode('utf-8')
+            try:
+                # Validar y redimensionar si es necesario (mínimo 500px para ML)
+                validation = self.validate_image_size(img_b64)
+                if validation.get('needs_resize'):
+                    _logger.info('Redimensionando imagen %s de %dx%d a %d px', image['filename'],
+                                 validation['width'], validation['height'], ML_IMAGE_RECOMMENDED_SIZE)
+                    img_b64 = self.resize_image(img_b64)
+                to_upload.append((checksum, image['filename'], base64.b64decode(img_b64)))
+            except Exception as e:
+                _logger.error('Error procesando imagen %s: %s', image['filename'], str(e))
+
+        uploaded = {}
+        if to_upload:
+            account = self.env['mercadolibre.account'].browse(account_id)
+            access_token = account.get_valid_token()
+            send = self._get_picture_sender(account_id)
+            workers = max(1, min(max_workers, len(to_upload)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(
+                    lambda job: _post_picture(send, access_token, job[1], job[2]), to_upload
+                ))
+            for (checksum, filename, _data), result in zip(to_upload, results):
+                if result.get('success') and result.get('id'):
+                    uploaded[checksum] = result
+                else:
+                    _logger.warning('Error subiendo imagen %s: %s', filename, result.get('error'))
+            _logger.info('Imágenes ML: %d reutilizadas, %d subidas, %d errores',
+                         len(cached), len(uploaded), len(to_upload) - len(uploaded))
+
+        # Un registro por imagen subida y producto (una sola creación)
+        vals_list = []
+        seen = set()
+        pictures = []
+        for index, image in enumerate(images):
+            checksum = checksums[index]
+            product_tmpl_id = image.get('product_tmpl_id')
+            if checksum in uploaded:
+                result = uploaded[checksum]
+                picture = {'id': result['id'], 'secure_url': result.get('secure_url')}
+                vals = {
+                    'ml_url': result.get('url'),
+                    'ml_size': result.get('size'),
+                    'ml_max_size': result.get('max_size'),
                 }
+            elif checksum in cached:
+                img = cached[checksum]
+                picture = {'id': img.ml_picture_id, 'secure_url': img.ml_secure_url}
+                if img.product_tmpl_id.id == product_tmpl_id:
+                    pictures.append(picture)
+                    continue
+                vals = {'ml_url': img.ml_url, 'ml_size': img.ml_size, 'ml_max_size': img.ml_max_size}
             else:
-                error_msg = response.text
-                _logger.error('Error subiendo imagen: %s - %s', response.status_code, error_msg)
-                return {
-                    'success': False,
-                    'error': f'HTTP {response.status_code}: {error_msg}'
-                }
+                pictures.append(None)
+                continue
+            pictures.append(picture)
+            if (checksum, product_tmpl_id) not in seen:
+                seen.add((checksum, product_tmpl_id))
+                vals.update({
+                    'account_id': account_id,
+                    'product_tmpl_id': product_tmpl_id,
+                    'ml_picture_id': picture['id'],
+                    'ml_secure_url': picture['secure_url'],
+                    'checksum': checksum,
+                    'state': 'uploaded',
+                })
+                vals_list.append(vals)
+        if vals_list:
+            ImageModel.create(vals_list)
 
-        except requests.exceptions.RequestException as e:
-            _logger.error('Error de conexión subiendo imagen: %s', str(e))
-            return {
-                'success': False,
-                'error': f'Error de conexión: {str(e)}'
-            }
+        return pictures
 
     @api.model
     def upload_product_images(self, account_id, product_tmpl_id):
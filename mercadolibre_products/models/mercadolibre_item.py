@@ -414,21 +414,57 @@ class MercadolibreItem(models.Model):
                 except (json.JSONDecodeError, TypeError):
                     pass
 
+    @api.model
+    def _get_odoo_stock_by_product(self, product_ids):
+        """
+        Stock disponible por producto con un solo read_group sobre stock.quant.
+
+        Respeta el contexto location / warehouse igual que qty_available
+        (por defecto, ubicaciones internas de las compañías activas).
+
+        Returns:
+            dict: {product_id: cantidad}
+        """
+        product_ids = list({pid for pid in product_ids if pid})
+        if not product_ids:
+            return {}
+        domain_quant_loc = self.env['product.product']._get_domain_locations()[0]
+        groups = self.env['stock.quant'].sudo().read_group(
+            [('product_id', 'in', product_ids)] + domain_quant_loc,
+            ['product_id', 'quantity:sum'],
+            ['product_id'],
+            lazy=False,
+        )
+        return {group['product_id'][0]: group['quantity'] for group in groups}
+
     @api.depends('product_tmpl_id', 'product_id', 'product_tmpl_id.qty_available',
                  'product_id.qty_available', 'variation_ids.product_id.qty_available')
+    @api.depends_context('location', 'warehouse', 'allowed_company_ids')
     def _compute_odoo_stock(self):
+        # Productos de todo el recordset: variaciones, producto o variantes
+        # de la plantilla vinculada, para calcular el stock en una consulta
+        product_ids = set()
+        for record in self:
+            if record.has_variations:
+                product_ids.update(record.variation_ids.product_id.ids)
+            elif record.product_id:
+                product_ids.add(record.product_id.id)
+            elif record.product_tmpl_id:
+                product_ids.update(record.product_tmpl_id.product_variant_ids.ids)
+        stock = self._get_odoo_stock_by_product(product_ids)
+
         for record in self:
             if record.has_variations:
                 # Sumar stock de todas las variaciones vinculadas
-                total = 0
-                for var in record.variation_ids:
-                    if var.product_id:
-                        total += var.product_id.qty_available
-                record.odoo_stock = total
+                record.odoo_stock = sum(
+                    stock.get(var.product_id.id, 0.0) for var in record.variation_ids
+                )
             elif record.product_id:
-                record.odoo_stock = record.product_id.qty_available
+                record.odoo_stock = stock.get(record.product_id.id, 0.0)
             elif record.product_tmpl_id:
-                record.odoo_stock = record.product_tmpl_id.qty_available
+                record.odoo_stock = sum(
+                    stock.get(pid, 0.0) for pid in record.product_tmpl_id.product_variant_ids.ids
+                )
             else:
                 record.odoo_stock = 0
 
@@ -445,6 +481,16 @@ class MercadolibreItem(models.Model):
     # =====================================================
     # CRUD METHODS
     # =====================================================
+    def write(self, vals):
+        result = super().write(vals)
+        # Un item recien vinculado entra al proximo envio delta a ML
+        if 'product_id' in vals or 'product_tmpl_id' in vals:
+            self.flush_recordset(['product_id', 'product_tmpl_id'])
+            self.env['mercadolibre.product.change']._mark_dirty(
+                (self.product_id | self.product_tmpl_id.product_variant_ids).ids, 'stock'
+            )
+        return result
+
     @api.model
     def create_from_ml_data(self, data, account):
         """
@@ -554,6 +600,8 @@ class MercadolibreItem(models.Model):
             for var_data in variations:
                 VariationModel.create_from_ml_data(var_data, item)
 
+        self.env['mercadolibre.sku.index']._refresh(item.ids)
+
         return item, is_new
 
     # =====================================================
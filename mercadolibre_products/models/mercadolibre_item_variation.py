@@ -164,12 +164,11 @@ class MercadolibreItemVariation(models.Model):
                 record.attribute_display = ''
 
     @api.depends('product_id', 'product_id.qty_available')
+    @api.depends_context('location', 'warehouse', 'allowed_company_ids')
     def _compute_odoo_stock(self):
+        stock = self.env['mercadolibre.item']._get_odoo_stock_by_product(self.product_id.ids)
         for record in self:
-            if record.product_id:
-                record.odoo_stock = record.product_id.qty_available
-            else:
-                record.odoo_stock = 0
+            record.odoo_stock = stock.get(record.product_id.id, 0.0)
 
     @api.depends('available_quantity', 'odoo_stock', 'product_id')
     def _compute_stock_difference(self):
@@ -179,6 +178,14 @@ class MercadolibreItemVariation(models.Model):
             else:
                 record.stock_difference = 0
 
+    def write(self, vals):
+        result = super().write(vals)
+        # Una variacion recien vinculada entra al proximo envio delta a ML
+        if 'product_id' in vals:
+            self.flush_recordset(['product_id'])
+            self.env['mercadolibre.product.change']._mark_dirty(self.product_id.ids, 'stock')
+        return result
+
     @api.model
     def create_from_ml_data(self, data, item):
         """
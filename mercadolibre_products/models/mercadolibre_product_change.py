@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo import models, fields, api
+from odoo.tools import sql
+
+_logger = logging.getLogger(__name__)
+
+
+class MercadolibreProductChange(models.Model):
+    """
+    Diario de cambios de productos vinculados a MercadoLibre.
+
+    Los eventos de stock (movimientos realizados), precio y nombre insertan
+    una fila por producto afectado y por configuracion que envia a ML. El
+    envio Odoo -> ML de cada configuracion consume (borra) sus filas y solo
+    envia los items de esos productos. Una fila de una transaccion que aun
+    no confirmo no es visible, asi que no se borra y se consume en el
+    proximo envio: no hay marca de agua que pueda saltarla.
+    """
+    _name = 'mercadolibre.product.change'
+    _description = 'Cambio de Producto para MercadoLibre'
+    _order = 'id desc'
+    _log_access = False
+
+    product_id = fields.Many2one(
+        'product.product',
+        string='Producto',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    config_id = fields.Many2one(
+        'mercadolibre.product.sync.config',
+        string='Configuracion',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    reason = fields.Selection([
+        ('stock', 'Stock'),
+        ('price', 'Precio'),
+        ('title', 'Titulo'),
+        ('retry', 'Reintento'),
+    ], string='Motivo', required=True)
+    date = fields.Datetime(
+        string='Fecha',
+        default=fields.Datetime.now
+    )
+
+    def _auto_init(self):
+        # Filas anteriores a config_id: se descartan, las configuraciones
+        # quedan con un envio completo pendiente (default de full_push_pending)
+        if (sql.column_exists(self.env.cr, self._table, 'product_id')
+                and not sql.column_exists(self.env.cr, self._table, 'config_id')):
+            self.env.cr.execute(f'DELETE FROM {self._table}')
+        return super()._auto_init()
+
+    @api.model
+    def _mark_dirty(self, product_ids, reason, config_ids=None):
+        """
+        Registra los productos como pendientes de envio a ML.
+
+        Se inserta una fila por producto y configuracion que envia a ML
+        (todas, o solo config_ids), siempre que el producto este vinculado
+        a un item o variacion de la cuenta de la configuracion. Un solo
+        INSERT para todos los productos.
+        """
+        product_ids = list({pid for pid in product_ids if pid})
+        if not product_ids:
+            return
+        params = {'reason': reason, 'product_ids': product_ids}
+        config_filter = ''
+        if config_ids is not None:
+            config_filter = 'AND c.id = ANY(%(config_ids)s)'
+            params['config_ids'] = list(config_ids)
+        self.env.cr.execute(f"""
+            INSERT INTO mercadolibre_product_change (product_id, config_id, reason, date)
+            SELECT pp.id, c.id, %(reason)s, now() at time zone 'UTC'
+              FROM product_product pp
+              JOIN mercadolibre_product_sync_config c
+                ON c.sync_direction IN ('odoo_to_ml', 'bidirectional')
+               {config_filter}
+             WHERE pp.id = ANY(%(product_ids)s)
+               AND (EXISTS (SELECT 1 FROM mercadolibre_item i
+                             WHERE i.account_id = c.account_id
+                               AND (i.product_id = pp.id
+                                    OR (i.product_id IS NULL AND i.product_tmpl_id = pp.product_tmpl_id)))
+                    OR EXISTS (SELECT 1 FROM mercadolibre_item_variation v
+                                 JOIN mercadolibre_item i ON i.id = v.item_id
+                                WHERE i.account_id = c.account_id
+                                  AND v.product_id = pp.id))
+        """, params)
+
+    @api.model
+    def _consume(self, config):
+        """
+        Borra las filas visibles de la configuracion y retorna sus productos.
+        Si el envio falla, el rollback de la transaccion las restaura.
+        """
+        self.env.cr.execute("""
+            DELETE FROM mercadolibre_product_change
+             WHERE config_id = %s
+         RETURNING product_id
+        """, (config.id,))
+        return list({row[0] for row in self.env.cr.fetchall()})
+
+    @api.model
+    def _gc(self):
+        """
+        Elimina las filas de configuraciones que ya no envian a ML y las de
+        mas de 30 dias; las configuraciones que pierden filas por antiguedad
+        quedan marcadas para un envio completo.
+        """
+        self.env['mercadolibre.product.sync.config'].flush_model(['full_push_pending', 'sync_direction'])
+        self.env.cr.execute("""
+            UPDATE mercadolibre_product_sync_config
+               SET full_push_pending = TRUE
+             WHERE id IN (SELECT DISTINCT config_id
+                            FROM mercadolibre_product_change
+                           WHERE date < (now() at time zone 'UTC') - interval '30 days')
+        """)
+        self.env.cr.execute("""
+            DELETE FROM mercadolibre_product_change ch
+             USING mercadolibre_product_sync_config c
+             WHERE c.id = ch.config_id
+               AND (c.sync_direction NOT IN ('odoo_to_ml', 'bidirectional')
+                    OR ch.date < (now() at time zone 'UTC') - interval '30 days')
+        """)
+        if self.env.cr.rowcount:
+            _logger.info('Eliminados %d cambios de producto sin envio pendiente', self.env.cr.rowcount)
+        self.env['mercadolibre.product.sync.config'].invalidate_model(['full_push_pending'])
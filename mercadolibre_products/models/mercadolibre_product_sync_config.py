@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 
 import json
-import time
 import logging
 from datetime import datetime, timedelta
 from odoo import models, fields, api, _
@@ -9,6 +8,11 @@ from odoo.exceptions import ValidationError, UserError
 
 _logger = logging.getLogger(__name__)
 
+# Resultados por pagina en /users/{id}/items/search y tope de offset de la API;
+# mas alla del tope se continua con search_type=scan
+ITEMS_SEARCH_PAGE_SIZE = 100
+ITEMS_SEARCH_MAX_OFFSET = 1000
+
 
 class MercadolibreProductSyncConfig(models.Model):
     _name = 'mercadolibre.product.sync.config'
@@ -117,6 +121,14 @@ class MercadolibreProductSyncConfig(models.Model):
         default=False,
         help='Actualizar titulo de ML con nombre del producto'
     )
+    full_push_pending = fields.Boolean(
+        string='Envio Completo Pendiente',
+        default=True,
+        readonly=True,
+        copy=False,
+        help='El proximo envio a ML recorre todos los items vinculados en lugar de '
+             'solo los productos del diario de cambios.'
+    )
 
     # =====================================================
     # FILTROS
@@ -135,7 +147,8 @@ class MercadolibreProductSyncConfig(models.Model):
     limit = fields.Integer(
         string='Limite',
         default=100,
-        help='Numero maximo de items a sincronizar por ejecucion'
+        help='Numero maximo de items a sincronizar por ejecucion (ML -> Odoo). '
+             'El envio Odoo -> ML solo envia los items con cambios.'
     )
 
     # =====================================================
@@ -243,6 +256,12 @@ class MercadolibreProductSyncConfig(models.Model):
         string='Log Ultima Ejecucion',
         readonly=True
     )
+    last_sync_run_id = fields.Many2one(
+        'mercadolibre.sync.run',
+        string='Ultima Ejecucion',
+        readonly=True,
+        ondelete='set null'
+    )
     total_syncs = fields.Integer(
         string='Total Ejecuciones',
         readonly=True,
@@ -258,6 +277,9 @@ class MercadolibreProductSyncConfig(models.Model):
     # METODOS DE CICLO DE VIDA
     # =====================================================
     def write(self, vals):
+        if vals.get('sync_direction') in ('odoo_to_ml', 'bidirectional'):
+            # Mientras no enviaba a ML no se registraron sus cambios
+            vals = dict(vals, full_push_pending=True)
         result = super().write(vals)
         if 'active' in vals:
             for record in self:
@@ -306,6 +328,11 @@ class MercadolibreProductSyncConfig(models.Model):
                 record._create_or_update_cron()
             record.state = 'active'
 
+    def action_view_sync_runs(self):
+        """Ver el historial de ejecuciones de esta configuracion"""
+        self.ensure_one()
+        return self.env['mercadolibre.sync.run']._action_view_runs(self)
+
     def action_run_now(self):
         """Ejecuta la sincronizacion manualmente"""
         self.ensure_one()
@@ -358,6 +385,9 @@ class MercadolibreProductSyncConfig(models.Model):
             })
             return False
 
+        # Encabezado y resumen van a last_sync_log; el detalle por item
+        # se escribe en lotes en mercadolibre.sync.run.line
+        run = self.env['mercadolibre.sync.run']._start(self, 'products', self.account_id)
         log_lines = []
         log_lines.append('=' * 50)
         log_lines.append(f'  SYNC PRODUCTOS ML: {self.name}')
@@ -375,14 +405,16 @@ class MercadolibreProductSyncConfig(models.Model):
 
         try:
             if self.sync_direction in ('ml_to_odoo', 'bidirectional'):
-                result = self._sync_from_ml(log_lines)
+                result = self._sync_from_ml(log_lines, run)
                 sync_count += result.get('sync_count', 0)
                 created_count += result.get('created_count', 0)
                 updated_count += result.get('updated_count', 0)
                 error_count += result.get('error_count', 0)
 
             if self.sync_direction in ('odoo_to_ml', 'bidirectional'):
-                result = self._sync_to_ml(log_lines)
+                # Si el envio falla, el rollback devuelve al diario las filas consumidas
+                with self.env.cr.savepoint():
+                    result = self._sync_to_ml(log_lines, run)
                 sync_count += result.get('sync_count', 0)
                 updated_count += result.get('updated_count', 0)
                 error_count += result.get('error_count', 0)
@@ -390,6 +422,7 @@ class MercadolibreProductSyncConfig(models.Model):
         except Exception as e:
             _logger.error('Error en sync: %s', str(e))
             log_lines.append(f'ERROR GENERAL: {str(e)}')
+            run.add('error', f'General: {str(e)}')
             error_count += 1
 
         # Resumen
@@ -412,13 +445,17 @@ class MercadolibreProductSyncConfig(models.Model):
         elif self.interval_type == 'days':
             next_run += timedelta(days=self.interval_number)
 
+        summary = '\n'.join(log_lines)
+        run.close(summary)
+
         self.write({
             'last_run': fields.Datetime.now(),
             'last_sync_count': sync_count,
             'last_sync_created': created_count,
             'last_sync_updated': updated_count,
             'last_sync_errors': error_count,
-            'last_sync_log': '\n'.join(log_lines),
+            'last_sync_log': summary,
+            'last_sync_run_id': run.run.id,
             'next_run': next_run,
             'total_syncs': self.total_syncs + 1,
             'total_items_synced': self.total_items_synced + sync_count,
@@ -427,8 +464,12 @@ class MercadolibreProductSyncConfig(models.Model):
         _logger.info('SYNC PRODUCTOS "%s" completada: %d sincronizados', self.name, sync_count)
         return True
 
-    def _sync_from_ml(self, log_lines):
-        """Sincroniza items desde MercadoLibre a Odoo"""
+    def _sync_from_ml(self, log_lines, run):
+        """
+        Sincroniza items desde MercadoLibre a Odoo.
+
+        Los totales van a log_lines y el detalle por item al SyncRunWriter run.
+        """
         log_lines.append('')
         log_lines.append('-' * 50)
         log_lines.append('  SINCRONIZACION ML -> ODOO')
@@ -442,82 +483,90 @@ class MercadolibreProductSyncConfig(models.Model):
         http = self.env['mercadolibre.http']
         ItemModel = self.env['mercadolibre.item']
 
-        # Obtener lista de items del vendedor
-        try:
-            params = {
-                'limit': self.limit,
-            }
-            if self.item_status_filter != 'all':
-                params['status'] = self.item_status_filter
+        # Obtener lista de items del vendedor, pagina por pagina
+        # (offset hasta el tope de la API y luego search_type=scan)
+        params = {}
+        if self.item_status_filter != 'all':
+            params['status'] = self.item_status_filter
+
+        pages = http._iter_pages(
+            self.account_id.id,
+            f'/users/{self.account_id.ml_user_id}/items/search',
+            params=params,
+            page_size=ITEMS_SEARCH_PAGE_SIZE,
+            max_results=self.limit,
+            max_offset=ITEMS_SEARCH_MAX_OFFSET,
+            scan=True,
+        )
+
+        total_logged = False
+        while True:
+            try:
+                page = next(pages, None)
+                if page is None:
+                    break
+                item_ids = [str(i) for i in page.get('results', [])]
 
-            response = http._request(
-                account_id=self.account_id.id,
-                endpoint=f'/users/{self.account_id.ml_user_id}/items/search',
-                method='GET',
-                params=params
-            )
+                if not total_logged:
+                    total = page.get('paging', {}).get('total', len(item_ids))
+                    log_lines.append(f'  Total items en ML: {total}')
+                    log_lines.append(f'  A procesar: {min(total, self.limit) if self.limit else total}')
+                    total_logged = True
 
-            item_ids = response.get('data', {}).get('results', [])
-            total = response.get('data', {}).get('paging', {}).get('total', len(item_ids))
+                # Obtener detalle de los items en lotes de 20 (multiget /items?ids=)
+                items_data, fetch_errors = http._multiget(self.account_id.id, 'items', item_ids)
 
-            log_lines.append(f'  Total items en ML: {total}')
-            log_lines.append(f'  A procesar: {len(item_ids)}')
+            except Exception as e:
+                log_lines.append(f'  ERROR obteniendo lista: {str(e)}')
+                run.add('error', f'Obteniendo lista: {str(e)}')
+                error_count += 1
+                break
 
-        except Exception as e:
-            log_lines.append(f'  ERROR obteniendo lista: {str(e)}')
-            return {'sync_count': 0, 'created_count': 0, 'updated_count': 0, 'error_count': 1}
+            # Procesar cada item de la pagina
+            for ml_item_id in item_ids:
+                try:
+                    if ml_item_id not in items_data:
+                        raise UserError(fetch_errors.get(ml_item_id, _('Item no encontrado')))
+                    item_data = items_data[ml_item_id]
 
-        # Procesar cada item
-        for ml_item_id in item_ids:
-            try:
-                # Obtener detalle del item
-                item_response = http._request(
-                    account_id=self.account_id.id,
-                    endpoint=f'/items/{ml_item_id}',
-                    method='GET'
-                )
-                item_data = item_response.get('data', {})
-
-                # Crear o actualizar item local
-                item, is_new = ItemModel.create_from_ml_data(item_data, self.account_id)
-                sync_count += 1
-
-                if is_new:
-                    created_count += 1
-                    action = 'NUEVO'
-                else:
-                    updated_count += 1
-                    action = 'ACTUALIZADO'
-
-                # Vincular producto si corresponde
-                if not item.is_linked and self.link_method != 'manual':
-                    self._auto_link_item(item)
-
-                # Sincronizar campos a producto Odoo si esta vinculado
-                if item.is_linked:
-                    self._sync_item_to_odoo_product(item, log_lines)
-
-                # Crear producto nuevo si corresponde
-                elif self.create_new_products:
-                    product = self._create_product_from_item(item)
-                    if product:
-                        item.write({
-                            'product_id': product.id,
-                            'product_tmpl_id': product.product_tmpl_id.id,
-                        })
-                        log_lines.append(f'    [{action}] {ml_item_id}: Producto creado')
-                    else:
-                        log_lines.append(f'    [{action}] {ml_item_id}: Error creando producto')
+                    # Crear o actualizar item local
+                    item, is_new = ItemModel.create_from_ml_data(item_data, self.account_id)
+                    sync_count += 1
 
-                log_lines.append(f'    [{action}] {ml_item_id}: {item.title[:40]}...')
+                    if is_new:
+                        created_count += 1
+                        level = 'created'
+                    else:
+                        updated_count += 1
+                        level = 'updated'
+                    message = item.title[:40]
+
+                    # Vincular producto si corresponde
+                    if not item.is_linked and self.link_method != 'manual':
+                        self._auto_link_item(item)
+
+                    # Sincronizar campos a producto Odoo si esta vinculado
+                    if item.is_linked:
+                        self._sync_item_to_odoo_product(item, run)
+
+                    # Crear producto nuevo si corresponde
+                    elif self.create_new_products:
+                        product = self._create_product_from_item(item)
+                        if product:
+                            item.write({
+                                'product_id': product.id,
+                                'product_tmpl_id': product.product_tmpl_id.id,
+                            })
+                            message += ' | Producto creado'
+                        else:
+                            message += ' | Error creando producto'
 
-            except Exception as e:
-                error_count += 1
-                log_lines.append(f'    [ERROR] {ml_item_id}: {str(e)}')
-                _logger.error('Error procesando item %s: %s', ml_item_id, str(e))
+                    run.add(level, message, ml_item_id)
 
-            # Rate limit: esperar un poco entre requests
-            time.sleep(0.1)
+                except Exception as e:
+                    error_count += 1
+                    run.add('error', str(e), ml_item_id)
+                    _logger.error('Error procesando item %s: %s', ml_item_id, str(e))
 
         return {
             'sync_count': sync_count,
@@ -526,18 +575,22 @@ class MercadolibreProductSyncConfig(models.Model):
             'error_count': error_count,
         }
 
-    def _sync_to_ml(self, log_lines):
-        """Sincroniza productos de Odoo a MercadoLibre"""
-        log_lines.append('')
-        log_lines.append('-' * 50)
-        log_lines.append('  SINCRONIZACION ODOO -> ML')
-        log_lines.append('-' * 50)
+    def action_full_push(self):
+        """El proximo envio Odoo -> ML recorre todos los items vinculados."""
+        self.write({'full_push_pending': True})
 
-        sync_count = 0
-        updated_count = 0
-        error_count = 0
+    def _get_push_items(self, log_lines):
+        """
+        Items a enviar: los de productos con filas en el diario de cambios
+        de esta configuracion, o todos los vinculados si hay un envio
+        completo pendiente. Las filas se consumen antes de leer el stock:
+        los cambios confirmados despues quedan para el proximo envio.
+
+        Returns:
+            mercadolibre.item
+        """
+        product_ids = self.env['mercadolibre.product.change']._consume(self)
 
-        # Obtener items vinculados
         domain = [
             ('account_id', '=', self.account_id.id),
             ('is_linked', '=', True),
@@ -545,92 +598,170 @@ class MercadolibreProductSyncConfig(models.Model):
         if self.item_status_filter != 'all':
             domain.append(('status', '=', self.item_status_filter))
 
-        items = self.env['mercadolibre.item'].search(domain, limit=self.limit)
-        log_lines.append(f'  Items vinculados a procesar: {len(items)}')
+        if self.full_push_pending:
+            log_lines.append('  Modo: completo (todos los items vinculados)')
+            return self.env['mercadolibre.item'].search(domain)
 
-        http = self.env['mercadolibre.http']
+        log_lines.append(f'  Modo: delta ({len(product_ids)} productos con cambios)')
+        if not product_ids:
+            return self.env['mercadolibre.item']
 
-        for item in items:
-            try:
-                updates = {}
-                update_msgs = []
-
-                # Sincronizar stock
-                if self.sync_stock_odoo_to_ml:
-                    new_stock = int(item.odoo_stock)
-                    if new_stock != item.available_quantity:
-                        if item.has_variations:
-                            # Actualizar stock por variacion
-                            for var in item.variation_ids:
-                                if var.is_linked:
-                                    var_stock = int(var.odoo_stock)
-                                    if var_stock != var.available_quantity:
-                                        try:
-                                            http._request(
-                                                account_id=self.account_id.id,
-                                                endpoint=f'/items/{item.ml_item_id}/variations/{var.ml_variation_id}',
-                                                method='PUT',
-                                                body={'available_quantity': var_stock}
-                                            )
-                                            var.write({'available_quantity': var_stock})
-                                        except Exception as e:
-                                            _logger.warning('Error actualizando variacion %s: %s',
-                                                          var.ml_variation_id, str(e))
-                        else:
-                            updates['available_quantity'] = new_stock
-                            update_msgs.append(f'stock: {item.available_quantity}->{new_stock}')
-
-                # Sincronizar precio
-                if self.sync_price_odoo_to_ml:
-                    product = item.product_id or (item.product_tmpl_id.product_variant_id if item.product_tmpl_id else False)
-                    if product:
-                        new_price = product.lst_price
-                        if abs(new_price - item.price) > 0.01:
-                            updates['price'] = new_price
-                            update_msgs.append(f'precio: {item.price}->{new_price}')
-
-                # Sincronizar titulo
-                if self.sync_name_to_title:
-                    product_tmpl = item.product_tmpl_id
-                    if product_tmpl and product_tmpl.name != item.title:
-                        # Nota: titulo no se puede cambiar si tiene ventas
-                        if item.sold_quantity == 0:
-                            updates['title'] = product_tmpl.name
-                            update_msgs.append('titulo')
-
-                # Enviar actualizaciones
-                if updates:
-                    http._request(
-                        account_id=self.account_id.id,
-                        endpoint=f'/items/{item.ml_item_id}',
-                        method='PUT',
-                        body=updates
-                    )
-
-                    # Actualizar registro local
-                    local_updates = {'last_sync': fields.Datetime.now()}
-                    if 'available_quantity' in updates:
-                        local_updates['available_quantity'] = updates['available_quantity']
-                    if 'price' in updates:
-                        local_updates['price'] = updates['price']
-                    if 'title' in updates:
-                        local_updates['title'] = updates['title']
-                    item.write(local_updates)
+        template_ids = self.env['product.product'].browse(product_ids).product_tmpl_id.ids
+        domain += [
+            '|', '|',
+            ('product_id', 'in', product_ids),
+            '&', ('product_id', '=', False), ('product_tmpl_id', 'in', template_ids),
+            ('variation_ids.product_id', 'in', product_ids),
+        ]
+        return self.env['mercadolibre.item'].search(domain)
+
+    def _get_stock_context(self):
+        """Contexto de stock (ubicacion o almacen) para calcular odoo_stock."""
+        if self.stock_location_id:
+            return {'location': self.stock_location_id.id}
+        if self.stock_warehouse_id:
+            return {'warehouse': self.stock_warehouse_id.id}
+        return {}
+
+    def _prepare_item_push(self, item):
+        """
+        Arma un solo PUT /items/{id} con todo lo que cambio del item,
+        incluidas las variaciones.
+
+        ML elimina las variaciones que no vienen en el arreglo variations,
+        por eso se envian todas (las que no cambian solo con su id).
+
+        Returns:
+            (body, local_updates, variation_updates, msgs) o None si no hay cambios
+        """
+        updates = {}
+        update_msgs = []
+        variation_updates = {}
+
+        # Stock
+        if self.sync_stock_odoo_to_ml:
+            if item.has_variations:
+                variations = []
+                for var in item.variation_ids:
+                    entry = {'id': int(var.ml_variation_id) if var.ml_variation_id.isdigit() else var.ml_variation_id}
+                    if var.is_linked:
+                        var_stock = int(var.odoo_stock)
+                        if var_stock != var.available_quantity:
+                            entry['available_quantity'] = var_stock
+                            variation_updates[var] = var_stock
+                    variations.append(entry)
+                if variation_updates:
+                    updates['variations'] = variations
+                    update_msgs.append(f'stock: {len(variation_updates)} variacion(es)')
+            else:
+                new_stock = int(item.odoo_stock)
+                if new_stock != item.available_quantity:
+                    updates['available_quantity'] = new_stock
+                    update_msgs.append(f'stock: {item.available_quantity}->{new_stock}')
+
+        # Precio
+        if self.sync_price_odoo_to_ml:
+            product = item.product_id or (item.product_tmpl_id.product_variant_id if item.product_tmpl_id else False)
+            if product:
+                new_price = product.lst_price
+                if abs(new_price - item.price) > 0.01:
+                    updates['price'] = new_price
+                    update_msgs.append(f'precio: {item.price}->{new_price}')
+
+        # Titulo
+        if self.sync_name_to_title:
+            product_tmpl = item.product_tmpl_id
+            if product_tmpl and product_tmpl.name != item.title:
+                # Nota: titulo no se puede cambiar si tiene ventas
+                if item.sold_quantity == 0:
+                    updates['title'] = product_tmpl.name
+                    update_msgs.append('titulo')
+
+        if not updates:
+            return None
+
+        local_updates = {'last_sync': fields.Datetime.now()}
+        for key in ('available_quantity', 'price', 'title'):
+            if key in updates:
+                local_updates[key] = updates[key]
+        return updates, local_updates, variation_updates, update_msgs
+
+    def _sync_to_ml(self, log_lines, run):
+        """
+        Sincroniza productos de Odoo a MercadoLibre.
+
+        Envio delta: solo los items de productos marcados en el diario de
+        cambios (stock, precio, titulo), un PUT por item con las variaciones
+        agrupadas, enviados en paralelo con concurrencia acotada.
+
+        Los totales van a log_lines y el detalle por item al SyncRunWriter run.
+        """
+        log_lines.append('')
+        log_lines.append('-' * 50)
+        log_lines.append('  SINCRONIZACION ODOO -> ML')
+        log_lines.append('-' * 50)
 
-                    sync_count += 1
-                    updated_count += 1
-                    log_lines.append(f'    [OK] {item.ml_item_id}: {", ".join(update_msgs)}')
+        sync_count = 0
+        updated_count = 0
+        error_count = 0
 
+        items = self._get_push_items(log_lines)
+        # odoo_stock de todos los items en una consulta, en la ubicacion configurada
+        items = items.with_context(**self._get_stock_context())
+        items.variation_ids.mapped('odoo_stock')
+        log_lines.append(f'  Items vinculados a procesar: {len(items)}')
+
+        # Armar los PUT en el hilo principal (lecturas ORM)
+        pushes = []
+        for item in items:
+            try:
+                push = self._prepare_item_push(item)
             except Exception as e:
                 error_count += 1
-                log_lines.append(f'    [ERROR] {item.ml_item_id}: {str(e)}')
+                run.add('error', str(e), item.ml_item_id)
+                continue
+            if push:
+                pushes.append((item, push))
+
+        workers = int(self.env['ir.config_parameter'].sudo().get_param(
+            'mercadolibre_products.push_workers', default=4
+        ))
+        results = self.env['mercadolibre.http']._request_batch(
+            self.account_id.id,
+            [{'endpoint': f'/items/{item.ml_item_id}', 'method': 'PUT', 'body': push[0]}
+             for item, push in pushes],
+            max_workers=workers,
+        ) if pushes else []
+
+        failed_products = []
+        for (item, (body, local_updates, variation_updates, update_msgs)), result in zip(pushes, results):
+            if result['error']:
+                error_count += 1
+                run.add('error', result['error'], item.ml_item_id)
                 item.write({
                     'sync_status': 'error',
-                    'sync_error': str(e)
+                    'sync_error': result['error']
                 })
+                failed_products += (item.product_id | item.product_tmpl_id.product_variant_ids
+                                    | item.variation_ids.product_id).ids
+                continue
+
+            # Actualizar registro local
+            item.write(local_updates)
+            for var, var_stock in variation_updates.items():
+                var.write({'available_quantity': var_stock})
+
+            sync_count += 1
+            updated_count += 1
+            run.add('updated', ", ".join(update_msgs), item.ml_item_id)
+
+        # Los fallidos vuelven al diario para el proximo envio
+        Change = self.env['mercadolibre.product.change']
+        Change._mark_dirty(failed_products, 'retry', config_ids=self.ids)
+        self.write({'full_push_pending': False})
+        Change._gc()
 
-            # Rate limit
-            time.sleep(0.1)
+        log_lines.append(f'  PUT enviados: {len(pushes)} (concurrencia {workers})')
 
         return {
             'sync_count': sync_count,
@@ -676,7 +807,7 @@ class MercadolibreProductSyncConfig(models.Model):
                 'product_tmpl_id': product.product_tmpl_id.id,
             })
 
-    def _sync_item_to_odoo_product(self, item, log_lines):
+    def _sync_item_to_odoo_product(self, item, run):
         """Sincroniza datos del item ML al producto Odoo vinculado"""
         product_tmpl = item.product_tmpl_id
         product = item.product_id
@@ -711,9 +842,9 @@ class MercadolibreProductSyncConfig(models.Model):
 
         # Sincronizar stock (crear ajuste de inventario)
         if self.sync_stock_ml_to_odoo and self.create_stock_adjustment:
-            self._sync_stock_to_odoo(item, log_lines)
+            self._sync_stock_to_odoo(item, run)
 
-    def _sync_stock_to_odoo(self, item, log_lines):
+    def _sync_stock_to_odoo(self, item, run):
         """Crea ajuste de inventario para igualar stock de ML"""
         if not item.is_linked:
             return
@@ -755,11 +886,11 @@ class MercadolibreProductSyncConfig(models.Model):
                     'inventory_quantity': ml_stock,
                 })
 
-            log_lines.append(f'      Ajuste inventario: {product.default_code or product.name} '
-                           f'{current_odoo_stock} -> {ml_stock}')
+            run.add('info', f'Ajuste inventario: {product.default_code or product.name} '
+                            f'{current_odoo_stock} -> {ml_stock}', item.ml_item_id)
 
         except Exception as e:
-            log_lines.append(f'      ERROR ajuste inventario: {str(e)}')
+            run.add('error', f'Ajuste inventario: {str(e)}', item.ml_item_id)
             _logger.error('Error creando ajuste inventario: %s', str(e))
 
     def _create_product_from_item(self, item):
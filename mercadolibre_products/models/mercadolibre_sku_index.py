@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+
+class MercadolibreSkuIndex(models.Model):
+    """
+    Indice local (cuenta, SELLER_SKU) -> item / variacion de ML.
+
+    Se reconstruye por item en cada sincronizacion (create_from_ml_data),
+    asi la verificacion de duplicados al publicar resuelve todos los SKU
+    con una consulta y solo consulta la API por los que no encuentra.
+    """
+    _name = 'mercadolibre.sku.index'
+    _description = 'Indice de SKU MercadoLibre'
+    _order = 'seller_sku'
+    _rec_name = 'seller_sku'
+    _log_access = False
+
+    account_id = fields.Many2one(
+        'mercadolibre.account',
+        string='Cuenta ML',
+        required=True,
+        ondelete='cascade'
+    )
+    seller_sku = fields.Char(
+        string='SELLER_SKU',
+        required=True
+    )
+    item_id = fields.Many2one(
+        'mercadolibre.item',
+        string='Item',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    variation_id = fields.Many2one(
+        'mercadolibre.item.variation',
+        string='Variacion',
+        ondelete='cascade'
+    )
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS mercadolibre_sku_index_account_sku_idx
+                ON mercadolibre_sku_index (account_id, seller_sku)
+        """)
+        # Items sincronizados antes de existir el indice
+        self.env.cr.execute('SELECT 1 FROM mercadolibre_sku_index LIMIT 1')
+        if not self.env.cr.fetchone():
+            self._refresh()
+
+    @api.model
+    def _refresh(self, item_ids=None):
+        """
+        Reconstruye las filas de los items indicados (todos si item_ids es None)
+        desde el SKU del item y de sus variaciones activas.
+        """
+        if item_ids is not None:
+            item_ids = list(item_ids)
+            if not item_ids:
+                return
+        self.env['mercadolibre.item'].flush_model(['account_id', 'seller_sku'])
+        self.env['mercadolibre.item.variation'].flush_model(['item_id', 'seller_sku', 'active'])
+
+        if item_ids is None:
+            self.env.cr.execute('DELETE FROM mercadolibre_sku_index')
+            item_filter = 'TRUE'
+        else:
+            self.env.cr.execute(
+                'DELETE FROM mercadolibre_sku_index WHERE item_id = ANY(%(ids)s)', {'ids': item_ids}
+            )
+            item_filter = 'i.id = ANY(%(ids)s)'
+        self.env.cr.execute(f"""
+            INSERT INTO mercadolibre_sku_index (account_id, seller_sku, item_id, variation_id)
+            SELECT i.account_id, i.seller_sku, i.id, NULL
+              FROM mercadolibre_item i
+             WHERE {item_filter} AND COALESCE(i.seller_sku, '') != ''
+            UNION ALL
+            SELECT i.account_id, v.seller_sku, i.id, v.id
+              FROM mercadolibre_item_variation v
+              JOIN mercadolibre_item i ON i.id = v.item_id
+             WHERE {item_filter} AND v.active AND COALESCE(v.seller_sku, '') != ''
+        """, {'ids': item_ids})
+
+    @api.model
+    def _lookup(self, account, skus):
+        """
+        Busca varios SKU de una cuenta con una sola consulta. Solo cuentan
+        los items activos o pausados, como la busqueda por seller_sku de ML.
+
+        Returns:
+            dict: {sku: ml_item_id}
+        """
+        skus = list({sku for sku in skus if sku})
+        if not skus:
+            return {}
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (s.seller_sku) s.seller_sku, i.ml_item_id
+              FROM mercadolibre_sku_index s
+              JOIN mercadolibre_item i ON i.id = s.item_id
+             WHERE s.account_id = %s
+               AND s.seller_sku = ANY(%s)
+               AND i.status IN ('active', 'paused')
+             ORDER BY s.seller_sku, i.id
+        """, (account.id, skus))
+        return dict(self.env.cr.fetchall())
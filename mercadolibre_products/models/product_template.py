@@ -429,6 +429,18 @@ class ProductTemplate(models.Model):
             record.ml_stock_difference = record.qty_available - ml_stock
             record.ml_stock_alert = abs(record.ml_stock_difference) > 0 and record.has_ml_items
 
+    # =====================================================
+    # DIARIO DE CAMBIOS PARA ENVIO A ML
+    # =====================================================
+    def write(self, vals):
+        result = super().write(vals)
+        Change = self.env['mercadolibre.product.change']
+        if 'list_price' in vals:
+            Change._mark_dirty(self.product_variant_ids.ids, 'price')
+        if 'name' in vals:
+            Change._mark_dirty(self.product_variant_ids.ids, 'title')
+        return result
+
     # =====================================================
     # ACCIONES
     # =====================================================
@@ -645,3 +657,16 @@ class ProductProduct(models.Model):
     def action_view_ml_items(self):
         """Ver publicaciones de ML vinculadas"""
         return self.product_tmpl_id.action_view_ml_items()
+
+
+class ProductTemplateAttributeValue(models.Model):
+    _inherit = 'product.template.attribute.value'
+
+    def write(self, vals):
+        result = super().write(vals)
+        # price_extra modifica el lst_price que se envia a ML
+        if 'price_extra' in vals:
+            self.env['mercadolibre.product.change']._mark_dirty(
+                self.ptav_product_variant_ids.ids, 'price'
+            )
+        return result
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models
+
+
+class StockMove(models.Model):
+    _inherit = 'stock.move'
+
+    def _action_done(self, cancel_backorder=False):
+        moves = super()._action_done(cancel_backorder=cancel_backorder)
+        # En Odoo 16 los ajustes de inventario (stock.quant._apply_inventory)
+        # tambien se validan como movimientos, por lo que este punto cubre
+        # todos los cambios de stock a mano
+        self.env['mercadolibre.product.change']._mark_dirty(
+            moves.filtered(lambda m: m.state == 'done').product_id.ids, 'stock'
+        )
+        return moves
@@ -2,12 +2,14 @@
 
 import logging
 import time
-import requests
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError, UserError
 
 _logger = logging.getLogger(__name__)
 
+# Estados de línea que la publicación masiva procesa ('category_mismatch' es advertencia, no bloqueo)
+PUBLISH_PENDING_STATUSES = ('ready', 'category_mismatch')
+
 
 class MercadolibrePublishMassive(models.TransientModel):
     _name = 'mercadolibre.publish.massive'
@@ -195,45 +197,59 @@ class MercadolibrePublishMassive(models.TransientModel):
                 status = 'low_price'
                 message = f'Precio ${product.list_price:.2f} - mínimo recomendado $35'
 
-            # Verificar SKU duplicado en ML
-            elif self.check_duplicates and product.default_code:
-                existing_ml = self._check_sku_exists_in_ml(product.default_code)
-                if existing_ml:
-                    status = 'sku_exists'
-                    message = f'SKU ya existe en ML: {existing_ml}'
-
-            # Campos para predicción de categoría
-            predicted_cat_id = ''
-            predicted_cat_name = ''
-
-            # Validar categoría con predictor de ML (solo si pasó las validaciones anteriores)
-            if status == 'ready' and self.validate_category and product.ml_category_id:
-                # Obtener nombre limpio del producto
-                product_name = product.name
-                if isinstance(product_name, dict):
-                    product_name = product_name.get('es_MX') or product_name.get('en_US') or str(product_name)
-
-                prediction = self._predict_category(product_name, site_id='MLM')
-                if prediction:
-                    predicted_cat_id = prediction.get('category_id', '')
-                    predicted_cat_name = prediction.get('category_name', '')
-
-                    # Comparar con la categoría seleccionada
-                    selected_cat_id = product.ml_category_id.ml_category_id
-                    if predicted_cat_id and predicted_cat_id != selected_cat_id:
-                        # Las categorías no coinciden - ADVERTENCIA
-                        status = 'category_mismatch'
-                        message = f'ML sugiere: {predicted_cat_name} ({predicted_cat_id}). Seleccionada: {product.ml_category_id.name}'
-
             lines.append({
                 'wizard_id': self.id,
                 'product_tmpl_id': product.id,
                 'status': status,
                 'status_message': message,
-                'predicted_category_id': predicted_cat_id,
-                'predicted_category_name': predicted_cat_name,
+                'predicted_category_id': '',
+                'predicted_category_name': '',
             })
 
+        # Verificar SKU duplicado en ML (en paralelo, solo los que siguen listos)
+        if self.check_duplicates:
+            products = self.env['product.template'].browse([
+                vals['product_tmpl_id'] for vals in lines if vals['status'] == 'ready'
+            ])
+            existing_skus = self._check_skus_exists_in_ml(
+                [p.default_code for p in products if p.default_code]
+            )
+            for vals in lines:
+                product = self.env['product.template'].browse(vals['product_tmpl_id'])
+                existing_ml = vals['status'] == 'ready' and existing_skus.get(product.default_code)
+                if existing_ml:
+                    vals['status'] = 'sku_exists'
+                    vals['status_message'] = f'SKU ya existe en ML: {existing_ml}'
+
+        # Validar categoría con predictor de ML (solo si pasó las validaciones anteriores)
+        if self.validate_category:
+            to_predict = [
+                (vals, self.env['product.template'].browse(vals['product_tmpl_id']))
+                for vals in lines if vals['status'] == 'ready'
+            ]
+            to_predict = [(vals, product) for vals, product in to_predict if product.ml_category_id]
+            predictions = self.env['mercadolibre.category.prediction']._predict_batch(
+                [self._get_product_title(product) for _vals, product in to_predict], site_id='MLM',
+                account_id=self.account_id.id
+            )
+            for vals, product in to_predict:
+                prediction = predictions.get(self._get_product_title(product))
+                if not prediction:
+                    continue
+                predicted_cat_id = prediction.get('category_id') or ''
+                predicted_cat_name = prediction.get('category_name') or ''
+                vals['predicted_category_id'] = predicted_cat_id
+                vals['predicted_category_name'] = predicted_cat_name
+
+                # Comparar con la categoría seleccionada
+                if predicted_cat_id and predicted_cat_id != product.ml_category_id.ml_category_id:
+                    # Las categorías no coinciden - ADVERTENCIA
+                    vals['status'] = 'category_mismatch'
+                    vals['status_message'] = (
+                        f'ML sugiere: {predicted_cat_name} ({predicted_cat_id}). '
+                        f'Seleccionada: {product.ml_category_id.name}'
+                    )
+
         self.env['mercadolibre.publish.massive.line'].create(lines)
 
         self.write({'state': 'preview'})
@@ -249,69 +265,87 @@ class MercadolibrePublishMassive(models.TransientModel):
 
     def _check_sku_exists_in_ml(self, sku):
         """Verifica si un SKU ya existe en MercadoLibre"""
-        if not sku or not self.account_id:
-            return False
+        return self._check_skus_exists_in_ml([sku]).get(sku, False)
+
+    def _check_skus_exists_in_ml(self, skus):
+        """
+        Verifica varios SKU en MercadoLibre.
+
+        Primero consulta el índice local de SKU (una sola consulta para
+        todos); solo los que no aparecen se consultan a la API, en paralelo.
+
+        Returns:
+            dict: {sku: ml_item_id} de los SKU que ya existen
+        """
+        skus = list(dict.fromkeys(sku for sku in skus if sku))
+        if not skus or not self.account_id:
+            return {}
+
+        existing = self.env['mercadolibre.sku.index']._lookup(self.account_id, skus)
+        misses = [sku for sku in skus if sku not in existing]
+        _logger.info('Verificación de SKU: %d en índice local, %d a consultar en ML',
+                     len(existing), len(misses))
+        if not misses:
+            return existing
 
         try:
-            http = self.env['mercadolibre.http']
-            response = http._request(
-                account_id=self.account_id.id,
-                endpoint=f'/users/{self.account_id.ml_user_id}/items/search',
-                method='GET',
-                params={'seller_sku': sku, 'status': 'active,paused'}
+            results = self.env['mercadolibre.http']._request_batch(
+                self.account_id.id,
+                [{
+                    'endpoint': f'/users/{self.account_id.ml_user_id}/items/search',
+                    'params': {'seller_sku': sku, 'status': 'active,paused'},
+                } for sku in misses],
             )
-            results = response.get('data', {}).get('results', [])
-            if results:
-                return results[0]  # Retorna el ML ID del item existente
         except Exception as e:
-            _logger.warning('Error verificando SKU %s: %s', sku, str(e))
-
-        return False
+            _logger.warning('Error verificando SKUs: %s', str(e))
+            return existing
+
+        for sku, result in zip(misses, results):
+            if result['error']:
+                _logger.warning('Error verificando SKU %s: %s', sku, result['error'])
+                continue
+            found = (result['data'] or {}).get('results', [])
+            if found:
+                existing[sku] = found[0]  # ML ID del item existente
+        return existing
+
+    @api.model
+    def _get_product_title(self, product):
+        """Nombre del producto como texto para el predictor de categorías."""
+        product_name = product.name
+        if isinstance(product_name, dict):
+            product_name = product_name.get('es_MX') or product_name.get('en_US') or str(product_name)
+        return product_name
 
     def _predict_category(self, product_name, site_id='MLM'):
         """
         Usa la API de MercadoLibre para predecir la categoría correcta
-        basándose en el nombre del producto.
+        basándose en el nombre del producto (con cache por título normalizado).
 
         Returns:
             dict: {'category_id': str, 'category_name': str, 'domain_name': str} o None
         """
         if not product_name:
             return None
-
-        try:
-            # Limpiar el nombre del producto
-            import urllib.parse
-            clean_name = urllib.parse.quote(product_name[:60])
-
-            url = f'https://api.mercadolibre.com/sites/{site_id}/domain_discovery/search?q={clean_name}'
-            response = requests.get(url, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-                if data and len(data) > 0:
-                    first_result = data[0]
-                    return {
-                        'category_id': first_result.get('category_id'),
-                        'category_name': first_result.get('category_name'),
-                        'domain_id': first_result.get('domain_id'),
-                        'domain_name': first_result.get('domain_name'),
-                    }
-        except Exception as e:
-            _logger.warning('Error prediciendo categoría para %s: %s', product_name[:30], str(e))
-
-        return None
+        return self.env['mercadolibre.category.prediction']._predict_batch(
+            [product_name], site_id=site_id, account_id=self.account_id.id
+        ).get(product_name)
 
     def action_publish(self):
-        """Publica los productos listos en MercadoLibre"""
+        """
+        Encola la publicación de los productos listos en MercadoLibre.
+
+        La publicación no corre en el request interactivo (con miles de
+        productos chocaría con limit_time_real): las líneas quedan en cola
+        y el cron de publicación masiva las procesa con el runner por lotes
+        de mercadolibre.job, que hace commit por lote y se vuelve a disparar
+        al agotar su presupuesto de tiempo (ver _cron_publish_massive).
+        """
         self.ensure_one()
 
         if not self.account_id.has_valid_token:
             raise ValidationError(_('La cuenta no tiene un token válido.'))
 
-        # Cambiar estado
-        self.write({'state': 'publishing'})
-
         log_lines = []
         log_lines.append('=' * 60)
         log_lines.append('    PUBLICACIÓN MASIVA EN MERCADOLIBRE')
@@ -320,17 +354,9 @@ class MercadolibrePublishMassive(models.TransientModel):
         log_lines.append(f'  Fecha: {fields.Datetime.now()}')
         log_lines.append('')
 
-        http = self.env['mercadolibre.http']
-        ItemModel = self.env['mercadolibre.item']
-
-        published_count = 0
-        skipped_count = 0
-        error_count = 0
-        warning_count = 0
-
         # Filtrar solo los listos
         # Incluir tanto 'ready' como 'category_mismatch' (advertencia, no bloqueo)
-        ready_lines = self.preview_line_ids.filtered(lambda l: l.status in ('ready', 'category_mismatch'))
+        ready_lines = self.preview_line_ids.filtered(lambda l: l.status in PUBLISH_PENDING_STATUSES)
         warning_lines = ready_lines.filtered(lambda l: l.status == 'category_mismatch')
 
         log_lines.append(f'  Productos a publicar: {len(ready_lines)}')
@@ -339,272 +365,447 @@ class MercadolibrePublishMassive(models.TransientModel):
         log_lines.append('')
         log_lines.append('-' * 60)
 
-        for line in ready_lines:
-            product = line.product_tmpl_id
+        # Escribir las líneas en cola renueva su write_date para que el
+        # vacuum de transitorios no las borre mientras esperan su lote
+        ready_lines.write({'status_message': _('En cola de publicación')})
+        self.write({
+            'state': 'publishing',
+            'publish_log': '\n'.join(log_lines) + '\n',
+            'published_count': 0,
+            'skipped_count': len(self.preview_line_ids) - len(ready_lines),
+            'error_count': 0,
+        })
 
-            try:
-                # Preparar datos usando la configuración del producto
-                brand_name = product.ml_brand or 'Genérico'
-                model_name = product.ml_model or product.default_code or product.name[:30]
-
-                # family_name (requerido por User Products / Catálogo 2.0)
-                # IMPORTANTE: Debe incluir marca, modelo y características
-                # ML genera el título automáticamente desde family_name
-                family_name = f"{brand_name} {model_name}"
-                if len(family_name) < 20:
-                    family_name = f"{brand_name} {product.name[:40]}"
-                family_name = family_name[:60]
-
-                # Imágenes (obtener primero, son requeridas)
-                pictures = self._get_product_pictures(product)
-                if not pictures:
-                    error_count += 1
-                    line.write({
-                        'status': 'error',
-                        'status_message': 'No se pudo subir imagen a MercadoLibre',
-                    })
-                    log_lines.append(f'  [ERROR] {product.name[:40]}: Sin imagen válida')
-                    continue
+        cron = self.env.ref('mercadolibre_products.ir_cron_mercadolibre_publish_massive',
+                            raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+        return self.action_refresh()
+
+    def action_refresh(self):
+        """Reabre el wizard para ver el avance de la publicación."""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Publicación Masiva'),
+            'res_model': 'mercadolibre.publish.massive',
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    @api.model
+    def _cron_publish_massive(self):
+        """
+        Publica las líneas en cola de todos los wizards en 'publishing'.
+
+        Recorre las líneas por lotes con el cursor persistente de
+        mercadolibre.job: cada lote (imágenes, POST de items y descripciones
+        en paralelo) hace commit al terminar y, al agotar el presupuesto de
+        tiempo, el cron se vuelve a disparar y continúa desde la última línea
+        procesada. Cada lote corre con el usuario que lanzó la publicación.
 
-                body = {
-                    'family_name': family_name,  # NO usar 'title', ML lo genera
-                    'category_id': product.ml_category_id.ml_category_id,
-                    'price': round(product.list_price, 2),  # MXN solo permite 2 decimales
-                    'currency_id': product.currency_id.name or 'MXN',
-                    'available_quantity': int(product.qty_available) or 1,
-                    'buying_mode': 'buy_it_now',
-                    'condition': product.ml_condition or 'new',
-                    'listing_type_id': product.ml_listing_type or 'gold_special',
-                    'pictures': pictures,
-                }
-
-                # Atributos
-                attributes = [
-                    {'id': 'BRAND', 'value_name': brand_name},
-                    {'id': 'MODEL', 'value_name': model_name},
-                ]
-                if product.default_code:
-                    attributes.append({'id': 'SELLER_SKU', 'value_name': product.default_code})
-                # GTIN solo si es un código de barras válido (numérico, 8-14 dígitos)
-                if product.barcode and product.barcode.isdigit() and len(product.barcode) in (8, 12, 13, 14):
-                    attributes.append({'id': 'GTIN', 'value_name': product.barcode})
-
-                body['attributes'] = attributes
-
-                # Shipping
-                body['shipping'] = {
-                    'mode': product.ml_shipping_mode or 'me2',
-                    'free_shipping': product.ml_free_shipping or False,
-                    'local_pick_up': product.ml_local_pick_up or False,
-                }
-
-                # Garantía
-                if product.ml_warranty_type and product.ml_warranty_type != 'Sin garantía':
-                    sale_terms = [
-                        {'id': 'WARRANTY_TYPE', 'value_name': product.ml_warranty_type}
-                    ]
-                    if product.ml_warranty_time:
-                        sale_terms.append({'id': 'WARRANTY_TIME', 'value_name': product.ml_warranty_time})
-                    body['sale_terms'] = sale_terms
-
-                # Publicar - intentar primero con family_name (Catálogo 2.0)
-                # Si falla, reintentar con title (categorías tradicionales)
-                try:
-                    response = http._request(
-                        account_id=self.account_id.id,
-                        endpoint='/items',
-                        method='POST',
-                        body=body
+        No usa _run_chunked: _publish_lines hace commit del ID de ML de cada
+        item apenas termina su POST (POST /items no es idempotente), lo que
+        no es posible dentro del savepoint por lote del runner.
+
+        Parámetros de sistema:
+            mercadolibre_products.publish_chunk_size: productos por lote (default 50)
+            mercadolibre_products.publish_workers: requests concurrentes (default 4)
+        """
+        Job = self.env['mercadolibre.job']
+        Line = self.env['mercadolibre.publish.massive.line'].sudo()
+        ICP = self.env['ir.config_parameter'].sudo()
+        chunk_size = max(int(ICP.get_param('mercadolibre_products.publish_chunk_size', default=50)), 1)
+        workers = int(ICP.get_param('mercadolibre_products.publish_workers', default=4))
+        cron = self.env.ref('mercadolibre_products.ir_cron_mercadolibre_publish_massive',
+                            raise_if_not_found=False)
+        pending_domain = [
+            ('wizard_id.state', '=', 'publishing'),
+            ('status', 'in', PUBLISH_PENDING_STATUSES),
+        ]
+
+        key = 'mercadolibre.publish.massive'
+        if not Job._try_lock(key):
+            _logger.info('Publicación masiva ya en ejecución en otro worker')
+            return
+
+        drained = False
+        try:
+            job = Job._get_job(key)
+            job._begin_pass()
+            self.env.cr.commit()
+            deadline = Job._get_deadline()
+
+            while True:
+                self._touch_publishing()
+                lines = Line.search(pending_domain + [('id', '>', int(job.cursor or 0))],
+                                    order='id', limit=chunk_size)
+                if not lines:
+                    job._finish()
+                    drained = True
+                    break
+
+                next_cursor = lines[-1].id
+                for wizard in lines.wizard_id:
+                    wizard._publish_queued_lines(
+                        lines.filtered(lambda l: l.wizard_id.id == wizard.id), workers, job
                     )
-                    item_data = response.get('data', {})
-                except Exception as api_error:
-                    error_str = str(api_error)
-                    # Si el error es por family_name inválido, reintentar con title
-                    if 'family name is invalid' in error_str or 'required_fields' in error_str:
-                        _logger.info('Categoría no soporta family_name, reintentando con title para %s', product.name)
-                        # Cambiar family_name por title
-                        body['title'] = body.pop('family_name')
-                        response = http._request(
-                            account_id=self.account_id.id,
-                            endpoint='/items',
-                            method='POST',
-                            body=body
-                        )
-                        item_data = response.get('data', {})
-                    else:
-                        raise  # Re-lanzar si es otro error
-
-                ml_item_id = item_data.get('id')
-
-                if ml_item_id:
-                    # Enviar descripción por separado
-                    if product.description_sale:
-                        try:
-                            http._request(
-                                account_id=self.account_id.id,
-                                endpoint=f'/items/{ml_item_id}/description',
-                                method='POST',
-                                body={'plain_text': product.description_sale}
-                            )
-                        except Exception:
-                            pass
+                job._save_cursor(next_cursor, len(lines))
+
+                if time.monotonic() >= deadline:
+                    _logger.info('Publicación masiva: presupuesto de tiempo agotado, '
+                                 'se reanuda desde la línea %s', next_cursor)
+                    job._pause(cron)
+                    break
+        finally:
+            try:
+                Job._unlock(key)
+            except Exception:
+                # Transacción abortada: el lock es de sesión, hay que liberarlo igual
+                self.env.cr.rollback()
+                Job._unlock(key)
+
+        if not drained:
+            return
+
+        # Wizards sin líneas en cola: cerrar con el resumen
+        self.sudo().search([('state', '=', 'publishing')]).filtered(
+            lambda w: not w.preview_line_ids.filtered(lambda l: l.status in PUBLISH_PENDING_STATUSES)
+        )._finish_publish()
+        self.env.cr.commit()
+
+        # Líneas encoladas detrás del cursor mientras corría la pasada
+        if cron and Line.search(pending_domain, limit=1):
+            cron.sudo()._trigger()
+
+    def _publish_queued_lines(self, lines, workers, job):
+        """
+        Publica las líneas en cola de este wizard con el usuario que lo creó.
 
+        Si el lote falla, las líneas que siguen en cola se marcan con error
+        (conservando el ID de ML si el POST ya se había confirmado) para no
+        reintentarlas en cada pasada.
+        """
+        self.ensure_one()
+        wizard = self.with_user(self.create_uid)
+        lines = lines.with_env(wizard.env)
+        log_lines = []
+        counters = {'published': 0, 'error': 0}
+        try:
+            wizard._publish_lines(lines, workers, log_lines, counters)
+        except Exception as e:
+            _logger.error('Error publicando lote del wizard %s: %s', self.id, str(e), exc_info=True)
+            # Vuelve al último commit: los IDs de ML ya guardados se conservan
+            self.env.cr.rollback()
+            failed = lines.exists().filtered(lambda l: l.status in PUBLISH_PENDING_STATUSES)
+            for line in failed:
+                message = str(e)
+                if line.ml_item_id:
+                    message = f'Publicado en ML como {line.ml_item_id}, sin registro local: {e}'
+                line.write({'status': 'error', 'status_message': message[:500]})
+            log_lines = [f'  [ERROR] Lote de {len(failed)} productos: {str(e)[:400]}']
+            job.write({'last_error': f'Wizard {self.id}: {e}'})
+            job._add_errors(1)
+        wizard.write({'publish_log': (wizard.publish_log or '') + '\n'.join(log_lines) + '\n'})
+        # Un fallo en el wizard siguiente del lote no debe revertir este
+        self.env.cr.commit()
+
+    @api.model
+    def _touch_publishing(self):
+        """
+        Renueva write_date de los wizards en 'publishing' y de sus líneas
+        para que el vacuum de modelos transitorios no los borre mientras la
+        publicación sigue en curso.
+        """
+        self.env.cr.execute("""
+            UPDATE mercadolibre_publish_massive
+               SET write_date = now() at time zone 'UTC'
+             WHERE state = 'publishing'
+               AND write_date < (now() at time zone 'UTC') - interval '10 minutes'
+        """)
+        self.env.cr.execute("""
+            UPDATE mercadolibre_publish_massive_line line
+               SET write_date = now() at time zone 'UTC'
+              FROM mercadolibre_publish_massive wizard
+             WHERE line.wizard_id = wizard.id
+               AND wizard.state = 'publishing'
+               AND line.write_date < (now() at time zone 'UTC') - interval '10 minutes'
+        """)
+
+    def _finish_publish(self):
+        """Escribe el resumen de la publicación y marca el wizard como completado."""
+        for wizard in self:
+            published_count = len(wizard.preview_line_ids.filtered(lambda l: l.status == 'published'))
+            error_count = len(wizard.preview_line_ids.filtered(lambda l: l.status == 'error'))
+
+            # Resumen
+            log_lines = []
+            log_lines.append('')
+            log_lines.append('=' * 60)
+            log_lines.append('  RESUMEN')
+            log_lines.append('=' * 60)
+            log_lines.append(f'  Publicados: {published_count}')
+            log_lines.append(f'  Omitidos:   {wizard.skipped_count}')
+            log_lines.append(f'  Errores:    {error_count}')
+            log_lines.append('=' * 60)
+
+            wizard.write({
+                'state': 'done',
+                'publish_log': (wizard.publish_log or '') + '\n'.join(log_lines),
+                'published_count': published_count,
+                'error_count': error_count,
+            })
+
+    def _prepare_publish_body(self, product, pictures):
+        """Arma el body del POST /items usando la configuración del producto."""
+        brand_name = product.ml_brand or 'Genérico'
+        model_name = product.ml_model or product.default_code or product.name[:30]
+
+        # family_name (requerido por User Products / Catálogo 2.0)
+        # IMPORTANTE: Debe incluir marca, modelo y características
+        # ML genera el título automáticamente desde family_name
+        family_name = f"{brand_name} {model_name}"
+        if len(family_name) < 20:
+            family_name = f"{brand_name} {product.name[:40]}"
+        family_name = family_name[:60]
+
+        body = {
+            'family_name': family_name,  # NO usar 'title', ML lo genera
+            'category_id': product.ml_category_id.ml_category_id,
+            'price': round(product.list_price, 2),  # MXN solo permite 2 decimales
+            'currency_id': product.currency_id.name or 'MXN',
+            'available_quantity': int(product.qty_available) or 1,
+            'buying_mode': 'buy_it_now',
+            'condition': product.ml_condition or 'new',
+            'listing_type_id': product.ml_listing_type or 'gold_special',
+            'pictures': pictures,
+        }
+
+        # Atributos
+        attributes = [
+            {'id': 'BRAND', 'value_name': brand_name},
+            {'id': 'MODEL', 'value_name': model_name},
+        ]
+        if product.default_code:
+            attributes.append({'id': 'SELLER_SKU', 'value_name': product.default_code})
+        # GTIN solo si es un código de barras válido (numérico, 8-14 dígitos)
+        if product.barcode and product.barcode.isdigit() and len(product.barcode) in (8, 12, 13, 14):
+            attributes.append({'id': 'GTIN', 'value_name': product.barcode})
+
+        body['attributes'] = attributes
+
+        # Shipping
+        body['shipping'] = {
+            'mode': product.ml_shipping_mode or 'me2',
+            'free_shipping': product.ml_free_shipping or False,
+            'local_pick_up': product.ml_local_pick_up or False,
+        }
+
+        # Garantía
+        if product.ml_warranty_type and product.ml_warranty_type != 'Sin garantía':
+            sale_terms = [
+                {'id': 'WARRANTY_TYPE', 'value_name': product.ml_warranty_type}
+            ]
+            if product.ml_warranty_time:
+                sale_terms.append({'id': 'WARRANTY_TIME', 'value_name': product.ml_warranty_time})
+            body['sale_terms'] = sale_terms
+
+        return body
+
+    def _publish_lines(self, lines, workers, log_lines, counters):
+        """
+        Publica un lote de líneas: imágenes, POST de items y descripciones
+        en paralelo; las escrituras locales quedan en el hilo principal.
+
+        POST /items no es idempotente: el ID de ML de cada item se guarda y
+        se hace commit apenas termina su POST, y las líneas que ya tienen
+        ID (lote interrumpido antes del registro local) no se vuelven a
+        publicar, solo se registran. Debe llamarse fuera de un savepoint.
+        """
+        http = self.env['mercadolibre.http']
+        ItemModel = self.env['mercadolibre.item']
+
+        def mark_error(line, log_message, status_message):
+            counters['error'] += 1
+            line.write({
+                'status': 'error',
+                'status_message': status_message[:500],
+            })
+            log_lines.append(f'  [ERROR] {line.product_tmpl_id.name[:40]}{log_message}')
+
+        def store_item_ids(batch):
+            stored = False
+            for (line, _body), result in batch:
+                item_id = not result['error'] and (result['data'] or {}).get('id')
+                if item_id:
+                    line.write({'ml_item_id': item_id})
+                    stored = True
+            if stored:
+                self.env.cr.commit()
+
+        # Ya publicadas en ML por un lote interrumpido: solo falta registrarlas
+        already_posted = lines.filtered('ml_item_id')
+        lines -= already_posted
+        posted = http._request_batch(
+            self.account_id.id,
+            [f'/items/{line.ml_item_id}' for line in already_posted],
+            max_workers=workers,
+        ) if already_posted else []
+
+        # Imágenes (obtener primero, son requeridas)
+        pictures_by_product = self._get_products_pictures(lines.product_tmpl_id) if lines else {}
+
+        pending = []
+        for line in lines:
+            product = line.product_tmpl_id
+            pictures = pictures_by_product.get(product.id)
+            if not pictures:
+                mark_error(line, ': Sin imagen válida', 'No se pudo subir imagen a MercadoLibre')
+                continue
+            try:
+                pending.append((line, self._prepare_publish_body(product, pictures)))
+            except Exception as e:
+                mark_error(line, f'\n          {str(e)[:400]}', str(e))
+
+        # Publicar - intentar primero con family_name (Catálogo 2.0)
+        # Si falla, reintentar con title (categorías tradicionales)
+        results = http._request_batch(
+            self.account_id.id,
+            [{'endpoint': '/items', 'method': 'POST', 'body': body} for _line, body in pending],
+            max_workers=workers,
+        ) if pending else []
+        store_item_ids(zip(pending, results))
+
+        retry = [
+            index for index, result in enumerate(results)
+            if result['error'] and ('family name is invalid' in result['error']
+                                    or 'required_fields' in result['error'])
+        ]
+        if retry:
+            for index in retry:
+                line, body = pending[index]
+                _logger.info('Categoría no soporta family_name, reintentando con title para %s',
+                             line.product_tmpl_id.name)
+                # Cambiar family_name por title
+                body['title'] = body.pop('family_name')
+            retried = http._request_batch(
+                self.account_id.id,
+                [{'endpoint': '/items', 'method': 'POST', 'body': pending[index][1]} for index in retry],
+                max_workers=workers,
+            )
+            for index, result in zip(retry, retried):
+                results[index] = result
+            store_item_ids((pending[index], results[index]) for index in retry)
+
+        published = []
+        for line, result in zip(already_posted, posted):
+            if result['error'] or not (result['data'] or {}).get('id'):
+                # El item existe en ML: no se vuelve a publicar
+                error = result['error'] or 'Sin datos del item'
+                mark_error(line, f': Publicado como {line.ml_item_id}, sin registro local',
+                           f'Publicado en ML como {line.ml_item_id}, sin registro local: {error}')
+                continue
+            published.append((line, result['data']))
+        for (line, body), result in zip(pending, results):
+            product = line.product_tmpl_id
+            if result['error']:
+                mark_error(line, f"\n          {result['error'][:400]}", result['error'])
+                _logger.error('Error publicando %s: %s', product.name, result['error'])
+                _logger.error('Body enviado: %s', body)
+                continue
+            item_data = result['data'] or {}
+            if not item_data.get('id'):
+                mark_error(line, ': Sin ID', 'No se obtuvo ID de ML')
+                continue
+            published.append((line, item_data))
+
+        # Enviar descripciones por separado (los errores no bloquean la publicación)
+        descriptions = [
+            {
+                'endpoint': f"/items/{item_data['id']}/description",
+                'method': 'POST',
+                'body': {'plain_text': line.product_tmpl_id.description_sale},
+            }
+            for line, item_data in published if line.product_tmpl_id.description_sale
+        ]
+        if descriptions:
+            http._request_batch(self.account_id.id, descriptions, max_workers=workers)
+
+        for line, item_data in published:
+            product = line.product_tmpl_id
+            ml_item_id = item_data['id']
+            try:
+                with self.env.cr.savepoint():
                     # Crear registro local
                     item, _is_new = ItemModel.create_from_ml_data(item_data, self.account_id)
                     item.write({
                         'product_tmpl_id': product.id,
                         'product_id': product.product_variant_id.id,
                     })
-
-                    line.write({
-                        'published': True,
-                        'ml_item_id': ml_item_id,
-                        'status': 'published',
-                        'status_message': f'Publicado: {ml_item_id}',
-                    })
-
-                    published_count += 1
-                    log_lines.append(f'  [OK] {product.name[:40]}')
-                    log_lines.append(f'       → {ml_item_id}')
-                else:
-                    error_count += 1
-                    line.write({
-                        'status': 'error',
-                        'status_message': 'No se obtuvo ID de ML',
-                    })
-                    log_lines.append(f'  [ERROR] {product.name[:40]}: Sin ID')
-
-                # Rate limit
-                time.sleep(0.3)
-
             except Exception as e:
-                error_count += 1
-                # Extraer mensaje de error más detallado
-                error_msg = str(e)
-                # Intentar obtener más detalles del error de la API
-                if hasattr(e, 'response') and e.response is not None:
-                    try:
-                        error_detail = e.response.json()
-                        error_msg = f"{error_detail.get('message', '')} - {error_detail.get('cause', [])}"
-                    except Exception:
-                        pass
-
-                line.write({
-                    'status': 'error',
-                    'status_message': error_msg[:500],
-                })
-                log_lines.append(f'  [ERROR] {product.name[:40]}')
-                log_lines.append(f'          {error_msg[:400]}')
-                _logger.error('Error publicando %s: %s', product.name, error_msg)
-                _logger.error('Body enviado: %s', body if 'body' in dir() else 'N/A')
+                _logger.error('Item %s publicado pero no se pudo registrar localmente: %s', ml_item_id, str(e))
 
-        # Contar omitidos
-        skipped_count = len(self.preview_line_ids) - len(ready_lines)
-
-        # Resumen
-        log_lines.append('')
-        log_lines.append('=' * 60)
-        log_lines.append('  RESUMEN')
-        log_lines.append('=' * 60)
-        log_lines.append(f'  Publicados: {published_count}')
-        log_lines.append(f'  Omitidos:   {skipped_count}')
-        log_lines.append(f'  Errores:    {error_count}')
-        log_lines.append('=' * 60)
+            line.write({
+                'published': True,
+                'ml_item_id': ml_item_id,
+                'status': 'published',
+                'status_message': f'Publicado: {ml_item_id}',
+            })
 
-        self.write({
-            'state': 'done',
-            'publish_log': '\n'.join(log_lines),
-            'published_count': published_count,
-            'skipped_count': skipped_count,
-            'error_count': error_count,
-        })
-
-        return {
-            'type': 'ir.actions.act_window',
-            'name': _('Publicación Masiva'),
-            'res_model': 'mercadolibre.publish.massive',
-            'res_id': self.id,
-            'view_mode': 'form',
-            'target': 'new',
-        }
+            counters['published'] += 1
+            log_lines.append(f'  [OK] {product.name[:40]}')
+            log_lines.append(f'       → {ml_item_id}')
 
     def _get_product_pictures(self, product):
+        """Obtiene las imágenes para publicar un producto."""
+        return self._get_products_pictures(product).get(product.id, [])
+
+    def _get_products_pictures(self, products):
         """
-        Obtiene las URLs de imágenes para publicar.
-        Incluye validación de tamaño y redimensionado automático.
+        Obtiene las imágenes para publicar varios productos.
+
+        Las imágenes ya subidas a la cuenta (mismo checksum de adjunto) se
+        reutilizan por su ID de ML; las demás se validan, redimensionan y
+        suben en paralelo.
+
+        Returns:
+            dict: {product_tmpl_id: [{'id': ml_picture_id}, ...]}
         """
-        pictures = []
-        ImageService = self.env['mercadolibre.image.service']
-        ImageModel = self.env['mercadolibre.image']
-
-        # Lista de imágenes a subir: (imagen_base64, nombre_archivo)
-        images_to_upload = []
-
-        # 1. Imagen principal
-        if product.image_1920:
-            img_b64 = product.image_1920
-            if isinstance(img_b64, bytes):
-                img_b64 = img_b64.decode('utf-8')
-            images_to_upload.append((img_b64, f'{product.default_code or product.id}_main.jpg'))
-
-        # 2. Imágenes adicionales (máximo 9 adicionales = 10 total)
-        if hasattr(product, 'product_template_image_ids') and product.product_template_image_ids:
-            for idx, extra_img in enumerate(product.product_template_image_ids[:9]):
-                if extra_img.image_1920:
-                    img_b64 = extra_img.image_1920
-                    if isinstance(img_b64, bytes):
-                        img_b64 = img_b64.decode('utf-8')
-                    images_to_upload.append((img_b64, f'{product.default_code or product.id}_extra_{idx+1}.jpg'))
-
-        # Subir todas las imágenes con validación y resize
-        for img_b64, filename in images_to_upload:
-            try:
-                # Validar y redimensionar si es necesario (mínimo 500px para ML)
-                try:
-                    validation = ImageService.validate_image_size(img_b64)
-                    if validation.get('needs_resize'):
-                        _logger.info('Redimensionando imagen %s de %dx%d a 1200px',
-                                   filename, validation.get('width', 0), validation.get('height', 0))
-                        img_b64 = ImageService.resize_image(img_b64, 1200)
-                except Exception as ve:
-                    _logger.warning('Error validando imagen %s: %s', filename, str(ve))
-
-                # Subir a ML
-                result = ImageService.upload_image_base64(
-                    self.account_id.id,
-                    img_b64,
-                    filename,
-                    auto_resize=True  # Respaldo por si la validación falló
-                )
-
-                if result.get('success'):
-                    picture_id = result.get('id')
-                    secure_url = result.get('secure_url') or result.get('url')
-                    if not secure_url and picture_id:
-                        secure_url = f'https://http2.mlstatic.com/D_{picture_id}-F.jpg'
-
-                    if secure_url:
-                        # Guardar registro
-                        ImageModel.create({
-                            'account_id': self.account_id.id,
+        images = []
+        # bin_size: solo se verifica que haya imagen, sin leer el binario
+        for product in products.with_context(bin_size=True):
+            # 1. Imagen principal
+            if product.image_1920:
+                images.append({
+                    'record': product,
+                    'filename': f'{product.default_code or product.id}_main.jpg',
+                    'product_tmpl_id': product.id,
+                })
+
+            # 2. Imágenes adicionales (máximo 9 adicionales = 10 total)
+            if hasattr(product, 'product_template_image_ids') and product.product_template_image_ids:
+                for idx, extra_img in enumerate(product.product_template_image_ids[:9]):
+                    if extra_img.image_1920:
+                        images.append({
+                            'record': extra_img,
+                            'filename': f'{product.default_code or product.id}_extra_{idx+1}.jpg',
                             'product_tmpl_id': product.id,
-                            'ml_picture_id': picture_id,
-                            'ml_url': result.get('url') or secure_url,
-                            'ml_secure_url': secure_url,
-                            'ml_size': result.get('size'),
-                            'ml_max_size': result.get('max_size'),
-                            'state': 'uploaded',
                         })
-                        pictures.append({'source': secure_url})
-                        _logger.info('Imagen subida para %s: %s', product.name, secure_url)
-                    else:
-                        _logger.warning('Imagen subida pero sin URL para %s', product.name)
-                else:
-                    _logger.warning('Error subiendo imagen %s de %s: %s',
-                                  filename, product.name, result.get('error'))
-            except Exception as e:
-                _logger.error('Error procesando imagen %s: %s', filename, str(e))
 
+        try:
+            uploaded = self.env['mercadolibre.image.service'].upload_images_cached(
+                self.account_id.id, images
+            )
+        except Exception as e:
+            _logger.error('Error subiendo imágenes a MercadoLibre: %s', str(e))
+            return {}
+
+        pictures = {}
+        for image, picture in zip(images, uploaded):
+            if picture:
+                pictures.setdefault(image['product_tmpl_id'], []).append({'id': picture['id']})
         return pictures
 
     def action_back(self):
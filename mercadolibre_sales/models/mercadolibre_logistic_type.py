@@ -1,6 +1,18 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api
+from collections import defaultdict, namedtuple
+
+from odoo import models, fields, api, tools
+
+# Reglas de un tipo logístico compiladas a IDs (inmutables, cacheables)
+CompiledLogisticRules = namedtuple('CompiledLogisticRules', [
+    'default_tag_ids',          # frozenset de crm.tag
+    'shipment_rules',           # ((frozenset estados, frozenset tags), ...) en orden de secuencia
+    'ml_tag_ids',               # frozenset de todos los tags gestionados por el tipo logístico
+    'invoiced_tag_ids',         # frozenset
+    'invoiced_remove_tag_ids',  # frozenset
+    'field_rules',              # ((config_id, trigger_type, frozenset estados, target_model), ...)
+])
 
 
 class MercadolibreLogisticType(models.Model):
@@ -246,6 +258,97 @@ class MercadolibreLogisticType(models.Model):
             'domain': domain,
         }
 
+    # =========================================================================
+    # REGLAS COMPILADAS
+    # =========================================================================
+    @api.model
+    @tools.ormcache('logistic_type_id')
+    def _get_compiled_rules(self, logistic_type_id):
+        """
+        Compila la configuración de un tipo logístico en una estructura
+        inmutable (frozensets/tuplas de IDs) cacheada por registro.
+
+        La caché se invalida en create/write/unlink de los modelos de
+        configuración (ver _clear_rules_cache), de modo que calcular tags
+        para una orden no vuelve a leer la configuración de la base.
+
+        Returns:
+            CompiledLogisticRules
+        """
+        record = self.sudo().browse(logistic_type_id).exists()
+        if not record:
+            return CompiledLogisticRules(
+                frozenset(), (), frozenset(), frozenset(), frozenset(), ()
+            )
+
+        shipment_rules = tuple(
+            (frozenset(config.get_status_list()), frozenset(config.tag_ids.ids))
+            for config in record.shipment_status_config_ids
+        )
+        field_rules = tuple(
+            (
+                config.id,
+                config.trigger_type,
+                frozenset(
+                    config.get_shipment_status_list()
+                    if config.trigger_type == 'shipment'
+                    else config.get_payment_status_list()
+                ),
+                config.target_model,
+            )
+            for config in record.field_update_config_ids.filtered('active')
+        )
+        default_tag_ids = frozenset(record.default_tag_ids.ids)
+        invoiced_tag_ids = frozenset(record.invoiced_tag_ids.ids)
+        invoiced_remove_tag_ids = frozenset(record.invoiced_tags_to_remove_ids.ids)
+
+        shipment_tag_ids = frozenset().union(*(tags for _statuses, tags in shipment_rules))
+        return CompiledLogisticRules(
+            default_tag_ids=default_tag_ids,
+            shipment_rules=shipment_rules,
+            ml_tag_ids=default_tag_ids | shipment_tag_ids | invoiced_tag_ids | invoiced_remove_tag_ids,
+            invoiced_tag_ids=invoiced_tag_ids,
+            invoiced_remove_tag_ids=invoiced_remove_tag_ids,
+            field_rules=field_rules,
+        )
+
+    @api.model
+    @tools.ormcache('code', 'account_id')
+    def _get_config_id_for(self, code, account_id):
+        """
+        Resuelve (y cachea) el tipo logístico que aplica a un código y cuenta.
+
+        Returns:
+            int: ID del tipo logístico o False
+        """
+        return self.sudo().search([
+            ('code', '=', code),
+            '|',
+            ('account_id', '=', account_id or False),
+            ('account_id', '=', False),
+        ], limit=1).id
+
+    @api.model
+    def _clear_rules_cache(self):
+        """Invalida las reglas compiladas en todos los workers."""
+        self.clear_caches()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self._clear_rules_cache()
+        return records
+
+    def write(self, vals):
+        result = super().write(vals)
+        self._clear_rules_cache()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self._clear_rules_cache()
+        return result
+
     def get_tags_for_shipment_status(self, shipment_status):
         """
         Obtiene las etiquetas correspondientes a un estado de envio.
@@ -256,30 +359,12 @@ class MercadolibreLogisticType(models.Model):
         Returns:
             recordset de crm.tag
         """
-        import logging
-        _logger = logging.getLogger(__name__)
-
         self.ensure_one()
-
-        _logger.info(
-            '[SHIPMENT_TAGS] Buscando tags para ship_status=%s en config=%s (total configs: %d)',
-            shipment_status, self.name, len(self.shipment_status_config_ids)
+        rules = self._get_compiled_rules(self.id)
+        return self.env['crm.tag'].browse(
+            sorted(self._match_shipment_tag_ids(rules, shipment_status))
         )
 
-        config = self.shipment_status_config_ids.filtered(
-            lambda c: shipment_status in c.get_status_list()
-        )
-
-        if config:
-            _logger.info(
-                '[SHIPMENT_TAGS] Match! Config "%s" -> Tags: %s',
-                config[0].name, config[0].tag_ids.mapped('name')
-            )
-            return config[0].tag_ids
-
-        _logger.info('[SHIPMENT_TAGS] No se encontró config para ship_status=%s', shipment_status)
-        return self.env['crm.tag']
-
     def get_all_configured_shipment_tags(self):
         """
         Obtiene TODAS las etiquetas configuradas en todos los estados de envío.
@@ -289,10 +374,18 @@ class MercadolibreLogisticType(models.Model):
             recordset de crm.tag con todos los tags de estados de envío
         """
         self.ensure_one()
-        all_tags = self.env['crm.tag']
-        for config in self.shipment_status_config_ids:
-            all_tags |= config.tag_ids
-        return all_tags
+        rules = self._get_compiled_rules(self.id)
+        tag_ids = frozenset().union(*(tags for _statuses, tags in rules.shipment_rules))
+        return self.env['crm.tag'].browse(sorted(tag_ids))
+
+    @staticmethod
+    def _match_shipment_tag_ids(rules, shipment_status):
+        """Tags de la primera regla de envío que contiene el estado."""
+        if shipment_status:
+            for statuses, tag_ids in rules.shipment_rules:
+                if shipment_status in statuses:
+                    return tag_ids
+        return frozenset()
 
     def calculate_and_apply_tags(self, sale_order, shipment_status=None, payment_status=None,
                                   account_id=None, company_id=None):
@@ -313,130 +406,101 @@ class MercadolibreLogisticType(models.Model):
         Returns:
             dict con información de los cambios realizados
         """
-        import logging
-        _logger = logging.getLogger(__name__)
-
         self.ensure_one()
-
-        _logger.info(
-            '[CALC_TAGS] Iniciando para %s: config=%s, ship_status=%s, pay_status=%s',
-            sale_order.name, self.name, shipment_status, payment_status
+        sale_order.ensure_one()
+        results = self.apply_tags_to_orders(
+            sale_order,
+            statuses={sale_order.id: (shipment_status, payment_status)},
+            account_id=account_id,
+            company_id=company_id,
         )
+        return results[sale_order.id]
 
-        result = {
-            'tags_added': [],
-            'tags_removed': [],
-            'final_tags': [],
-        }
+    def apply_tags_to_orders(self, sale_orders, statuses=None, account_id=None, company_id=None):
+        """
+        Calcula y aplica tags a un recordset de órdenes con las reglas compiladas.
 
-        # Obtener tags actuales de la orden
-        current_tags = sale_order.tag_ids
-        new_tags = self.env['crm.tag']
+        Las órdenes que terminan con el mismo conjunto de tags se escriben
+        juntas (un write por grupo), en lugar de un write por orden.
 
-        _logger.info('[CALC_TAGS] Tags actuales: %s', current_tags.mapped('name'))
+        Args:
+            sale_orders: recordset de sale.order
+            statuses: dict {sale_order_id: (shipment_status, payment_status)}.
+                      Si una orden no está, se usan ml_shipping_status/ml_status.
+            account_id: ID de cuenta ML (opcional)
+            company_id: ID de compañía (opcional)
 
-        # =====================================================
-        # 1. TAGS POR DEFECTO DEL TIPO LOGÍSTICO (siempre se mantienen)
-        # =====================================================
-        if self.default_tag_ids:
-            new_tags |= self.default_tag_ids
-            _logger.info('[CALC_TAGS] Tags por defecto: %s', self.default_tag_ids.mapped('name'))
+        Returns:
+            dict {sale_order_id: {'tags_added', 'tags_removed', 'final_tags'}}
+        """
+        import logging
+        _logger = logging.getLogger(__name__)
 
-        # =====================================================
-        # 2. TAGS POR ESTADO DE ENVÍO (reemplazar)
-        # =====================================================
-        if shipment_status:
-            shipment_tags = self.get_tags_for_shipment_status(shipment_status)
-            _logger.info(
-                '[CALC_TAGS] Tags para estado envío "%s": %s (configs: %d)',
-                shipment_status,
-                shipment_tags.mapped('name') if shipment_tags else 'NINGUNO',
-                len(self.shipment_status_config_ids)
-            )
-            if shipment_tags:
-                new_tags |= shipment_tags
-        else:
-            _logger.info('[CALC_TAGS] Sin estado de envío para buscar tags')
-
-        # =====================================================
-        # 3. TAGS POR ESTADO DE PAGO (reemplazar)
-        # =====================================================
-        if payment_status:
-            PaymentConfig = self.env['mercadolibre.payment.status.config']
-            payment_tags = PaymentConfig.get_tags_for_payment_status(
-                payment_status,
-                account_id=account_id,
-                company_id=company_id
-            )
-            _logger.info(
-                '[CALC_TAGS] Tags para estado pago "%s": %s',
-                payment_status,
-                payment_tags.mapped('name') if payment_tags else 'NINGUNO'
-            )
-            if payment_tags:
-                new_tags |= payment_tags
-        else:
-            _logger.info('[CALC_TAGS] Sin estado de pago para buscar tags')
-
-        # =====================================================
-        # 4. TAGS DE FACTURACIÓN (lógica especial)
-        # =====================================================
-        is_invoiced = sale_order.invoice_status == 'invoiced' or \
-                      (sale_order.invoice_ids and any(inv.state == 'posted' for inv in sale_order.invoice_ids))
-
-        _logger.info('[CALC_TAGS] Facturado: %s (invoice_status=%s)', is_invoiced, sale_order.invoice_status)
-
-        if is_invoiced:
-            # Agregar tags de facturación
-            if self.invoiced_tag_ids:
-                new_tags |= self.invoiced_tag_ids
-                _logger.info('[CALC_TAGS] Tags facturación agregados: %s', self.invoiced_tag_ids.mapped('name'))
-
-            # Quitar solo los tags específicos configurados para quitar
-            if self.invoiced_tags_to_remove_ids:
-                new_tags -= self.invoiced_tags_to_remove_ids
-                _logger.info('[CALC_TAGS] Tags facturación quitados: %s', self.invoiced_tags_to_remove_ids.mapped('name'))
-
-        # =====================================================
-        # 5. PRESERVAR TAGS QUE NO SON DE ML
-        # =====================================================
-        # Obtener todos los tags que están configurados en ML (para no quitar tags manuales)
-        all_ml_tags = self.default_tag_ids | self.get_all_configured_shipment_tags()
-        all_ml_tags |= self.invoiced_tag_ids | self.invoiced_tags_to_remove_ids
-
-        # Obtener tags de pago configurados
+        self.ensure_one()
+        statuses = statuses or {}
+        rules = self._get_compiled_rules(self.id)
         PaymentConfig = self.env['mercadolibre.payment.status.config']
-        all_payment_configs = PaymentConfig.search([])
-        for pc in all_payment_configs:
-            all_ml_tags |= pc.tag_ids
-
-        # Tags manuales (los que tiene la orden pero no están en ninguna config ML)
-        manual_tags = current_tags - all_ml_tags
-
-        # Agregar tags manuales al resultado final
-        new_tags |= manual_tags
+        payment_rules = PaymentConfig._get_compiled_rules(account_id or False, company_id or False)
+        ml_tag_ids = rules.ml_tag_ids | PaymentConfig._get_all_configured_tag_ids()
 
-        _logger.info('[CALC_TAGS] Tags manuales preservados: %s', manual_tags.mapped('name'))
-        _logger.info('[CALC_TAGS] Tags finales calculados: %s', new_tags.mapped('name'))
-
-        # =====================================================
-        # 6. APLICAR CAMBIOS
-        # =====================================================
-        if set(new_tags.ids) != set(current_tags.ids):
-            result['tags_removed'] = (current_tags - new_tags).mapped('name')
-            result['tags_added'] = (new_tags - current_tags).mapped('name')
-
-            sale_order.write({'tag_ids': [(6, 0, new_tags.ids)]})
+        changes = {}
+        for sale_order in sale_orders:
+            shipment_status, payment_status = statuses.get(
+                sale_order.id, (sale_order.ml_shipping_status, sale_order.ml_status)
+            )
+            current_ids = frozenset(sale_order.tag_ids.ids)
+
+            # 1. Por defecto + 2. estado de envío + 3. estado de pago
+            new_ids = set(rules.default_tag_ids)
+            new_ids |= self._match_shipment_tag_ids(rules, shipment_status)
+            new_ids |= PaymentConfig._match_payment_tag_ids(payment_rules, payment_status)
+
+            # 4. Facturación: agrega los configurados y quita solo los específicos
+            is_invoiced = sale_order.invoice_status == 'invoiced' or \
+                any(inv.state == 'posted' for inv in sale_order.invoice_ids)
+            if is_invoiced:
+                new_ids |= rules.invoiced_tag_ids
+                new_ids -= rules.invoiced_remove_tag_ids
+
+            # 5. Preservar tags manuales (no configurados en ML)
+            new_ids |= current_ids - ml_tag_ids
+
+            changes[sale_order.id] = (current_ids, new_ids)
+
+        # Un tag borrado no modifica la configuración (cascade en la tabla
+        # relacional), así que las reglas cacheadas pueden referenciarlo
+        all_tag_ids = set()
+        for current_ids, new_ids in changes.values():
+            all_tag_ids |= current_ids | new_ids
+        tags = self.env['crm.tag'].browse(sorted(all_tag_ids)).exists()
+        tag_names = dict((tag.id, tag.name) for tag in tags)
+
+        groups = defaultdict(list)
+        for order_id, (current_ids, new_ids) in changes.items():
+            new_ids = frozenset(new_ids).intersection(tag_names)
+            changes[order_id] = (current_ids, new_ids)
+            if new_ids != current_ids:
+                groups[new_ids].append(order_id)
+
+        # 6. Aplicar cambios agrupados por conjunto final de tags
+        SaleOrder = self.env['sale.order']
+        for new_ids, order_ids in groups.items():
+            SaleOrder.browse(order_ids).write({'tag_ids': [(6, 0, sorted(new_ids))]})
+
+        results = {}
+        for order_id, (current_ids, new_ids) in changes.items():
+            results[order_id] = {
+                'tags_added': [tag_names[t] for t in sorted(new_ids - current_ids)],
+                'tags_removed': [tag_names[t] for t in sorted(current_ids - new_ids)],
+                'final_tags': [tag_names[t] for t in sorted(new_ids)],
+            }
+
+        if groups:
             _logger.info(
-                '[CALC_TAGS] Cambios aplicados en %s: +%s -%s',
-                sale_order.name, result['tags_added'], result['tags_removed']
+                '[CALC_TAGS] Config "%s": %d/%d órdenes con cambios de tags (%d writes)',
+                self.name, sum(len(ids) for ids in groups.values()), len(changes), len(groups)
             )
-        else:
-            _logger.info('[CALC_TAGS] Sin cambios necesarios en tags para %s', sale_order.name)
-
-        result['final_tags'] = new_tags.mapped('name')
-
-        return result
+        return results
 
     def apply_field_updates(self, sale_order, shipment_status=None, payment_status=None):
         """
@@ -460,31 +524,22 @@ class MercadolibreLogisticType(models.Model):
             'errors': [],
         }
 
-        if not self.field_update_config_ids:
+        # Filtrar con las reglas compiladas: solo se leen las configs que aplican
+        rules = self._get_compiled_rules(self.id)
+        current = {'shipment': shipment_status, 'payment': payment_status}
+        config_ids = [
+            config_id
+            for config_id, trigger_type, trigger_statuses, _target in rules.field_rules
+            if current[trigger_type] and current[trigger_type] in trigger_statuses
+        ]
+        if not config_ids:
             return result
 
-        _logger.info(
-            '[FIELD_UPDATES] Verificando %d configs para %s (ship=%s, pay=%s)',
-            len(self.field_update_config_ids), sale_order.name,
-            shipment_status, payment_status
-        )
-
         # Obtener picking relacionado si es necesario
         picking = None
 
-        for config in self.field_update_config_ids.filtered('active'):
+        for config in self.env['mercadolibre.field.update.config'].browse(config_ids):
             try:
-                # Verificar si debe activarse
-                should_apply = False
-
-                if config.trigger_type == 'shipment' and shipment_status:
-                    should_apply = config.should_trigger('shipment', shipment_status)
-                elif config.trigger_type == 'payment' and payment_status:
-                    should_apply = config.should_trigger('payment', payment_status)
-
-                if not should_apply:
-                    continue
-
                 _logger.info(
                     '[FIELD_UPDATES] Config "%s" activada para %s',
                     config.name, sale_order.name
@@ -553,6 +608,25 @@ class MercadolibreLogisticType(models.Model):
 
         return result
 
+    def action_recompute_tags(self):
+        """Recalcula los tags de todas las órdenes de venta de este tipo logístico."""
+        self.ensure_one()
+        domain = [('ml_logistic_type', '=', self.code)]
+        if self.account_id:
+            domain.append(('ml_account_id', '=', self.account_id.id))
+        sale_orders = self.env['sale.order'].search(domain)
+        sale_orders._recompute_ml_tags()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Etiquetas Recalculadas',
+                'message': f'Se recalcularon las etiquetas de {len(sale_orders)} ordenes.',
+                'type': 'success',
+                'sticky': False,
+            }
+        }
+
 
 class MercadolibreShipmentStatusConfig(models.Model):
     """
@@ -640,6 +714,22 @@ class MercadolibreShipmentStatusConfig(models.Model):
             labels = [status_labels.get(s, s) for s in statuses]
             record.status_display = ', '.join(labels) if labels else 'Sin estados'
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['mercadolibre.logistic.type']._clear_rules_cache()
+        return records
+
+    def write(self, vals):
+        result = super().write(vals)
+        self.env['mercadolibre.logistic.type']._clear_rules_cache()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self.env['mercadolibre.logistic.type']._clear_rules_cache()
+        return result
+
     def get_status_list(self):
         """Retorna lista de estados seleccionados"""
         self.ensure_one()
@@ -741,6 +831,22 @@ class MercadolibrePaymentStatusConfig(models.Model):
         string='Notas'
     )
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['mercadolibre.logistic.type']._clear_rules_cache()
+        return records
+
+    def write(self, vals):
+        result = super().write(vals)
+        self.env['mercadolibre.logistic.type']._clear_rules_cache()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self.env['mercadolibre.logistic.type']._clear_rules_cache()
+        return result
+
     def get_status_list(self):
         """Retorna lista de estados seleccionados de orden ML"""
         self.ensure_one()
@@ -770,48 +876,55 @@ class MercadolibrePaymentStatusConfig(models.Model):
         return statuses
 
     @api.model
-    def get_tags_for_payment_status(self, payment_status, account_id=None, company_id=None):
+    @tools.ormcache('account_id', 'company_id')
+    def _get_compiled_rules(self, account_id, company_id):
         """
-        Obtiene las etiquetas correspondientes a un estado de pago/orden.
-
-        Args:
-            payment_status: Estado del pago/orden (paid, confirmed, approved, etc.)
-            account_id: ID de la cuenta ML (opcional)
-            company_id: ID de la compania (opcional)
+        Compila las configuraciones activas que aplican a una cuenta/compañía.
 
         Returns:
-            recordset de crm.tag
+            tuple: ((frozenset estados, frozenset tags), ...) en orden de secuencia
         """
-        import logging
-        _logger = logging.getLogger(__name__)
-
         domain = [('active', '=', True)]
         if account_id:
             domain.append(('account_id', 'in', [False, account_id]))
         if company_id:
             domain.append(('company_id', 'in', [False, company_id]))
-
-        configs = self.search(domain)
-        _logger.info(
-            '[PAYMENT_TAGS] Buscando tags para status=%s, account=%s, company=%s: encontradas %d configs',
-            payment_status, account_id, company_id, len(configs)
+        return tuple(
+            (frozenset(config.get_status_list()), frozenset(config.tag_ids.ids))
+            for config in self.sudo().search(domain)
         )
 
-        for config in configs:
-            status_list = config.get_status_list()
-            _logger.debug(
-                '[PAYMENT_TAGS] Config "%s" tiene estados: %s',
-                config.name, status_list
-            )
-            if payment_status in status_list:
-                _logger.info(
-                    '[PAYMENT_TAGS] Match! Config "%s" -> Tags: %s',
-                    config.name, config.tag_ids.mapped('name')
-                )
-                return config.tag_ids
+    @api.model
+    @tools.ormcache()
+    def _get_all_configured_tag_ids(self):
+        """Todos los tags configurados en estados de pago (para preservar los manuales)."""
+        return frozenset(self.sudo().search([]).tag_ids.ids)
+
+    @staticmethod
+    def _match_payment_tag_ids(payment_rules, payment_status):
+        """Tags de la primera configuración de pago que contiene el estado."""
+        if payment_status:
+            for statuses, tag_ids in payment_rules:
+                if payment_status in statuses:
+                    return tag_ids
+        return frozenset()
 
-        _logger.info('[PAYMENT_TAGS] No se encontró config para status=%s', payment_status)
-        return self.env['crm.tag']
+    @api.model
+    def get_tags_for_payment_status(self, payment_status, account_id=None, company_id=None):
+        """
+        Obtiene las etiquetas correspondientes a un estado de pago/orden.
+
+        Args:
+            payment_status: Estado del pago/orden (paid, confirmed, approved, etc.)
+            account_id: ID de la cuenta ML (opcional)
+            company_id: ID de la compania (opcional)
+
+        Returns:
+            recordset de crm.tag
+        """
+        payment_rules = self._get_compiled_rules(account_id or False, company_id or False)
+        tag_ids = self._match_payment_tag_ids(payment_rules, payment_status)
+        return self.env['crm.tag'].browse(sorted(tag_ids)).exists()
 
 
 class MercadolibreFieldUpdateConfig(models.Model):
@@ -993,6 +1106,22 @@ class MercadolibreFieldUpdateConfig(models.Model):
             labels = [status_labels.get(s, s) for s in statuses]
             record.status_display = ', '.join(labels) if labels else 'Sin estados'
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['mercadolibre.logistic.type']._clear_rules_cache()
+        return records
+
+    def write(self, vals):
+        result = super().write(vals)
+        self.env['mercadolibre.logistic.type']._clear_rules_cache()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self.env['mercadolibre.logistic.type']._clear_rules_cache()
+        return result
+
     def get_shipment_status_list(self):
         """Retorna lista de estados de envío seleccionados"""
         self.ensure_one()
@@ -1057,10 +1186,11 @@ class MercadolibreFieldUpdateConfig(models.Model):
         if self.trigger_type != trigger_type:
             return False
 
-        if trigger_type == 'shipment':
-            return status in self.get_shipment_status_list()
-        else:
-            return status in self.get_payment_status_list()
+        rules = self.env['mercadolibre.logistic.type']._get_compiled_rules(self.logistic_type_id.id)
+        for config_id, _trigger, statuses, _target in rules.field_rules:
+            if config_id == self.id:
+                return status in statuses
+        return False
 
     def get_value_to_set(self):
         """
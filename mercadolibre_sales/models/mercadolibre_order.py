@@ -381,6 +381,320 @@ class MercadolibreOrder(models.Model):
 
         # Preparar valores
         currency = self._get_currency(data.get('currency_id', 'MXN'))
+        vals = self._prepare_order_vals(data, account, currency)
+
+        buyer_data = data.get('buyer', {}) or {}
+        ml_buyer_id = vals['ml_buyer_id']
+
+        if existing:
+            _logger.info('Actualizando orden existente: %s', ml_order_id)
+            existing.write(vals)
+            order = existing
+            is_new = False
+
+            # Actualizar tags en sale.order si existe
+            existing._sync_sale_order_ml_tags(vals)
+        else:
+            _logger.info('Creando nueva orden: %s', ml_order_id)
+            order = self.create(vals)
+            is_new = True
+
+        # Crear/actualizar items
+        self._sync_items(order, data.get('order_items', []))
+
+        # Crear/actualizar comprador
+        if ml_buyer_id:
+            buyer = self._sync_buyer(buyer_data, account)
+            if buyer:
+                order.buyer_id = buyer.id
+
+        # Si no se pudo determinar el logistic_type desde la orden,
+        # intentar obtenerlo del shipment
+        if not order.logistic_type and order.ml_shipment_id:
+            try:
+                fetched_type = order._fetch_logistic_type_from_shipment()
+                if fetched_type:
+                    order.write({'logistic_type': fetched_type})
+                    _logger.info(
+                        'Logistic type obtenido del shipment para orden %s: %s',
+                        ml_order_id, fetched_type
+                    )
+            except Exception as e:
+                _logger.warning(
+                    'No se pudo obtener logistic_type del shipment para orden %s: %s',
+                    ml_order_id, e
+                )
+
+        return order, is_new
+
+    @api.model
+    def create_from_ml_data_batch(self, payloads, account):
+        """
+        Crea o actualiza un lote de ordenes desde los datos de MercadoLibre.
+
+        Equivalente a llamar create_from_ml_data por cada payload, pero con
+        las búsquedas agrupadas: ordenes, monedas y compradores existentes se
+        precargan con una consulta IN, las ordenes nuevas se crean en un solo
+        create() junto con sus items y las existentes solo se escriben si
+        cambió su last_updated o su estado.
+
+        Args:
+            payloads: lista de dicts con los datos de las ordenes desde la API
+            account: mercadolibre.account record
+
+        Returns:
+            lista de (mercadolibre.order record, bool is_new) en el orden de entrada
+        """
+        BuyerModel = self.env['mercadolibre.buyer']
+        ItemModel = self.env['mercadolibre.order.item']
+
+        # Deduplicar por ID conservando la ultima version recibida
+        payload_by_id = {}
+        for data in payloads:
+            ml_order_id = str(data.get('id', '') or '')
+            if not ml_order_id:
+                _logger.error('No se encontro ID de orden en los datos')
+                continue
+            payload_by_id[ml_order_id] = data
+
+        if not payload_by_id:
+            return []
+
+        # Precarga de ordenes existentes
+        existing_by_id = {
+            order.ml_order_id: order
+            for order in self.search([
+                ('ml_order_id', 'in', list(payload_by_id)),
+                ('account_id', '=', account.id),
+            ])
+        }
+
+        # Precarga de monedas
+        currency_codes = {data.get('currency_id', 'MXN') for data in payload_by_id.values()}
+        currency_codes.discard(None)
+        currency_codes.discard('')
+        currencies = {
+            currency.name: currency
+            for currency in self.env['res.currency'].search([('name', 'in', list(currency_codes))])
+        } if currency_codes else {}
+
+        # Precarga y upsert de compradores
+        buyer_vals_by_id = {}
+        for data in payload_by_id.values():
+            buyer_data = data.get('buyer', {}) or {}
+            if buyer_data.get('id'):
+                buyer_vals = self._prepare_buyer_vals(buyer_data, account)
+                buyer_vals_by_id[buyer_vals['ml_buyer_id']] = buyer_vals
+
+        buyers = {}
+        if buyer_vals_by_id:
+            buyers = {
+                buyer.ml_buyer_id: buyer
+                for buyer in BuyerModel.search([
+                    ('ml_buyer_id', 'in', list(buyer_vals_by_id)),
+                    ('account_id', '=', account.id),
+                ])
+            }
+            for ml_buyer_id, buyer in buyers.items():
+                buyer_vals = buyer_vals_by_id[ml_buyer_id]
+                changed = {
+                    key: value for key, value in buyer_vals.items()
+                    if key not in ('account_id', 'ml_buyer_id') and (buyer[key] or '') != (value or '')
+                }
+                if changed:
+                    buyer.write(changed)
+            new_buyer_vals = [
+                vals for ml_buyer_id, vals in buyer_vals_by_id.items()
+                if ml_buyer_id not in buyers
+            ]
+            if new_buyer_vals:
+                for buyer in BuyerModel.create(new_buyer_vals):
+                    buyers[buyer.ml_buyer_id] = buyer
+
+        # Preparar valores de cada orden
+        vals_by_id = {}
+        for ml_order_id, data in payload_by_id.items():
+            currency = currencies.get(data.get('currency_id', 'MXN'), False)
+            vals = self._prepare_order_vals(data, account, currency)
+            buyer = buyers.get(vals['ml_buyer_id'])
+            if buyer:
+                vals['buyer_id'] = buyer.id
+            vals_by_id[ml_order_id] = vals
+
+        # Crear ordenes nuevas en un solo create con sus items
+        new_ids = [ml_order_id for ml_order_id in payload_by_id if ml_order_id not in existing_by_id]
+        orders_by_id = dict(existing_by_id)
+        if new_ids:
+            _logger.info('Creando %d ordenes nuevas en lote', len(new_ids))
+            create_vals = []
+            for ml_order_id in new_ids:
+                vals = dict(vals_by_id[ml_order_id])
+                vals['item_ids'] = [
+                    (0, 0, self._prepare_item_vals(item_data))
+                    for item_data in payload_by_id[ml_order_id].get('order_items', []) or []
+                ]
+                create_vals.append(vals)
+            for order in self.create(create_vals):
+                orders_by_id[order.ml_order_id] = order
+
+        # Actualizar solo las ordenes existentes que cambiaron
+        changed_orders = self.browse()
+        unchanged_orders = self.browse()
+        for ml_order_id, order in existing_by_id.items():
+            vals = vals_by_id[ml_order_id]
+            if (order.date_last_updated and order.date_last_updated == vals['date_last_updated']
+                    and order.status == vals['status']):
+                unchanged_orders |= order
+                continue
+            _logger.info('Actualizando orden existente: %s', ml_order_id)
+            order.write(vals)
+            changed_orders |= order
+
+        if unchanged_orders:
+            unchanged_orders.write({'last_sync_date': fields.Datetime.now()})
+
+        if changed_orders:
+            changed_orders.mapped('item_ids').unlink()
+            item_vals = []
+            for order in changed_orders:
+                for item_data in payload_by_id[order.ml_order_id].get('order_items', []) or []:
+                    item_vals.append(dict(self._prepare_item_vals(item_data), order_id=order.id))
+            if item_vals:
+                ItemModel.create(item_vals)
+            for order in changed_orders:
+                order._sync_sale_order_ml_tags(vals_by_id[order.ml_order_id])
+
+        # Completar logistic_type desde los shipments en un solo multiget
+        missing_logistic = [
+            order for order in orders_by_id.values()
+            if not order.logistic_type and order.ml_shipment_id
+        ]
+        if missing_logistic:
+            try:
+                found, errors = self.env['mercadolibre.http']._multiget(
+                    account.id, 'shipments', [order.ml_shipment_id for order in missing_logistic]
+                )
+                for order in missing_logistic:
+                    shipment_data = found.get(order.ml_shipment_id)
+                    if not shipment_data:
+                        _logger.warning(
+                            'No se pudo obtener logistic_type del shipment para orden %s: %s',
+                            order.ml_order_id, errors.get(order.ml_shipment_id)
+                        )
+                        continue
+                    fetched_type = self._get_logistic_type_from_shipment_data(shipment_data)
+                    if fetched_type:
+                        order.write({'logistic_type': fetched_type})
+            except Exception as e:
+                _logger.warning('No se pudo obtener logistic_type de los shipments: %s', e)
+
+        return [
+            (orders_by_id[ml_order_id], ml_order_id not in existing_by_id)
+            for ml_order_id in payload_by_id
+        ]
+
+    @api.model
+    def benchmark_upsert(self, account, count=50):
+        """
+        Mide consultas SQL y tiempo por orden del upsert uno por uno
+        (create_from_ml_data) contra el upsert por lote
+        (create_from_ml_data_batch).
+
+        Usa el raw_data de las ultimas `count` ordenes de la cuenta en tres
+        escenarios: ordenes existentes con last_updated nuevo (ambos caminos
+        reescriben la orden), ordenes existentes sin cambios (payload tal
+        cual, el lote las omite) y ordenes nuevas (mismo payload con otro ID,
+        camino de creacion). El logistic_type se fija en el payload para no
+        medir llamadas HTTP a shipments. Cada medicion se revierte con un
+        savepoint.
+
+        Returns:
+            dict con keys: count y, por escenario ('existing', 'unchanged',
+            'new'), un dict con before/after (consultas por orden) y
+            before_ms/after_ms (milisegundos por orden)
+        """
+        orders = self.search([
+            ('account_id', '=', account.id),
+            ('raw_data', '!=', False),
+        ], limit=count, order='id desc')
+        if not orders:
+            raise ValidationError(_('La cuenta no tiene ordenes sincronizadas con datos de ML'))
+
+        payloads = []
+        for order in orders:
+            data = json.loads(order.raw_data)
+            shipping = data.get('shipping') or {}
+            data['shipping'] = dict(shipping, logistic_type=order.logistic_type or 'not_specified')
+            payloads.append(data)
+        # last_updated posterior al guardado para que el lote no omita la orden
+        last_updated = (fields.Datetime.now() + timedelta(minutes=1)).strftime('%Y-%m-%dT%H:%M:%S.000-00:00')
+        updated_payloads = [dict(data, last_updated=last_updated) for data in payloads]
+        new_payloads = [dict(data, id=f"BENCH{data.get('id')}") for data in payloads]
+
+        cr = self.env.cr
+
+        class Rollback(Exception):
+            pass
+
+        def measure(upsert, batch):
+            self.env.flush_all()
+            queries = elapsed = 0
+            try:
+                with cr.savepoint():
+                    start_queries = cr.sql_log_count
+                    start = time.perf_counter()
+                    upsert(batch)
+                    self.env.flush_all()
+                    elapsed = time.perf_counter() - start
+                    queries = cr.sql_log_count - start_queries
+                    raise Rollback()
+            except Rollback:
+                pass
+            self.env.invalidate_all()
+            return queries / len(batch), elapsed * 1000 / len(batch)
+
+        def one_by_one(batch):
+            for data in batch:
+                self.create_from_ml_data(data, account)
+
+        def in_batch(batch):
+            self.create_from_ml_data_batch(batch, account)
+
+        result = {'count': len(payloads)}
+        for scenario, batch in (
+            ('existing', updated_payloads),
+            ('unchanged', payloads),
+            ('new', new_payloads),
+        ):
+            before, before_ms = measure(one_by_one, batch)
+            after, after_ms = measure(in_batch, batch)
+            result[scenario] = {
+                'before': before,
+                'after': after,
+                'before_ms': before_ms,
+                'after_ms': after_ms,
+            }
+            _logger.info(
+                'Benchmark upsert ordenes (%s, %d): antes %.1f consultas/orden (%.1f ms), '
+                'ahora %.1f consultas/orden (%.1f ms)',
+                scenario, len(batch), before, before_ms, after, after_ms
+            )
+        return result
+
+    @api.model
+    def _prepare_order_vals(self, data, account, currency):
+        """
+        Construye los valores de mercadolibre.order a partir de los datos de la API.
+
+        Args:
+            data: dict con los datos de la orden desde la API
+            account: mercadolibre.account record
+            currency: res.currency record (o False)
+
+        Returns:
+            dict de valores para create/write
+        """
+        ml_order_id = str(data.get('id', ''))
 
         # Buyer info
         buyer_data = data.get('buyer', {}) or {}
@@ -425,78 +739,44 @@ class MercadolibreOrder(models.Model):
             'last_sync_date': fields.Datetime.now(),
         }
 
-        if existing:
-            _logger.info('Actualizando orden existente: %s', ml_order_id)
-            existing.write(vals)
-            order = existing
-            is_new = False
+        return vals
 
-            # =========================================================
-            # ACTUALIZAR TAGS EN SALE.ORDER SI EXISTE
-            # =========================================================
-            if existing.sale_order_id:
-                try:
-                    # Obtener estado de envío usando el método helper
-                    current_shipping_status = existing._get_shipping_status()
-                    _logger.info(
-                        '[TAGS_SYNC] Actualizando tags para %s: shipping=%s, payment=%s',
-                        existing.sale_order_id.name,
-                        current_shipping_status,
-                        vals.get('status') or existing.status
-                    )
-
-                    tag_result = existing.sale_order_id._update_ml_status_and_tags(
-                        shipment_status=current_shipping_status,
-                        payment_status=vals.get('status') or existing.status,
-                        ml_tags=vals.get('ml_tags'),
-                        paid_amount=vals.get('paid_amount'),
-                    )
-                    if tag_result.get('tags_added') or tag_result.get('tags_removed'):
-                        _logger.info(
-                            '[TAGS_SYNC] Tags actualizados en %s: +%s -%s',
-                            existing.sale_order_id.name,
-                            tag_result.get('tags_added', []),
-                            tag_result.get('tags_removed', [])
-                        )
-                    elif tag_result.get('updated'):
-                        _logger.info('[TAGS_SYNC] Estados ML actualizados en %s', existing.sale_order_id.name)
-                    else:
-                        _logger.info('[TAGS_SYNC] Sin cambios en tags para %s', existing.sale_order_id.name)
-                except Exception as e:
-                    _logger.error('[TAGS_SYNC] Error actualizando tags en sale.order %s: %s',
-                                  existing.sale_order_id.name, e, exc_info=True)
-        else:
-            _logger.info('Creando nueva orden: %s', ml_order_id)
-            order = self.create(vals)
-            is_new = True
-
-        # Crear/actualizar items
-        self._sync_items(order, data.get('order_items', []))
+    def _sync_sale_order_ml_tags(self, vals):
+        """Actualiza estados y tags ML en la sale.order vinculada tras un cambio de la orden"""
+        self.ensure_one()
+        if not self.sale_order_id:
+            return
 
-        # Crear/actualizar comprador
-        if ml_buyer_id:
-            buyer = self._sync_buyer(buyer_data, account)
-            if buyer:
-                order.buyer_id = buyer.id
+        try:
+            # Obtener estado de envío usando el método helper
+            current_shipping_status = self._get_shipping_status()
+            _logger.info(
+                '[TAGS_SYNC] Actualizando tags para %s: shipping=%s, payment=%s',
+                self.sale_order_id.name,
+                current_shipping_status,
+                vals.get('status') or self.status
+            )
 
-        # Si no se pudo determinar el logistic_type desde la orden,
-        # intentar obtenerlo del shipment
-        if not order.logistic_type and order.ml_shipment_id:
-            try:
-                fetched_type = order._fetch_logistic_type_from_shipment()
-                if fetched_type:
-                    order.write({'logistic_type': fetched_type})
-                    _logger.info(
-                        'Logistic type obtenido del shipment para orden %s: %s',
-                        ml_order_id, fetched_type
-                    )
-            except Exception as e:
-                _logger.warning(
-                    'No se pudo obtener logistic_type del shipment para orden %s: %s',
-                    ml_order_id, e
+            tag_result = self.sale_order_id._update_ml_status_and_tags(
+                shipment_status=current_shipping_status,
+                payment_status=vals.get('status') or self.status,
+                ml_tags=vals.get('ml_tags'),
+                paid_amount=vals.get('paid_amount'),
+            )
+            if tag_result.get('tags_added') or tag_result.get('tags_removed'):
+                _logger.info(
+                    '[TAGS_SYNC] Tags actualizados en %s: +%s -%s',
+                    self.sale_order_id.name,
+                    tag_result.get('tags_added', []),
+                    tag_result.get('tags_removed', [])
                 )
-
-        return order, is_new
+            elif tag_result.get('updated'):
+                _logger.info('[TAGS_SYNC] Estados ML actualizados en %s', self.sale_order_id.name)
+            else:
+                _logger.info('[TAGS_SYNC] Sin cambios en tags para %s', self.sale_order_id.name)
+        except Exception as e:
+            _logger.error('[TAGS_SYNC] Error actualizando tags en sale.order %s: %s',
+                          self.sale_order_id.name, e, exc_info=True)
 
     def _get_logistic_type_from_data(self, data):
         """
@@ -567,22 +847,25 @@ class MercadolibreOrder(models.Model):
         order.item_ids.unlink()
 
         for item_data in items_data:
-            item_info = item_data.get('item', {}) or {}
+            ItemModel.create(dict(self._prepare_item_vals(item_data), order_id=order.id))
 
-            ItemModel.create({
-                'order_id': order.id,
-                'ml_item_id': item_info.get('id', ''),
-                'title': item_info.get('title', ''),
-                'category_id': item_info.get('category_id', ''),
-                'variation_id': str(item_info.get('variation_id', '')) if item_info.get('variation_id') else '',
-                'seller_sku': item_info.get('seller_sku', '') or item_info.get('seller_custom_field', ''),
-                'condition': item_info.get('condition', ''),
-                'quantity': item_data.get('quantity', 1),
-                'unit_price': item_data.get('unit_price', 0.0),
-                'full_unit_price': item_data.get('full_unit_price', 0.0),
-                'sale_fee': item_data.get('sale_fee', 0.0),
-                'listing_type_id': item_data.get('listing_type_id', ''),
-            })
+    @api.model
+    def _prepare_item_vals(self, item_data):
+        """Construye los valores de mercadolibre.order.item desde order_items de la API"""
+        item_info = item_data.get('item', {}) or {}
+        return {
+            'ml_item_id': item_info.get('id', ''),
+            'title': item_info.get('title', ''),
+            'category_id': item_info.get('category_id', ''),
+            'variation_id': str(item_info.get('variation_id', '')) if item_info.get('variation_id') else '',
+            'seller_sku': item_info.get('seller_sku', '') or item_info.get('seller_custom_field', ''),
+            'condition': item_info.get('condition', ''),
+            'quantity': item_data.get('quantity', 1),
+            'unit_price': item_data.get('unit_price', 0.0),
+            'full_unit_price': item_data.get('full_unit_price', 0.0),
+            'sale_fee': item_data.get('sale_fee', 0.0),
+            'listing_type_id': item_data.get('listing_type_id', ''),
+        }
 
     def _sync_buyer(self, buyer_data, account):
         """Crea o actualiza el comprador"""
@@ -597,14 +880,7 @@ class MercadolibreOrder(models.Model):
             ('account_id', '=', account.id)
         ], limit=1)
 
-        vals = {
-            'account_id': account.id,
-            'ml_buyer_id': ml_buyer_id,
-            'nickname': buyer_data.get('nickname', ''),
-            'first_name': buyer_data.get('first_name', ''),
-            'last_name': buyer_data.get('last_name', ''),
-            'email': buyer_data.get('email', ''),
-        }
+        vals = self._prepare_buyer_vals(buyer_data, account)
 
         if existing:
             existing.write(vals)
@@ -612,6 +888,18 @@ class MercadolibreOrder(models.Model):
         else:
             return BuyerModel.create(vals)
 
+    @api.model
+    def _prepare_buyer_vals(self, buyer_data, account):
+        """Construye los valores de mercadolibre.buyer desde los datos de la API"""
+        return {
+            'account_id': account.id,
+            'ml_buyer_id': str(buyer_data.get('id', '')),
+            'nickname': buyer_data.get('nickname', ''),
+            'first_name': buyer_data.get('first_name', ''),
+            'last_name': buyer_data.get('last_name', ''),
+            'email': buyer_data.get('email', ''),
+        }
+
     def _get_currency(self, currency_code):
         """Obtiene la moneda de Odoo por codigo"""
         if not currency_code:
@@ -676,7 +964,6 @@ class MercadolibreOrder(models.Model):
         Util cuando el logistic_type no viene en la orden directamente.
         """
         self.ensure_one()
-        import requests
 
         if not self.ml_shipment_id:
             return {
@@ -722,7 +1009,6 @@ class MercadolibreOrder(models.Model):
         Retorna el logistic_type mapeado o False.
         """
         self.ensure_one()
-        import requests
 
         if not self.ml_shipment_id:
             return False
@@ -740,73 +1026,10 @@ class MercadolibreOrder(models.Model):
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, headers=headers, timeout=30)
 
             if response.status_code == 200:
-                data = response.json()
-
-                # Mapeo de valores de ML a nuestro selection
-                logistic_map = {
-                    'fulfillment': 'fulfillment',
-                    'xd_drop_off': 'xd_drop_off',
-                    'cross_docking': 'cross_docking',
-                    'drop_off': 'drop_off',
-                    'self_service': 'self_service',
-                    'custom': 'custom',
-                    'not_specified': 'not_specified',
-                    'default': 'default',
-                }
-
-                # Log completo de datos recibidos para debug
-                _logger.info(
-                    'Shipment %s data: logistic_type=%s, logistic=%s, mode=%s, tags=%s',
-                    self.ml_shipment_id,
-                    data.get('logistic_type'),
-                    data.get('logistic'),
-                    data.get('mode'),
-                    data.get('tags')
-                )
-
-                # El logistic_type puede venir directamente o en logistic.type
-                logistic_type = data.get('logistic_type', '')
-
-                if not logistic_type:
-                    logistic = data.get('logistic', {}) or {}
-                    logistic_type = logistic.get('type', '')
-
-                if logistic_type and logistic_type in logistic_map:
-                    _logger.info('Logistic type obtenido para shipment %s: %s -> %s',
-                               self.ml_shipment_id, logistic_type, logistic_map[logistic_type])
-                    return logistic_map[logistic_type]
-
-                # Intentar inferir del modo
-                mode = data.get('mode', '')
-                if not mode:
-                    logistic = data.get('logistic', {}) or {}
-                    mode = logistic.get('mode', '')
-
-                if mode == 'custom':
-                    # Envio propio del vendedor
-                    _logger.info('Shipment %s: modo custom -> custom', self.ml_shipment_id)
-                    return 'custom'
-                elif mode == 'me1':
-                    _logger.info('Shipment %s: modo me1 -> custom', self.ml_shipment_id)
-                    return 'custom'
-                elif mode == 'me2':
-                    # me2 sin tipo especifico, buscar en tags
-                    tags = data.get('tags', []) or []
-                    if 'fulfillment' in str(tags).lower():
-                        _logger.info('Shipment %s: modo me2 con tag fulfillment -> fulfillment', self.ml_shipment_id)
-                        return 'fulfillment'
-                    _logger.info('Shipment %s: modo me2 sin fulfillment -> xd_drop_off', self.ml_shipment_id)
-                    return 'xd_drop_off'  # Por defecto para me2
-                elif mode == 'not_specified':
-                    # A convenir
-                    _logger.info('Shipment %s: modo not_specified -> not_specified', self.ml_shipment_id)
-                    return 'not_specified'
-
-                _logger.warning('Shipment %s: no se pudo determinar logistic_type, modo=%s', self.ml_shipment_id, mode)
-                return False
+                return self._get_logistic_type_from_shipment_data(response.json())
 
             else:
                 _logger.error('Error obteniendo shipment %s: %s',
@@ -818,6 +1041,79 @@ class MercadolibreOrder(models.Model):
                         self.ml_shipment_id, str(e))
             return False
 
+    @api.model
+    def _get_logistic_type_from_shipment_data(self, data):
+        """
+        Determina el logistic_type a partir de la respuesta de /shipments/{id}.
+
+        Returns:
+            str logistic_type o False
+        """
+        shipment_id = data.get('id')
+
+        # Mapeo de valores de ML a nuestro selection
+        logistic_map = {
+            'fulfillment': 'fulfillment',
+            'xd_drop_off': 'xd_drop_off',
+            'cross_docking': 'cross_docking',
+            'drop_off': 'drop_off',
+            'self_service': 'self_service',
+            'custom': 'custom',
+            'not_specified': 'not_specified',
+            'default': 'default',
+        }
+
+        # Log completo de datos recibidos para debug
+        _logger.info(
+            'Shipment %s data: logistic_type=%s, logistic=%s, mode=%s, tags=%s',
+            shipment_id,
+            data.get('logistic_type'),
+            data.get('logistic'),
+            data.get('mode'),
+            data.get('tags')
+        )
+
+        # El logistic_type puede venir directamente o en logistic.type
+        logistic_type = data.get('logistic_type', '')
+
+        if not logistic_type:
+            logistic = data.get('logistic', {}) or {}
+            logistic_type = logistic.get('type', '')
+
+        if logistic_type and logistic_type in logistic_map:
+            _logger.info('Logistic type obtenido para shipment %s: %s -> %s',
+                       shipment_id, logistic_type, logistic_map[logistic_type])
+            return logistic_map[logistic_type]
+
+        # Intentar inferir del modo
+        mode = data.get('mode', '')
+        if not mode:
+            logistic = data.get('logistic', {}) or {}
+            mode = logistic.get('mode', '')
+
+        if mode == 'custom':
+            # Envio propio del vendedor
+            _logger.info('Shipment %s: modo custom -> custom', shipment_id)
+            return 'custom'
+        elif mode == 'me1':
+            _logger.info('Shipment %s: modo me1 -> custom', shipment_id)
+            return 'custom'
+        elif mode == 'me2':
+            # me2 sin tipo especifico, buscar en tags
+            tags = data.get('tags', []) or []
+            if 'fulfillment' in str(tags).lower():
+                _logger.info('Shipment %s: modo me2 con tag fulfillment -> fulfillment', shipment_id)
+                return 'fulfillment'
+            _logger.info('Shipment %s: modo me2 sin fulfillment -> xd_drop_off', shipment_id)
+            return 'xd_drop_off'  # Por defecto para me2
+        elif mode == 'not_specified':
+            # A convenir
+            _logger.info('Shipment %s: modo not_specified -> not_specified', shipment_id)
+            return 'not_specified'
+
+        _logger.warning('Shipment %s: no se pudo determinar logistic_type, modo=%s', shipment_id, mode)
+        return False
+
     def action_view_raw_data(self):
         """Muestra los datos crudos de la orden"""
         self.ensure_one()
@@ -841,7 +1137,6 @@ class MercadolibreOrder(models.Model):
         Obtiene y sincroniza los descuentos desde /orders/{id}/discounts
         """
         self.ensure_one()
-        import requests
 
         if not self.ml_order_id:
             return False
@@ -859,7 +1154,7 @@ class MercadolibreOrder(models.Model):
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, headers=headers, timeout=30)
 
             if response.status_code == 200:
                 data = response.json()
@@ -1043,74 +1338,177 @@ class MercadolibreOrder(models.Model):
 
         Usa la configuracion del tipo logistico para determinar
         si debe confirmar automaticamente la orden y el picking.
+
+        Se ejecuta con mercadolibre.job: lotes por ID ascendente con commit
+        por lote y cursor persistente; si se agota el tiempo el cron se
+        vuelve a disparar y continua desde el ultimo lote confirmado.
         """
         _logger.info('Iniciando cron de creacion de ordenes de venta')
 
-        # Buscar ordenes pendientes de crear
-        orders = self.search([
+        domain = [
             ('status', 'in', ['paid', 'partially_paid']),
             ('sale_order_id', '=', False),
             ('odoo_order_state', 'in', ['pending', 'error']),
-        ], limit=100)  # Limitar para evitar timeouts
+        ]
+        stats = {'created': 0, 'errors': 0}
+        configs = {}
 
-        if not orders:
-            _logger.info('No hay ordenes pendientes de crear')
-            return
-
-        _logger.info('Procesando %d ordenes pendientes', len(orders))
+        def fetch(cursor, limit):
+            orders = self.search(domain + [('id', '>', int(cursor or 0))], order='id', limit=limit)
+            return orders, orders[-1:].id
 
-        created_count = 0
-        error_count = 0
+        def process(orders):
+            import_context = orders._prepare_import_context()
+            import_context['deferred_pickings'] = []
 
-        for order in orders:
-            try:
-                # Buscar configuracion de sincronizacion para esta cuenta
-                config = self.env['mercadolibre.order.sync.config'].search([
-                    ('account_id', '=', order.account_id.id),
-                    ('create_sale_orders', '=', True),
-                ], limit=1)
+            for order in orders:
+                try:
+                    # Buscar configuracion de sincronizacion para esta cuenta
+                    config = configs.get(order.account_id.id)
+                    if config is None:
+                        config = self.env['mercadolibre.order.sync.config'].search([
+                            ('account_id', '=', order.account_id.id),
+                            ('create_sale_orders', '=', True),
+                        ], limit=1)
+
+                        if not config:
+                            # Crear configuracion temporal minima
+                            config = self.env['mercadolibre.order.sync.config'].new({
+                                'account_id': order.account_id.id,
+                                'name': 'Temporal',
+                                'create_sale_orders': True,
+                            })
+                        configs[order.account_id.id] = config
+
+                    # Crear la orden de venta
+                    sale_order = order._create_sale_order(config, import_context)
+
+                    if sale_order:
+                        stats['created'] += 1
+                        _logger.info('Orden %s creada exitosamente: %s',
+                                   order.ml_order_id, sale_order.name)
+                    else:
+                        stats['errors'] += 1
 
-                if not config:
-                    # Crear configuracion temporal minima
-                    config = self.env['mercadolibre.order.sync.config'].new({
-                        'account_id': order.account_id.id,
-                        'name': 'Temporal',
-                        'create_sale_orders': True,
+                except Exception as e:
+                    stats['errors'] += 1
+                    _logger.error('Error creando orden para %s: %s',
+                                order.ml_order_id, str(e))
+                    order.write({
+                        'odoo_order_state': 'error',
+                        'odoo_order_error': str(e),
                     })
 
-                # Crear la orden de venta
-                sale_order = order._create_sale_order(config)
+            if import_context['deferred_pickings']:
+                self._process_deferred_pickings(import_context['deferred_pickings'])
 
-                if sale_order:
-                    created_count += 1
-                    _logger.info('Orden %s creada exitosamente: %s',
-                               order.ml_order_id, sale_order.name)
-                else:
-                    error_count += 1
+        job_stats = self.env['mercadolibre.job']._run_chunked(
+            'mercadolibre.order.create_sale_orders',
+            fetch,
+            process,
+            cron=self.env.ref('mercadolibre_sales.ir_cron_mercadolibre_create_sale_orders',
+                              raise_if_not_found=False),
+        )
 
-            except Exception as e:
-                error_count += 1
-                _logger.error('Error creando orden para %s: %s',
-                            order.ml_order_id, str(e))
-                order.write({
-                    'odoo_order_state': 'error',
-                    'odoo_order_error': str(e),
-                })
+        _logger.info('Cron finalizado: %d creadas, %d errores (%d lotes, %s)',
+                    stats['created'], stats['errors'], job_stats['chunks'],
+                    'completo' if job_stats['drained'] else 'continua en la siguiente ejecucion')
+
+    def _prepare_import_context(self):
+        """
+        Precarga las búsquedas que necesita _create_sale_order para las
+        ordenes de self, de modo que importar un lote haga un número fijo
+        de consultas en lugar de varias por orden y por línea.
 
-        _logger.info('Cron finalizado: %d creadas, %d errores',
-                    created_count, error_count)
+        El dict se actualiza durante la importación (ordenes y partners
+        creados) para que las siguientes ordenes del lote los encuentren.
 
-    def _create_sale_order(self, config):
+        Returns:
+            dict con keys:
+                sale_orders_by_ref: {(client_order_ref, company_id): sale.order}
+                warehouse_by_company: {company_id: stock.warehouse}
+                default_warehouse: stock.warehouse
+                pricelist_by_company: {company_id o False: product.pricelist}
+                default_pricelist: product.pricelist
+                products_by_sku: {default_code: product.product}
+                partners_by_email: {(email, company_id o False): res.partner}
+        """
+        companies = self.mapped('company_id')
+        company_ids = companies.ids
+
+        # Ordenes de venta existentes por referencia
+        refs = list({order.ml_pack_id or order.ml_order_id for order in self})
+        sale_orders_by_ref = {}
+        if refs:
+            for sale_order in self.env['sale.order'].search([
+                ('client_order_ref', 'in', refs),
+                ('company_id', 'in', company_ids),
+            ], order='id desc'):
+                # Referencias duplicadas: la mas reciente, como la busqueda individual
+                sale_orders_by_ref.setdefault((sale_order.client_order_ref, sale_order.company_id.id), sale_order)
+
+        # Almacenes por compania
+        Warehouse = self.env['stock.warehouse']
+        warehouse_by_company = {}
+        for warehouse in Warehouse.search([('company_id', 'in', company_ids)]):
+            warehouse_by_company.setdefault(warehouse.company_id.id, warehouse)
+
+        # Tarifas por compania y globales
+        Pricelist = self.env['product.pricelist']
+        pricelist_by_company = {}
+        for pricelist in Pricelist.search([('company_id', 'in', company_ids + [False])]):
+            pricelist_by_company.setdefault(pricelist.company_id.id or False, pricelist)
+
+        # Productos por SKU
+        skus = list(set(self.mapped('item_ids.seller_sku')) - {False, ''})
+        products_by_sku = {}
+        if skus:
+            for product in self.env['product.product'].search([('default_code', 'in', skus)]):
+                products_by_sku.setdefault(product.default_code, product)
+
+        # Partners por email de los compradores sin partner
+        emails = list(set(
+            self.mapped('buyer_id').filtered(lambda b: not b.partner_id).mapped('email')
+        ) - {False, ''})
+        partners_by_email = {}
+        if emails:
+            for partner in self.env['res.partner'].search([
+                ('email', 'in', emails),
+                ('company_id', 'in', company_ids + [False]),
+            ]):
+                partners_by_email.setdefault((partner.email, partner.company_id.id or False), partner)
+
+        return {
+            'sale_orders_by_ref': sale_orders_by_ref,
+            'warehouse_by_company': warehouse_by_company,
+            'default_warehouse': (
+                Warehouse.browse() if len(warehouse_by_company) == len(companies)
+                else Warehouse.search([], limit=1)
+            ),
+            'pricelist_by_company': pricelist_by_company,
+            'default_pricelist': (
+                Pricelist.browse() if pricelist_by_company
+                else Pricelist.search([], limit=1)
+            ),
+            'products_by_sku': products_by_sku,
+            'partners_by_email': partners_by_email,
+        }
+
+    def _create_sale_order(self, config, import_context=None):
         """
         Crea la orden de venta en Odoo basandose en la configuracion.
 
         Args:
             config: mercadolibre.order.sync.config record con la configuracion
+            import_context: dict de _prepare_import_context compartido por el lote
+                (opcional, si no se indica se prepara solo para esta orden)
 
         Returns:
             sale.order record o False
         """
         self.ensure_one()
+        if import_context is None:
+            import_context = self._prepare_import_context()
 
         # Validar que no tenga ya una orden creada
         if self.sale_order_id:
@@ -1121,10 +1519,7 @@ class MercadolibreOrder(models.Model):
         client_order_ref = self.ml_pack_id if self.ml_pack_id else self.ml_order_id
 
         # Validar si ya existe una orden con esta referencia (creada manualmente o por otro proceso)
-        existing_order = self.env['sale.order'].search([
-            ('client_order_ref', '=', client_order_ref),
-            ('company_id', '=', self.company_id.id),
-        ], limit=1)
+        existing_order = import_context['sale_orders_by_ref'].get((client_order_ref, self.company_id.id))
 
         if existing_order:
             _logger.info('Orden con referencia %s ya existe: %s - vinculando', client_order_ref, existing_order.name)
@@ -1157,7 +1552,7 @@ class MercadolibreOrder(models.Model):
 
         try:
             # Obtener o crear partner
-            partner = self._get_or_create_partner(config)
+            partner = self._get_or_create_partner(config, import_context)
             if not partner:
                 raise ValidationError(_('No se pudo obtener/crear el cliente'))
 
@@ -1171,13 +1566,9 @@ class MercadolibreOrder(models.Model):
             elif config.default_warehouse_id:
                 warehouse = config.default_warehouse_id
             if not warehouse:
-                # Buscar almacen de la compania
-                warehouse = self.env['stock.warehouse'].search([
-                    ('company_id', '=', self.company_id.id)
-                ], limit=1)
-            if not warehouse:
-                # Buscar cualquier almacen disponible
-                warehouse = self.env['stock.warehouse'].search([], limit=1)
+                # Almacen de la compania o, si no hay, cualquier almacen disponible
+                warehouse = (import_context['warehouse_by_company'].get(self.company_id.id)
+                             or import_context['default_warehouse'])
             if not warehouse:
                 raise ValidationError(_('No se encontro ningun almacen. Configure un almacen por defecto en la configuracion de sincronizacion.'))
 
@@ -1188,18 +1579,10 @@ class MercadolibreOrder(models.Model):
             elif config.default_pricelist_id:
                 pricelist = config.default_pricelist_id
             if not pricelist:
-                # Buscar tarifa de la compania
-                pricelist = self.env['product.pricelist'].search([
-                    ('company_id', '=', self.company_id.id)
-                ], limit=1)
-            if not pricelist:
-                # Buscar tarifa sin compania (global)
-                pricelist = self.env['product.pricelist'].search([
-                    ('company_id', '=', False)
-                ], limit=1)
-            if not pricelist:
-                # Buscar cualquier tarifa disponible
-                pricelist = self.env['product.pricelist'].search([], limit=1)
+                # Tarifa de la compania, global (sin compania) o cualquier tarifa disponible
+                pricelist = (import_context['pricelist_by_company'].get(self.company_id.id)
+                             or import_context['pricelist_by_company'].get(False)
+                             or import_context['default_pricelist'])
             if not pricelist:
                 raise ValidationError(_('No se encontro ninguna tarifa de precios. Configure una tarifa por defecto en la configuracion de sincronizacion.'))
 
@@ -1234,10 +1617,11 @@ class MercadolibreOrder(models.Model):
 
             # Crear orden de venta
             sale_order = self.env['sale.order'].create(order_vals)
+            import_context['sale_orders_by_ref'][(client_order_ref, self.company_id.id)] = sale_order
             _logger.info('Orden de venta creada: %s para ML orden %s', sale_order.name, self.ml_order_id)
 
             # Crear lineas de productos
-            self._create_sale_order_lines(sale_order, config)
+            self._create_sale_order_lines(sale_order, config, import_context)
 
             # Crear lineas de descuento si aplica
             _logger.info('Orden %s - seller_discount=%.2f, meli_discount=%.2f, total_amount=%.2f',
@@ -1316,9 +1700,16 @@ class MercadolibreOrder(models.Model):
                     sale_order.action_confirm()
                     _logger.info('[AUTO_CONFIRM] Orden %s confirmada automaticamente', sale_order.name)
 
-                    # Validar picking si esta configurado
+                    # Validar picking si esta configurado (en lote al final del sync si se difiere)
                     if should_confirm_picking:
-                        self._auto_confirm_picking(sale_order, logistic_config, config, should_set_done_from_reserved)
+                        deferred_pickings = import_context.get('deferred_pickings')
+                        if deferred_pickings is not None and getattr(config, 'defer_picking_validation', False):
+                            deferred_pickings.append(
+                                (self, sale_order, logistic_config, config, should_set_done_from_reserved)
+                            )
+                        else:
+                            self._auto_confirm_picking(sale_order, logistic_config, config,
+                                                       should_set_done_from_reserved)
 
                 except Exception as e:
                     _logger.error('[AUTO_CONFIRM] Error al confirmar orden %s: %s', sale_order.name, str(e))
@@ -1361,9 +1752,11 @@ class MercadolibreOrder(models.Model):
             })
             return False
 
-    def _get_or_create_partner(self, config):
+    def _get_or_create_partner(self, config, import_context=None):
         """Obtiene o crea el partner para la orden"""
         self.ensure_one()
+        if import_context is None:
+            import_context = self._prepare_import_context()
 
         # =====================================================
         # MODO CLIENTE ESPECÍFICO: Usar siempre el mismo cliente
@@ -1396,10 +1789,8 @@ class MercadolibreOrder(models.Model):
         if self.buyer_id:
             # Buscar por email
             if self.buyer_id.email:
-                partner = Partner.search([
-                    ('email', '=', self.buyer_id.email),
-                    ('company_id', 'in', [self.company_id.id, False])
-                ], limit=1)
+                partner = (import_context['partners_by_email'].get((self.buyer_id.email, self.company_id.id))
+                           or import_context['partners_by_email'].get((self.buyer_id.email, False)))
                 if partner:
                     self.buyer_id.partner_id = partner.id
                     return partner
@@ -1413,6 +1804,8 @@ class MercadolibreOrder(models.Model):
                 'comment': f'Creado desde MercadoLibre. Buyer ID: {self.ml_buyer_id}',
             }
             partner = Partner.create(partner_vals)
+            if partner.email:
+                import_context['partners_by_email'][(partner.email, self.company_id.id)] = partner
             self.buyer_id.partner_id = partner.id
             return partner
 
@@ -1463,17 +1856,18 @@ class MercadolibreOrder(models.Model):
 
         return price_without_tax
 
-    def _create_sale_order_lines(self, sale_order, config):
+    def _create_sale_order_lines(self, sale_order, config, import_context=None):
         """Crea las lineas de la orden de venta"""
         OrderLine = self.env['sale.order.line']
+        if import_context is None:
+            import_context = self._prepare_import_context()
 
+        line_vals_list = []
         for item in self.item_ids:
             # Buscar producto por SKU
             product = False
             if item.seller_sku:
-                product = self.env['product.product'].search([
-                    ('default_code', '=', item.seller_sku)
-                ], limit=1)
+                product = import_context['products_by_sku'].get(item.seller_sku, False)
 
             # Si no encuentra, usar producto por defecto
             if not product:
@@ -1495,8 +1889,10 @@ class MercadolibreOrder(models.Model):
                 'ml_item_id': item.ml_item_id,
                 'ml_seller_sku': item.seller_sku,
             }
+            line_vals_list.append(line_vals)
 
-            OrderLine.create(line_vals)
+        if line_vals_list:
+            OrderLine.create(line_vals_list)
 
     def _create_discount_lines(self, sale_order, config):
         """
@@ -1727,6 +2123,71 @@ class MercadolibreOrder(models.Model):
                     sale_order.name, result['validated_pickings'], result['errors'])
         return result
 
+    @api.model
+    def _process_deferred_pickings(self, entries):
+        """
+        Confirma, reserva y valida en lote los pickings diferidos durante
+        una importacion (ver defer_picking_validation en la config de sync).
+
+        Los pickings se agrupan por almacen, politica de stock y
+        set_done_from_reserved, y cada grupo se procesa con llamadas sobre
+        el recordset completo para que el motor de stock agrupe las
+        busquedas de quants. Si un grupo falla se reprocesa orden por orden
+        con _auto_confirm_picking para aislar el picking con error.
+
+        Args:
+            entries: lista de tuplas
+                (mercadolibre.order, sale.order, logistic_config, sync_config, set_done_from_reserved)
+
+        Returns:
+            dict con keys validated (int) y errors (int)
+        """
+        stats = {'validated': 0, 'errors': 0}
+        groups = {}
+        for entry in entries:
+            ml_order, sale_order, logistic_config, sync_config, set_done = entry
+            policy = 'force'
+            if logistic_config and logistic_config.stock_validation_policy:
+                policy = logistic_config.stock_validation_policy
+            key = (sale_order.warehouse_id.id, policy, bool(set_done))
+            groups.setdefault(key, []).append(entry)
+
+        for (warehouse_id, policy, set_done), group in groups.items():
+            ml_orders = self.union(*[entry[0] for entry in group])
+            pickings = self.env['sale.order'].union(*[entry[1] for entry in group]).mapped(
+                'picking_ids'
+            ).filtered(lambda p: p.state not in ('done', 'cancel'))
+            if not pickings:
+                continue
+
+            _logger.info('[AUTO_PICKING] Lote almacen %s: %d pickings de %d ordenes (policy=%s, set_done=%s)',
+                         warehouse_id, len(pickings), len(group), policy, set_done)
+            try:
+                with self.env.cr.savepoint():
+                    pickings.filtered(lambda p: p.state == 'draft').action_confirm()
+                    to_assign = pickings.filtered(lambda p: p.state in ('waiting', 'confirmed'))
+                    if to_assign:
+                        to_assign.action_assign()
+                    if set_done:
+                        self._set_all_done_from_reserved(pickings, force_demand=policy == 'force')
+                    self._validate_picking_simple(pickings)
+
+                ml_orders.write({
+                    'stock_validation_status': 'ok',
+                    'stock_validation_notes': False,
+                })
+                stats['validated'] += len(pickings)
+            except Exception as e:
+                _logger.warning('[AUTO_PICKING] Error en lote almacen %s, procesando orden por orden: %s',
+                                warehouse_id, str(e))
+                for ml_order, sale_order, logistic_config, sync_config, entry_set_done in group:
+                    result = ml_order._auto_confirm_picking(sale_order, logistic_config, sync_config,
+                                                            entry_set_done)
+                    stats['validated'] += len(result['validated_pickings'])
+                    stats['errors'] += len(result['errors'])
+
+        return stats
+
     def _set_all_done_from_reserved(self, picking, force_demand=False):
         """
         Establece la cantidad hecha (qty_done) igual a la reservada.
@@ -1736,10 +2197,10 @@ class MercadolibreOrder(models.Model):
             picking: stock.picking a procesar
             force_demand: Si True, usa la cantidad demandada cuando no hay reservado
         """
-        # Usar metodo nativo de Odoo para copiar reservado a hecho
+        # Usar metodo nativo de Odoo para copiar reservado a hecho (acepta varios pickings)
         picking.action_set_quantities_to_reservation()
         _logger.info('[AUTO_PICKING] Picking %s: qty_done establecido desde reservado (metodo nativo)',
-                    picking.name)
+                    ', '.join(picking.mapped('name')))
 
         # Si es forzado y hay lineas sin qty_done, poner la demanda
         if force_demand:
@@ -1756,7 +2217,7 @@ class MercadolibreOrder(models.Model):
                     if move.product_uom_qty > 0:
                         self.env['stock.move.line'].create({
                             'move_id': move.id,
-                            'picking_id': picking.id,
+                            'picking_id': move.picking_id.id,
                             'product_id': move.product_id.id,
                             'product_uom_id': move.product_uom.id,
                             'location_id': move.location_id.id,
@@ -1769,6 +2230,7 @@ class MercadolibreOrder(models.Model):
     def _validate_picking_simple(self, picking):
         """
         Valida un picking de forma simple, manejando wizards automaticamente.
+        Acepta varios pickings: los wizards reciben todos en su contexto.
         """
         result = picking.with_context(
             skip_sms=True,
@@ -2215,7 +2677,7 @@ class MercadolibreOrder(models.Model):
         }
 
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=60)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, params=params, headers=headers, timeout=60)
 
             if response.status_code == 200:
                 # Determinar extension
@@ -2279,7 +2741,6 @@ class MercadolibreOrder(models.Model):
         Returns:
             dict con resultado
         """
-        import requests
         import base64
 
         url = f'https://api.mercadolibre.com/shipments/{self.ml_shipment_id}/label'
@@ -2287,7 +2748,7 @@ class MercadolibreOrder(models.Model):
         headers = {'Authorization': f'Bearer {access_token}'}
 
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=60)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, params=params, headers=headers, timeout=60)
 
             if response.status_code == 200:
                 content_type = response.headers.get('Content-Type', '')
@@ -2507,6 +2968,18 @@ class MercadolibreOrder(models.Model):
             _logger.error('Error obteniendo orden %s desde API: %s', order_id, str(e))
             return {'status': 'error', 'message': str(e)}
 
+        # Si la orden no cambio desde la ultima sincronizacion no hay nada que hacer
+        existing = self.search([
+            ('ml_order_id', '=', str(order_data.get('id', order_id))),
+            ('account_id', '=', account.id),
+        ], limit=1)
+        last_updated = self._parse_datetime(order_data.get('last_updated'))
+        if (existing and last_updated and existing.date_last_updated == last_updated
+                and existing.status == order_data.get('status', '')
+                and (existing.sale_order_id or existing.status not in ('paid', 'partially_paid'))):
+            _logger.info('Orden %s sin cambios (last_updated=%s), se omite', order_id, last_updated)
+            return {'status': 'skipped', 'message': f'Orden {order_id} sin cambios', 'order_id': existing.id}
+
         # Determinar el tipo logistico de la orden
         logistic_type = self._get_logistic_type_from_data(order_data)
         _logger.info('Tipo logistico de la orden: %s', logistic_type or 'No determinado')
@@ -2618,7 +3091,6 @@ class MercadolibreOrder(models.Model):
         Returns:
             dict con datos de la orden o None si falla
         """
-        import requests
 
         try:
             access_token = account.get_valid_token()
@@ -2633,7 +3105,7 @@ class MercadolibreOrder(models.Model):
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(account).get(url, headers=headers, timeout=30)
 
             if response.status_code == 200:
                 return response.json()
@@ -2656,7 +3128,6 @@ class MercadolibreOrder(models.Model):
         Returns:
             str codigo del tipo logistico o False
         """
-        import requests
 
         try:
             access_token = account.get_valid_token()
@@ -2670,7 +3141,7 @@ class MercadolibreOrder(models.Model):
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(account).get(url, headers=headers, timeout=30)
 
             if response.status_code == 200:
                 data = response.json()
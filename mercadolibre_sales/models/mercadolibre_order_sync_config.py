@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
 
 import json
-import time
 import logging
 import pytz
+import time
 from datetime import datetime, timedelta
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
@@ -12,6 +12,11 @@ _logger = logging.getLogger(__name__)
 
 MEXICO_TZ = pytz.timezone('America/Mexico_City')
 
+# Maximo de resultados por pagina que acepta /orders/search
+ORDERS_SEARCH_PAGE_SIZE = 50
+# Sale orders por lote en la actualización de órdenes existentes
+UPDATE_BATCH_SIZE = 200
+
 
 class MercadolibreOrderSyncConfig(models.Model):
     _name = 'mercadolibre.order.sync.config'
@@ -128,8 +133,31 @@ class MercadolibreOrderSyncConfig(models.Model):
 
     limit = fields.Integer(
         string='Limite',
-        default=50,
-        help='Numero maximo de ordenes a sincronizar por ejecucion'
+        default=0,
+        help='Numero maximo de ordenes a sincronizar por ejecucion (0 = todas). '
+             'Las ordenes se consultan pagina por pagina hasta agotar el resultado.'
+    )
+
+    # Sincronizacion incremental (marca de agua por last_updated)
+    use_incremental_sync = fields.Boolean(
+        string='Sincronizacion Incremental',
+        default=False,
+        help='Consulta solo las ordenes modificadas desde la ultima ejecucion exitosa '
+             '(order.last_updated.from) en lugar de todo el periodo. '
+             'La primera ejecucion usa el periodo configurado.'
+    )
+    last_updated_watermark = fields.Datetime(
+        string='Sincronizado Hasta',
+        readonly=True,
+        copy=False,
+        help='Inicio de la ultima ejecucion exitosa. La siguiente ejecucion '
+             'consulta ordenes modificadas desde este momento (menos el solape).'
+    )
+    watermark_overlap_minutes = fields.Integer(
+        string='Solape (minutos)',
+        default=10,
+        help='Minutos que se restan a la marca de agua para cubrir desfases de reloj '
+             'y ordenes actualizadas durante la ejecucion anterior'
     )
 
     # Programacion - FLEXIBLE (minutos, horas, dias)
@@ -171,6 +199,12 @@ class MercadolibreOrderSyncConfig(models.Model):
         string='Log Ultima Ejecucion',
         readonly=True
     )
+    last_sync_run_id = fields.Many2one(
+        'mercadolibre.sync.run',
+        string='Ultima Ejecucion',
+        readonly=True,
+        ondelete='set null'
+    )
     state = fields.Selection([
         ('draft', 'Borrador'),
         ('active', 'Activo'),
@@ -223,6 +257,12 @@ class MercadolibreOrderSyncConfig(models.Model):
         help='Automaticamente poner la cantidad hecha igual a la reservada '
              'para permitir validar el picking. Activo por defecto.'
     )
+    defer_picking_validation = fields.Boolean(
+        string='Validar Pickings en Lote',
+        default=True,
+        help='Confirmar, reservar y validar los pickings al final de la sincronizacion, '
+             'agrupados por almacen, en lugar de hacerlo orden por orden.'
+    )
 
     # Defaults
     default_warehouse_id = fields.Many2one(
@@ -354,7 +394,6 @@ class MercadolibreOrderSyncConfig(models.Model):
         Returns:
             str: Código del tipo logístico o False si no se pudo obtener
         """
-        import requests
 
         if not shipment_id:
             return False
@@ -372,7 +411,7 @@ class MercadolibreOrderSyncConfig(models.Model):
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, headers=headers, timeout=30)
 
             if response.status_code == 200:
                 data = response.json()
@@ -517,6 +556,46 @@ class MercadolibreOrderSyncConfig(models.Model):
             cron = self.env['ir.cron'].sudo().create(cron_vals)
             self.cron_id = cron
 
+    def _get_watermark_from(self):
+        """
+        Retorna el datetime (UTC) desde el cual consultar ordenes modificadas,
+        o None si se debe usar el rango de fechas del periodo.
+        """
+        self.ensure_one()
+        if not self.use_incremental_sync or not self.last_updated_watermark:
+            return None
+        return self.last_updated_watermark - timedelta(minutes=max(self.watermark_overlap_minutes, 0))
+
+    def action_view_sync_runs(self):
+        """Ver el historial de ejecuciones de esta configuracion"""
+        self.ensure_one()
+        return self.env['mercadolibre.sync.run']._action_view_runs(self)
+
+    def action_benchmark_upsert(self):
+        """Mide consultas por orden del upsert uno por uno contra el upsert por lote"""
+        self.ensure_one()
+        result = self.env['mercadolibre.order'].benchmark_upsert(self.account_id)
+        lines = [
+            f'{label}: antes {result[key]["before"]:.1f} consultas/orden '
+            f'({result[key]["before_ms"]:.1f} ms), ahora {result[key]["after"]:.1f} '
+            f'({result[key]["after_ms"]:.1f} ms)'
+            for key, label in (('existing', 'Existentes'), ('unchanged', 'Sin cambios'), ('new', 'Nuevas'))
+        ]
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': f'Benchmark Upsert ({result["count"]} ordenes)',
+                'message': '\n'.join(lines),
+                'type': 'info',
+                'sticky': True,
+            }
+        }
+
+    def action_reset_watermark(self):
+        """Reinicia la marca de agua: la proxima ejecucion usa el periodo completo"""
+        self.write({'last_updated_watermark': False})
+
     def _get_date_range(self):
         """Calcula el rango de fechas segun el periodo"""
         now_mexico = datetime.now(MEXICO_TZ)
@@ -556,6 +635,30 @@ class MercadolibreOrderSyncConfig(models.Model):
             })
             return True
 
+        # Lock del trabajo: el cron y "Ejecutar ahora" (o dos workers) no
+        # deben avanzar el mismo cursor a la vez
+        Job = self.env['mercadolibre.job']
+        job_key = f'{self._name}.{self.id}'
+        if not Job._try_lock(job_key):
+            _logger.info('SYNC "%s": ya esta en ejecucion en otro worker', self.name)
+            return False
+        try:
+            return self._sync_orders(Job._get_job(job_key))
+        finally:
+            try:
+                Job._unlock(job_key)
+            except Exception:
+                # Transaccion abortada: el lock es de sesion, hay que liberarlo igual
+                self.env.cr.rollback()
+                Job._unlock(job_key)
+
+    def _sync_orders(self, job):
+        """
+        Cuerpo de _execute_sync, con el lock del trabajo ya tomado.
+
+        Args:
+            job: mercadolibre.job con el cursor de la configuracion
+        """
         _logger.info('='*60)
         _logger.info('SYNC ORDENES ML: Iniciando "%s"', self.name)
         _logger.info('='*60)
@@ -569,6 +672,9 @@ class MercadolibreOrderSyncConfig(models.Model):
             })
             return False
 
+        # Encabezado y resumen van a last_sync_log; el detalle por orden
+        # se escribe en lotes en mercadolibre.sync.run.line
+        run = self.env['mercadolibre.sync.run']._start(self, 'orders', self.account_id)
         log_lines = []
         log_lines.append('=' * 50)
         log_lines.append(f'  SYNC ORDENES ML: {self.name}')
@@ -578,32 +684,50 @@ class MercadolibreOrderSyncConfig(models.Model):
         log_lines.append(f'  Fecha (Mexico): {now_mexico.strftime("%d/%m/%Y %H:%M:%S")}')
         log_lines.append('')
 
+        watermark_from = self._get_watermark_from()
+
+        # Cursor reanudable: si la ejecucion anterior se pauso por tiempo,
+        # se continua desde el offset ya confirmado
+        Job = self.env['mercadolibre.job']
+        start_offset = int(job.cursor or 0) if job.state in ('paused', 'running') else 0
+        deadline = Job._get_deadline()
+        job._begin_pass()
+        # Inicio de la primera ejecucion de la pasada: es la marca de agua
+        # a guardar cuando una ejecucion reanudada termina de drenar
+        run_started_at = job.started_at or fields.Datetime.now()
+        if start_offset:
+            log_lines.append(f'  Reanudando desde offset {start_offset}')
         date_from, date_to = self._get_date_range()
 
         log_lines.append(f'  Cuenta:    {self.account_id.name}')
-        log_lines.append(f'  Periodo:   {self.period}')
-        log_lines.append(f'  Fechas:    {date_from.strftime("%d/%m/%Y")} a {date_to.strftime("%d/%m/%Y")}')
+        if watermark_from:
+            watermark_mx = pytz.utc.localize(watermark_from).astimezone(MEXICO_TZ)
+            log_lines.append('  Modo:      Incremental')
+            log_lines.append(f'  Desde:     {watermark_mx.strftime("%d/%m/%Y %H:%M:%S")} (last_updated)')
+            date_from = date_to = None
+        else:
+            log_lines.append(f'  Periodo:   {self.period}')
+            log_lines.append(f'  Fechas:    {date_from.strftime("%d/%m/%Y")} a {date_to.strftime("%d/%m/%Y")}')
         log_lines.append('')
 
         # Obtener token
         try:
-            access_token = self.account_id.get_valid_token()
+            self.account_id.get_valid_token()
         except Exception as e:
             log_lines.append(f'ERROR: No se pudo obtener token: {str(e)}')
+            run.close('\n'.join(log_lines), state='error')
             self.write({
                 'last_run': fields.Datetime.now(),
                 'last_sync_log': '\n'.join(log_lines),
                 'last_sync_errors': 1,
+                'last_sync_run_id': run.run.id,
             })
             return False
 
-        import requests
-
         # Construir parametros de busqueda
         params = {
             'seller': self.account_id.ml_user_id,
             'sort': 'date_desc',
-            'limit': self.limit,
         }
 
         # Filtro por fechas
@@ -619,110 +743,83 @@ class MercadolibreOrderSyncConfig(models.Model):
             params['order.date_created.to'] = dt_to_mx.strftime('%Y-%m-%dT%H:%M:%S.999%z')
             params['order.date_created.to'] = params['order.date_created.to'][:-2] + ':' + params['order.date_created.to'][-2:]
 
+        # Filtro incremental por fecha de ultima modificacion
+        if watermark_from:
+            dt_wm_mx = pytz.utc.localize(watermark_from).astimezone(MEXICO_TZ)
+            params['order.last_updated.from'] = dt_wm_mx.strftime('%Y-%m-%dT%H:%M:%S.000%z')
+            params['order.last_updated.from'] = params['order.last_updated.from'][:-2] + ':' + params['order.last_updated.from'][-2:]
+
         # Filtro por estado
         if self.status_filter and self.status_filter != 'all':
             params['order.status'] = self.status_filter
 
-        url = 'https://api.mercadolibre.com/orders/search'
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json',
-        }
-
-        # Log detallado de parámetros
         _logger.info('─' * 50)
-        _logger.info('API REQUEST: GET /orders/search')
-        _logger.info('URL: %s', url)
+        _logger.info('API REQUEST: GET /orders/search (paginado)')
         _logger.info('Params: %s', json.dumps(params, indent=2, default=str))
         _logger.info('─' * 50)
 
-        LogModel = self.env['mercadolibre.log'].sudo()
-        headers_log = {k: v if k != 'Authorization' else 'Bearer ***' for k, v in headers.items()}
-        start_time = time.time()
+        # Paginacion perezosa: cada pagina se procesa antes de pedir la siguiente
+        pages = self.env['mercadolibre.http']._iter_pages(
+            self.account_id.id,
+            '/orders/search',
+            params=params,
+            page_size=ORDERS_SEARCH_PAGE_SIZE,
+            max_results=max(self.limit - start_offset, 1) if self.limit else None,
+            start_offset=start_offset,
+        )
 
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=60)
-            duration = time.time() - start_time
-
-            # Log de respuesta
-            _logger.info('API RESPONSE: %s (%.2fs)', response.status_code, duration)
-            _logger.info('Response URL: %s', response.url)
-            if response.status_code != 200:
-                _logger.error('Response Body: %s', response.text[:2000])
-
-            response_body_log = response.text[:10000] if response.text else ''
-            LogModel.create({
-                'log_type': 'api_request',
-                'level': 'success' if response.status_code == 200 else 'error',
-                'account_id': self.account_id.id,
-                'message': f'Order Sync "{self.name}": GET /orders/search - {response.status_code}',
-                'request_url': response.url,
-                'request_method': 'GET',
-                'request_headers': json.dumps(headers_log, indent=2),
-                'request_body': json.dumps(params, indent=2, default=str),
-                'response_code': response.status_code,
-                'response_headers': json.dumps(dict(response.headers), indent=2),
-                'response_body': response_body_log,
-                'duration': duration,
-            })
-
-            if response.status_code != 200:
-                # Parsear error de ML
-                error_detail = ''
-                try:
-                    error_json = response.json()
-                    error_detail = error_json.get('message', '') or error_json.get('error', '')
-                    if error_json.get('cause'):
-                        error_detail += f" - Causa: {error_json.get('cause')}"
-                except:
-                    error_detail = response.text[:500]
-
-                log_lines.append(f'ERROR API: {response.status_code}')
-                log_lines.append(f'Detalle: {error_detail}')
-                log_lines.append(f'URL: {response.url}')
-                _logger.error('ERROR API ML: %s - %s', response.status_code, error_detail)
-
-                self.write({
-                    'last_run': fields.Datetime.now(),
-                    'last_sync_log': '\n'.join(log_lines),
-                    'last_sync_errors': 1,
-                })
-                return False
-
-            data = response.json()
-
-        except requests.exceptions.RequestException as e:
-            _logger.error('Error de conexion: %s', str(e))
-            log_lines.append(f'ERROR conexion: {str(e)}')
+            first_page = next(pages, {})
+        except Exception as e:
+            _logger.error('ERROR API ML: %s', str(e))
+            log_lines.append(f'ERROR API: {str(e)}')
+            run.close('\n'.join(log_lines), state='error')
             self.write({
                 'last_run': fields.Datetime.now(),
                 'last_sync_log': '\n'.join(log_lines),
                 'last_sync_errors': 1,
+                'last_sync_run_id': run.run.id,
             })
             return False
 
-        results = data.get('results', [])
-        total = data.get('paging', {}).get('total', len(results))
+        total = (first_page.get('paging') or {}).get('total', len(first_page.get('results', [])))
+        page_errors = []
+
+        def iter_results():
+            for order_data in first_page.get('results', []):
+                yield order_data
+            try:
+                for page in pages:
+                    for order_data in page.get('results', []):
+                        yield order_data
+            except Exception as e:
+                _logger.error('Error obteniendo pagina de ordenes: %s', str(e))
+                page_errors.append(str(e))
+
+        results = iter_results()
 
         log_lines.append(f'  Total en ML:   {total}')
-        log_lines.append(f'  A procesar:    {len(results)}')
+        log_lines.append(f'  A procesar:    {min(total, self.limit) if self.limit else total}')
         log_lines.append('')
 
         OrderModel = self.env['mercadolibre.order']
-        sync_count = 0
-        created_count = 0
-        updated_count = 0
-        error_count = 0
-
-        # Contadores para ordenes Odoo
-        sale_orders_created = 0
-        sale_orders_errors = 0
+        stats = {
+            'sync': 0,
+            'created': 0,
+            'updated': 0,
+            'errors': 0,
+            # Ordenes Odoo
+            'sale_orders_created': 0,
+            'sale_orders_errors': 0,
+            'skipped_logistic_type': 0,
+            'skipped_no_logistic': 0,
+            'pickings_validated': 0,
+            'picking_errors': 0,
+        }
 
         # Contadores para filtro de tipo logistico
         filtered_logistic_count = 0
 
-        synced_orders = []
-
         # Obtener tipos logisticos permitidos para esta configuracion
         allowed_logistic_types = self.get_allowed_logistic_types()
         if allowed_logistic_types is not None:
@@ -731,8 +828,26 @@ class MercadolibreOrderSyncConfig(models.Model):
         else:
             log_lines.append('  Filtro logistico: Todos (sin filtro)')
 
+        if self.create_sale_orders:
+            # Log detallado de configuracion
+            _logger.warning('='*60)
+            _logger.warning('INICIO CREACION ORDENES VENTA - Config: %s', self.name)
+            _logger.warning('sync_all_logistic_types: %s', self.sync_all_logistic_types)
+            _logger.warning('logistic_type_ids seleccionados: %s',
+                          self.logistic_type_ids.mapped(lambda x: (x.id, x.name, x.code)) if self.logistic_type_ids else 'NINGUNO')
+            _logger.warning('='*60)
+            if allowed_logistic_types is not None:
+                _logger.warning('*** FILTRO ACTIVO ***: Solo se crearan ordenes con tipo en: %s', allowed_logistic_types)
+            else:
+                _logger.warning('*** SIN FILTRO ***: sync_all_logistic_types=True, se crearan TODAS las ordenes')
+                _logger.warning('Para activar filtrado: desmarca "Sincronizar Todos los Tipos Logisticos" en la config')
+
+        batch = []
+        consumed = 0
+        paused = False
         for order_data in results:
             ml_id = order_data.get('id')
+            consumed += 1
 
             # FILTRO POR TIPO LOGISTICO - Verificar ANTES de crear el registro
             if allowed_logistic_types is not None:
@@ -775,133 +890,63 @@ class MercadolibreOrderSyncConfig(models.Model):
                                ml_id, shipping.get('id') if shipping else None)
                     continue
 
-            try:
-                order, is_new = OrderModel.create_from_ml_data(order_data, self.account_id)
-                sync_count += 1
-                if is_new:
-                    created_count += 1
-                else:
-                    updated_count += 1
-
-                if order:
-                    synced_orders.append(order)
-
-                    # Sincronizar descuentos si esta configurado
-                    if self.sync_discounts:
-                        order._sync_discounts_from_api()
-
-                    # Sincronizar logistic_type desde shipment si no vino en la orden
-                    if not order.logistic_type and order.ml_shipment_id:
-                        try:
-                            logistic_type = order._fetch_logistic_type_from_shipment()
-                            if logistic_type:
-                                order.write({'logistic_type': logistic_type})
-                                _logger.info('Logistic type actualizado para orden %s: %s',
-                                           order.ml_order_id, logistic_type)
-                        except Exception as e:
-                            _logger.warning('Error obteniendo logistic_type para %s: %s',
-                                          order.ml_order_id, str(e))
+            batch.append(order_data)
+            if len(batch) >= ORDERS_SEARCH_PAGE_SIZE:
+                self._process_order_batch(batch, run, stats, allowed_logistic_types)
+                batch = []
+                # Commit por lote con el offset ya procesado: las ordenes de
+                # venta del lote ya estan creadas, una ejecucion interrumpida
+                # no deja atras del cursor ordenes sin venta
+                job._save_cursor(start_offset + consumed, ORDERS_SEARCH_PAGE_SIZE)
+                if time.monotonic() >= deadline:
+                    paused = True
+                    break
+
+        if batch:
+            self._process_order_batch(batch, run, stats, allowed_logistic_types)
+
+        sync_count = stats['sync']
+        created_count = stats['created']
+        updated_count = stats['updated']
+        error_count = stats['errors']
+        sale_orders_created = stats['sale_orders_created']
+        sale_orders_errors = stats['sale_orders_errors']
 
-            except Exception as e:
-                error_count += 1
-                _logger.error('Error procesando orden %s: %s', ml_id, str(e))
+        if filtered_logistic_count:
+            run.count('skipped', filtered_logistic_count)
 
-        # Crear ordenes de venta si esta configurado
-        if self.create_sale_orders and synced_orders:
+        if page_errors:
+            error_count += len(page_errors)
+            log_lines.append(f'  ERROR paginacion: {page_errors[0]}')
+            for page_error in page_errors:
+                run.add('error', f'Paginacion: {page_error}')
+
+        if self.create_sale_orders:
             log_lines.append('')
             log_lines.append('-' * 50)
             log_lines.append('  CREACION DE ORDENES DE VENTA')
             log_lines.append('-' * 50)
-
-            # Log detallado de configuracion
-            _logger.warning('='*60)
-            _logger.warning('INICIO CREACION ORDENES VENTA - Config: %s', self.name)
-            _logger.warning('sync_all_logistic_types: %s', self.sync_all_logistic_types)
-            _logger.warning('logistic_type_ids seleccionados: %s',
-                          self.logistic_type_ids.mapped(lambda x: (x.id, x.name, x.code)) if self.logistic_type_ids else 'NINGUNO')
-            _logger.warning('='*60)
-
-            # Obtener tipos logisticos permitidos
-            allowed_logistic_types = self.get_allowed_logistic_types()
             if allowed_logistic_types is not None:
                 log_lines.append(f'  Tipos logisticos permitidos: {", ".join(allowed_logistic_types) or "Ninguno"}')
                 log_lines.append(f'  sync_all_logistic_types: {self.sync_all_logistic_types}')
-                _logger.warning('*** FILTRO ACTIVO ***: Solo se crearan ordenes con tipo en: %s', allowed_logistic_types)
             else:
                 log_lines.append('  Tipos logisticos: Todos (sin filtro) - VERIFICAR CONFIGURACION')
                 log_lines.append('  NOTA: Para filtrar, desmarca "Sincronizar Todos los Tipos Logisticos"')
-                _logger.warning('*** SIN FILTRO ***: sync_all_logistic_types=True, se crearan TODAS las ordenes')
-                _logger.warning('Para activar filtrado: desmarca "Sincronizar Todos los Tipos Logisticos" en la config')
-
-            # Agrupar por pack_id si esta configurado
-            if self.group_by_pack:
-                orders_to_process = self._group_orders_by_pack(synced_orders)
-            else:
-                orders_to_process = synced_orders
-
-            # Contadores adicionales para filtrado por tipo logistico
-            skipped_logistic_type = 0
-            skipped_no_logistic = 0
-
-            for order in orders_to_process:
-                if order.sale_order_id:
-                    continue
-
-                if order.status not in ('paid', 'partially_paid'):
-                    continue
-
-                # Filtrar por tipo logistico si esta configurado
-                if allowed_logistic_types is not None:
-                    order_logistic = order.logistic_type
-                    _logger.info('Orden %s: logistic_type=%s, permitidos=%s',
-                               order.ml_order_id, order_logistic, allowed_logistic_types)
-
-                    if not order_logistic:
-                        # Si no tiene logistic_type, intentar obtenerlo del shipment
-                        if order.ml_shipment_id:
-                            try:
-                                fetched_type = order._fetch_logistic_type_from_shipment()
-                                if fetched_type:
-                                    order.write({'logistic_type': fetched_type})
-                                    order_logistic = fetched_type
-                                    _logger.info('Orden %s: logistic_type obtenido del shipment: %s',
-                                               order.ml_order_id, fetched_type)
-                            except Exception as e:
-                                _logger.warning('Error obteniendo logistic_type para filtro: %s', str(e))
-
-                    if not order_logistic:
-                        skipped_no_logistic += 1
-                        log_lines.append(f'    [SKIP] {order.ml_order_id}: sin tipo logistico')
-                        _logger.info('Orden %s omitida: sin tipo logistico', order.ml_order_id)
-                        continue
-
-                    if order_logistic not in allowed_logistic_types:
-                        skipped_logistic_type += 1
-                        log_lines.append(f'    [SKIP] {order.ml_order_id}: tipo {order_logistic} no permitido')
-                        _logger.info('Orden %s omitida: tipo logistico %s no esta en %s',
-                                   order.ml_order_id, order_logistic, allowed_logistic_types)
-                        continue
-
-                try:
-                    sale_order = order._create_sale_order(self)
-                    if sale_order:
-                        sale_orders_created += 1
-                        log_lines.append(f'    [OK] {order.ml_order_id}: {sale_order.name} ({order.logistic_type or "sin tipo"})')
-                except Exception as e:
-                    sale_orders_errors += 1
-                    log_lines.append(f'    [ERROR] {order.ml_order_id}: {str(e)}')
-
+            if stats['pickings_validated'] or stats['picking_errors']:
+                log_lines.append(f'  Pickings validados en lote: {stats["pickings_validated"]}')
+                if stats['picking_errors']:
+                    log_lines.append(f'  Errores de pickings: {stats["picking_errors"]}')
             log_lines.append(f'  Ordenes creadas: {sale_orders_created}')
-            if skipped_logistic_type:
-                log_lines.append(f'  Omitidas (tipo no permitido): {skipped_logistic_type}')
-            if skipped_no_logistic:
-                log_lines.append(f'  Omitidas (sin tipo): {skipped_no_logistic}')
+            if stats['skipped_logistic_type']:
+                log_lines.append(f'  Omitidas (tipo no permitido): {stats["skipped_logistic_type"]}')
+            if stats['skipped_no_logistic']:
+                log_lines.append(f'  Omitidas (sin tipo): {stats["skipped_no_logistic"]}')
             log_lines.append(f'  Errores:         {sale_orders_errors}')
 
         # Actualizar órdenes existentes si está configurado
         update_stats = {'updated': 0, 'cancelled': 0, 'errors': 0}
-        if self.update_existing_orders:
-            update_stats = self._update_existing_sale_orders()
+        if self.update_existing_orders and not paused:
+            update_stats = self._update_existing_sale_orders(run, deadline=deadline)
             if update_stats.get('log_lines'):
                 log_lines.extend(update_stats['log_lines'])
 
@@ -932,23 +977,186 @@ class MercadolibreOrderSyncConfig(models.Model):
         elif self.interval_type == 'days':
             next_run += timedelta(days=self.interval_number)
 
-        self.write({
+        vals = {}
+        if paused:
+            log_lines.append(f'  Ejecucion pausada por tiempo: se reanuda en offset {start_offset + consumed}')
+        # Errores acumulados entre las ejecuciones de la misma pasada
+        job._add_errors(error_count + sale_orders_errors)
+        if self.use_incremental_sync:
+            # Solo avanzar la marca de agua si se recorrieron todas las paginas
+            # sin errores en ninguna ejecucion de la pasada: una orden que
+            # fallo debe volver a consultarse
+            truncated = bool(self.limit and total > self.limit)
+            if job.error_count or truncated or paused:
+                log_lines.append('  Marca de agua NO actualizada (ejecucion incompleta)')
+            else:
+                vals['last_updated_watermark'] = run_started_at
+
+        summary = '\n'.join(log_lines)
+        run.close(summary)
+
+        self.write(dict(vals, **{
             'last_run': fields.Datetime.now(),
             'last_sync_count': sync_count,
             'last_sync_created': created_count,
             'last_sync_updated': updated_count,
             'last_sync_errors': error_count,
-            'last_sync_log': '\n'.join(log_lines),
+            'last_sync_log': summary,
+            'last_sync_run_id': run.run.id,
             'next_run': next_run,
             'total_syncs': self.total_syncs + 1,
             'total_orders_synced': self.total_orders_synced + sync_count,
             'last_sale_orders_created': sale_orders_created,
             'total_sale_orders_created': self.total_sale_orders_created + sale_orders_created,
-        })
+        }))
+
+        if paused:
+            # Vuelve a disparar el cron de la configuracion para continuar
+            job._pause(self.cron_id)
+        else:
+            job._finish()
 
         _logger.info('SYNC ORDENES "%s" completada: %d sincronizadas', self.name, sync_count)
         return True
 
+    def _upsert_order_batch(self, batch):
+        """
+        Crea/actualiza un lote de ordenes con create_from_ml_data_batch.
+
+        Si el lote falla se reintenta orden por orden para aislar la orden
+        con error sin perder el resto.
+
+        Returns:
+            lista de (mercadolibre.order record o False, bool is_new)
+        """
+        OrderModel = self.env['mercadolibre.order']
+        try:
+            with self.env.cr.savepoint():
+                return OrderModel.create_from_ml_data_batch(batch, self.account_id)
+        except Exception as e:
+            _logger.warning('Error en lote de %d ordenes, reintentando una por una: %s',
+                            len(batch), str(e))
+
+        results = []
+        for order_data in batch:
+            try:
+                with self.env.cr.savepoint():
+                    results.append(OrderModel.create_from_ml_data(order_data, self.account_id))
+            except Exception as e:
+                _logger.error('Error procesando orden %s: %s', order_data.get('id'), str(e))
+                results.append((False, False))
+        return results
+
+    def _process_order_batch(self, batch, run, stats, allowed_logistic_types):
+        """
+        Procesa un lote de ordenes de la API: upsert, descuentos y, si esta
+        configurado, sus ordenes de venta y pickings diferidos.
+
+        Todo el trabajo del lote termina antes de que el llamador guarde el
+        offset, de modo que una ejecucion interrumpida no deja ordenes sin
+        venta detras del cursor (ni de la marca de agua).
+
+        Args:
+            batch: lista de dicts de ordenes de la API
+            run: SyncRunWriter de la ejecucion
+            stats: dict de contadores de _sync_orders (se actualiza)
+            allowed_logistic_types: lista de get_allowed_logistic_types()
+        """
+        synced_orders = []
+        for order, is_new in self._upsert_order_batch(batch):
+            if not order:
+                stats['errors'] += 1
+                run.count('error')
+                continue
+            stats['sync'] += 1
+            if is_new:
+                stats['created'] += 1
+                run.count('created')
+            else:
+                stats['updated'] += 1
+                run.count('updated')
+            synced_orders.append(order)
+
+            # Sincronizar descuentos si esta configurado
+            if self.sync_discounts:
+                try:
+                    order._sync_discounts_from_api()
+                except Exception as e:
+                    _logger.warning('Error sincronizando descuentos para %s: %s',
+                                    order.ml_order_id, str(e))
+
+        if self.create_sale_orders and synced_orders:
+            self._create_sale_orders_batch(synced_orders, run, stats, allowed_logistic_types)
+
+    def _create_sale_orders_batch(self, synced_orders, run, stats, allowed_logistic_types):
+        """
+        Crea las ordenes de venta de un lote de ordenes ML y valida sus
+        pickings diferidos. Las ordenes de un pack repartidas en varios
+        lotes se vinculan a la venta ya creada por su referencia.
+        """
+        # Agrupar por pack_id si esta configurado
+        if self.group_by_pack:
+            orders_to_process = self._group_orders_by_pack(synced_orders)
+        else:
+            orders_to_process = synced_orders
+
+        OrderModel = self.env['mercadolibre.order']
+        import_context = OrderModel.union(*orders_to_process)._prepare_import_context()
+        import_context['deferred_pickings'] = []
+
+        for order in orders_to_process:
+            if order.sale_order_id:
+                continue
+
+            if order.status not in ('paid', 'partially_paid'):
+                continue
+
+            # Filtrar por tipo logistico si esta configurado
+            if allowed_logistic_types is not None:
+                order_logistic = order.logistic_type
+                _logger.info('Orden %s: logistic_type=%s, permitidos=%s',
+                           order.ml_order_id, order_logistic, allowed_logistic_types)
+
+                if not order_logistic:
+                    # Si no tiene logistic_type, intentar obtenerlo del shipment
+                    if order.ml_shipment_id:
+                        try:
+                            fetched_type = order._fetch_logistic_type_from_shipment()
+                            if fetched_type:
+                                order.write({'logistic_type': fetched_type})
+                                order_logistic = fetched_type
+                                _logger.info('Orden %s: logistic_type obtenido del shipment: %s',
+                                           order.ml_order_id, fetched_type)
+                        except Exception as e:
+                            _logger.warning('Error obteniendo logistic_type para filtro: %s', str(e))
+
+                if not order_logistic:
+                    stats['skipped_no_logistic'] += 1
+                    run.add('skipped', 'Sin tipo logistico', order.ml_order_id)
+                    _logger.info('Orden %s omitida: sin tipo logistico', order.ml_order_id)
+                    continue
+
+                if order_logistic not in allowed_logistic_types:
+                    stats['skipped_logistic_type'] += 1
+                    run.add('skipped', f'Tipo {order_logistic} no permitido', order.ml_order_id)
+                    _logger.info('Orden %s omitida: tipo logistico %s no esta en %s',
+                               order.ml_order_id, order_logistic, allowed_logistic_types)
+                    continue
+
+            try:
+                sale_order = order._create_sale_order(self, import_context)
+                if sale_order:
+                    stats['sale_orders_created'] += 1
+                    run.add('ok', f'{sale_order.name} ({order.logistic_type or "sin tipo"})', order.ml_order_id)
+            except Exception as e:
+                stats['sale_orders_errors'] += 1
+                run.add('error', str(e), order.ml_order_id)
+
+        if import_context['deferred_pickings']:
+            picking_stats = OrderModel._process_deferred_pickings(import_context['deferred_pickings'])
+            stats['pickings_validated'] += picking_stats['validated']
+            stats['picking_errors'] += picking_stats['errors']
+
     def _group_orders_by_pack(self, orders):
         """
         Agrupa ordenes por pack_id para crear una sola orden de venta por pack.
@@ -967,16 +1175,25 @@ class MercadolibreOrderSyncConfig(models.Model):
 
         return result
 
-    def _update_existing_sale_orders(self):
+    def _update_existing_sale_orders(self, run=None, deadline=None):
         """
         Actualiza estados, tags y pagos de órdenes de venta existentes
         consultando la API de MercadoLibre.
 
+        Corre como trabajo por lotes propio (mercadolibre.job): commit y
+        cursor por lote, y al agotar el presupuesto de tiempo se pausa y
+        vuelve a disparar el cron de la configuración para continuar.
+
+        Args:
+            run: SyncRunWriter donde registrar el detalle por orden (opcional).
+                 Sin run, el detalle se agrega a stats['log_lines'].
+            deadline: time.monotonic() límite compartido con la sincronización
+                      de órdenes (opcional, default el del trabajo)
+
         Returns:
             dict: Estadísticas de actualización
         """
         self.ensure_one()
-        import requests
 
         stats = {
             'total_checked': 0,
@@ -989,6 +1206,12 @@ class MercadolibreOrderSyncConfig(models.Model):
         if not self.update_existing_orders:
             return stats
 
+        def log_item(level, tag, reference, message):
+            if run:
+                run.add(level, message, reference)
+            else:
+                stats['log_lines'].append(f'    [{tag}] {reference}: {message}')
+
         stats['log_lines'].append('')
         stats['log_lines'].append('-' * 50)
         stats['log_lines'].append('  ACTUALIZACIÓN DE ÓRDENES EXISTENTES')
@@ -1016,134 +1239,168 @@ class MercadolibreOrderSyncConfig(models.Model):
             domain.append(('create_date', '>=', date_limit))
             stats['log_lines'].append(f'  Modo: Últimos {self.update_days} días')
 
-        sale_orders = SaleOrder.search(domain, limit=100)
-        stats['log_lines'].append(f'  Órdenes a verificar: {len(sale_orders)}')
+        total = SaleOrder.search_count(domain)
+        stats['log_lines'].append(f'  Órdenes a verificar: {total}')
 
-        if not sale_orders:
+        if not total:
             stats['log_lines'].append('  No hay órdenes para actualizar')
             return stats
 
-        # Obtener token
-        try:
-            access_token = self.account_id.get_valid_token()
-        except Exception as e:
-            stats['log_lines'].append(f'  ERROR: No se pudo obtener token: {str(e)}')
-            stats['errors'] = 1
-            return stats
-
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json',
-        }
+        http = self.env['mercadolibre.http']
+        MlOrder = self.env['mercadolibre.order'].sudo()
+        stats['unchanged'] = 0
 
-        for sale_order in sale_orders:
-            stats['total_checked'] += 1
-            ml_order_id = sale_order.ml_order_id
+        # Recorrer todas las órdenes candidatas por cursor de id, en lotes
+        def fetch(cursor, limit):
+            sale_orders = SaleOrder.search(domain + [('id', '>', int(cursor or 0))],
+                                           order='id', limit=limit)
+            return sale_orders, sale_orders[-1:].id
 
+        def process(sale_orders):
+            # Consultar órdenes y envíos del lote en requests concurrentes
             try:
-                # Consultar estado de la orden en ML
-                url = f'https://api.mercadolibre.com/orders/{ml_order_id}'
-                response = requests.get(url, headers=headers, timeout=30)
-
-                if response.status_code != 200:
-                    _logger.warning('Error consultando orden %s: HTTP %s',
-                                  ml_order_id, response.status_code)
-                    stats['errors'] += 1
-                    continue
-
-                order_data = response.json()
-
-                # =====================================================
-                # EXTRAER DATOS DE LA API DE ML
-                # =====================================================
-                new_status = order_data.get('status')
-                new_ship_status = None
-
-                # Estado del envío - consultar API de shipments
-                shipping = order_data.get('shipping', {}) or {}
-                shipment_id = shipping.get('id')
+                orders_data, order_errors = http._multiget(
+                    self.account_id.id, 'orders', sale_orders.mapped('ml_order_id')
+                )
+                shipment_ids = [
+                    str((data.get('shipping') or {}).get('id'))
+                    for data in orders_data.values()
+                    if (data.get('shipping') or {}).get('id')
+                ]
+                shipments_data, _ship_errors = http._multiget(
+                    self.account_id.id, 'shipments', shipment_ids
+                )
+            except Exception as e:
+                stats['log_lines'].append(f'  ERROR: No se pudieron consultar órdenes: {str(e)}')
+                stats['errors'] += 1
+                return
 
-                if shipment_id:
-                    ship_url = f'https://api.mercadolibre.com/shipments/{shipment_id}'
-                    ship_response = requests.get(ship_url, headers=headers, timeout=30)
+            ml_orders = {
+                ml_order.ml_order_id: ml_order
+                for ml_order in MlOrder.search([
+                    ('ml_order_id', 'in', sale_orders.mapped('ml_order_id')),
+                    ('account_id', '=', self.account_id.id),
+                ])
+            }
 
-                    if ship_response.status_code == 200:
-                        ship_data = ship_response.json()
-                        new_ship_status = ship_data.get('status')
+            for sale_order in sale_orders:
+                stats['total_checked'] += 1
+                ml_order_id = sale_order.ml_order_id
 
-                # Tags ML
-                tags = order_data.get('tags', []) or []
-                new_ml_tags = ','.join(tags) if tags else ''
+                try:
+                    order_data = orders_data.get(ml_order_id)
+                    if not order_data:
+                        _logger.warning('Error consultando orden %s: %s',
+                                      ml_order_id, order_errors.get(ml_order_id))
+                        stats['errors'] += 1
+                        continue
 
-                # Monto pagado
-                payments = order_data.get('payments', []) or []
-                paid_amount = sum(p.get('total_paid_amount', 0) or 0
-                                 for p in payments
-                                 if p.get('status') == 'approved')
+                    # =====================================================
+                    # EXTRAER DATOS DE LA API DE ML
+                    # =====================================================
+                    new_status = order_data.get('status')
+                    new_ship_status = None
 
-                # =====================================================
-                # USAR MÉTODO CENTRALIZADO PARA ACTUALIZAR
-                # (elimina duplicación de lógica)
-                # =====================================================
-                _logger.info(
-                    '[SYNC_UPDATE] Actualizando %s: status=%s, ship=%s',
-                    sale_order.name, new_status, new_ship_status
-                )
+                    # Estado del envío
+                    shipping = order_data.get('shipping', {}) or {}
+                    shipment_id = shipping.get('id')
 
-                tag_result = sale_order._update_ml_status_and_tags(
-                    shipment_status=new_ship_status,
-                    payment_status=new_status,
-                    ml_tags=new_ml_tags,
-                    paid_amount=paid_amount,
-                )
+                    if shipment_id and str(shipment_id) in shipments_data:
+                        new_ship_status = shipments_data[str(shipment_id)].get('status')
+
+                    # Tags ML
+                    tags = order_data.get('tags', []) or []
+                    new_ml_tags = ','.join(tags) if tags else ''
+
+                    # Monto pagado
+                    payments = order_data.get('payments', []) or []
+                    paid_amount = sum(p.get('total_paid_amount', 0) or 0
+                                     for p in payments
+                                     if p.get('status') == 'approved')
+
+                    ml_order = ml_orders.get(ml_order_id)
+                    must_cancel = (self.cancel_on_ml_cancel and new_status == 'cancelled'
+                                   and sale_order.state not in ['cancel', 'done'])
+
+                    # Sin cambios respecto a lo guardado: no escribir nada
+                    if (not must_cancel
+                            and (not new_status or new_status == sale_order.ml_status)
+                            and (not new_ship_status or new_ship_status == sale_order.ml_shipping_status)
+                            and new_ml_tags == (sale_order.ml_tags or '')
+                            and paid_amount == sale_order.ml_paid_amount
+                            and (not ml_order or not new_status or new_status == ml_order.status)):
+                        stats['unchanged'] += 1
+                        continue
 
-                # Registrar cambios en estadísticas
-                if tag_result.get('updated'):
-                    stats['updated'] += 1
-                    changes = tag_result.get('status_changes', [])
-                    if tag_result.get('tags_added'):
-                        changes.append(f"tags +: {', '.join(tag_result['tags_added'])}")
-                    if tag_result.get('tags_removed'):
-                        changes.append(f"tags -: {', '.join(tag_result['tags_removed'])}")
-
-                    if changes:
-                        stats['log_lines'].append(f'    [UPD] {sale_order.name}: {", ".join(changes)}')
-                        _logger.info('Orden %s actualizada: %s', sale_order.name, changes)
-
-                # =====================================================
-                # CANCELAR SI ML CANCELÓ (funcionalidad especial)
-                # =====================================================
-                if self.cancel_on_ml_cancel and new_status == 'cancelled':
-                    if sale_order.state not in ['cancel', 'done']:
-                        try:
-                            sale_order.with_context(
-                                disable_cancel_warning=True
-                            )._action_cancel()
-                            stats['cancelled'] += 1
-                            stats['log_lines'].append(
-                                f'    [CANCEL] {sale_order.name}: Cancelada por estado ML'
-                            )
-                            _logger.info('Orden %s cancelada por estado ML', sale_order.name)
-                        except Exception as cancel_error:
-                            stats['log_lines'].append(
-                                f'    [ERROR] {sale_order.name}: No se pudo cancelar: {cancel_error}'
-                            )
-
-                # =====================================================
-                # ACTUALIZAR MERCADOLIBRE.ORDER SI EXISTE
-                # =====================================================
-                ml_order = self.env['mercadolibre.order'].sudo().search([
-                    ('ml_order_id', '=', ml_order_id)
-                ], limit=1)
-
-                if ml_order and new_status and new_status != ml_order.status:
-                    ml_order.write({'status': new_status})
+                    # =====================================================
+                    # USAR MÉTODO CENTRALIZADO PARA ACTUALIZAR
+                    # (elimina duplicación de lógica)
+                    # =====================================================
+                    _logger.info(
+                        '[SYNC_UPDATE] Actualizando %s: status=%s, ship=%s',
+                        sale_order.name, new_status, new_ship_status
+                    )
+
+                    tag_result = sale_order._update_ml_status_and_tags(
+                        shipment_status=new_ship_status,
+                        payment_status=new_status,
+                        ml_tags=new_ml_tags,
+                        paid_amount=paid_amount,
+                    )
+
+                    # Registrar cambios en estadísticas
+                    if tag_result.get('updated'):
+                        stats['updated'] += 1
+                        changes = tag_result.get('status_changes', [])
+                        if tag_result.get('tags_added'):
+                            changes.append(f"tags +: {', '.join(tag_result['tags_added'])}")
+                        if tag_result.get('tags_removed'):
+                            changes.append(f"tags -: {', '.join(tag_result['tags_removed'])}")
+
+                        if changes:
+                            log_item('updated', 'UPD', sale_order.name, ", ".join(changes))
+                            _logger.info('Orden %s actualizada: %s', sale_order.name, changes)
+
+                    # =====================================================
+                    # CANCELAR SI ML CANCELÓ (funcionalidad especial)
+                    # =====================================================
+                    if self.cancel_on_ml_cancel and new_status == 'cancelled':
+                        if sale_order.state not in ['cancel', 'done']:
+                            try:
+                                sale_order.with_context(
+                                    disable_cancel_warning=True
+                                )._action_cancel()
+                                stats['cancelled'] += 1
+                                log_item('ok', 'CANCEL', sale_order.name, 'Cancelada por estado ML')
+                                _logger.info('Orden %s cancelada por estado ML', sale_order.name)
+                            except Exception as cancel_error:
+                                log_item('error', 'ERROR', sale_order.name, f'No se pudo cancelar: {cancel_error}')
+
+                    # =====================================================
+                    # ACTUALIZAR MERCADOLIBRE.ORDER SI EXISTE
+                    # =====================================================
+                    if ml_order and new_status and new_status != ml_order.status:
+                        ml_order.write({'status': new_status})
 
-            except Exception as e:
-                stats['errors'] += 1
-                _logger.error('Error actualizando orden %s: %s', ml_order_id, str(e))
-                stats['log_lines'].append(f'    [ERROR] {sale_order.name}: {str(e)[:50]}')
+                except Exception as e:
+                    stats['errors'] += 1
+                    _logger.error('Error actualizando orden %s: %s', ml_order_id, str(e))
+                    log_item('error', 'ERROR', sale_order.name, str(e))
+
+        job_stats = self.env['mercadolibre.job']._run_chunked(
+            f'{self._name}.{self.id}.update_existing',
+            fetch,
+            process,
+            cron=self.cron_id,
+            chunk_size=UPDATE_BATCH_SIZE,
+            deadline=deadline,
+        )
+        if job_stats['locked']:
+            stats['log_lines'].append('  En ejecución en otro worker')
+        elif not job_stats['drained']:
+            stats['log_lines'].append('  Pausada por tiempo: continúa en la siguiente ejecución')
 
+        stats['log_lines'].append(f'  Sin cambios: {stats["unchanged"]}')
         stats['log_lines'].append(f'  Verificadas: {stats["total_checked"]}')
         stats['log_lines'].append(f'  Actualizadas: {stats["updated"]}')
         if stats['cancelled']:
@@ -252,12 +252,11 @@ class SaleOrder(models.Model):
         # =====================================================
         logistic_config = None
         if self.ml_logistic_type:
-            logistic_config = self.env['mercadolibre.logistic.type'].search([
-                ('code', '=', self.ml_logistic_type),
-                '|',
-                ('account_id', '=', self.ml_account_id.id if self.ml_account_id else False),
-                ('account_id', '=', False),
-            ], limit=1)
+            LogisticType = self.env['mercadolibre.logistic.type']
+            logistic_config = LogisticType.browse(LogisticType._get_config_id_for(
+                self.ml_logistic_type,
+                self.ml_account_id.id if self.ml_account_id else False,
+            ))
             _logger.info(
                 '[UPDATE_ML_TAGS] Buscando config logistica para code=%s, account=%s: encontrada=%s',
                 self.ml_logistic_type,
@@ -333,6 +332,33 @@ class SaleOrder(models.Model):
 
         return result
 
+    def _recompute_ml_tags(self):
+        """
+        Recalcula los tags de Odoo de varias órdenes ML con sus estados actuales.
+
+        Agrupa las órdenes por tipo logístico, cuenta y compañía para aplicar
+        las reglas compiladas una vez por grupo, con writes agrupados.
+
+        Returns:
+            dict {sale_order_id: resultado de apply_tags_to_orders}
+        """
+        LogisticType = self.env['mercadolibre.logistic.type']
+        groups = {}
+        for order in self.filtered(lambda o: o.is_ml_order and o.ml_logistic_type):
+            key = (order.ml_logistic_type, order.ml_account_id.id, order.company_id.id)
+            groups.setdefault(key, self.browse())
+            groups[key] |= order
+
+        results = {}
+        for (code, account_id, company_id), orders in groups.items():
+            logistic_config = LogisticType.browse(LogisticType._get_config_id_for(code, account_id))
+            if not logistic_config:
+                continue
+            results.update(logistic_config.apply_tags_to_orders(
+                orders, account_id=account_id or None, company_id=company_id or None
+            ))
+        return results
+
     def action_mass_cancel(self):
         """
         Cancela masivamente ordenes de venta sin mostrar wizard de confirmacion.
@@ -12,6 +12,9 @@ _logger = logging.getLogger(__name__)
 
 MEXICO_TZ = pytz.timezone('America/Mexico_City')
 
+# Maximo de resultados por pagina que acepta /orders/search
+ORDERS_SEARCH_PAGE_SIZE = 50
+
 
 class MercadolibreOrderSync(models.TransientModel):
     _name = 'mercadolibre.order.sync'
@@ -52,7 +55,9 @@ class MercadolibreOrderSync(models.TransientModel):
 
     limit = fields.Integer(
         string='Limite',
-        default=50
+        default=50,
+        help='Numero maximo de ordenes a sincronizar (0 = todas). '
+             'Las ordenes se consultan pagina por pagina.'
     )
 
     # Sync discounts
@@ -144,7 +149,7 @@ class MercadolibreOrderSync(models.TransientModel):
         log_lines.append('')
 
         try:
-            access_token = self.account_id.get_valid_token()
+            self.account_id.get_valid_token()
         except Exception as e:
             _logger.error('Error obteniendo token: %s', str(e))
             self.write({
@@ -153,13 +158,10 @@ class MercadolibreOrderSync(models.TransientModel):
             })
             raise ValidationError(_(f'Error obteniendo token: {str(e)}'))
 
-        import requests
-
         # Construir parametros
         params = {
             'seller': self.account_id.ml_user_id,
             'sort': 'date_desc',
-            'limit': self.limit,
         }
 
         if self.date_from:
@@ -177,64 +179,47 @@ class MercadolibreOrderSync(models.TransientModel):
         if self.status_filter and self.status_filter != 'all':
             params['order.status'] = self.status_filter
 
-        url = 'https://api.mercadolibre.com/orders/search'
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json',
-        }
-
-        LogModel = self.env['mercadolibre.log'].sudo()
-        headers_log = {k: v if k != 'Authorization' else 'Bearer ***' for k, v in headers.items()}
-        start_time = time.time()
+        # Paginacion perezosa: cada pagina se procesa antes de pedir la siguiente
+        pages = self.env['mercadolibre.http']._iter_pages(
+            self.account_id.id,
+            '/orders/search',
+            params=params,
+            page_size=ORDERS_SEARCH_PAGE_SIZE,
+            max_results=self.limit,
+        )
 
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=60)
-            duration = time.time() - start_time
-
-            response_body_log = response.text[:10000] if response.text else ''
-            LogModel.create({
-                'log_type': 'api_request',
-                'level': 'success' if response.status_code == 200 else 'error',
-                'account_id': self.account_id.id,
-                'message': f'Order Sync Wizard: GET /orders/search - {response.status_code}',
-                'request_url': response.url,
-                'request_method': 'GET',
-                'request_headers': json.dumps(headers_log, indent=2),
-                'request_body': json.dumps(params, indent=2),
-                'response_code': response.status_code,
-                'response_headers': json.dumps(dict(response.headers), indent=2),
-                'response_body': response_body_log,
-                'duration': duration,
-            })
-
-            if response.status_code != 200:
-                error_msg = f'Error API: {response.status_code} - {response.text}'
-                log_lines.append(f'ERROR: {error_msg}')
-                self.write({
-                    'state': 'error',
-                    'sync_log': '\n'.join(log_lines),
-                })
-                raise ValidationError(error_msg)
-
-            data = response.json()
-
-        except requests.exceptions.RequestException as e:
-            log_lines.append(f'ERROR conexion: {str(e)}')
+            first_page = next(pages, {})
+        except Exception as e:
+            log_lines.append(f'ERROR: {str(e)}')
             self.write({
                 'state': 'error',
                 'sync_log': '\n'.join(log_lines),
             })
-            raise ValidationError(_(f'Error de conexion: {str(e)}'))
+            raise ValidationError(str(e))
 
-        results = data.get('results', [])
-        paging = data.get('paging', {})
-        total = paging.get('total', len(results))
+        paging = first_page.get('paging', {})
+        total = paging.get('total', len(first_page.get('results', [])))
+        page_errors = []
+
+        def iter_results():
+            for order_data in first_page.get('results', []):
+                yield order_data
+            try:
+                for page in pages:
+                    for order_data in page.get('results', []):
+                        yield order_data
+            except Exception as e:
+                _logger.error('Error obteniendo pagina de ordenes: %s', str(e))
+                page_errors.append(str(e))
+
+        results = iter_results()
 
         log_lines.append('-' * 50)
         log_lines.append('  RESULTADOS DE BUSQUEDA')
         log_lines.append('-' * 50)
         log_lines.append(f'  Total en MercadoLibre: {total}')
-        log_lines.append(f'  Obtenidas:             {len(results)}')
+        log_lines.append(f'  A obtener:             {min(total, self.limit) if self.limit else total}')
         log_lines.append('')
         log_lines.append('-' * 50)
         log_lines.append('  DETALLE DE ORDENES')
@@ -289,6 +274,10 @@ class MercadolibreOrderSync(models.TransientModel):
                 log_lines.append(f'  [ERROR      ]  #{ml_id}  {str(e)}')
                 _logger.error('Error procesando orden %s: %s', ml_id, str(e))
 
+        if page_errors:
+            error_count += len(page_errors)
+            log_lines.append(f'  [ERROR      ]  Paginacion: {page_errors[0]}')
+
         log_lines.append('')
         log_lines.append('=' * 50)
         log_lines.append('  RESUMEN')
@@ -363,7 +352,7 @@ class MercadolibreOrderSync(models.TransientModel):
         start_time = time.time()
 
         try:
-            response = requests.get(url, headers=headers, timeout=60)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, headers=headers, timeout=60)
             duration = time.time() - start_time
 
             response_body_log = response.text[:10000] if response.text else ''
@@ -447,7 +436,7 @@ class MercadolibreOrderSync(models.TransientModel):
 
             start_time = time.time()
             try:
-                search_response = requests.get(search_url, params=params, headers=headers, timeout=60)
+                search_response = self.env['mercadolibre.http']._get_session(self.account_id).get(search_url, params=params, headers=headers, timeout=60)
                 duration = time.time() - start_time
 
                 response_body_log = search_response.text[:10000] if search_response.text else ''
@@ -632,7 +621,7 @@ class MercadolibreOrderSync(models.TransientModel):
         start_time = time.time()
 
         try:
-            response = requests.get(pack_url, headers=headers, timeout=60)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(pack_url, headers=headers, timeout=60)
             duration = time.time() - start_time
 
             response_body_log = response.text[:10000] if response.text else ''
@@ -659,7 +648,7 @@ class MercadolibreOrderSync(models.TransientModel):
                     order_id = pack_order.get('id')
                     if order_id:
                         order_url = f'https://api.mercadolibre.com/orders/{order_id}'
-                        order_response = requests.get(order_url, headers=headers, timeout=60)
+                        order_response = self.env['mercadolibre.http']._get_session(self.account_id).get(order_url, headers=headers, timeout=60)
 
                         if order_response.status_code == 200:
                             order_data = order_response.json()
@@ -686,7 +675,7 @@ class MercadolibreOrderSync(models.TransientModel):
 
             start_time = time.time()
             try:
-                response = requests.get(search_url, params=params, headers=headers, timeout=60)
+                response = self.env['mercadolibre.http']._get_session(self.account_id).get(search_url, params=params, headers=headers, timeout=60)
                 duration = time.time() - start_time
 
                 response_body_log = response.text[:10000] if response.text else ''
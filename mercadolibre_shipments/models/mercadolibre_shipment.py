@@ -281,6 +281,11 @@ class MercadolibreShipment(models.Model):
         string='Ultima Sincronizacion',
         readonly=True
     )
+    ml_last_updated = fields.Datetime(
+        string='Ultima Modificacion ML',
+        readonly=True,
+        help='last_updated del envio en MercadoLibre; si no cambia, el cron no reescribe el registro'
+    )
     sync_error = fields.Text(
         string='Error Sincronizacion',
         readonly=True
@@ -354,6 +359,36 @@ class MercadolibreShipment(models.Model):
             ('account_id', '=', account.id)
         ], limit=1)
 
+        vals = self._prepare_vals_from_ml_data(data, account)
+        status = vals['status']
+
+        # Vincular con orden si se proporciona
+        if order:
+            vals['order_id'] = order.id
+
+        old_status = existing.status if existing else None
+
+        if existing:
+            _logger.info('Actualizando envio existente: %s', ml_shipment_id)
+            existing.write(vals)
+            shipment = existing
+            is_new = False
+        else:
+            _logger.info('Creando nuevo envio: %s', ml_shipment_id)
+            shipment = self.create(vals)
+            is_new = True
+
+        # Registrar cambio de estado en historial
+        if status and (is_new or old_status != status):
+            shipment._create_status_history(status, vals['substatus'])
+
+        return shipment, is_new
+
+    @api.model
+    def _prepare_vals_from_ml_data(self, data, account):
+        """Valores del registro de envio a partir de los datos de la API."""
+        ml_shipment_id = str(data.get('id', ''))
+
         # Extraer datos de status
         status_data = data.get('status', '')
         substatus_data = data.get('substatus', '')
@@ -449,31 +484,11 @@ class MercadolibreShipment(models.Model):
             'dimensions': dimensions,
             'weight': weight,
             'raw_data': json.dumps(data, indent=2, ensure_ascii=False),
+            'ml_last_updated': self._parse_datetime(data.get('last_updated')),
             'last_sync_date': fields.Datetime.now(),
             'sync_error': False,
         }
-
-        # Vincular con orden si se proporciona
-        if order:
-            vals['order_id'] = order.id
-
-        old_status = existing.status if existing else None
-
-        if existing:
-            _logger.info('Actualizando envio existente: %s', ml_shipment_id)
-            existing.write(vals)
-            shipment = existing
-            is_new = False
-        else:
-            _logger.info('Creando nuevo envio: %s', ml_shipment_id)
-            shipment = self.create(vals)
-            is_new = True
-
-        # Registrar cambio de estado en historial
-        if status and (is_new or old_status != status):
-            shipment._create_status_history(status, substatus_data)
-
-        return shipment, is_new
+        return vals
 
     def _map_ml_status(self, ml_status):
         """Mapea el status de ML a nuestro selection"""
@@ -564,12 +579,18 @@ class MercadolibreShipment(models.Model):
     def _create_status_history(self, status, substatus=None):
         """Crea registro en historial de estados"""
         self.ensure_one()
-        self.env['mercadolibre.shipment.status.history'].create({
+        self.env['mercadolibre.shipment.status.history'].create(
+            self._prepare_status_history_vals(status, substatus)
+        )
+
+    def _prepare_status_history_vals(self, status, substatus=None):
+        self.ensure_one()
+        return {
             'shipment_id': self.id,
             'status': status,
             'substatus': substatus,
             'date': fields.Datetime.now(),
-        })
+        }
 
     # =========================================================================
     # SINCRONIZACION MANUAL
@@ -594,7 +615,7 @@ class MercadolibreShipment(models.Model):
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, headers=headers, timeout=30)
 
             if response.status_code == 200:
                 data = response.json()
@@ -653,7 +674,7 @@ class MercadolibreShipment(models.Model):
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(account).get(url, headers=headers, timeout=30)
 
             if response.status_code == 200:
                 data = response.json()
@@ -709,7 +730,7 @@ class MercadolibreShipment(models.Model):
         }
 
         try:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.env['mercadolibre.http']._get_session(self.account_id).get(url, headers=headers, timeout=30)
 
             if response.status_code == 200:
                 # Guardar URL de etiqueta PDF
@@ -963,53 +984,234 @@ class MercadolibreShipment(models.Model):
         Sincroniza envios de ordenes que:
         - Tienen shipment_id pero no tienen registro de shipment
         - Tienen shipment no entregado (para actualizar estado)
+
+        Cada grupo se procesa con mercadolibre.job: lotes por ID con commit
+        por lote y cursor persistente. Si se agota el tiempo del cron se
+        vuelve a disparar y continua desde el ultimo lote confirmado.
         """
         Order = self.env['mercadolibre.order']
+        Job = self.env['mercadolibre.job']
+        cron = self.env.ref('mercadolibre_shipments.ir_cron_sync_shipments', raise_if_not_found=False)
+        deadline = Job._get_deadline()
         accounts = self.env['mercadolibre.account'].search([
             ('state', '=', 'connected')
         ])
+        if not accounts:
+            return True
+
+        def fetch_missing(cursor, limit):
+            # Ordenes con shipment_id pero sin registro de shipment
+            orders = Order.search([
+                ('account_id', 'in', accounts.ids),
+                ('ml_shipment_id', '!=', False),
+                ('ml_shipment_id', '!=', ''),
+                ('shipment_id', '=', False),
+                ('id', '>', int(cursor or 0)),
+            ], order='id', limit=limit)
+            return orders, orders[-1:].id
+
+        def process_missing(orders):
+            for account in orders.account_id:
+                account_orders = orders.filtered(lambda o: o.account_id == account)
+                self._sync_shipments_chunk(
+                    account, orders_by_shipment={o.ml_shipment_id: o for o in account_orders}
+                )
+
+        def fetch_pending(cursor, limit):
+            # Envios no entregados (para tracking)
+            shipments = self.search([
+                ('account_id', 'in', accounts.ids),
+                ('status', 'not in', ['delivered', 'cancelled', 'returned']),
+                ('ml_shipment_id', '!=', False),
+                ('id', '>', int(cursor or 0)),
+            ], order='id', limit=limit)
+            return shipments, shipments[-1:].id
+
+        def process_pending(shipments):
+            for account in shipments.account_id:
+                account_shipments = shipments.filtered(lambda s: s.account_id == account)
+                self._sync_shipments_chunk(
+                    account, pending_by_id={s.ml_shipment_id: s for s in account_shipments}
+                )
+
+        jobs = [
+            ('mercadolibre.shipment.sync_missing', fetch_missing, process_missing),
+            ('mercadolibre.shipment.sync_pending', fetch_pending, process_pending),
+        ]
+        # Un trabajo pausado se reanuda antes de empezar pasadas nuevas
+        jobs.sort(key=lambda job: Job._get_job(job[0]).state != 'paused')
+
+        for key, fetch, process in jobs:
+            stats = Job._run_chunked(key, fetch, process, cron=cron, deadline=deadline)
+            if not stats['drained'] and not stats['locked']:
+                break
+
+        return True
+
+    @api.model
+    def _sync_shipments_chunk(self, account, orders_by_shipment=None, pending_by_id=None):
+        """
+        Descarga y aplica un lote de envios de una cuenta.
+
+        Args:
+            account: mercadolibre.account
+            orders_by_shipment: {ml_shipment_id: mercadolibre.order} sin registro de shipment
+            pending_by_id: {ml_shipment_id: mercadolibre.shipment} a refrescar
+        """
+        orders_by_shipment = orders_by_shipment or {}
+        pending_by_id = pending_by_id or {}
+        ml_shipment_ids = list(dict.fromkeys(
+            list(orders_by_shipment) + list(pending_by_id)
+        ))
+        if not ml_shipment_ids:
+            return
+
+        # Descarga concurrente; las escrituras se hacen abajo en el cursor principal
+        results = self.env['mercadolibre.http']._request_batch(
+            account.id,
+            [f'/shipments/{sid}' for sid in ml_shipment_ids],
+        )
+
+        now = fields.Datetime.now()
+        failed = {}
+        unchanged = self.browse()
+        updates = []        # (shipment, vals)
+        creates = []        # (order, vals)
+        for ml_shipment_id, result in zip(ml_shipment_ids, results):
+            shipment = pending_by_id.get(ml_shipment_id)
+            if result['error']:
+                _logger.error('Error sync shipment %s: %s', ml_shipment_id, result['error'])
+                if shipment:
+                    failed.setdefault(result['error'], self.browse())
+                    failed[result['error']] |= shipment
+                continue
 
-        for account in accounts:
             try:
-                # Sincronizar ordenes sin shipment
-                orders_without_shipment = Order.search([
-                    ('account_id', '=', account.id),
-                    ('ml_shipment_id', '!=', False),
-                    ('ml_shipment_id', '!=', ''),
-                    ('shipment_id', '=', False),
-                ], limit=50)
-
-                for order in orders_without_shipment:
-                    try:
-                        shipment = self.sync_shipment_by_id(
-                            order.ml_shipment_id,
-                            account
-                        )
-                        if shipment and not shipment.order_id:
-                            shipment.order_id = order.id
-                        self.env.cr.commit()
-                    except Exception as e:
-                        _logger.error('Error sync shipment %s: %s',
-                                    order.ml_shipment_id, str(e))
-                        self.env.cr.rollback()
-
-                # Actualizar envios no entregados (para tracking)
-                pending_shipments = self.search([
-                    ('account_id', '=', account.id),
-                    ('status', 'not in', ['delivered', 'cancelled', 'returned']),
-                ], limit=100)
-
-                for shipment in pending_shipments:
-                    try:
-                        shipment.action_sync_from_api()
-                        self.env.cr.commit()
-                    except Exception as e:
-                        _logger.error('Error updating shipment %s: %s',
-                                    shipment.ml_shipment_id, str(e))
-                        self.env.cr.rollback()
+                vals = self._prepare_vals_from_ml_data(result['data'], account)
+            except Exception as e:
+                _logger.error('Error updating shipment %s: %s', ml_shipment_id, str(e))
+                continue
+
+            if shipment:
+                if self._is_unchanged(shipment, vals):
+                    unchanged |= shipment
+                else:
+                    updates.append((shipment, vals))
+            else:
+                order = orders_by_shipment[ml_shipment_id]
+                vals['order_id'] = order.id
+                creates.append((order, vals))
+
+        # Envios ya registrados pero sin vincular a la orden: se actualizan
+        if creates:
+            existing = {s.ml_shipment_id: s for s in self.search([
+                ('account_id', '=', account.id),
+                ('ml_shipment_id', 'in', [vals['ml_shipment_id'] for _order, vals in creates]),
+            ])}
+            if existing:
+                updates += [(existing[vals['ml_shipment_id']], vals) for _order, vals in creates
+                            if vals['ml_shipment_id'] in existing]
+                creates = [(order, vals) for order, vals in creates
+                           if vals['ml_shipment_id'] not in existing]
+
+        # Sin cambios en ML: solo se marca la sincronizacion (un UPDATE)
+        if unchanged:
+            unchanged.write({'last_sync_date': now, 'sync_error': False})
+        for error, shipments in failed.items():
+            shipments.write({'sync_error': error, 'last_sync_date': now})
+
+        history_vals = []
+        history_vals += self._apply_shipment_updates(updates)
+        history_vals += self._apply_shipment_creates(account, creates)
+        if history_vals:
+            self.env['mercadolibre.shipment.status.history'].create(history_vals)
+
+        _logger.info('Sync envios cuenta %s: %d sin cambios, %d actualizados, %d nuevos, %d errores',
+                     account.name, len(unchanged), len(updates), len(creates),
+                     sum(len(s) for s in failed.values()))
+
+    @api.model
+    def _is_unchanged(self, shipment, vals):
+        """
+        El envio no cambio en ML si coinciden last_updated y el estado.
+        Sin last_updated guardado (registros previos) siempre se reescribe.
+        """
+        return bool(
+            vals.get('ml_last_updated')
+            and shipment.ml_last_updated == vals['ml_last_updated']
+            and shipment.status == vals['status']
+            and (shipment.substatus or '') == (vals['substatus'] or '')
+        )
+
+    @api.model
+    def _apply_shipment_updates(self, updates):
+        """
+        Escribe los envios que cambiaron en un solo savepoint; si el lote
+        falla se reintenta de a uno para aislar el registro con error.
 
+        Returns:
+            list de vals de historial de estados para los cambios de estado
+        """
+        def apply(items):
+            history = []
+            for shipment, vals in items:
+                old_status = shipment.status
+                shipment.write(vals)
+                if vals['status'] and old_status != vals['status']:
+                    history.append(shipment._prepare_status_history_vals(vals['status'], vals['substatus']))
+            self.env.flush_all()
+            return history
+
+        if not updates:
+            return []
+        try:
+            with self.env.cr.savepoint():
+                return apply(updates)
+        except Exception as e:
+            _logger.warning('Error en lote de envios (%s), reintentando de a uno', e)
+
+        history = []
+        for shipment, vals in updates:
+            try:
+                with self.env.cr.savepoint():
+                    history += apply([(shipment, vals)])
             except Exception as e:
-                _logger.error('Error in cron sync shipments for account %s: %s',
-                            account.name, str(e))
+                _logger.error('Error updating shipment %s: %s', shipment.ml_shipment_id, str(e))
+        return history
 
-        return True
+    @api.model
+    def _apply_shipment_creates(self, account, creates):
+        """
+        Crea los envios de ordenes sin registro en un solo create y
+        propaga el tipo logistico a la orden.
+
+        Returns:
+            list de vals de historial de estados de los envios creados
+        """
+        def apply(items):
+            shipments = self.create([vals for _order, vals in items])
+            history = []
+            for (order, vals), shipment in zip(items, shipments):
+                if shipment.logistic_type and order.logistic_type != shipment.logistic_type:
+                    order.write({'logistic_type': shipment.logistic_type})
+                if vals['status']:
+                    history.append(shipment._prepare_status_history_vals(vals['status'], vals['substatus']))
+            self.env.flush_all()
+            return history
+
+        if not creates:
+            return []
+        try:
+            with self.env.cr.savepoint():
+                return apply(creates)
+        except Exception as e:
+            _logger.warning('Error creando lote de envios (%s), reintentando de a uno', e)
+
+        history = []
+        for item in creates:
+            try:
+                with self.env.cr.savepoint():
+                    history += apply([item])
+            except Exception as e:
+                _logger.error('Error updating shipment %s: %s', item[1]['ml_shipment_id'], str(e))
+        return history